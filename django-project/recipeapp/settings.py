@@ -141,6 +141,30 @@ if not DATABASE_URL:
         }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# Used for rendered recipe card fragments. The per-process memory cache is
+# fine for a single worker; deployments with several workers should point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. Redis or Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'recipeapp'),
+    }
+}
+
+
+# Search
+# 'database' (default) uses the database's full-text search (recipes/search.py).
+# 'memory' answers searches from an in-process BM25 index in each worker
+# (recipes/search_index.py), loaded at worker start from the snapshot file
+# below when it is current, or else built from the database. Set the snapshot
+# path to '' to always build from the database.
+RECIPE_SEARCH_BACKEND = os.getenv('RECIPE_SEARCH_BACKEND', 'database')
+RECIPE_SEARCH_SNAPSHOT = os.getenv('RECIPE_SEARCH_SNAPSHOT', str(BASE_DIR / 'search_index.pickle'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
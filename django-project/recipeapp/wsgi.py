@@ -15,3 +15,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipeapp.settings')
 
 application = get_wsgi_application()
 
+
+# Load the in-process search index (if enabled) and the completion index
+# before the first request
+from recipes import search_index, typeahead  # noqa: E402
+
+search_index.warm_up()
+typeahead.warm_up()
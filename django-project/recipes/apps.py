@@ -5,3 +5,6 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
 
+    def ready(self):
+        # Register signal handlers that keep derived recipe data in sync
+        from . import signals  # noqa: F401
@@ -0,0 +1,221 @@
+"""
+Helpers for performance benchmarks of the recipe listing and search.
+
+Benchmarks seed a synthetic catalog with bulk inserts (no signals fire), run
+their measurements, and roll everything back; see the `benchmark_*`
+management commands. In-memory benchmarks use synthetic documents instead.
+"""
+import itertools
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+
+from . import search
+from .models import ABTestClick, ABTestImpression, Recipe, RecipeCard, Step, Tag
+
+
+def seed_catalog(recipe_count, cuisine_count=12, dietary_count=8, dietary_rate=0.5,
+                 seed=0, batch_size=5000):
+    """
+    Bulk-insert a synthetic catalog of tagged recipes and build their cards.
+
+    Each recipe gets one random cuisine tag and each dietary tag with
+    probability `dietary_rate`. Meant to run inside a transaction that the
+    caller rolls back.
+
+    Args:
+        recipe_count: Number of recipes to create
+        cuisine_count: Number of cuisine tags
+        dietary_count: Number of dietary tags
+        dietary_rate: Probability that a recipe carries a given dietary tag
+        seed: Random seed, so runs are comparable
+        batch_size: Rows per bulk insert
+
+    Returns:
+        dict with keys 'cuisine' and 'dietary': lists of the created Tags
+    """
+    rng = random.Random(seed)
+    author = User.objects.create_user(username=f'benchmark-{rng.getrandbits(32):08x}')
+    cuisine = Tag.objects.bulk_create(
+        [Tag(name=f'bench-cuisine-{i}', category='cuisine') for i in range(cuisine_count)]
+    )
+    dietary = Tag.objects.bulk_create(
+        [Tag(name=f'bench-dietary-{i}', category='dietary') for i in range(dietary_count)]
+    )
+
+    RecipeTag = Recipe.tags.through
+    for start in range(0, recipe_count, batch_size):
+        recipes = []
+        for i in range(start, min(start + batch_size, recipe_count)):
+            recipe = Recipe(
+                title=f'Benchmark recipe {i}',
+                description='Synthetic recipe for benchmarks',
+                author=author,
+                prep_time=rng.randint(5, 60),
+                cook_time=rng.randint(0, 120),
+            )
+            recipe.total_time = recipe.compute_total_time()  # bulk_create skips save()
+            recipes.append(recipe)
+        Recipe.objects.bulk_create(recipes)
+        links = []
+        for recipe in recipes:
+            links.append(RecipeTag(recipe_id=recipe.pk, tag_id=rng.choice(cuisine).pk))
+            links.extend(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag.pk)
+                for tag in dietary if rng.random() < dietary_rate
+            )
+        RecipeTag.objects.bulk_create(links)
+        RecipeCard.objects.sync(recipe.pk for recipe in recipes)
+
+    return {'cuisine': cuisine, 'dietary': dietary}
+
+
+def seed_ab_tests(impression_count, click_rate=0.1, seed=0):
+    """
+    Bulk-insert synthetic AB test impressions and clicks.
+
+    Args:
+        impression_count: Number of impressions to create
+        click_rate: Probability that an impression gets a click
+        seed: Random seed, so runs are comparable
+    """
+    rng = random.Random(seed)
+    impressions = ABTestImpression.objects.bulk_create([
+        ABTestImpression(variant=rng.choice('AB'), path='/')
+        for _ in range(impression_count)
+    ])
+    ABTestClick.objects.bulk_create([
+        ABTestClick(impression=impression, variant=impression.variant, path='/')
+        for impression in impressions if rng.random() < click_rate
+    ])
+
+
+# Recipe words, most common first; synthetic text draws from them (plus a
+# long tail of made-up words) with Zipf-like frequencies
+RECIPE_WORDS = """
+    chicken garlic onion butter salt pepper olive oil tomato cheese pasta rice
+    sauce lemon fresh cream beef egg flour sugar roast bake simmer stir chop
+    slice potato carrot herb basil parsley soup salad spicy sweet crispy grill
+    pork fish shrimp bean lentil mushroom spinach ginger chili lime coconut
+    curry noodle bread dough yogurt honey vinegar mustard thyme rosemary oregano
+    cumin paprika cinnamon vanilla chocolate apple berry orange avocado corn
+    pepperoni bacon sausage tofu broccoli cabbage zucchini eggplant pumpkin
+    almond walnut peanut sesame soy miso kimchi tortilla taco burrito pizza
+""".split()
+
+
+def synthetic_documents(count, seed=0, vocabulary_size=20000):
+    """
+    Generate synthetic recipe texts for in-memory search benchmarks.
+
+    Args:
+        count: Number of documents
+        seed: Random seed, so runs are comparable
+        vocabulary_size: Number of distinct words to draw from
+
+    Yields:
+        (recipe_id, (title, description, tags, steps)) tuples, ids from 1
+    """
+    rng = random.Random(seed)
+    words = RECIPE_WORDS + [f'word{i}' for i in range(vocabulary_size - len(RECIPE_WORDS))]
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    for recipe_id in range(1, count + 1):
+        drawn = rng.choices(words, cum_weights=cum_weights, k=60)
+        yield recipe_id, (
+            ' '.join(drawn[:3]),
+            ' '.join(drawn[3:15]),
+            ' '.join(drawn[15:18]),
+            ' '.join(drawn[18:]),
+        )
+
+
+# Words of synthetic_documents() that seed_search_catalog() turns into tags
+SEARCH_TAG_WORDS = RECIPE_WORDS[:40]
+
+# Steps per recipe seeded by seed_search_catalog()
+SEARCH_STEP_COUNT = 3
+
+
+def seed_search_catalog(recipe_count, seed=0, batch_size=2000):
+    """
+    Bulk-insert synthetic recipes with searchable text, tags and steps.
+
+    Titles, descriptions and steps come from synthetic_documents(), so word
+    frequencies follow a Zipf-like curve as in real recipe text. A recipe
+    is tagged with every word of its tag text found in SEARCH_TAG_WORDS
+    (tags are named after the word, title-cased). Cards and full-text
+    documents (PostgreSQL or FTS5) are built too. Meant to run inside a
+    transaction that the caller rolls back.
+
+    Args:
+        recipe_count: Number of recipes to create
+        seed: Random seed, so runs are comparable
+        batch_size: Recipes per bulk insert
+
+    Returns:
+        dict: {tag name: Tag} of the tags used by the catalog
+    """
+    rng = random.Random(seed)
+    author = User.objects.create_user(username=f'benchmark-{rng.getrandbits(32):08x}')
+    names = [word.title() for word in SEARCH_TAG_WORDS]
+    Tag.objects.bulk_create([Tag(name=name, category='other') for name in names], ignore_conflicts=True)
+    tags = Tag.objects.in_bulk(names, field_name='name')
+
+    RecipeTag = Recipe.tags.through
+    documents = synthetic_documents(recipe_count, seed=seed)
+    while True:
+        batch = list(itertools.islice(documents, batch_size))
+        if not batch:
+            break
+        recipes = []
+        for _, (title, description, _, _) in batch:
+            recipe = Recipe(title=title.title(), description=description, author=author,
+                            prep_time=rng.randint(5, 60), cook_time=rng.randint(0, 120))
+            recipe.total_time = recipe.compute_total_time()  # bulk_create skips save()
+            recipes.append(recipe)
+        Recipe.objects.bulk_create(recipes)
+        links, steps = [], []
+        for recipe, (_, (_, _, tag_text, step_text)) in zip(recipes, batch):
+            links.extend(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tags[name].pk)
+                for name in {word.title() for word in tag_text.split()} if name in tags
+            )
+            words = step_text.split()
+            size = -(-len(words) // SEARCH_STEP_COUNT)
+            steps.extend(
+                Step(recipe=recipe, step_number=number + 1,
+                     instruction_text=' '.join(words[number * size:(number + 1) * size]).capitalize() + '.')
+                for number in range(SEARCH_STEP_COUNT)
+            )
+        RecipeTag.objects.bulk_create(links)
+        Step.objects.bulk_create(steps)
+        RecipeCard.objects.sync(recipe.pk for recipe in recipes)
+        search.update_document_range(recipes[0].pk, recipes[-1].pk + 1)
+    return tags
+
+
+def measure(func, repeat):
+    """
+    Time repeated calls of func.
+
+    Args:
+        func: Callable taking no arguments
+        repeat: Number of timed calls
+
+    Returns:
+        dict with 'median_ms', 'p95_ms' and 'result' (the last return value)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'result': result,
+    }
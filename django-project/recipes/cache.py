@@ -0,0 +1,254 @@
+"""
+Caching helpers for rendered recipe markup.
+
+Two layers live here:
+
+- Card fragments: recipe cards are rendered once per content version and
+  stored in the Django cache. A page of cards is fetched with a single
+  multi-get; only the misses are loaded from the database and rendered.
+
+- Anonymous full-page cache: complete responses of the home and recipe
+  detail pages for logged-out visitors. Entries are invalidated by writes
+  (see recipes/signals.py) rather than expiring on a short TTL.
+"""
+import hashlib
+import re
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import RecipeCard
+
+
+# Bump when recipe_card.html changes so stale markup is never served
+CARD_TEMPLATE_REVISION = 2
+
+# Fragments are immutable per version, so they can live for a long time
+CARD_FRAGMENT_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def card_fragment_key(recipe_id, version):
+    """Cache key of the rendered card for a recipe at a given content version."""
+    return f'recipe-card:r{CARD_TEMPLATE_REVISION}:{recipe_id}:{version}'
+
+
+# Parts of a cached card that search highlights replace
+_CARD_TITLE_RE = re.compile(r'(<h3 class="recipe-card-title">).*?(</h3>)', re.DOTALL)
+_CARD_SNIPPET_SLOT = '<!--search-snippet-->'
+
+
+def _with_highlight(fragment, highlight):
+    """Put a search highlight (see recipes/highlight.py) into a rendered card."""
+    fragment = _CARD_TITLE_RE.sub(lambda match: match.group(1) + highlight.title + match.group(2), fragment, count=1)
+    if highlight.snippet:
+        fragment = fragment.replace(
+            _CARD_SNIPPET_SLOT, f'<p class="recipe-card-snippet">{highlight.snippet}</p>', 1
+        )
+    return fragment
+
+
+def render_recipe_cards(cards, highlights=None):
+    """
+    Return the rendered HTML for each card, using the fragment cache.
+
+    The cards only need `recipe_id` and `version` loaded; full rows are
+    fetched (in one query) just for the cards missing from the cache.
+    Cached fragments do not depend on the search, so search highlights are
+    substituted into them afterwards.
+
+    Args:
+        cards: List of RecipeCard objects, in display order
+        highlights: Optional {recipe_id: highlight.Highlight}
+
+    Returns:
+        list: Safe HTML strings, one per card, in the same order
+    """
+    keys = [card_fragment_key(card.recipe_id, card.version) for card in cards]
+    fragments = cache.get_many(keys)
+
+    missing = [card.recipe_id for card, key in zip(cards, keys) if key not in fragments]
+    if missing:
+        rendered = {}
+        for card in RecipeCard.objects.filter(recipe_id__in=missing):
+            key = card_fragment_key(card.recipe_id, card.version)
+            rendered[key] = render_to_string('recipe_card.html', {'recipe': card})
+        cache.set_many(rendered, CARD_FRAGMENT_TIMEOUT)
+        fragments.update(rendered)
+
+    highlights = highlights or {}
+    html = []
+    for card, key in zip(cards, keys):
+        # A card edited between the two queries may have a newer version; skip it
+        if key not in fragments:
+            continue
+        fragment = fragments[key]
+        if card.recipe_id in highlights:
+            fragment = _with_highlight(fragment, highlights[card.recipe_id])
+        html.append(mark_safe(fragment))
+    return html
+
+
+# --- Anonymous full-page cache ----------------------------------------------
+
+# Safety net only: entries are invalidated by writes, not by expiry
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Views whose cached pages list many recipes and must be dropped on any change
+LISTING_PAGES = ('home',)
+
+# Query parameters that may be repeated; their values are sorted
+MULTI_VALUE_PARAMS = ('dietary',)
+
+
+def canonical_query_string(query_dict):
+    """
+    Canonicalize a request's GET parameters for use in a cache key.
+
+    Empty parameters are dropped, keys are sorted, values are stripped and
+    repeated filters such as `dietary` are sorted, so equivalent filter URLs
+    (e.g. `?dietary=2&dietary=1&q=` and `?dietary=1&dietary=2`) share an entry.
+
+    Args:
+        query_dict: request.GET
+
+    Returns:
+        str: Canonical, URL-encoded query string
+    """
+    pairs = []
+    for key in sorted(query_dict.keys()):
+        values = [value.strip() for value in query_dict.getlist(key) if value.strip()]
+        if key in MULTI_VALUE_PARAMS:
+            values = sorted(set(values), key=lambda v: (len(v), v))
+        else:
+            values = values[-1:]  # Views read single-value params with .get()
+        pairs.extend((key, value) for value in values)
+    return urlencode(pairs)
+
+
+def _generation_key(namespace):
+    return f'page-cache:gen:{namespace}'
+
+
+def _page_key(namespace, generation, identity):
+    # Hashed so long query strings stay within backend key limits (250 bytes on Memcached)
+    digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()
+    return f'page-cache:{namespace}:{generation}:{digest}'
+
+
+def _count(namespace, outcome):
+    """Increment the hit or miss counter for a cached view."""
+    key = f'page-cache:stats:{namespace}:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr(); start over
+            cache.add(key, 1, None)
+
+
+def _is_cacheable_request(request):
+    """Only logged-out GET/HEAD requests with no pending flash messages."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    return len(messages.get_messages(request)) == 0
+
+
+def cache_anonymous_page(namespace):
+    """
+    Decorator caching a view's full response for anonymous visitors.
+
+    Listing pages (see LISTING_PAGES) are keyed by a generation token for the
+    namespace plus a hash of the canonical query string; any recipe or tag
+    change replaces the token. Other pages are keyed per URL kwargs (e.g. the recipe
+    pk) and are dropped individually when that recipe changes.
+
+    Args:
+        namespace: Name of the cached page type (e.g. 'home', 'recipe')
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            if namespace in LISTING_PAGES:
+                gen_key = _generation_key(namespace)
+                generation = cache.get(gen_key)
+                if generation is None:
+                    generation = uuid.uuid4().hex[:12]
+                    cache.add(gen_key, generation, None)
+                identity = canonical_query_string(request.GET)
+            else:
+                generation = '0'
+                identity = ':'.join(f'{k}={v}' for k, v in sorted(kwargs.items()))
+            key = _page_key(namespace, generation, identity)
+
+            cached = cache.get(key)
+            if cached is not None:
+                _count(namespace, 'hits')
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            _count(namespace, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies and not getattr(response, 'streaming', False):
+                cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapped
+    return decorator
+
+
+def _drop_pages(recipe_ids, listings):
+    if listings:
+        cache.set_many({_generation_key(ns): uuid.uuid4().hex[:12] for ns in LISTING_PAGES}, None)
+    if recipe_ids:
+        cache.delete_many([_page_key('recipe', '0', f'pk={pk}') for pk in recipe_ids])
+
+
+def invalidate_pages(recipe_ids=(), listings=True):
+    """
+    Drop cached pages affected by a write.
+
+    Runs immediately and again after the surrounding transaction commits,
+    so a request that re-caches a page between the write and the commit
+    cannot leave stale content behind.
+
+    Args:
+        recipe_ids: Recipes whose detail pages changed
+        listings: Whether listing pages (home) must be dropped too
+    """
+    recipe_ids = list(recipe_ids)
+    _drop_pages(recipe_ids, listings)
+    transaction.on_commit(lambda: _drop_pages(recipe_ids, listings))
+
+
+def page_cache_stats():
+    """
+    Return hit/miss counters for each cached page type.
+
+    Returns:
+        dict: {namespace: {'hits': int, 'misses': int, 'hit_ratio': float}}
+    """
+    namespaces = LISTING_PAGES + ('recipe',)
+    keys = [f'page-cache:stats:{ns}:{outcome}' for ns in namespaces for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    stats = {}
+    for ns in namespaces:
+        hits = values.get(f'page-cache:stats:{ns}:hits', 0)
+        misses = values.get(f'page-cache:stats:{ns}:misses', 0)
+        total = hits + misses
+        stats[ns] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+        }
+    return stats
@@ -0,0 +1,187 @@
+"""
+Streaming recipe export as JSON Lines or CSV.
+
+Records carry the fields read by `manage.py import_recipes` (see
+recipes/import_records.py), so an export can be imported elsewhere, plus
+the recipe id, uploader and creation time:
+
+    id, title, description, recipe_author, source_url, image_url,
+    ingredients, prep_time, cook_time, total_time, author, created_at,
+    tags, steps
+
+In JSON Lines, tags and steps are lists; in CSV, tags are comma-separated
+and steps one per line within their cell.
+
+Recipes are read in primary key order with QuerySet.iterator(chunk_size),
+which uses a server-side cursor on PostgreSQL, and their tags and steps
+are prefetched one chunk at a time. Output is produced in pieces of about
+PIECE_SIZE characters, optionally gzip-compressed on the fly, so memory
+use does not grow with the number of recipes exported.
+
+Served by the export_recipes view and `manage.py export_recipes`.
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+from collections import defaultdict
+
+from . import search
+from .models import Recipe, Step
+
+
+# Recipes read (and tags and steps prefetched) per database round-trip
+CHUNK_SIZE = 2000
+
+# Characters of output gathered before a piece is yielded
+PIECE_SIZE = 64 * 1024
+
+# Fields of an exported record, in CSV column order
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'recipe_author', 'source_url', 'image_url', 'ingredients',
+    'prep_time', 'cook_time', 'total_time', 'author', 'created_at', 'tags', 'steps',
+)
+
+# Recipe columns read for the fields before tags and steps
+_RECIPE_COLUMNS = (
+    'pk', 'title', 'description', 'recipe_author', 'source_url', 'image_url', 'ingredients',
+    'prep_time', 'cook_time', 'total_time', 'author__username', 'created_at',
+)
+
+# Media types by format
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def filtered_recipes(query='', tag_ids=(), max_time=None):
+    """
+    Return every recipe matching a search and filters, as the home page does.
+
+    Args:
+        query: Search string, or '' for every recipe
+        tag_ids: Tag ids recipes must all carry (cuisine and dietary filters)
+        max_time: Maximum total time in minutes, or None
+
+    Returns:
+        QuerySet of Recipe objects in primary key order
+    """
+    # Every match: the listing pages through them all, the export streams them
+    recipes = search.search_recipes(query, Recipe.objects.all(), limit=None).with_all_tags(tag_ids)
+    if max_time is not None:
+        recipes = recipes.filter(total_time__lte=max_time)
+    return recipes.order_by('pk')
+
+
+def _chunks(rows, size):
+    """Group an iterable into lists of at most size items."""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_records(recipes, chunk_size=CHUNK_SIZE):
+    """
+    Yield one dict per recipe, streaming from the database.
+
+    Recipe rows are read as tuples rather than model instances, and the
+    tags and steps of each chunk are fetched with one query each, which
+    is what prefetch_related would run, without building an object per
+    row.
+
+    Args:
+        recipes: QuerySet of Recipe objects (e.g., from filtered_recipes)
+        chunk_size: Recipes fetched, with their tags and steps, per query
+
+    Yields:
+        dict: The EXPORT_FIELDS of a recipe
+    """
+    rows = recipes.values_list(*_RECIPE_COLUMNS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        recipe_ids = [row[0] for row in chunk]
+        tags = defaultdict(list)
+        for recipe_id, name in Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids).order_by(
+            'recipe_id', 'tag__name'
+        ).values_list('recipe_id', 'tag__name'):
+            tags[recipe_id].append(name)
+        steps = defaultdict(list)
+        for recipe_id, text in Step.objects.filter(recipe_id__in=recipe_ids).order_by(
+            'recipe_id', 'step_number'
+        ).values_list('recipe_id', 'instruction_text'):
+            steps[recipe_id].append(text)
+        for row in chunk:
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['tags'] = tags[record['id']]
+            record['steps'] = steps[record['id']]
+            record['created_at'] = record['created_at'].isoformat()
+            yield record
+
+
+def _lines(records, fmt):
+    """Serialize records, yielding one line (or CSV row) at a time."""
+    if fmt == 'jsonl':
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values):
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield row(EXPORT_FIELDS)
+    for record in records:
+        record['tags'] = ', '.join(record['tags'])
+        record['steps'] = '\n'.join(record['steps'])
+        yield row(['' if record[field] is None else record[field] for field in EXPORT_FIELDS])
+
+
+def _pieces(lines):
+    """Join lines into pieces of about PIECE_SIZE characters."""
+    piece, size = [], 0
+    for line in lines:
+        piece.append(line)
+        size += len(line)
+        if size >= PIECE_SIZE:
+            yield ''.join(piece)
+            piece, size = [], 0
+    if piece:
+        yield ''.join(piece)
+
+
+def _gzipped(chunks):
+    """Compress a stream of bytes into one gzip member, chunk by chunk."""
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(recipes, fmt='jsonl', compress=False, chunk_size=CHUNK_SIZE):
+    """
+    Stream an export of recipes.
+
+    Args:
+        recipes: QuerySet of Recipe objects (e.g., from filtered_recipes)
+        fmt: 'jsonl' or 'csv'
+        compress: Whether to gzip the output
+        chunk_size: Recipes fetched, with their tags and steps, per query
+
+    Returns:
+        iterator of bytes: Pieces of UTF-8 output, gzip-compressed if asked
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f'Unknown export format {fmt!r}')
+    chunks = (piece.encode() for piece in _pieces(_lines(export_records(recipes, chunk_size), fmt)))
+    return _gzipped(chunks) if compress else chunks
@@ -0,0 +1,102 @@
+"""
+Facet counts for the home page filters.
+
+For the current search and filter state, reports how many recipes each
+filter option would return:
+
+    - per cuisine tag: results if that cuisine were chosen instead
+    - per dietary tag: results if that tag were ticked as well
+    - per time bucket: results if that limit were chosen instead
+
+Everything is computed with two aggregate queries, whatever the number of
+tags: one grouped pass over the recipe-tag table for the tag facets, and
+one pass over RecipeCard for the time buckets and the total result count.
+"""
+from django.db.models import Count, Q
+
+from .models import Recipe, RecipeCard, has_tag
+
+
+# (minutes, label) for each option of the "Time to Make" filter
+TIME_BUCKETS = [
+    (15, 'Under 15 min'),
+    (30, 'Under 30 min'),
+    (60, 'Under 1 hour'),
+    (120, 'Under 2 hours'),
+]
+
+
+def _all_of(conditions):
+    """AND a list of Q objects together (an empty list matches everything)."""
+    combined = Q()
+    for condition in conditions:
+        combined &= condition
+    return combined
+
+
+def _count(field, condition):
+    """Count(field), filtered only when there is a condition to apply."""
+    return Count(field, filter=condition) if condition else Count(field)
+
+
+def facet_counts(matching_ids=None, cuisine_id=None, dietary_ids=(), max_time=None):
+    """
+    Compute facet counts for the current search and filter state.
+
+    Args:
+        matching_ids: Subquery/iterable of recipe ids matching the search,
+            or None when there is no search
+        cuisine_id: Selected cuisine tag id, or None
+        dietary_ids: Selected dietary tag ids
+        max_time: Selected maximum total time in minutes, or None
+
+    Returns:
+        dict with keys:
+            tags: {tag_id: count} for cuisine and dietary tags
+            time: {minutes: count} for each TIME_BUCKETS option
+            total: Number of recipes matching all current filters
+    """
+    # Conditions on the recipe of each recipe-tag row
+    cuisine_q = Q(has_tag(cuisine_id, 'recipe_id')) if cuisine_id is not None else Q()
+    dietary_q = _all_of([Q(has_tag(tag_id, 'recipe_id')) for tag_id in dietary_ids])
+    time_q = Q(recipe__total_time__lte=max_time) if max_time is not None else Q()
+
+    RecipeTag = Recipe.tags.through
+    rows = RecipeTag.objects.filter(tag__category__in=('cuisine', 'dietary'))
+    if matching_ids is not None:
+        rows = rows.filter(recipe_id__in=matching_ids)
+    rows = (
+        rows.values('tag_id', 'tag__category')
+        .annotate(
+            # Cuisine is single-select: count as if this cuisine replaced the current one
+            as_cuisine=_count('recipe_id', dietary_q & time_q),
+            # Dietary tags are AND-combined: count with every current filter applied
+            as_dietary=_count('recipe_id', cuisine_q & dietary_q & time_q),
+        )
+        .order_by()
+    )
+    tags = {
+        row['tag_id']: row['as_cuisine'] if row['tag__category'] == 'cuisine' else row['as_dietary']
+        for row in rows
+    }
+
+    # Time buckets and the total result count in one pass over the cards
+    cards = RecipeCard.objects.all()
+    if matching_ids is not None:
+        cards = cards.filter(recipe_id__in=matching_ids)
+    tag_q = _all_of([
+        Q(has_tag(tag_id, 'recipe_id'))
+        for tag_id in ([cuisine_id] if cuisine_id is not None else []) + list(dietary_ids)
+    ])
+    selected_time_q = Q(total_time__lte=max_time) if max_time is not None else Q()
+    buckets = {
+        f'under_{minutes}': _count('pk', tag_q & Q(total_time__lte=minutes))
+        for minutes, _ in TIME_BUCKETS
+    }
+    totals = cards.aggregate(total=_count('pk', tag_q & selected_time_q), **buckets)
+
+    return {
+        'tags': tags,
+        'time': {minutes: totals[f'under_{minutes}'] for minutes, _ in TIME_BUCKETS},
+        'total': totals['total'],
+    }
@@ -113,7 +113,7 @@ class RecipeForm(forms.ModelForm):
         Returns:
             str or None: The URL if provided, None if empty
         """
-        url = self.cleaned_data.get('image_url', '').strip()
+        url = (self.cleaned_data.get('image_url') or '').strip()
         return url if url else None
 
     def clean_source_url(self):
@@ -126,5 +126,5 @@ class RecipeForm(forms.ModelForm):
         Returns:
             str or None: The URL if provided, None if empty
         """
-        url = self.cleaned_data.get('source_url', '').strip()
+        url = (self.cleaned_data.get('source_url') or '').strip()
         return url if url else None
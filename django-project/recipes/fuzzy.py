@@ -0,0 +1,275 @@
+"""
+Typo-tolerant search: correcting misspelled query words.
+
+Searches like "carbonnara" or "choclate" find nothing with exact lexeme or
+substring matching. The home page therefore retries a search that returned
+few results with every unknown query word replaced by the most similar term
+of the lexicon (SearchTerm: the words of recipe titles, tag names and
+ingredients), e.g. "choclate cake" -> "chocolate cake".
+
+Similarity is pg_trgm's: the share of common trigrams, where a word's
+trigrams are the three-letter substrings of the word padded with two spaces
+in front and one behind. Candidate terms always come from an index, never
+from a scan of the lexicon:
+
+- PostgreSQL: the `%` operator over a GIN `gin_trgm_ops` index on
+  SearchTerm.word (migration 0015).
+- Other databases: an in-process trigram index (trigram -> term ids), kept
+  current like the tag index with the 'search_terms' IndexVersion token.
+"""
+import re
+import threading
+from array import array
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models.functions import Abs, Length
+
+from .models import IndexVersion, Recipe, SearchTerm
+from .search_index import STOP_WORDS, fold
+
+
+INDEX_NAME = 'search_terms'
+
+# The home page tries a corrected query when a search finds fewer recipes
+MIN_RESULTS = 3
+
+# Minimum trigram similarity of a correction (pg_trgm's default threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+# Words outside these lengths are neither stored nor corrected
+MIN_WORD_LENGTH = 3
+MAX_WORD_LENGTH = 64
+
+# Recipes read per batch when rebuilding the lexicon
+BATCH_SIZE = 1000
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def words(text):
+    """
+    Return the lexicon words of a text.
+
+    Args:
+        text: Any text (title, tag name, ingredient list, query)
+
+    Returns:
+        list of folded words, without stop words, numbers and words that
+        are too short or too long
+    """
+    return [
+        word for word in _WORD_RE.findall(fold(text or ''))
+        if MIN_WORD_LENGTH <= len(word) <= MAX_WORD_LENGTH and word.isalpha() and word not in STOP_WORDS
+    ]
+
+
+def trigrams(word):
+    """Return the set of trigrams of a word, padded as pg_trgm does."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Trigram similarity of two words, between 0 and 1 (pg_trgm's similarity())."""
+    ta, tb = trigrams(a), trigrams(b)
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+
+def recipe_words(recipes):
+    """
+    Collect the lexicon words of recipes.
+
+    Args:
+        recipes: Recipe QuerySet
+
+    Returns:
+        set of words from the recipes' titles, tag names and ingredients
+    """
+    found = set()
+    for title, ingredients in recipes.order_by().values_list('title', 'ingredients'):
+        found.update(words(title))
+        found.update(words(ingredients))
+    RecipeTag = Recipe.tags.through
+    tag_names = RecipeTag.objects.filter(recipe__in=recipes).values_list('tag__name', flat=True).distinct()
+    for name in tag_names:
+        found.update(words(name))
+    return found
+
+
+def recipes_changed(recipe_ids):
+    """
+    Add the words of written recipes to the lexicon.
+
+    Called from `recipes_changed` (see recipes/signals.py), inside the
+    transaction of the write.
+
+    Args:
+        recipe_ids: Ids of recipes that were created, edited or deleted
+    """
+    new = recipe_words(Recipe.objects.filter(pk__in=recipe_ids))
+    new -= set(SearchTerm.objects.filter(word__in=new).values_list('word', flat=True))
+    if not new:
+        return
+    SearchTerm.objects.bulk_create([SearchTerm(word=word) for word in new], ignore_conflicts=True)
+    term_index.terms_added(new)
+
+
+def rebuild_terms():
+    """
+    Recompute the lexicon from every recipe, dropping words no longer used.
+
+    Returns:
+        int: Number of terms
+    """
+    lexicon = set()
+    last = 0
+    while True:
+        ids = list(Recipe.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        lexicon |= recipe_words(Recipe.objects.filter(pk__in=ids))
+        last = ids[-1]
+    with transaction.atomic():
+        SearchTerm.objects.all().delete()
+        SearchTerm.objects.bulk_create([SearchTerm(word=word) for word in sorted(lexicon)], batch_size=BATCH_SIZE)
+        IndexVersion.objects.replace(INDEX_NAME)
+    return len(lexicon)
+
+
+class TrigramIndex:
+    """
+    Per-process trigram index over the lexicon, for databases without pg_trgm.
+
+    Each trigram maps to the ids of the terms containing it, so the terms
+    sharing trigrams with a query word are found by merging a few short
+    posting lists.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None  # None until loaded, and after a missed write
+        self._terms = []  # term id -> word
+        self._sizes = array('H')  # term id -> number of trigrams
+        self._ids = {}  # word -> term id
+        self._postings = {}  # trigram -> array of term ids
+
+    def ensure_current(self):
+        """Reload the index if it was never loaded or another worker wrote since."""
+        current = IndexVersion.objects.current(INDEX_NAME)
+        with self._lock:
+            if current != self._version:
+                self._load(current)
+
+    def _load(self, version):
+        self._terms, self._sizes, self._ids, self._postings = [], array('H'), {}, {}
+        self.add_terms(SearchTerm.objects.order_by().values_list('word', flat=True).iterator(chunk_size=5000))
+        self._version = version
+
+    def add_terms(self, new_words):
+        """Index words directly, without touching the database (as the benchmarks do)."""
+        for word in new_words:
+            if word in self._ids:
+                continue
+            term_id = self._ids[word] = len(self._terms)
+            self._terms.append(word)
+            word_trigrams = trigrams(word)
+            self._sizes.append(len(word_trigrams))
+            for trigram in word_trigrams:
+                postings = self._postings.get(trigram)
+                if postings is None:
+                    postings = self._postings[trigram] = array('I')
+                postings.append(term_id)
+
+    def terms_added(self, new_words):
+        """
+        Apply new lexicon terms to the index and publish a new version token.
+
+        Args:
+            new_words: Words just inserted into SearchTerm
+        """
+        old, new = IndexVersion.objects.replace(INDEX_NAME)
+        with self._lock:
+            if self._version is None or self._version != old:
+                # Not loaded, or already behind: reload on next use instead
+                self._version = None
+                return
+            self.add_terms(new_words)
+            self._version = new
+
+    def __contains__(self, word):
+        return word in self._ids
+
+    def closest(self, word):
+        """
+        Find the term most similar to a word.
+
+        Args:
+            word: Folded word
+
+        Returns:
+            str: The most similar term (ties: closest in length, then
+            alphabetical), or None if none reaches SIMILARITY_THRESHOLD
+        """
+        query = trigrams(word)
+        with self._lock:
+            shared = Counter()
+            for trigram in query:
+                shared.update(self._postings.get(trigram, ()))
+            best = min((
+                (-count / (len(query) + self._sizes[term_id] - count),
+                 abs(len(self._terms[term_id]) - len(word)),
+                 self._terms[term_id])
+                for term_id, count in shared.items()
+            ), default=None)
+        if best is None or -best[0] < SIMILARITY_THRESHOLD:
+            return None
+        return best[2]
+
+
+def _closest_postgres(word):
+    """Find the most similar term with pg_trgm, through the GIN index."""
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    return (
+        SearchTerm.objects.filter(word__trigram_similar=word)  # `%`, served by the GIN index
+        .annotate(similarity=TrigramSimilarity('word', word), length_gap=Abs(Length('word') - len(word)))
+        .order_by('-similarity', 'length_gap', 'word')
+        .values_list('word', flat=True)
+        .first()
+    )
+
+
+def correct(query):
+    """
+    Replace the unknown words of a query with their closest lexicon terms.
+
+    Args:
+        query: Search string from user input
+
+    Returns:
+        str: The corrected query, or None if no word was corrected
+    """
+    query_words = _WORD_RE.findall(fold(query))
+    candidates = [word for word in query_words if words(word) == [word]]
+    if not candidates:
+        return None
+    if connection.vendor == 'postgresql':
+        known = set(SearchTerm.objects.filter(word__in=candidates).values_list('word', flat=True))
+        closest = _closest_postgres
+    else:
+        term_index.ensure_current()
+        known = {word for word in candidates if word in term_index}
+        closest = term_index.closest
+
+    corrected = []
+    for word in query_words:
+        if word in candidates and word not in known:
+            word = closest(word) or word
+        corrected.append(word)
+    return ' '.join(corrected) if corrected != query_words else None
+
+
+# The trigram index of this process
+term_index = TrigramIndex()
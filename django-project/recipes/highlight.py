@@ -0,0 +1,202 @@
+"""
+Search hit highlighting for the recipes on a results page.
+
+Each result shows its title with the matching words marked, and a short
+snippet of the description (or, failing that, the steps) around the first
+match, so visitors can see why a recipe was found.
+
+Highlights are built in Python for the recipes on the current page only,
+never for the whole result set, and only the first MAX_TEXT_CHARS of each
+description and step are read from the database. Which words count as a
+match follows the search backend that found the recipes:
+
+    memory, postgresql   words with the same stem as a query word
+                         (the last query word of a memory search also
+                         matches as a prefix)
+    fts5                 folded words equal to a query word, the last one
+                         as a prefix
+    substring search     every occurrence of the query text
+
+Home page searches keep the highlights they computed next to their cached
+results (see result_cache.CachedResults), so paging back and forth through
+a popular search builds each snippet once.
+"""
+import re
+from collections import namedtuple
+
+from django.db.models.functions import Substr
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import search
+from . import search_index as memory_search
+from .models import Recipe, Step
+
+
+# Characters of each description and step inspected for matches
+MAX_TEXT_CHARS = 2000
+
+# Steps inspected per recipe
+MAX_STEPS = 10
+
+# Length of a snippet, and of the context kept before its first match
+SNIPPET_CHARS = 160
+SNIPPET_LEAD = 40
+
+_WORD_RE = re.compile(r'\w+')
+
+Highlight = namedtuple('Highlight', 'title snippet')
+Highlight.__doc__ = 'Safe HTML of a result: its title and a snippet, matches wrapped in <mark>.'
+
+
+def current_backend():
+    """Return the search backend in use: 'memory', 'postgresql', 'fts5' or None."""
+    return 'memory' if memory_search.is_enabled() else search.backend()
+
+
+def _word_matcher(query, backend):
+    """Return a predicate telling whether a folded word matches the query."""
+    if backend == 'memory':
+        stems = set()
+        prefixes = []
+        for kind, value in memory_search.parse_query(query):
+            if kind == 'term':
+                stems.add(value)
+            elif kind == 'prefix':
+                prefixes.append(value[0])
+                stems.add(value[1])
+            else:
+                stems.update(term for _, term in value)
+        return lambda word: memory_search.stem(word) in stems or word.startswith(tuple(prefixes))
+    if backend == 'postgresql':
+        stems = {term for _, term in memory_search.analyze(query)}
+        return lambda word: memory_search.stem(word) in stems
+    # FTS5: every word as typed; a starred word and the last word as prefixes
+    words = re.findall(r'(\w+)(\*?)', memory_search.fold(query))
+    exact = {word for word, _ in words}
+    prefixes = tuple(word for i, (word, star) in enumerate(words) if star or i == len(words) - 1)
+    return lambda word: word in exact or word.startswith(prefixes)
+
+
+def matcher(query, backend):
+    """
+    Build a function finding the query's matches in a text.
+
+    Args:
+        query: Search string from user input
+        backend: 'memory', 'postgresql', 'fts5' or None (substring search)
+
+    Returns:
+        callable: text -> list of (start, end) spans, in order
+    """
+    if backend is None:
+        pattern = re.compile(re.escape(query), re.IGNORECASE) if query else None
+        return lambda text: [match.span() for match in pattern.finditer(text)] if pattern else []
+    matches_word = _word_matcher(query, backend)
+    return lambda text: [
+        match.span() for match in _WORD_RE.finditer(text)
+        if matches_word(memory_search.fold(match.group()))
+    ]
+
+
+def mark(text, spans, start=0, end=None):
+    """
+    Escape text[start:end] and wrap the given spans in <mark>.
+
+    Args:
+        text: Plain text
+        spans: Sorted (start, end) positions within text
+        start, end: Part of the text to keep
+
+    Returns:
+        SafeString
+    """
+    end = len(text) if end is None else end
+    parts = []
+    position = start
+    for span_start, span_end in spans:
+        if span_end <= position or span_start >= end:
+            continue
+        span_start, span_end = max(span_start, position), min(span_end, end)
+        parts.append(escape(text[position:span_start]))
+        parts.append(f'<mark>{escape(text[span_start:span_end])}</mark>')
+        position = span_end
+    parts.append(escape(text[position:end]))
+    return mark_safe(''.join(parts))
+
+
+def snippet(text, spans):
+    """
+    Cut a snippet of about SNIPPET_CHARS around the first match.
+
+    Args:
+        text: Plain text
+        spans: Sorted match positions within text (may be empty)
+
+    Returns:
+        SafeString, with '…' where the text was cut
+    """
+    start = 0
+    if spans and spans[0][0] > SNIPPET_LEAD:
+        # Start at a word boundary shortly before the first match
+        start = text.rfind(' ', 0, spans[0][0] - SNIPPET_LEAD) + 1
+    end = start + SNIPPET_CHARS
+    if end < len(text):
+        # Do not cut a word in half
+        space = text.rfind(' ', start, end)
+        end = space if space > start else end
+    else:
+        end = len(text)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(text) else ''
+    return mark_safe(prefix + mark(text, spans, start, end) + suffix)
+
+
+def _texts(recipe_ids):
+    """Read the title, the start of the description and the first steps of each recipe."""
+    texts = {
+        recipe_id: [title, description, []]
+        for recipe_id, title, description in Recipe.objects.filter(pk__in=recipe_ids).annotate(
+            start=Substr('description', 1, MAX_TEXT_CHARS)
+        ).values_list('pk', 'title', 'start')
+    }
+    steps = Step.objects.filter(recipe_id__in=recipe_ids, step_number__lte=MAX_STEPS).order_by(
+        'recipe_id', 'step_number'
+    ).annotate(start=Substr('instruction_text', 1, MAX_TEXT_CHARS)).values_list('recipe_id', 'start')
+    for recipe_id, text in steps:
+        recipe_steps = texts[recipe_id][2] if recipe_id in texts else None
+        # Guards against duplicate step numbers
+        if recipe_steps is not None and len(recipe_steps) < MAX_STEPS:
+            recipe_steps.append(text)
+    return texts
+
+
+def highlights(query, recipe_ids, backend, cached=None):
+    """
+    Highlight the titles and cut snippets for the recipes on a page.
+
+    Args:
+        query: Search string from user input
+        recipe_ids: Recipes on the page
+        backend: Search backend that found them (see current_backend)
+        cached: Optional dict of highlights already built for this search;
+            new ones are added to it
+
+    Returns:
+        dict: {recipe_id: Highlight}
+    """
+    cached = {} if cached is None else cached
+    missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in cached]
+    if missing:
+        find = matcher(query, backend)
+        for recipe_id, (title, description, steps) in _texts(missing).items():
+            spans = find(description)
+            text = description
+            if not spans:
+                for step in steps:
+                    step_spans = find(step)
+                    if step_spans:
+                        text, spans = step, step_spans
+                        break
+            cached[recipe_id] = Highlight(mark(title, find(title)), snippet(text, spans))
+    return {recipe_id: cached[recipe_id] for recipe_id in recipe_ids if recipe_id in cached}
@@ -0,0 +1,183 @@
+"""
+Reading and validating the records of a bulk recipe import.
+
+Two input formats are accepted, one recipe per record:
+
+    jsonl   JSON Lines: one object per line
+    csv     a header row, then one row per recipe (cells may span lines)
+
+with these fields (only title is required):
+
+    title, description, recipe_author, source_url, image_url
+    ingredients     one per line, or a JSON list
+    prep_time, cook_time    minutes
+    tags            comma-separated, or a JSON list of names
+    steps           one per line, or a JSON list
+
+The file is read in the importing process, which only splits it into raw
+records; validating them (parse_chunk) is pure Python and may run in worker
+processes. This module therefore imports no models, so workers started with
+the 'spawn' method need no Django setup.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+
+
+# Formats by file extension
+FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv'}
+
+# Column limits of Recipe and Tag (see recipes/models.py)
+MAX_TITLE_LENGTH = 200
+MAX_RECIPE_AUTHOR_LENGTH = 200
+MAX_URL_LENGTH = 200
+MAX_TAG_LENGTH = 50
+
+_validate_url = URLValidator()
+
+
+def read_records(path, fmt):
+    """
+    Yield the raw records of an import file, without validating them.
+
+    Args:
+        path: File path
+        fmt: 'jsonl' or 'csv'
+
+    Yields:
+        tuple: (line number, raw record); the record is the text of the
+        line for JSON Lines and a dict of cells for CSV. Blank JSON Lines
+        are skipped.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'jsonl':
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield number, line
+        else:
+            reader = csv.DictReader(f)
+            reader.fieldnames  # Read the header, so line_num counts from it
+            line = reader.line_num + 1
+            for row in reader:
+                yield line, row
+                line = reader.line_num + 1
+
+
+def _text(record, field, max_length=None):
+    value = record.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, (str, int, float)):
+        raise ValueError(f'{field} must be text')
+    value = str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def _minutes(record, field):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a whole number of minutes') from None
+    if minutes < 0 or minutes != float(value):
+        raise ValueError(f'{field} must be a whole number of minutes')
+    return minutes
+
+
+def _url(record, field):
+    url = _text(record, field, MAX_URL_LENGTH)
+    if not url:
+        return None
+    try:
+        _validate_url(url)
+    except ValidationError:
+        raise ValueError(f'{field} is not a valid URL') from None
+    return url
+
+
+def _items(record, field, separator):
+    value = record.get(field)
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.split(separator)
+    elif not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f'{field} must be text or a list of texts')
+    return [item.strip() for item in value if item.strip()]
+
+
+def parse_record(raw, fmt):
+    """
+    Validate one raw record.
+
+    Args:
+        raw: Raw record, as yielded by read_records
+        fmt: 'jsonl' or 'csv'
+
+    Returns:
+        dict: Recipe field values, plus 'tags' and 'steps' (lists of
+        strings); empty optional fields are '' or None, as the form
+        would save them
+
+    Raises:
+        ValueError: If the record is not a valid recipe
+    """
+    if fmt == 'jsonl':
+        try:
+            record = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'invalid JSON: {e.msg}') from None
+        if not isinstance(record, dict):
+            raise ValueError('record must be a JSON object')
+    else:
+        if None in raw:
+            raise ValueError('more cells than header columns')
+        record = raw
+    title = _text(record, 'title', MAX_TITLE_LENGTH)
+    if not title:
+        raise ValueError('title is required')
+    tags = list(dict.fromkeys(_items(record, 'tags', ',')))
+    for name in tags:
+        if len(name) > MAX_TAG_LENGTH:
+            raise ValueError(f'tag {name[:20]!r}... is longer than {MAX_TAG_LENGTH} characters')
+    ingredients = record.get('ingredients')
+    return {
+        'title': title,
+        'description': _text(record, 'description'),
+        'recipe_author': _text(record, 'recipe_author', MAX_RECIPE_AUTHOR_LENGTH),
+        'source_url': _url(record, 'source_url'),
+        'image_url': _url(record, 'image_url'),
+        'ingredients': '\n'.join(_items(record, 'ingredients', '\n')) if isinstance(ingredients, list)
+        else _text(record, 'ingredients'),
+        'prep_time': _minutes(record, 'prep_time'),
+        'cook_time': _minutes(record, 'cook_time'),
+        'tags': tags,
+        'steps': _items(record, 'steps', '\n'),
+    }
+
+
+def parse_chunk(fmt, chunk):
+    """
+    Validate a list of raw records; runs in worker processes.
+
+    Args:
+        fmt: 'jsonl' or 'csv'
+        chunk: List of (line number, raw record)
+
+    Returns:
+        list of (line number, record, error): record is the dict of
+        parse_record, or None with the error message if it was invalid
+    """
+    parsed = []
+    for line, raw in chunk:
+        try:
+            parsed.append((line, parse_record(raw, fmt), None))
+        except ValueError as e:
+            parsed.append((line, None, str(e)))
+    return parsed
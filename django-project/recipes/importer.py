@@ -0,0 +1,313 @@
+"""
+Bulk recipe import from JSON Lines or CSV files (see recipes/import_records.py).
+
+The file is streamed, never held in memory: raw records are read in order,
+validated in chunks by a pool of worker processes, and written in batches,
+each in its own transaction:
+
+    recipes         bulk_create (COPY FROM STDIN on PostgreSQL)
+    tags            resolved through an in-memory name -> id map; names not
+                    yet in the map are created with one bulk insert
+    tag links       one INSERT statement run for every row (COPY)
+    steps           one INSERT statement run for every row (COPY)
+
+Bulk inserts send no model signals, so each batch then parses the new
+recipes' ingredient rows and sends `recipes_changed` once for the whole
+batch (see recipes/signals.py): cards, search documents and the other
+derived data are written in the same transaction, and running workers
+reload their in-memory indexes.
+
+Progress is kept in an ImportCheckpoint row updated in the same
+transaction as each batch, so an interrupted import resumes after the last
+committed batch; records before it are read again but not parsed.
+
+Run with `manage.py import_recipes`.
+"""
+import io
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .import_records import FORMATS, parse_chunk, read_records
+from .models import ImportCheckpoint, Ingredient, Recipe, Step, Tag
+from .signals import notify_recipes_changed
+
+
+# Recipes written per transaction
+BATCH_SIZE = 1000
+
+# Records validated per task sent to a worker process
+PARSE_CHUNK_SIZE = 500
+
+# Chunks queued per worker, so parsing stays ahead of writing without
+# reading the whole file ahead
+CHUNKS_PER_WORKER = 4
+
+# Invalid records reported individually; later ones are only counted
+MAX_REPORTED_ERRORS = 20
+
+# Recipe columns written by COPY, in order
+_COPY_RECIPE_COLUMNS = (
+    'id', 'title', 'description', 'author_id', 'recipe_author', 'source_url', 'image_url',
+    'created_at', 'ingredients', 'prep_time', 'cook_time', 'total_time',
+)
+
+
+class TagIds:
+    """
+    Tag name -> id map, loaded once and extended as the import creates tags.
+
+    Names are matched exactly, as the recipe form does. Tags created here get
+    the default category.
+    """
+
+    def __init__(self):
+        self._ids = dict(Tag.objects.values_list('name', 'pk'))
+
+    def resolve(self, names):
+        """
+        Return the ids of the given tag names, creating the missing tags.
+
+        Costs no query if every name is known, otherwise two.
+
+        Args:
+            names: Iterable of tag names
+
+        Returns:
+            dict: {name: id}, covering at least the given names
+        """
+        missing = {name for name in names if name not in self._ids}
+        if missing:
+            # A tag created meanwhile by someone else is kept and looked up
+            Tag.objects.bulk_create([Tag(name=name) for name in sorted(missing)], ignore_conflicts=True)
+            self._ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'pk'))
+        return self._ids
+
+
+def _copy_value(value):
+    """Format a value for COPY's text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+def _insert_rows(table, columns, rows):
+    """
+    Insert plain rows into a table, skipping model instances and signals.
+
+    Uses COPY FROM STDIN on PostgreSQL and one prepared statement run for
+    every row (executemany) elsewhere.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    names = ', '.join(quote(column) for column in columns)
+    with connection.cursor() as cursor:
+        if connection.vendor != 'postgresql':
+            placeholders = ', '.join(['%s'] * len(columns))
+            cursor.executemany(f'INSERT INTO {quote(table)} ({names}) VALUES ({placeholders})', rows)
+            return
+        data = io.StringIO(''.join('\t'.join(_copy_value(value) for value in row) + '\n' for row in rows))
+        sql = f'COPY {quote(table)} ({names}) FROM STDIN'
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, data)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(data.getvalue())
+
+
+def _reserve_ids(model, count):
+    """Draw count ids from the sequence of a model's primary key (PostgreSQL)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _insert_recipes(records, author_id):
+    """Insert the recipe rows of a batch and return their ids, in order."""
+    now = timezone.now()
+    recipes = []
+    for record in records:
+        recipe = Recipe(
+            author_id=author_id,
+            created_at=now,
+            **{field: value for field, value in record.items() if field not in ('tags', 'steps')},
+        )
+        recipe.total_time = recipe.compute_total_time()  # bulk inserts skip save()
+        recipes.append(recipe)
+    if connection.vendor != 'postgresql':
+        Recipe.objects.bulk_create(recipes)
+        return [recipe.pk for recipe in recipes]
+    ids = _reserve_ids(Recipe, len(recipes))
+    for recipe, pk in zip(recipes, ids):
+        recipe.pk = pk
+    _insert_rows(Recipe._meta.db_table, _COPY_RECIPE_COLUMNS, (
+        [getattr(recipe, column) for column in _COPY_RECIPE_COLUMNS] for recipe in recipes
+    ))
+    return ids
+
+
+def _insert_batch(records, author_id, tag_ids):
+    """
+    Write a batch of validated records: recipes, tag links and steps.
+
+    Args:
+        records: Dicts from import_records.parse_record
+        author_id: Id of the User recorded as uploader
+        tag_ids: TagIds of the import
+
+    Returns:
+        list: Ids of the new recipes
+    """
+    recipe_ids = _insert_recipes(records, author_id)
+    names = tag_ids.resolve({name for record in records for name in record['tags']})
+    links = [
+        (recipe_id, names[name])
+        for recipe_id, record in zip(recipe_ids, records) for name in record['tags']
+    ]
+    steps = [
+        (recipe_id, number, text)
+        for recipe_id, record in zip(recipe_ids, records)
+        for number, text in enumerate(record['steps'], start=1)
+    ]
+    _insert_rows(Recipe.tags.through._meta.db_table, ('recipe_id', 'tag_id'), links)
+    _insert_rows(Step._meta.db_table, ('recipe_id', 'step_number', 'instruction_text'), steps)
+    return recipe_ids
+
+
+def _chunks(records, size):
+    """Group an iterable into lists of at most size items."""
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parsed(chunks, fmt, workers):
+    """
+    Validate chunks of raw records, in order.
+
+    With more than one worker, chunks are validated by a process pool,
+    keeping at most CHUNKS_PER_WORKER chunks per worker in flight.
+
+    Yields:
+        list: parse_chunk results, one list per chunk
+    """
+    parse = partial(parse_chunk, fmt)
+    if workers <= 1:
+        yield from map(parse, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parse, chunk))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _format(path):
+    """Guess the format of a file from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f'Cannot tell the format of {path}; pass jsonl or csv')
+    return FORMATS[extension]
+
+
+def import_recipes(path, author, fmt=None, batch_size=BATCH_SIZE, workers=1, checkpoint=None,
+                   restart=False, log=None):
+    """
+    Import the recipes of a JSON Lines or CSV file.
+
+    Invalid records are skipped and reported through log. An import
+    interrupted by an error resumes, when run again with the same
+    checkpoint, after its last committed batch.
+
+    Args:
+        path: File path
+        author: User recorded as the uploader of every recipe
+        fmt: 'jsonl' or 'csv' (default: from the file extension)
+        batch_size: Recipes written per transaction
+        workers: Processes validating records (1: validate inline)
+        checkpoint: Name of the checkpoint (default: the file's absolute path)
+        restart: Start from the first record, ignoring the checkpoint;
+            recipes imported before are not removed
+        log: Optional callable receiving progress messages
+
+    Returns:
+        dict: 'resumed_from' (records skipped from the checkpoint),
+        'imported', 'skipped', 'seconds' and 'rows_per_second' (records
+        read per second) of this run
+
+    Raises:
+        ValueError: If the format is unknown or the checkpoint name too long
+    """
+    log = log or (lambda message: None)
+    fmt = fmt or _format(path)
+    source = checkpoint or os.path.abspath(path)
+    if len(source) > ImportCheckpoint._meta.get_field('source').max_length:
+        raise ValueError('Checkpoint name is too long; choose a shorter one')
+    state, _ = ImportCheckpoint.objects.get_or_create(source=source)
+    if restart:
+        ImportCheckpoint.objects.filter(source=source).update(position=0, imported=0, skipped=0)
+        state.position = 0
+    resumed_from = state.position
+    if resumed_from:
+        log(f'Resuming after record {resumed_from}')
+
+    tag_ids = TagIds()
+    records = itertools.islice(read_records(path, fmt), resumed_from, None)
+    results = itertools.chain.from_iterable(_parsed(_chunks(records, PARSE_CHUNK_SIZE), fmt, workers))
+    imported = skipped = 0
+    start = time.perf_counter()
+    for batch in _chunks(results, batch_size):
+        valid = [record for _, record, _ in batch if record is not None]
+        for line, _, error in batch:
+            if error is not None:
+                skipped += 1
+                if skipped <= MAX_REPORTED_ERRORS:
+                    log(f'Skipped line {line}: {error}')
+        with transaction.atomic():
+            if valid:
+                recipe_ids = _insert_batch(valid, author.pk, tag_ids)
+                Ingredient.objects.sync(recipe_ids)
+                notify_recipes_changed(recipe_ids)
+            ImportCheckpoint.objects.filter(source=source).update(
+                position=F('position') + len(batch),
+                imported=F('imported') + len(valid),
+                skipped=F('skipped') + len(batch) - len(valid),
+                updated_at=timezone.now(),
+            )
+        imported += len(valid)
+        elapsed = time.perf_counter() - start
+        log(f'{imported + skipped} records, {imported} imported ({(imported + skipped) / elapsed:,.0f} records/s)')
+    if skipped > MAX_REPORTED_ERRORS:
+        log(f'{skipped - MAX_REPORTED_ERRORS} more invalid record(s) skipped')
+    elapsed = time.perf_counter() - start
+    return {
+        'resumed_from': resumed_from,
+        'imported': imported,
+        'skipped': skipped,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round((imported + skipped) / elapsed) if elapsed else 0,
+    }
@@ -0,0 +1,187 @@
+"""
+Parsing of free-text ingredient lines.
+
+Recipe.ingredients holds one ingredient per line, as typed ("2 cups flour,
+sifted", "½ tsp salt", "3 large eggs"). This module splits a line into
+
+    amount     the quantity and unit as written ("2 cups")
+    quantity   the amount as a number (2.0), or None
+    unit       the unit, normalized ("cup"), or ''
+    name       the rest of the line ("flour, sifted")
+    canonical  the ingredient itself, folded and singular ("flour")
+
+Canonical names are what pantry searches match on (see recipes/pantry.py):
+"3 Large Eggs" and "1 egg" both use "egg". Preparation notes after a comma
+or in parentheses and descriptive words ("chopped", "fresh") are left out.
+
+Only pure functions live here, without model imports, so recipes.models
+and migrations can use them.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+from fractions import Fraction
+
+
+# Unit spellings -> normalized unit
+UNITS = {}
+for _unit, _spellings in {
+    'cup': 'cup cups c',
+    'tbsp': 'tbsp tbsps tbs tablespoon tablespoons',
+    'tsp': 'tsp tsps teaspoon teaspoons',
+    'g': 'g gr gram grams',
+    'kg': 'kg kilogram kilograms',
+    'ml': 'ml milliliter milliliters millilitre millilitres',
+    'l': 'l liter liters litre litres',
+    'oz': 'oz ounce ounces',
+    'lb': 'lb lbs pound pounds',
+    'pinch': 'pinch pinches',
+    'dash': 'dash dashes',
+    'clove': 'clove cloves',
+    'can': 'can cans tin tins',
+    'slice': 'slice slices',
+    'bunch': 'bunch bunches',
+    'sprig': 'sprig sprigs',
+    'stick': 'stick sticks',
+    'package': 'package packages pkg',
+    'handful': 'handful handfuls',
+}.items():
+    UNITS.update(dict.fromkeys(_spellings.split(), _unit))
+
+# Words describing an ingredient rather than naming it
+DESCRIPTORS = frozenset("""
+    a an of the to for and or about approximately plus more
+    fresh freshly large small medium big whole ripe organic raw
+    chopped diced minced sliced grated shredded crushed cubed halved quartered
+    finely roughly thinly coarsely freshly lightly
+    peeled seeded pitted cored trimmed rinsed drained packed divided
+    softened melted beaten cooked boiled toasted
+    extra virgin unsalted boneless skinless
+    optional taste serving garnish room temperature
+""".split())
+
+_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+_NUMBER = r'(?:\d+\s+\d+/\d+|\d+/\d+|\d{1,3}(?:,\d{3})+(?:\.\d+)?(?![\d,])|\d+(?:[.,]\d+)?)'
+_THOUSANDS_RE = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?')
+_AMOUNT_RE = re.compile(rf'^({_NUMBER})(?:\s*(?:-|–|to)\s*{_NUMBER})?\s*')
+_NOTE_RE = re.compile(r'^\([^)]*\)\s*')
+_UNIT_RE = re.compile(r'^([a-zA-Z]+)\.?(?:\s+|$)')
+_BULLET_RE = re.compile(r'^[\s\-*•·]+')
+_WORD_RE = re.compile(r'[^\W\d_]+')
+
+# Words ending in "s" that are not plurals
+UNCOUNTABLE = frozenset('molasses hummus couscous asparagus citrus swiss brussels'.split())
+
+ParsedIngredient = namedtuple('ParsedIngredient', 'amount quantity unit name canonical')
+
+
+def _fold(text):
+    """Lower-case text and strip diacritics, as search_index.fold does."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _quantity(text):
+    """Convert '1 1/2', '2,5', '1,000' or '3/4' to a float; None for '1/0'."""
+    total = 0.0
+    for part in text.split():
+        # A comma before three digits groups thousands, otherwise it is decimal
+        part = part.replace(',', '') if _THOUSANDS_RE.fullmatch(part) else part.replace(',', '.')
+        try:
+            total += float(Fraction(part)) if '/' in part else float(part)
+        except (ValueError, ZeroDivisionError):
+            return None
+    return total
+
+
+def singular(word):
+    """Return a plural word's singular form ('tomatoes' -> 'tomato'), approximately."""
+    if word in UNCOUNTABLE:
+        return word
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def canonical_name(text):
+    """
+    Reduce an ingredient name to its canonical form.
+
+    Args:
+        text: Ingredient name, e.g. "Cherry Tomatoes (halved)"
+
+    Returns:
+        str: Folded words without descriptors, the last one singular
+        (e.g. "cherry tomato"); '' if nothing is left
+    """
+    text = re.split(r'[,(;]', text, maxsplit=1)[0]
+    words = [word for word in _WORD_RE.findall(_fold(text)) if word not in DESCRIPTORS and word not in UNITS]
+    if words:
+        words[-1] = singular(words[-1])
+    return ' '.join(words)[:100]
+
+
+def parse_amount(amount):
+    """
+    Parse an amount as written ("2 cups", "1/2", "200g").
+
+    Returns:
+        tuple: (quantity or None, normalized unit or '')
+    """
+    line = parse_ingredient(f'{amount} x')
+    return line.quantity, line.unit
+
+
+def parse_ingredient(line):
+    """
+    Split one ingredient line into its parts.
+
+    Args:
+        line: A line of Recipe.ingredients
+
+    Returns:
+        ParsedIngredient; `canonical` is '' for lines that name no
+        ingredient (blank lines, section headers such as "For the sauce:")
+    """
+    line = _BULLET_RE.sub('', line.strip())
+    for symbol, fraction in _FRACTIONS.items():
+        line = line.replace(symbol, f' {fraction}')
+    line = ' '.join(line.split())
+    if not line or line.endswith(':'):
+        return ParsedIngredient('', None, '', line, '')
+
+    rest = line
+    quantity = None
+    unit = ''
+    match = _AMOUNT_RE.match(rest)
+    if match:
+        quantity = _quantity(match.group(1))
+        rest = rest[match.end():]
+        # "1 (14 oz) can tomatoes": the note belongs to the amount
+        rest = _NOTE_RE.sub('', rest)
+    match = _UNIT_RE.match(rest)
+    if match and match.group(1).lower() in UNITS and (quantity is not None or match.group(1).lower() != 'c'):
+        unit = UNITS[match.group(1).lower()]
+        rest = rest[match.end():]
+    amount = line[:len(line) - len(rest)].strip()
+    name = re.sub(r'^of\s+', '', rest)
+    return ParsedIngredient(amount, quantity, unit, name, canonical_name(name))
+
+
+def parse_ingredients(text):
+    """
+    Parse a whole ingredient list.
+
+    Args:
+        text: Recipe.ingredients
+
+    Returns:
+        list of ParsedIngredient, one per line naming an ingredient
+    """
+    parsed = (parse_ingredient(line) for line in (text or '').splitlines())
+    return [line for line in parsed if line.canonical]
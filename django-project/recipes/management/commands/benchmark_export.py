@@ -0,0 +1,76 @@
+"""
+Management command benchmarking the streaming recipe export.
+
+For each size, seeds a synthetic catalog in the database (rolled back
+afterwards; see benchmarks.seed_search_catalog), then exports every
+recipe in each format, discarding the output. Reports the throughput and
+the process's resident memory: at the start of the export and its peak,
+sampled after every piece of output, so flat memory shows as a peak
+close to the start whatever the catalog size.
+
+Usage:
+    python manage.py benchmark_export [--sizes 100000,1000000] [--formats jsonl,csv] [--gzip]
+"""
+import os
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import exporter
+from recipes.benchmarks import seed_search_catalog
+
+
+def resident_memory():
+    """Return the resident set size of this process in bytes (peak so far where unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = 'Benchmark streaming exports of seeded synthetic catalogs: throughput and resident memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100000,1000000',
+                            help='Comma-separated catalog sizes (default: 100000,1000000)')
+        parser.add_argument('--formats', default='jsonl,csv',
+                            help='Comma-separated formats to export (default: jsonl,csv)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument('--chunk-size', type=int, default=exporter.CHUNK_SIZE,
+                            help=f'Recipes fetched per query (default: {exporter.CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        formats = options['formats'].split(',')
+        if set(formats) - set(exporter.CONTENT_TYPES):
+            raise CommandError(f'--formats must be among {", ".join(sorted(exporter.CONTENT_TYPES))}')
+        for size in sizes:
+            with transaction.atomic():
+                self.stdout.write(f'Seeding {size} recipes...')
+                start = time.perf_counter()
+                seed_search_catalog(size)
+                self.stdout.write(f'  seeded in {time.perf_counter() - start:.0f} s')
+                for fmt in formats:
+                    self._run(size, fmt, options['gzip'], options['chunk_size'])
+                transaction.set_rollback(True)
+
+    def _run(self, size, fmt, compress, chunk_size):
+        recipes = exporter.filtered_recipes()
+        before = peak = resident_memory()
+        written = 0
+        start = time.perf_counter()
+        for chunk in exporter.export(recipes, fmt, compress, chunk_size):
+            written += len(chunk)
+            peak = max(peak, resident_memory())
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  {fmt + (' gz' if compress else ''):<9} {elapsed:7.1f} s  {size / elapsed:9,.0f} recipes/s  "
+            f"{written / 2 ** 20:8.1f} MiB out  RSS {before / 2 ** 20:6.1f} -> peak {peak / 2 ** 20:6.1f} MiB"
+        )
@@ -0,0 +1,83 @@
+"""
+Management command benchmarking pantry searches on the ingredient index.
+
+Indexes synthetic recipes (no database rows are written) whose ingredients
+are drawn from a Zipf-like vocabulary, then times pantry searches of
+several sizes and missing-item allowances against each catalog size.
+
+Usage:
+    python manage.py benchmark_pantry [--sizes 10000,100000,1000000] [--repeat 20]
+"""
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.benchmarks import measure
+from recipes.pantry import IngredientIndex
+
+
+# Distinct ingredients in the synthetic catalog
+VOCABULARY_SIZE = 3000
+
+# Ingredients per synthetic recipe
+MIN_INGREDIENTS, MAX_INGREDIENTS = 4, 16
+
+# Pantry sizes and missing-item allowances timed per catalog
+PANTRY_SIZES = (5, 20, 100, 1000)
+ALLOWED_MISSING = (0, 2, 5)
+
+
+def _vocabulary():
+    names = [f'ingredient{i}' for i in range(VOCABULARY_SIZE)]
+    return names, list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+
+
+def synthetic_rows(count, seed=0):
+    """Yield (recipe_id, canonical name) pairs for `count` synthetic recipes."""
+    rng = random.Random(seed)
+    names, cum_weights = _vocabulary()
+    for recipe_id in range(1, count + 1):
+        for name in set(rng.choices(names, cum_weights=cum_weights, k=rng.randint(MIN_INGREDIENTS, MAX_INGREDIENTS))):
+            yield recipe_id, name
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pantry searches on the in-process ingredient index with synthetic catalogs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated catalog sizes (default: 10000,100000,1000000)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed searches per pantry (default: 20)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        for size in sizes:
+            self._run(size, options['repeat'])
+
+    def _run(self, size, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{size} recipes'))
+        index = IngredientIndex()
+        start = time.perf_counter()
+        index.build(synthetic_rows(size))
+        self.stdout.write(f'  build      {time.perf_counter() - start:8.1f} s')
+
+        # Pantries hold the most common ingredients, as real kitchens do
+        names, cum_weights = _vocabulary()
+        rng = random.Random(1)
+        for pantry_size in PANTRY_SIZES:
+            pantry = set()
+            while len(pantry) < pantry_size:
+                pantry.add(rng.choices(names, cum_weights=cum_weights)[0])
+            for max_missing in ALLOWED_MISSING:
+                timing = measure(lambda: index.search(pantry, max_missing), repeat)
+                self.stdout.write(
+                    f"  pantry {pantry_size:>4}  missing <= {max_missing}   "
+                    f"median {timing['median_ms']:8.2f} ms   p95 {timing['p95_ms']:8.2f} ms   "
+                    f"{timing['result'].count:>8,} matches"
+                )
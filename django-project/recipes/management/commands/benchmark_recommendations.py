@@ -0,0 +1,95 @@
+"""
+Management command benchmarking the favorites-based neighbour lists.
+
+Streams synthetic favorites (no database rows are written): users save a
+few to a few dozen recipes each, popular recipes far more often than the
+rest. For each size, computes every recipe's neighbour list as `--rebuild`
+does, and reports the time taken, the number of passes over the stream
+and the peak memory allocated (traced in a second run, as tracing slows
+Python down).
+
+Usage:
+    python manage.py benchmark_recommendations [--sizes 100000,1000000] [--max-pairs 2000000]
+"""
+import itertools
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import recommendations
+
+
+# Synthetic favorites per user, and recipes per favorite
+MIN_BASKET, MAX_BASKET = 1, 40
+FAVORITES_PER_RECIPE = 10
+
+
+def synthetic_favorites(count, seed=0):
+    """
+    Return a callable streaming about `count` synthetic favorites, ordered by user.
+
+    Each call replays the same rows, as a fresh database query would.
+    """
+    recipes = max(count // FAVORITES_PER_RECIPE, MAX_BASKET)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, recipes + 1)))
+    ids = list(range(1, recipes + 1))
+
+    def stream():
+        rng = random.Random(seed)
+        produced = 0
+        user_id = 0
+        while produced < count:
+            user_id += 1
+            basket = set(rng.choices(ids, cum_weights=cum_weights, k=rng.randint(MIN_BASKET, MAX_BASKET)))
+            produced += len(basket)
+            for recipe_id in sorted(basket):
+                yield user_id, recipe_id
+    return stream
+
+
+class Command(BaseCommand):
+    help = 'Benchmark building favorites-based neighbour lists from streamed synthetic favorites.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100000,1000000',
+                            help='Comma-separated numbers of favorites (default: 100000,1000000)')
+        parser.add_argument('--max-pairs', type=int, default=recommendations.MAX_PAIRS,
+                            help=f'Pair counts held in memory at once (default: {recommendations.MAX_PAIRS})')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if min(sizes) < 1 or options['max_pairs'] < 1:
+            raise CommandError('Sizes and --max-pairs must be positive')
+        for size in sizes:
+            self._run(size, options['max_pairs'])
+
+    def _run(self, size, max_pairs):
+        stream = synthetic_favorites(size)
+        passes = 0
+
+        def counted():
+            nonlocal passes
+            passes += 1
+            return stream()
+
+        start = time.perf_counter()
+        lists = related = 0
+        for _, neighbours in recommendations.neighbour_lists(counted, max_pairs=max_pairs):
+            lists += 1
+            related += bool(neighbours)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        for _ in recommendations.neighbour_lists(stream, max_pairs=max_pairs):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"  {size:>10,} favorites   {elapsed:8.1f} s   {passes} passes   peak {peak / 2 ** 20:7.1f} MiB   "
+            f"{lists:,} recipes, {related:,} with neighbours"
+        )
@@ -0,0 +1,85 @@
+"""
+Management command comparing the search backends on synthetic catalogs.
+
+Seeds a reproducible catalog of each size, replays a mix of queries (single
+words, several words, tag names, rare terms, terms without hits) against
+every backend available on this database, reports p50/p95/p99 latency,
+SQL queries issued and rows scanned, and rolls the catalog back. The full
+report is written as JSON; pass an earlier report with --compare to see
+how p95 latency moved.
+
+Usage:
+    python manage.py benchmark_search [--sizes 1000,10000,100000] [--repeat 20] [--seed 0]
+        [--backends fallback,fts5,memory] [--output search-benchmark.json] [--compare old.json]
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.search_benchmark import available_backends, compare_reports, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the search backends on seeded synthetic catalogs and write a JSON report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated catalog sizes (default: 1000,10000,100000)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs per query (default: 20)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed of the synthetic catalog (default: 0)')
+        parser.add_argument('--backends', default='',
+                            help='Comma-separated backends to run (default: every available one)')
+        parser.add_argument('--output', default='search-benchmark.json',
+                            help='File the JSON report is written to (default: search-benchmark.json)')
+        parser.add_argument('--compare', default='',
+                            help='Earlier JSON report to compare p95 latencies against')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if not sizes or min(sizes) < 1 or options['repeat'] < 1:
+            raise CommandError('Sizes and --repeat must be positive')
+        backends = [name for name in options['backends'].split(',') if name]
+        unknown = set(backends) - set(available_backends())
+        if unknown:
+            raise CommandError(f"Backends not available on this database: {', '.join(sorted(unknown))}")
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    previous = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        report = run_benchmark(sizes, repeat=options['repeat'], seed=options['seed'],
+                               backends=backends or None, log=self.stdout.write)
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2)
+
+        for run in report['runs']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{run['recipes']} recipes"))
+            for name, result in run['backends'].items():
+                summary = result['summary']
+                self.stdout.write(
+                    f"  {name:<11} p50 {summary['p50_ms']:8.2f} ms   p95 {summary['p95_ms']:8.2f} ms   "
+                    f"p99 {summary['p99_ms']:8.2f} ms   {summary['queries']:5.2f} queries   "
+                    f"{summary['rows_scanned']:>10,} rows scanned per search"
+                )
+                for query_class, summary in result['classes'].items():
+                    self.stdout.write(
+                        f"    {query_class:<12}p50 {summary['p50_ms']:8.2f} ms   p95 {summary['p95_ms']:8.2f} ms"
+                    )
+        if previous is not None:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"p95 compared with {options['compare']}"))
+            for row in compare_reports(previous, report):
+                before, after = row['p95_ms']
+                ratio = f"x{row['ratio']:.2f}" if row['ratio'] is not None else ''
+                self.stdout.write(
+                    f"  {row['recipes']:>8} {row['backend']:<11}{row['class']:<12}"
+                    f"{before:8.2f} -> {after:8.2f} ms  {ratio}"
+                )
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}; benchmark data rolled back."))
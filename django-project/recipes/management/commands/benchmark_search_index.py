@@ -0,0 +1,111 @@
+"""
+Management command benchmarking the in-process search index at several sizes.
+
+Indexes synthetic recipe texts (no database rows are written) and reports
+build time, memory, snapshot save/load time, query latency and the cost of
+incremental updates for each catalog size, plus the latency of typo
+correction against the words of the catalog.
+
+Usage:
+    python manage.py benchmark_search_index [--sizes 10000,100000,1000000] [--repeat 20]
+"""
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import fuzzy
+from recipes.benchmarks import measure, synthetic_documents
+from recipes.search_index import InvertedIndex
+
+
+# (label, query) pairs covering each kind of clause
+QUERIES = [
+    ('common word', 'chicken'),
+    ('two words', 'garlic butter'),
+    ('rare word', 'word5000'),
+    ('phrase', '"olive oil"'),
+    ('prefix', 'tom'),
+    ('mixed', 'roast "lemon herb" pot'),
+]
+
+# Misspellings to correct, including one sharing trigrams with many terms
+TYPOS = ['chiken', 'tomatoe', 'parsely', 'cinamon', 'wrod1234']
+
+# Documents re-indexed when timing incremental updates
+UPDATE_COUNT = 200
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the in-process BM25 search index on synthetic catalogs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated catalog sizes (default: 10000,100000,1000000)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs per query (default: 20)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if not sizes or min(sizes) < UPDATE_COUNT:
+            raise CommandError(f'Sizes must be at least {UPDATE_COUNT}')
+        for size in sizes:
+            self._run(size, options['repeat'])
+
+    def _run(self, size, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{size} recipes'))
+        index = InvertedIndex()
+        start = time.perf_counter()
+        for recipe_id, fields in synthetic_documents(size):
+            index.add(recipe_id, fields)
+        build = time.perf_counter() - start
+        stats = index.stats()
+        self.stdout.write(
+            f"  build      {build:8.1f} s    ({size / build:,.0f} docs/s)\n"
+            f"  index      {stats['terms']:,} terms, {stats['postings']:,} postings, "
+            f"{stats['positions']:,} positions, {stats['array_bytes'] / 2 ** 20:,.1f} MiB of arrays"
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'search_index.pickle')
+            save = measure(lambda: index.save_snapshot(path), 1)
+            loaded = InvertedIndex()
+            load = measure(lambda: loaded.load_snapshot(path), 1)
+            self.stdout.write(
+                f"  snapshot   save {save['median_ms'] / 1000:.2f} s, load {load['median_ms'] / 1000:.2f} s, "
+                f"{os.path.getsize(path) / 2 ** 20:,.1f} MiB"
+            )
+        if [r for r, _ in loaded.search('chicken')] != [r for r, _ in index.search('chicken')]:
+            raise CommandError('Snapshot returned different results')
+
+        for label, query in QUERIES:
+            result = measure(lambda: index.search(query), repeat)
+            self.stdout.write(
+                f"  {label:<12}median {result['median_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms"
+                f"   ({len(result['result'])} results)"
+            )
+
+        # Re-index the first documents with fresh text, as edits would
+        updates = list(synthetic_documents(UPDATE_COUNT, seed=1))
+        start = time.perf_counter()
+        for recipe_id, fields in updates:
+            index.add(recipe_id, fields)
+        update = (time.perf_counter() - start) * 1000 / UPDATE_COUNT
+        self.stdout.write(f'  update     {update:8.3f} ms per recipe')
+
+        # Typo correction over the distinct words of the catalog (the
+        # synthetic vocabulary is complete long before 100k documents)
+        lexicon = set()
+        for _, fields in synthetic_documents(min(size, 100000)):
+            lexicon.update(' '.join(fields).split())
+        terms = fuzzy.TrigramIndex()
+        terms.add_terms(sorted(lexicon))
+        result = measure(lambda: [terms.closest(typo) for typo in TYPOS], repeat)
+        self.stdout.write(
+            f"  fuzzy      median {result['median_ms'] / len(TYPOS):8.2f} ms per word over {len(lexicon):,} terms"
+            f"   ({', '.join(f'{typo}->{term}' for typo, term in zip(TYPOS, result['result']))})"
+        )
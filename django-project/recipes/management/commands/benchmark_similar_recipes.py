@@ -0,0 +1,118 @@
+"""
+Management command benchmarking the "More like this" similar recipes.
+
+Two parts:
+
+- Batch job scaling: builds the TF-IDF matrix of synthetic recipes (no
+  database rows are written) at each catalog size and times finding the
+  neighbours of a sample of recipes; the full job costs about the per-recipe
+  time times the catalog size.
+- Detail view cost: seeds a catalog in the database (rolled back
+  afterwards), stores every neighbour list, and times the recipe detail
+  view next to the lookup and rendering of its similar-recipes panel.
+
+Usage:
+    python manage.py benchmark_similar_recipes [--sizes 1000,10000,100000] [--sample 500]
+        [--view-size 2000] [--repeat 50]
+"""
+import random
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from recipes import similar, views
+from recipes.benchmarks import SEARCH_TAG_WORDS, measure, seed_search_catalog, synthetic_documents
+from recipes.cache import render_recipe_cards
+from recipes.models import Recipe
+from recipes.search_index import analyze
+
+
+def synthetic_features(count, seed=0):
+    """Turn synthetic documents into feature counts, as similar.recipe_features() reads them."""
+    tag_words = set(SEARCH_TAG_WORDS)
+    for recipe_id, (title, _, tags, steps) in synthetic_documents(count, seed=seed):
+        features = Counter()
+        for _, term in analyze(title):
+            features[term] += similar.FIELD_WEIGHTS['title']
+        for word in set(tags.split()) & tag_words:
+            features['tag:' + word] += similar.FIELD_WEIGHTS['tags']
+        for _, term in analyze(steps):
+            features[term] += similar.FIELD_WEIGHTS['steps']
+        yield recipe_id, features
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the similar-recipes batch job on synthetic catalogs and the detail view it serves.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated catalog sizes of the batch job (default: 1000,10000,100000)')
+        parser.add_argument('--sample', type=int, default=500,
+                            help='Recipes whose neighbours are timed per size (default: 500)')
+        parser.add_argument('--view-size', type=int, default=2000,
+                            help='Recipes seeded in the database for the detail view (default: 2000)')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Timed detail views (default: 50)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if min(sizes) < 1 or options['sample'] < 1 or options['view_size'] < 2 or options['repeat'] < 1:
+            raise CommandError('Sizes, --sample, --view-size and --repeat must be positive')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Batch job'))
+        for size in sizes:
+            self._batch(size, options['sample'])
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Detail view, {options['view_size']} recipes"))
+        with transaction.atomic():
+            self._view(options['view_size'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _batch(self, size, sample):
+        documents = list(synthetic_features(size))
+        start = time.perf_counter()
+        matrix = similar.TfidfMatrix.build(documents)
+        build = time.perf_counter() - start
+        ids = random.Random(1).sample(list(matrix.recipe_ids()), min(sample, len(matrix)))
+        start = time.perf_counter()
+        for recipe_id in ids:
+            matrix.neighbours(recipe_id)
+        per_recipe = (time.perf_counter() - start) / len(ids)
+        self.stdout.write(
+            f"  {size:>9,} recipes   build {build:7.2f} s   neighbours {per_recipe * 1000:7.3f} ms/recipe   "
+            f"all lists ~{build + per_recipe * size:8.1f} s"
+        )
+
+    def _view(self, size, repeat):
+        seed_search_catalog(size)
+        start = time.perf_counter()
+        changed = similar.rebuild()
+        self.stdout.write(f'  rebuild (read, score, write) {time.perf_counter() - start:7.2f} s   {changed:,} lists')
+
+        recipe = Recipe.objects.order_by('pk')[size // 2]
+        request = RequestFactory().get(f'/recipe/{recipe.pk}/')
+        request.user = User.objects.get(pk=recipe.author_id)  # Logged in: the page cache is bypassed
+
+        def panel():
+            return render_recipe_cards(similar.similar_cards(recipe.pk))
+
+        panel()  # Warm the card fragment cache, as on a busy server
+        with CaptureQueriesContext(connection) as captured:
+            cards = panel()
+        view = measure(lambda: views.recipe_detail(request, pk=recipe.pk), repeat)
+        lookup = measure(panel, repeat)
+        self.stdout.write(
+            f"  detail view      median {view['median_ms']:8.2f} ms   p95 {view['p95_ms']:8.2f} ms"
+        )
+        self.stdout.write(
+            f"  similar panel    median {lookup['median_ms']:8.2f} ms   p95 {lookup['p95_ms']:8.2f} ms   "
+            f"{len(captured.captured_queries)} query, {len(cards)} cards"
+        )
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back.'))
@@ -0,0 +1,77 @@
+"""
+Management command comparing ways of filtering recipes by several tags.
+
+Seeds a synthetic catalog, times the first listing page for one cuisine plus
+several dietary tags, and rolls the catalog back.
+
+Usage:
+    python manage.py benchmark_tag_filters [--recipes 100000] [--tags 5] [--repeat 20]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.benchmarks import measure, seed_catalog
+from recipes.models import Recipe, RecipeCard, has_tag
+from recipes.pagination import PAGE_SIZE, paginate, paginate_entries
+from recipes.tag_index import TagIndex
+
+
+class Command(BaseCommand):
+    help = 'Benchmark AND-combined tag filters: M2M join chain vs. EXISTS on the card table vs. in-memory tag index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000,
+                            help='Number of synthetic recipes (default: 100000)')
+        parser.add_argument('--tags', type=int, default=5,
+                            help='Number of selected tags: one cuisine plus dietary tags (default: 5)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs per approach (default: 20)')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['tags'] <= 9:
+            raise CommandError('--tags must be between 1 and 9')
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['recipes']} recipes...")
+            tags = seed_catalog(options['recipes'])
+            tag_ids = [tags['cuisine'][0].pk] + [tag.pk for tag in tags['dietary'][:options['tags'] - 1]]
+            self._run(tag_ids, options['repeat'])
+            transaction.set_rollback(True)
+
+    def _run(self, tag_ids, repeat):
+        def join_chain():
+            # The original view: one M2M join per selected tag, then DISTINCT
+            recipes = Recipe.objects.all()
+            for tag_id in tag_ids:
+                recipes = recipes.filter(tags__id=tag_id)
+            return [r.pk for r in recipes.distinct().order_by('-created_at', '-id')[:PAGE_SIZE]]
+
+        def card_table():
+            cards = RecipeCard.objects.only('recipe_id', 'created_at', 'version')
+            for tag_id in tag_ids:
+                cards = cards.filter(has_tag(tag_id, 'recipe_id'))
+            return [card.pk for card in paginate(cards).items]
+
+        index = TagIndex()
+        load = measure(index.ensure_current, 1)
+
+        def tag_index():
+            index.ensure_current()
+            page = paginate_entries(index.matching(tag_ids))
+            cards = RecipeCard.objects.only('recipe_id', 'created_at', 'version').in_bulk(page.items)
+            return [cards[pk].pk for pk in page.items]
+
+        results = {
+            'join chain': measure(join_chain, repeat),
+            'card table': measure(card_table, repeat),
+            'tag index': measure(tag_index, repeat),
+        }
+        pages = {name: result['result'] for name, result in results.items()}
+        if len({tuple(page) for page in pages.values()}) != 1:
+            raise CommandError('Approaches returned different pages')
+
+        self.stdout.write(f'{len(tag_ids)} tags selected, {len(index.matching(tag_ids))} matching recipes')
+        self.stdout.write(f"Tag index load: {load['median_ms']:.1f} ms")
+        for name, result in results.items():
+            self.stdout.write(f"{name:>12}: median {result['median_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms")
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back.'))
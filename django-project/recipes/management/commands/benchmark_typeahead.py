@@ -0,0 +1,109 @@
+"""
+Management command benchmarking the typeahead completion index at several sizes.
+
+Indexes synthetic recipes (no database rows are written) and reports build
+time, index size, per-keystroke latency for prefixes typed one character at
+a time, and the cost of incremental updates for each catalog size.
+
+Usage:
+    python manage.py benchmark_typeahead [--sizes 10000,100000,1000000] [--keystrokes 2000]
+"""
+import random
+import resource
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.benchmarks import RECIPE_WORDS, synthetic_documents
+from recipes.typeahead import CompletionIndex
+
+
+# Recipes re-indexed when timing incremental updates
+UPDATE_COUNT = 200
+
+# Synthetic tags: one per common recipe word
+TAGS = {tag_id: (word.title(), 'other') for tag_id, word in enumerate(RECIPE_WORDS)}
+TAG_IDS = {word: tag_id for tag_id, (word, _) in TAGS.items()}
+
+
+def synthetic_records(count, seed=0):
+    """Turn synthetic documents into completion index records."""
+    rng = random.Random(seed)
+    for recipe_id, (title, description, tags, _) in synthetic_documents(count, seed=seed):
+        tag_ids = [TAG_IDS[word.title()] for word in tags.split() if word.title() in TAG_IDS]
+        yield recipe_id, title, description, tag_ids, rng.randrange(5)
+
+
+def _percentiles(timings):
+    timings = sorted(timings)
+    return (
+        statistics.median(timings),
+        timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        timings[-1],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the in-process typeahead completion index on synthetic catalogs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated catalog sizes (default: 10000,100000,1000000)')
+        parser.add_argument('--keystrokes', type=int, default=2000,
+                            help='Timed completion requests per phase (default: 2000)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if not sizes or min(sizes) < UPDATE_COUNT:
+            raise CommandError(f'Sizes must be at least {UPDATE_COUNT}')
+        for size in sizes:
+            self._run(size, options['keystrokes'])
+
+    def _run(self, size, keystrokes):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{size} recipes'))
+        index = CompletionIndex()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        index.build(synthetic_records(size), TAGS)
+        build = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(
+            f"  build      {build:8.1f} s    {len(index._entries):,} completions, {len(index):,} keys, "
+            f"peak RSS +{(rss_after - rss_before) / 1024:,.0f} MiB"
+        )
+
+        # Type the start of random titles, one character at a time
+        rng = random.Random(1)
+        titles = [title for _, title, *_ in synthetic_records(min(size, 10000), seed=2)]
+        prefixes = []
+        while len(prefixes) < keystrokes:
+            title = rng.choice(titles)
+            prefixes.extend(title[:length] for length in range(1, min(len(title), 12) + 1))
+        prefixes = prefixes[:keystrokes]
+
+        self._keystrokes('cold', index, prefixes)
+        self._keystrokes('warm', index, prefixes)
+
+        updates = list(synthetic_records(UPDATE_COUNT, seed=3))
+        start = time.perf_counter()
+        for record in updates:
+            index.apply([record[0]], [record], TAGS)
+        update = (time.perf_counter() - start) * 1000 / UPDATE_COUNT
+        self.stdout.write(f'  update     {update:8.3f} ms per recipe')
+        self._keystrokes('after edits', index, prefixes)
+
+    def _keystrokes(self, label, index, prefixes):
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.complete(prefix)
+            timings.append((time.perf_counter() - start) * 1000)
+        median, p99, slowest = _percentiles(timings)
+        self.stdout.write(
+            f"  {label:<12}median {median:6.3f} ms   p99 {p99:6.3f} ms   max {slowest:7.2f} ms"
+            f"   ({len(prefixes)} keystrokes)"
+        )
@@ -0,0 +1,44 @@
+"""
+Management command that fails if a hot query regresses to a full table scan.
+
+Usage:
+    python manage.py check_query_plans [--seed 1000]
+
+With --seed, a synthetic catalog and AB test log are inserted first and
+rolled back afterwards, so plans reflect a populated database.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.benchmarks import seed_ab_tests, seed_catalog
+from recipes.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries from views.py and fail on full table scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed this many synthetic recipes (and AB test rows) first, then roll back (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                seed_catalog(options['seed'])
+                seed_ab_tests(options['seed'])
+            results = check_query_plans()
+            transaction.set_rollback(True)
+
+        failures = [(name, tables) for name, tables in results if tables]
+        for name, tables in results:
+            if tables:
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}: {', '.join(tables)}"))
+            else:
+                self.stdout.write(f'ok         {name}')
+        if failures:
+            raise CommandError(f'{len(failures)} hot query(ies) use a full table scan.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} hot queries use indexes.'))
@@ -0,0 +1,62 @@
+"""
+Management command to export recipes as JSON Lines or CSV.
+
+Streams the recipes matching the home page's search and filters (every
+recipe by default) to a file or standard output; see recipes/exporter.py.
+Exports can be read back with `manage.py import_recipes`.
+
+Usage:
+    python manage.py export_recipes [--output recipes.jsonl.gz] [--format jsonl|csv] [--gzip]
+        [--q QUERY] [--cuisine TAG_ID] [--dietary TAG_ID ...] [--max-time MINUTES]
+        [--chunk-size 2000]
+"""
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import exporter
+
+
+class Command(BaseCommand):
+    help = 'Stream recipes matching a search and filters to a JSON Lines or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='File to write (default: standard output)')
+        parser.add_argument('--format', choices=sorted(exporter.CONTENT_TYPES),
+                            help='Output format (default: from the --output extension, else jsonl)')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Compress the output (default: if --output ends in .gz)')
+        parser.add_argument('--q', default='', help='Search query, as typed into the home page')
+        parser.add_argument('--cuisine', type=int, help='Cuisine tag id')
+        parser.add_argument('--dietary', type=int, action='append', default=[],
+                            help='Dietary tag id (repeat for several)')
+        parser.add_argument('--max-time', type=int, help='Maximum total time in minutes')
+        parser.add_argument('--chunk-size', type=int, default=exporter.CHUNK_SIZE,
+                            help=f'Recipes fetched per query (default: {exporter.CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+        fmt = options['format'] or ('csv' if output.removesuffix('.gz').endswith('.csv') else 'jsonl')
+        tag_ids = ([options['cuisine']] if options['cuisine'] is not None else []) + options['dietary']
+        recipes = exporter.filtered_recipes(options['q'].strip(), tag_ids, options['max_time'])
+
+        start = time.perf_counter()
+        written = 0
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in exporter.export(recipes, fmt, compress, options['chunk_size']):
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if output == '-':
+                stream.flush()
+            else:
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {written / 2 ** 20:.1f} MiB in {time.perf_counter() - start:.1f} s.'
+        ))
@@ -0,0 +1,33 @@
+"""
+Management command to re-parse every recipe's ingredient list into Ingredient rows.
+
+Run after changing the parser in recipes/ingredients.py. Only recipes whose
+parsed lines changed are rewritten; running workers reload their ingredient
+index on the next pantry search.
+
+Usage:
+    python manage.py rebuild_ingredients [--batch-size 1000]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Ingredient, IndexVersion
+from recipes.pantry import INDEX_NAME
+
+
+class Command(BaseCommand):
+    help = 'Re-parse recipe ingredient lists into normalized Ingredient rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of recipes to parse per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = Ingredient.objects.rebuild(batch_size=options['batch_size'])
+            IndexVersion.objects.replace(INDEX_NAME)
+        self.stdout.write(self.style.SUCCESS(f'Rewrote the ingredients of {count} recipe(s).'))
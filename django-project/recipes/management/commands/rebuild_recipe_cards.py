@@ -0,0 +1,27 @@
+"""
+Management command to rebuild the RecipeCard read model from scratch.
+
+Usage:
+    python manage.py rebuild_recipe_cards [--batch-size 1000]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import RecipeCard
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized RecipeCard table from recipes, tags and steps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of recipes to recompute per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = RecipeCard.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} recipe card(s).'))
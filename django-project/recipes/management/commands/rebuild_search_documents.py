@@ -0,0 +1,55 @@
+"""
+Management command to rebuild recipe search documents in parallel batches.
+
+Usage:
+    python manage.py rebuild_search_documents [--batch-size 2000] [--workers 4]
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes import search
+from recipes.models import Recipe
+
+
+def _rebuild_range(start, stop):
+    # Each worker thread has its own database connection; close it when done
+    try:
+        return search.update_document_range(start, stop)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Recompute the full-text search documents of every recipe (PostgreSQL or SQLite FTS5).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Primary key range per batch (default: 2000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of batches updated concurrently, each on its own connection (default: 4)',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Stored search documents require PostgreSQL or SQLite with FTS5.')
+        batch_size = options['batch_size']
+        last = Recipe.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        ranges = [(start, start + batch_size) for start in range(0, last + 1, batch_size)]
+
+        # Batches commit independently, so a failure leaves earlier ones done.
+        # SQLite allows a single writer, so its batches run one at a time.
+        if options['workers'] <= 1 or search.backend() == 'fts5':
+            count = sum(search.update_document_range(start, stop) for start, stop in ranges)
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                count = sum(pool.map(lambda bounds: _rebuild_range(*bounds), ranges))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} search document(s) in {len(ranges)} batch(es).'))
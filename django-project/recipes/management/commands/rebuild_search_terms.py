@@ -0,0 +1,20 @@
+"""
+Management command to rebuild the lexicon used by typo-tolerant search.
+
+Words are added to the lexicon as recipes are written but never removed;
+rebuilding drops the words no recipe uses any more.
+
+Usage:
+    python manage.py rebuild_search_terms
+"""
+from django.core.management.base import BaseCommand
+
+from recipes import fuzzy
+
+
+class Command(BaseCommand):
+    help = 'Recompute the SearchTerm lexicon from recipe titles, tag names and ingredients.'
+
+    def handle(self, *args, **options):
+        count = fuzzy.rebuild_terms()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt lexicon with {count} term(s).'))
@@ -0,0 +1,38 @@
+"""
+Management command to recompute the "people who saved this also saved" lists.
+
+By default only the lists affected by favorites saved or removed since the
+last run are recomputed (see recipes/recommendations.py); schedule it every
+few minutes. With --rebuild every list is recomputed from a stream of all
+favorites; run it once after deploying and then nightly.
+
+Usage:
+    python manage.py update_recommendations [--rebuild] [--max-pairs 2000000]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the favorites-based neighbours of recently saved recipes, or of every recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every list instead of those affected by recent favorites')
+        parser.add_argument('--max-pairs', type=int, default=recommendations.MAX_PAIRS,
+                            help=f'Pair counts held in memory while rebuilding (default: {recommendations.MAX_PAIRS})')
+
+    def handle(self, *args, **options):
+        if options['max_pairs'] < 1:
+            raise CommandError('--max-pairs must be positive')
+        start = time.perf_counter()
+        if options['rebuild']:
+            changed = recommendations.rebuild(max_pairs=options['max_pairs'])
+            summary = f'Rebuilt recommendations; {changed} list(s) changed'
+        else:
+            processed, changed = recommendations.update()
+            summary = f'Processed {processed} saved or unsaved recipe(s); {changed} list(s) changed'
+        self.stdout.write(self.style.SUCCESS(f'{summary} in {time.perf_counter() - start:.1f} s.'))
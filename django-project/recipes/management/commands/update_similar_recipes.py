@@ -0,0 +1,35 @@
+"""
+Management command to recompute the "More like this" lists of recipes.
+
+By default only the lists affected by writes since the last run are
+recomputed, reading only the written recipes and the matrix stored by the
+last rebuild (see recipes/similar.py); schedule it every few minutes. With
+--rebuild every recipe is read and every list recomputed with fresh
+document frequencies; run it once after deploying and then nightly.
+
+Usage:
+    python manage.py update_similar_recipes [--rebuild]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import similar
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed similar recipes of written recipes, or of every recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every list instead of those affected by recent writes')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['rebuild']:
+            changed = similar.rebuild()
+            summary = f'Rebuilt similar recipes; {changed} list(s) changed'
+        else:
+            processed, changed = similar.update()
+            summary = f'Processed {processed} written recipe(s); {changed} list(s) changed'
+        self.stdout.write(self.style.SUCCESS(f'{summary} in {time.perf_counter() - start:.1f} s.'))
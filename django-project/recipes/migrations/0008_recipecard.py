@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_cards(apps, schema_editor):
+    """Create a card for every existing recipe."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeCard = apps.get_model('recipes', 'RecipeCard')
+    cards = []
+    for recipe in Recipe.objects.select_related('author').prefetch_related('tags', 'steps').iterator(chunk_size=500):
+        tags = sorted(recipe.tags.all(), key=lambda tag: tag.name)
+        cuisine = next((tag.name for tag in tags if tag.category == 'cuisine'), '')
+        tag_ids = sorted(tag.pk for tag in tags)
+        total_time = (recipe.prep_time or 0) + (recipe.cook_time or 0)
+        cards.append(RecipeCard(
+            recipe_id=recipe.pk,
+            title=recipe.title,
+            image_url=recipe.image_url,
+            byline=f"By {recipe.recipe_author}" if recipe.recipe_author else f"From {recipe.author.username}",
+            cuisine_name=cuisine,
+            tag_ids=''.join(f',{tag_id}' for tag_id in tag_ids) + ',' if tag_ids else '',
+            total_time=total_time or None,
+            step_count=len(recipe.steps.all()),
+            created_at=recipe.created_at,
+        ))
+        if len(cards) >= 500:
+            RecipeCard.objects.bulk_create(cards)
+            cards = []
+    RecipeCard.objects.bulk_create(cards)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeCard',
+            fields=[
+                ('recipe', models.OneToOneField(help_text='The recipe this card summarizes', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='recipes.recipe')),
+                ('title', models.CharField(max_length=200)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('byline', models.CharField(help_text="Author display text (e.g., 'By Jamie Oliver' or 'From alice')", max_length=220)),
+                ('cuisine_name', models.CharField(blank=True, help_text="Name of the recipe's cuisine tag, if any", max_length=50)),
+                ('tag_ids', models.TextField(blank=True, help_text="Comma-delimited tag ids with leading and trailing commas (e.g., ',3,7,')")),
+                ('total_time', models.PositiveIntegerField(blank=True, help_text='Prep plus cook time in minutes', null=True)),
+                ('step_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(help_text='Copied from the recipe, for ordering')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at', '-recipe'], name='recipecard_created_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:49
+
+import hashlib
+
+from django.db import migrations, models
+
+
+DISPLAY_FIELDS = ('title', 'image_url', 'byline', 'cuisine_name', 'total_time', 'step_count')
+
+
+def backfill_versions(apps, schema_editor):
+    """Fingerprint existing cards (mirrors RecipeCard.compute_version)."""
+    RecipeCard = apps.get_model('recipes', 'RecipeCard')
+    batch = []
+    for card in RecipeCard.objects.iterator(chunk_size=1000):
+        parts = [card.recipe_id, card.created_at.isoformat()]
+        parts += [getattr(card, name) for name in DISPLAY_FIELDS]
+        card.version = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+        batch.append(card)
+        if len(batch) >= 1000:
+            RecipeCard.objects.bulk_update(batch, ['version'])
+            batch = []
+    RecipeCard.objects.bulk_update(batch, ['version'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipecard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipecard',
+            name='version',
+            field=models.CharField(blank=True, help_text="Fingerprint of the displayed fields; changes whenever the card's content does", max_length=16),
+        ),
+        migrations.RunPython(backfill_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:01
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+BATCH_SIZE = 5000
+
+
+def backfill_total_time(apps, schema_editor):
+    """Set total_time on existing recipes, one UPDATE per primary key range."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    total = NullIf(Coalesce(F('prep_time'), Value(0)) + Coalesce(F('cook_time'), Value(0)), Value(0))
+    last = Recipe.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last + 1, BATCH_SIZE):
+        Recipe.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(total_time=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_indexversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='total_time',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Prep plus cook time in minutes, or empty if neither is set; maintained by save()', null=True),
+        ),
+        migrations.RunPython(backfill_total_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='recipecard',
+            name='total_time',
+            field=models.PositiveIntegerField(blank=True, help_text='Copied from Recipe.total_time', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['total_time', '-created_at', '-id'], name='recipe_total_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipecard',
+            index=models.Index(fields=['total_time', '-created_at', '-recipe'], name='recipecard_total_time_idx'),
+        ),
+    ]
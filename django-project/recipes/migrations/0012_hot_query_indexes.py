@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:03
+
+from django.db import migrations, models
+
+from recipes.operations import AddIndexConcurrentlyIfSupported
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0011_recipe_total_time'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfSupported(
+            model_name='abtestclick',
+            index=models.Index(fields=['variant', 'created_at'], name='abclick_variant_time_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='abtestimpression',
+            index=models.Index(fields=['variant', 'created_at'], name='abimpression_variant_time_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='tag',
+            index=models.Index(fields=['category', 'name'], name='tag_category_name_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:07
+
+from django.db import migrations
+import recipes.models
+
+
+BATCH_SIZE = 5000
+
+# Mirrors recipes.search.document_expression(); kept as SQL so the migration
+# does not depend on application code
+BACKFILL_SQL = """
+UPDATE recipes_recipe AS r SET search_document =
+    setweight(to_tsvector(COALESCE(r.title, '')), 'A')
+    || setweight(to_tsvector(COALESCE(r.description, '')), 'B')
+    || setweight(to_tsvector(COALESCE((
+        SELECT string_agg(t.name, ' ') FROM recipes_tag t
+        JOIN recipes_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'C')
+    || setweight(to_tsvector(COALESCE((
+        SELECT string_agg(s.instruction_text, ' ') FROM recipes_step s
+        WHERE s.recipe_id = r.id
+    ), '')), 'C')
+WHERE r.id >= %s AND r.id < %s
+"""
+
+
+def create_gin_index(apps, schema_editor):
+    """GIN index on the search document; PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS recipe_search_document_gin '
+        'ON recipes_recipe USING gin (search_document)'
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS recipe_search_document_gin')
+
+
+def backfill_documents(apps, schema_editor):
+    """Compute documents for existing recipes, one UPDATE per primary key range."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    last = Recipe.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last + 1, BATCH_SIZE):
+        schema_editor.execute(BACKFILL_SQL, [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and each
+    # backfill batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=recipes.models.SearchDocumentField(blank=True, editable=False, help_text='Weighted search document (PostgreSQL only); maintained by recipes/search.py', null=True),
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+        # The GIN index is not declared in Recipe.Meta: GinIndex cannot be
+        # created on SQLite, which development and tests use
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
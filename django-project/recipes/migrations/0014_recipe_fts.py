@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:10
+
+from django.db import migrations, models, transaction
+from django.db.utils import OperationalError
+import django.db.models.deletion
+import recipes.models
+
+
+# Column weights for bm25: title, description, tags, steps
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+    "title, description, tags, steps, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 4.0, 2.0, 1.0)')",
+]
+
+# Mirrors recipes.search._FTS_INSERT_SQL; kept here so the migration does not
+# depend on application code
+BACKFILL_SQL = """
+INSERT INTO recipes_recipe_fts(rowid, title, description, tags, steps)
+SELECT r.id, r.title, r.description,
+    COALESCE((SELECT group_concat(t.name, ' ') FROM recipes_tag t
+              JOIN recipes_recipe_tags rt ON rt.tag_id = t.id
+              WHERE rt.recipe_id = r.id), ''),
+    COALESCE((SELECT group_concat(s.instruction_text, ' ') FROM recipes_step s
+              WHERE s.recipe_id = r.id), '')
+FROM recipes_recipe r
+"""
+
+
+def create_fts_table(apps, schema_editor):
+    """Create and fill the FTS5 table, if this is SQLite built with FTS5."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for sql in CREATE_SQL:
+                schema_editor.execute(sql)
+    except OperationalError:
+        return  # No FTS5 in this SQLite build; search uses substring matching
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS recipes_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('tags', models.TextField(help_text='Tag names, space separated')),
+                ('steps', models.TextField(help_text='Step instructions, space separated')),
+                ('document', recipes.models.FullTextMatchField(db_column='recipes_recipe_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:30
+
+import re
+import unicodedata
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+import recipes.models
+
+
+BATCH_SIZE = 1000
+
+# Mirrors recipes.fuzzy.words(); kept here so the migration does not depend
+# on application code
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from in into is it of on or so than that
+    the then these this to was were will with
+""".split())
+
+
+def lexicon_words(text):
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return {
+        word for word in re.findall(r'\w+', folded)
+        if 3 <= len(word) <= 64 and word.isalpha() and word not in STOP_WORDS
+    }
+
+
+def backfill_terms(apps, schema_editor):
+    """Collect the words of existing titles, ingredients and tag names."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Tag = apps.get_model('recipes', 'Tag')
+    SearchTerm = apps.get_model('recipes', 'SearchTerm')
+    lexicon = set()
+    for title, ingredients in Recipe.objects.values_list('title', 'ingredients').iterator(chunk_size=BATCH_SIZE):
+        lexicon |= lexicon_words(title) | lexicon_words(ingredients)
+    for name in Tag.objects.filter(recipe__isnull=False).values_list('name', flat=True).distinct():
+        lexicon |= lexicon_words(name)
+    SearchTerm.objects.bulk_create([SearchTerm(word=word) for word in sorted(lexicon)], batch_size=BATCH_SIZE)
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN trigram index on the lexicon; PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS searchterm_word_trgm '
+        'ON recipes_searchterm USING gin (word gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS searchterm_word_trgm')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0014_recipe_fts'),
+    ]
+
+    operations = [
+        # CREATE EXTENSION pg_trgm; does nothing on other databases
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('word', recipes.models.TrigramWordField(max_length=64, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.RunPython(backfill_terms, migrations.RunPython.noop),
+        # Not declared in SearchTerm.Meta: GIN indexes cannot be created on
+        # SQLite, which development and tests use
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
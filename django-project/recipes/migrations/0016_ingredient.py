@@ -0,0 +1,172 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:52
+
+import re
+import unicodedata
+from fractions import Fraction
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+# A copy of recipes.ingredients.parse_ingredients() as of this migration;
+# kept here so the migration does not depend on application code and later
+# parser changes do not change what the backfill writes
+
+UNITS = {}
+for _unit, _spellings in {
+    'cup': 'cup cups c',
+    'tbsp': 'tbsp tbsps tbs tablespoon tablespoons',
+    'tsp': 'tsp tsps teaspoon teaspoons',
+    'g': 'g gr gram grams',
+    'kg': 'kg kilogram kilograms',
+    'ml': 'ml milliliter milliliters millilitre millilitres',
+    'l': 'l liter liters litre litres',
+    'oz': 'oz ounce ounces',
+    'lb': 'lb lbs pound pounds',
+    'pinch': 'pinch pinches',
+    'dash': 'dash dashes',
+    'clove': 'clove cloves',
+    'can': 'can cans tin tins',
+    'slice': 'slice slices',
+    'bunch': 'bunch bunches',
+    'sprig': 'sprig sprigs',
+    'stick': 'stick sticks',
+    'package': 'package packages pkg',
+    'handful': 'handful handfuls',
+}.items():
+    UNITS.update(dict.fromkeys(_spellings.split(), _unit))
+
+DESCRIPTORS = frozenset("""
+    a an of the to for and or about approximately plus more
+    fresh freshly large small medium big whole ripe organic raw
+    chopped diced minced sliced grated shredded crushed cubed halved quartered
+    finely roughly thinly coarsely freshly lightly
+    peeled seeded pitted cored trimmed rinsed drained packed divided
+    softened melted beaten cooked boiled toasted
+    extra virgin unsalted boneless skinless
+    optional taste serving garnish room temperature
+""".split())
+
+UNCOUNTABLE = frozenset('molasses hummus couscous asparagus citrus swiss brussels'.split())
+
+FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+NUMBER = r'(?:\d+\s+\d+/\d+|\d+/\d+|\d{1,3}(?:,\d{3})+(?:\.\d+)?(?![\d,])|\d+(?:[.,]\d+)?)'
+THOUSANDS_RE = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?')
+AMOUNT_RE = re.compile(rf'^({NUMBER})(?:\s*(?:-|–|to)\s*{NUMBER})?\s*')
+NOTE_RE = re.compile(r'^\([^)]*\)\s*')
+UNIT_RE = re.compile(r'^([a-zA-Z]+)\.?(?:\s+|$)')
+BULLET_RE = re.compile(r'^[\s\-*•·]+')
+WORD_RE = re.compile(r'[^\W\d_]+')
+
+
+def quantity(text):
+    total = 0.0
+    for part in text.split():
+        part = part.replace(',', '') if THOUSANDS_RE.fullmatch(part) else part.replace(',', '.')
+        try:
+            total += float(Fraction(part)) if '/' in part else float(part)
+        except (ValueError, ZeroDivisionError):
+            return None
+    return total
+
+
+def singular(word):
+    if word in UNCOUNTABLE:
+        return word
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def canonical_name(text):
+    text = re.split(r'[,(;]', text, maxsplit=1)[0]
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    words = [word for word in WORD_RE.findall(folded) if word not in DESCRIPTORS and word not in UNITS]
+    if words:
+        words[-1] = singular(words[-1])
+    return ' '.join(words)[:100]
+
+
+def parse_ingredients(text):
+    """Yield (name, amount, quantity, unit, canonical) for each line naming an ingredient."""
+    for line in (text or '').splitlines():
+        line = BULLET_RE.sub('', line.strip())
+        for symbol, fraction in FRACTIONS.items():
+            line = line.replace(symbol, f' {fraction}')
+        line = ' '.join(line.split())
+        if not line or line.endswith(':'):
+            continue
+        rest = line
+        number = None
+        unit = ''
+        match = AMOUNT_RE.match(rest)
+        if match:
+            number = quantity(match.group(1))
+            rest = NOTE_RE.sub('', rest[match.end():])
+        match = UNIT_RE.match(rest)
+        if match and match.group(1).lower() in UNITS and (number is not None or match.group(1).lower() != 'c'):
+            unit = UNITS[match.group(1).lower()]
+            rest = rest[match.end():]
+        amount = line[:len(line) - len(rest)].strip()
+        name = re.sub(r'^of\s+', '', rest)
+        canonical = canonical_name(name)
+        if canonical:
+            yield name, amount, number, unit, canonical
+
+
+def backfill_ingredients(apps, schema_editor):
+    """Parse the ingredient list of every existing recipe into rows."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    rows = []
+    for recipe_id, text in Recipe.objects.values_list('pk', 'ingredients').iterator(chunk_size=BATCH_SIZE):
+        for position, (name, amount, quantity, unit, canonical) in enumerate(parse_ingredients(text)):
+            rows.append(Ingredient(
+                recipe_id=recipe_id,
+                position=position,
+                name=name[:200],
+                amount=amount[:50],
+                quantity=quantity,
+                unit=unit,
+                canonical=canonical,
+            ))
+        if len(rows) >= BATCH_SIZE:
+            Ingredient.objects.bulk_create(rows)
+            rows = []
+    Ingredient.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_search_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0, help_text="Line number within the recipe's ingredient list, from 0")),
+                ('name', models.CharField(help_text="The ingredient as written, without the amount (e.g., 'Flour, sifted')", max_length=200)),
+                ('amount', models.CharField(blank=True, help_text="Quantity and unit as written (e.g., '2 cups')", max_length=50)),
+                ('quantity', models.FloatField(blank=True, help_text="The amount as a number (e.g., 2.0 for '2 cups')", null=True)),
+                ('unit', models.CharField(blank=True, help_text="Normalized unit (e.g., 'cup', 'tbsp', 'g'), or empty for counted items", max_length=20)),
+                ('canonical', models.CharField(blank=True, help_text="Folded, singular ingredient name shared across recipes (e.g., 'flour')", max_length=100)),
+                ('recipe', models.ForeignKey(help_text='The recipe this ingredient belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_items', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['position', 'pk'],
+                'indexes': [models.Index(fields=['canonical', 'recipe'], name='ingredient_canonical_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ingredients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_ingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSimilarity',
+            fields=[
+                ('recipe_id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(help_text='Position in the list, from 0 (most similar)')),
+                ('score', models.FloatField(help_text="Cosine similarity of the two recipes' TF-IDF vectors")),
+                ('recipe', models.ForeignKey(db_index=False, help_text='The recipe this list belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='recipes.recipe')),
+                ('similar', models.ForeignKey(db_constraint=False, help_text='A recipe similar to it', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.recipe')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='similarrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'rank'), name='similar_recipe_rank_uniq'),
+        ),
+    ]
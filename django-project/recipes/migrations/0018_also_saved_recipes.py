@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRecommendation',
+            fields=[
+                ('recipe_id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AlsoSavedRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(help_text='Position in the list, from 0 (most related)')),
+                ('score', models.FloatField(help_text="Cosine similarity of the two recipes' sets of savers")),
+                ('other', models.ForeignKey(db_constraint=False, help_text='A recipe often saved by the same people', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.recipe')),
+                ('recipe', models.ForeignKey(db_index=False, help_text='The recipe this list belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='also_saved_entries', to='recipes.recipe')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='alsosavedrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'rank'), name='also_saved_rank_uniq'),
+        ),
+    ]
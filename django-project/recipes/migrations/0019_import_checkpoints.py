@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_also_saved_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('source', models.CharField(help_text="The imported file's absolute path, or the name given with --checkpoint", max_length=255, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0, help_text='Input records consumed so far, valid or not')),
+                ('imported', models.BigIntegerField(default=0, help_text='Recipes created so far')),
+                ('skipped', models.BigIntegerField(default=0, help_text='Invalid records skipped so far')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the last batch was committed')),
+            ],
+        ),
+    ]
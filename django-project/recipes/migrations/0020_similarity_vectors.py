@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_import_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeVector',
+            fields=[
+                ('recipe_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('features', models.BinaryField(help_text='SimilarityFeature ids, as a packed array of unsigned ints')),
+                ('weights', models.BinaryField(help_text='Normalized weights, as a packed array of floats')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarityFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="A title or step term, 'tag:<name>' or 'ing:<canonical name>'", max_length=200, unique=True)),
+                ('idf', models.FloatField(help_text='Inverse document frequency at the last rebuild')),
+                ('recipe_ids', models.BinaryField(default=b'', help_text="Recipes in the feature's column, as a packed array of unsigned ints")),
+                ('weights', models.BinaryField(default=b'', help_text='Their weights for the feature, as a packed array of floats')),
+            ],
+        ),
+    ]
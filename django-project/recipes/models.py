@@ -6,16 +6,148 @@ This module defines the core data models:
     - Tag: Labels for categorizing recipes (vegan, dessert, gluten-free, etc.)
     - Step: Numbered cooking instructions for recipes
     - Favorite: User favorites with personal notes about recipes
+    - Ingredient: Parsed lines of a recipe's ingredient list
+    - RecipeCard: Flat, write-maintained read model for listing pages
+    - IndexVersion: Version tokens for in-process indexes built from the database
+    - RecipeSearchEntry: SQLite FTS5 full-text index over recipes (unmanaged)
+    - SearchTerm: Lexicon of recipe words for typo-tolerant search
 
 Relationships:
     - Recipe has one author (ForeignKey to User)
     - Recipe can have many tags (ManyToMany)
     - Recipe can have many steps (ForeignKey from Step)
     - Recipe can be favorited by many users (ForeignKey from Favorite)
+    - Recipe has one RecipeCard (OneToOne from RecipeCard)
+    - Recipe can have many ingredient rows (ForeignKey from Ingredient)
 """
-from django.db import models
+import hashlib
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
+from .ingredients import canonical_name, parse_amount, parse_ingredients
+
+
+class SearchDocumentField(models.TextField):
+    """
+    Stored full-text search document.
+
+    A `tsvector` column on PostgreSQL, where `filter(field=query)` matches
+    with the `@@` operator; a plain, unused text column on other databases.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return super().db_type(connection)
+
+
+try:
+    from django.contrib.postgres.search import SearchVectorExact
+except ImportError:  # psycopg not installed
+    pass
+else:
+    SearchDocumentField.register_lookup(SearchVectorExact)
+
+
+class TrigramWordField(models.CharField):
+    """
+    A word compared by trigram similarity.
+
+    On PostgreSQL `filter(field__trigram_similar=word)` renders the pg_trgm
+    `%` operator, which a GIN `gin_trgm_ops` index can serve.
+    """
+
+
+try:
+    from django.contrib.postgres.lookups import TrigramSimilar
+except ImportError:  # psycopg not installed
+    pass
+else:
+    TrigramWordField.register_lookup(TrigramSimilar)
+
+
+def has_tag(tag_id, recipe_ref='pk'):
+    """
+    Correlated EXISTS matching rows whose recipe carries the given tag.
+
+    A semi-join against the recipe-tag table: unlike filtering through
+    `tags__id`, it never multiplies the outer rows, so no DISTINCT is needed
+    and any number of tag constraints can be combined.
+
+    Args:
+        tag_id: Tag primary key
+        recipe_ref: Field of the outer query holding the recipe id
+            (e.g. 'pk' for Recipe, 'recipe_id' for RecipeCard)
+
+    Returns:
+        Exists expression, usable in filter() and in aggregate filters
+    """
+    return Exists(Recipe.tags.through.objects.filter(recipe_id=OuterRef(recipe_ref), tag_id=tag_id))
+
+
+class RecipeQuerySet(models.QuerySet):
+    """
+    Custom QuerySet for Recipe with reusable listing projections and filters.
+    """
+
+    def with_all_tags(self, tag_ids):
+        """
+        Keep recipes that carry every one of the given tags.
+
+        Args:
+            tag_ids: Iterable of Tag primary keys
+
+        Returns:
+            QuerySet with one EXISTS constraint per tag (see has_tag)
+        """
+        queryset = self
+        for tag_id in tag_ids:
+            queryset = queryset.filter(has_tag(tag_id))
+        return queryset
+
+    def cards(self):
+        """
+        Project recipes down to what a recipe card needs, in one query.
+
+        Annotates each recipe with:
+            - cuisine_name: Name of its first cuisine tag (alphabetical), or None
+            - step_count: Number of steps
+
+        and joins the author so `recipe.author.username` needs no extra query.
+        The long `description`, `ingredients` and `search_document` columns
+        are deferred because cards never display them.
+
+        Both annotations are correlated subqueries rather than joins, so they
+        never fan out the recipe rows and combine safely with other filters.
+
+        Returns:
+            QuerySet of Recipe objects ready for card rendering
+        """
+        cuisine_names = (
+            Tag.objects.filter(recipe=OuterRef('pk'), category='cuisine')
+            .order_by('name')
+            .values('name')[:1]
+        )
+        step_counts = (
+            Step.objects.filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return (
+            self.select_related('author')
+            .defer('description', 'ingredients', 'search_document')
+            .annotate(
+                cuisine_name=Subquery(cuisine_names),
+                step_count=Coalesce(Subquery(step_counts), 0),
+            )
+        )
+
 
 class Recipe(models.Model):
     """
@@ -74,18 +206,50 @@ class Recipe(models.Model):
         null=True,
         help_text="Cooking time in minutes"
     )
+    total_time = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Prep plus cook time in minutes, or empty if neither is set; maintained by save()"
+    )
+    search_document = SearchDocumentField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Weighted search document (PostgreSQL only); maintained by recipes/search.py"
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']  # Newest recipes first
+        indexes = [
+            # Serves keyset pagination over (created_at, id), newest first
+            models.Index(fields=['-created_at', '-id'], name='recipe_created_id_idx'),
+            # Serves max-time filters and quickest-first ordering as range scans
+            models.Index(fields=['total_time', '-created_at', '-id'], name='recipe_total_time_idx'),
+        ]
 
-    @property
-    def total_time(self):
-        """Calculate total time as sum of prep and cook time."""
+    def compute_total_time(self):
+        """Calculate total time as sum of prep and cook time (None if zero)."""
         prep = self.prep_time or 0
         cook = self.cook_time or 0
         total = prep + cook
         return total if total > 0 else None
 
+    def save(self, *args, **kwargs):
+        """
+        Save the recipe, recomputing the stored total_time first.
+
+        Note that QuerySet.update() and bulk_create() bypass this; callers
+        changing prep_time or cook_time that way must set total_time too.
+        """
+        self.total_time = self.compute_total_time()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'prep_time', 'cook_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'total_time'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
@@ -118,6 +282,10 @@ class Tag(models.Model):
 
     class Meta:
         ordering = ['name']  # Alphabetical order
+        indexes = [
+            # Serves the filter menus: one category, alphabetical
+            models.Index(fields=['category', 'name'], name='tag_category_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -187,6 +355,606 @@ class Favorite(models.Model):
         return f"{self.user.username} favorited {self.recipe.title}"
 
 
+class IngredientManager(models.Manager):
+    """
+    Manager for Ingredient with helpers to derive rows from Recipe.ingredients.
+    """
+
+    def sync(self, recipe_ids):
+        """
+        Re-parse the ingredient lists of the given recipes.
+
+        Rows of a recipe are replaced only if its parsed lines differ from
+        the stored ones. Costs a fixed number of queries regardless of how
+        many recipes are passed.
+
+        Args:
+            recipe_ids: Iterable of Recipe primary keys
+
+        Returns:
+            set: Ids of the recipes whose rows were rewritten
+        """
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids:
+            return set()
+
+        stored = {}
+        for recipe_id, amount, name in self.filter(recipe_id__in=recipe_ids).order_by(
+            'recipe_id', 'position', 'pk'
+        ).values_list('recipe_id', 'amount', 'name'):
+            stored.setdefault(recipe_id, []).append((amount, name))
+
+        changed = set()
+        rows = []
+        for recipe_id, text in Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', 'ingredients'):
+            lines = parse_ingredients(text)
+            if [(line.amount[:50], line.name[:200]) for line in lines] == stored.get(recipe_id, []):
+                continue
+            changed.add(recipe_id)
+            rows.extend(Ingredient.from_line(recipe_id, position, line) for position, line in enumerate(lines))
+
+        if changed:
+            self.filter(recipe_id__in=changed).delete()
+            self.bulk_create(rows, batch_size=1000)
+        return changed
+
+    def rebuild(self, batch_size=1000):
+        """
+        Re-parse every recipe's ingredient list.
+
+        Args:
+            batch_size: Number of recipes to parse per batch
+
+        Returns:
+            int: Number of recipes whose rows were rewritten
+        """
+        ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        changed = 0
+        for start in range(0, len(ids), batch_size):
+            changed += len(self.sync(ids[start:start + batch_size]))
+        return changed
+
+
+class Ingredient(models.Model):
+    """
+    Ingredient model - one parsed line of a recipe's ingredient list.
+
+    Recipe.ingredients (one ingredient per line) stays what authors edit;
+    these rows are derived from it by IngredientManager.sync (see
+    recipes/signals.py) and hold the parts search needs: the quantity, the
+    normalized unit and the canonical ingredient name shared across recipes
+    (see recipes/ingredients.py).
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='ingredient_items',
+        help_text="The recipe this ingredient belongs to"
+    )
+    position = models.PositiveIntegerField(
+        default=0,
+        help_text="Line number within the recipe's ingredient list, from 0"
+    )
+    name = models.CharField(
+        max_length=200,
+        help_text="The ingredient as written, without the amount (e.g., 'Flour, sifted')"
+    )
+    amount = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Quantity and unit as written (e.g., '2 cups')"
+    )
+    quantity = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="The amount as a number (e.g., 2.0 for '2 cups')"
+    )
+    unit = models.CharField(
+        max_length=20,
+        blank=True,
+        help_text="Normalized unit (e.g., 'cup', 'tbsp', 'g'), or empty for counted items"
+    )
+    canonical = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Folded, singular ingredient name shared across recipes (e.g., 'flour')"
+    )
+
+    objects = IngredientManager()
+
+    class Meta:
+        ordering = ['position', 'pk']
+        indexes = [
+            # Recipes using an ingredient, for pantry and ingredient searches
+            models.Index(fields=['canonical', 'recipe'], name='ingredient_canonical_idx'),
+        ]
+
+    @classmethod
+    def from_line(cls, recipe_id, position, line):
+        """
+        Build an unsaved row from a parsed line.
+
+        Args:
+            recipe_id: Primary key of the recipe
+            position: Line number within the ingredient list
+            line: ingredients.ParsedIngredient
+        """
+        return cls(
+            recipe_id=recipe_id,
+            position=position,
+            name=line.name[:200],
+            amount=line.amount[:50],
+            quantity=line.quantity,
+            unit=line.unit,
+            canonical=line.canonical,
+        )
+
+    def save(self, *args, **kwargs):
+        """Save the row, filling in the parsed fields if they were left empty."""
+        if self.quantity is None and not self.unit:
+            self.quantity, self.unit = parse_amount(self.amount)
+        if not self.canonical:
+            self.canonical = canonical_name(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.amount} {self.name}" if self.amount else self.name
+
+
+class RecipeCardManager(models.Manager):
+    """
+    Manager for RecipeCard with helpers to keep the read model in sync.
+    """
+
+    def sync(self, recipe_ids):
+        """
+        Recompute the cards for the given recipes.
+
+        Cards are inserted or overwritten for recipes that exist and deleted
+        for recipes that no longer do. Costs a fixed number of queries
+        regardless of how many recipes are passed.
+
+        Args:
+            recipe_ids: Iterable of Recipe primary keys
+        """
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids:
+            return
+
+        recipes = list(Recipe.objects.filter(pk__in=recipe_ids).cards())
+
+        tag_ids = {}
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag_id'):
+            tag_ids.setdefault(recipe_id, []).append(tag_id)
+
+        cards = [RecipeCard.from_recipe(recipe, tag_ids.get(recipe.pk, [])) for recipe in recipes]
+        self.bulk_create(
+            cards,
+            update_conflicts=True,
+            unique_fields=['recipe'],
+            update_fields=[f.name for f in RecipeCard._meta.concrete_fields if not f.primary_key],
+        )
+
+        missing = recipe_ids - {recipe.pk for recipe in recipes}
+        if missing:
+            self.filter(recipe_id__in=missing).delete()
+
+    def rebuild(self, batch_size=1000):
+        """
+        Rebuild every card from scratch.
+
+        Args:
+            batch_size: Number of recipes to recompute per batch
+
+        Returns:
+            int: Number of cards written
+        """
+        self.all().delete()
+        ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            self.sync(ids[start:start + batch_size])
+        return len(ids)
+
+
+class RecipeCard(models.Model):
+    """
+    RecipeCard model - denormalized, write-maintained read model for listings.
+
+    Stores everything a recipe card displays, precomputed, so listing and
+    filtering pages read a single table instead of joining Recipe, Tag, Step
+    and User. Rows are kept current by the signal handlers in
+    recipes/signals.py and can be rebuilt with `manage.py rebuild_recipe_cards`.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        help_text="The recipe this card summarizes"
+    )
+    title = models.CharField(max_length=200)
+    image_url = models.URLField(blank=True, null=True)
+    byline = models.CharField(
+        max_length=220,
+        help_text="Author display text (e.g., 'By Jamie Oliver' or 'From alice')"
+    )
+    cuisine_name = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Name of the recipe's cuisine tag, if any"
+    )
+    tag_ids = models.TextField(
+        blank=True,
+        help_text="Comma-delimited tag ids with leading and trailing commas (e.g., ',3,7,')"
+    )
+    total_time = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Copied from Recipe.total_time"
+    )
+    step_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(help_text="Copied from the recipe, for ordering")
+    version = models.CharField(
+        max_length=16,
+        blank=True,
+        help_text="Fingerprint of the displayed fields; changes whenever the card's content does"
+    )
+
+    objects = RecipeCardManager()
+
+    # Fields that appear in the rendered card markup
+    DISPLAY_FIELDS = ('title', 'image_url', 'byline', 'cuisine_name', 'total_time', 'step_count')
+
+    class Meta:
+        ordering = ['-created_at']  # Same order as recipes
+        indexes = [
+            models.Index(fields=['-created_at', '-recipe'], name='recipecard_created_idx'),
+            models.Index(fields=['total_time', '-created_at', '-recipe'], name='recipecard_total_time_idx'),
+        ]
+
+    @classmethod
+    def from_recipe(cls, recipe, tag_ids):
+        """
+        Build an unsaved card for a recipe fetched via Recipe.objects.cards().
+
+        Args:
+            recipe: Recipe annotated with cuisine_name and step_count
+            tag_ids: Ids of all tags on the recipe
+
+        Returns:
+            RecipeCard
+        """
+        if recipe.recipe_author:
+            byline = f"By {recipe.recipe_author}"
+        else:
+            byline = f"From {recipe.author.username}"
+        card = cls(
+            recipe_id=recipe.pk,
+            title=recipe.title,
+            image_url=recipe.image_url,
+            byline=byline,
+            cuisine_name=recipe.cuisine_name or '',
+            tag_ids=''.join(f',{tag_id}' for tag_id in sorted(tag_ids)) + ',' if tag_ids else '',
+            total_time=recipe.total_time,
+            step_count=recipe.step_count,
+            created_at=recipe.created_at,
+        )
+        card.version = card.compute_version()
+        return card
+
+    def compute_version(self):
+        """
+        Fingerprint the displayed fields.
+
+        Used as the cache version for the rendered card fragment: any edit to
+        the recipe, its tags or its steps that changes what the card shows
+        yields a new version, while identical content maps to the same one.
+        The recipe id and creation time are included so a reused id (e.g.
+        after a database reset) never matches an old fragment.
+        """
+        parts = [self.recipe_id, self.created_at.isoformat()]
+        parts += [getattr(self, name) for name in self.DISPLAY_FIELDS]
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def id(self):
+        """Recipe id, so cards can stand in for recipes in templates."""
+        return self.recipe_id
+
+    def __str__(self):
+        return self.title
+
+
+class IndexVersionManager(models.Manager):
+    """
+    Manager for IndexVersion with helpers to read and replace tokens.
+    """
+
+    def current(self, name):
+        """
+        Return the current version token of an index ('' if never written).
+
+        Args:
+            name: Index name (e.g., 'tag_index')
+        """
+        return self.filter(name=name).values_list('version', flat=True).first() or ''
+
+    def replace(self, name):
+        """
+        Give an index a fresh version token, as part of the current transaction.
+
+        The row is locked until the transaction ends, so concurrent writers
+        replace the token one after another and each sees its predecessor.
+
+        Args:
+            name: Index name (e.g., 'tag_index')
+
+        Returns:
+            tuple: (previous token, new token); the previous token is '' if
+            the index had none
+        """
+        new = uuid.uuid4().hex
+        with transaction.atomic():
+            row = self.select_for_update().filter(name=name).first()
+            if row is None:
+                self.create(name=name, version=new)
+                return '', new
+            old = row.version
+            self.filter(name=name).update(version=new)
+        return old, new
+
+
+class IndexVersion(models.Model):
+    """
+    IndexVersion model - version token of a per-process, in-memory index.
+
+    Processes that cache data derived from the database (see
+    recipes/tag_index.py) compare their loaded token with this row to detect
+    writes made by other workers. Tokens are random rather than counters so a
+    rolled-back write can never be mistaken for a later one.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.CharField(max_length=32)
+
+    objects = IndexVersionManager()
+
+    def __str__(self):
+        return f"{self.name} @ {self.version}"
+
+
+class FullTextMatchField(models.TextField):
+    """
+    The hidden column of an SQLite FTS5 table that shares the table's name.
+
+    Supports only the `match` lookup, rendered as `<table> MATCH <query>`.
+    """
+
+
+@FullTextMatchField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class RecipeSearchEntry(models.Model):
+    """
+    RecipeSearchEntry model - one row of the SQLite FTS5 table over recipes.
+
+    The virtual table is created by migration 0014 when the SQLite build
+    supports FTS5, and written with raw SQL by recipes/search.py; this
+    unmanaged model exists so searches can join and rank it through the ORM:
+
+        Recipe.objects.filter(search_entry__document__match='"pasta"*')
+            .annotate(rank=-F('search_entry__rank'))
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry',
+    )
+    title = models.TextField()
+    description = models.TextField()
+    tags = models.TextField(help_text="Tag names, space separated")
+    steps = models.TextField(help_text="Step instructions, space separated")
+    # Hidden FTS5 columns: the MATCH target and the weighted bm25 score
+    # (lower is better) of the current match
+    document = FullTextMatchField(db_column='recipes_recipe_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_fts'
+
+    def __str__(self):
+        return self.title
+
+
+class SearchTerm(models.Model):
+    """
+    SearchTerm model - one distinct word of recipe titles, tag names or ingredients.
+
+    Typo-tolerant search corrects misspelled query words to the most similar
+    term (see recipes/fuzzy.py). Terms are added as recipes are written and
+    only pruned by `manage.py rebuild_search_terms`. On PostgreSQL the
+    word has a GIN trigram index (migration 0015).
+    """
+    word = TrigramWordField(max_length=64, primary_key=True)
+
+    def __str__(self):
+        return self.word
+
+
+class SimilarRecipe(models.Model):
+    """
+    SimilarRecipe model - one entry of a recipe's "More like this" list.
+
+    Lists are precomputed from TF-IDF vectors (see recipes/similar.py) by
+    `manage.py update_similar_recipes`, so the detail page reads them with a
+    single indexed lookup. Entries pointing at a recipe deleted since are
+    skipped by the detail page until the next run repairs the list.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_entries',
+        db_index=False,  # Covered by the (recipe, rank) constraint
+        help_text="The recipe this list belongs to"
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        help_text="A recipe similar to it"
+    )
+    rank = models.PositiveSmallIntegerField(help_text="Position in the list, from 0 (most similar)")
+    score = models.FloatField(help_text="Cosine similarity of the two recipes' TF-IDF vectors")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'rank'], name='similar_recipe_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class PendingSimilarity(models.Model):
+    """
+    PendingSimilarity model - a recipe written since its similar recipes were computed.
+
+    Rows are added by the signal handlers in recipes/signals.py and consumed
+    by `manage.py update_similar_recipes`. Deleted recipes stay queued too,
+    so the lists pointing at them are repaired.
+    """
+    recipe_id = models.BigIntegerField(primary_key=True)
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class SimilarityFeature(models.Model):
+    """
+    SimilarityFeature model - one feature of the TF-IDF matrix behind similar recipes.
+
+    Stored by `manage.py update_similar_recipes --rebuild` with its weight
+    at the time and its column of the matrix (see recipes/similar.py), so
+    incremental runs read only the features and columns they need. Features
+    too common to weigh anything have no row.
+    """
+    name = models.CharField(
+        max_length=200,
+        unique=True,
+        help_text="A title or step term, 'tag:<name>' or 'ing:<canonical name>'"
+    )
+    idf = models.FloatField(help_text="Inverse document frequency at the last rebuild")
+    recipe_ids = models.BinaryField(
+        default=b'',
+        help_text="Recipes in the feature's column, as a packed array of unsigned ints"
+    )
+    weights = models.BinaryField(
+        default=b'',
+        help_text="Their weights for the feature, as a packed array of floats"
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeVector(models.Model):
+    """
+    RecipeVector model - a recipe's row of the TF-IDF matrix behind similar recipes.
+
+    Stored by `manage.py update_similar_recipes` (see recipes/similar.py);
+    rows of deleted recipes are removed by the next run.
+    """
+    recipe_id = models.BigIntegerField(primary_key=True)
+    features = models.BinaryField(help_text="SimilarityFeature ids, as a packed array of unsigned ints")
+    weights = models.BinaryField(help_text="Normalized weights, as a packed array of floats")
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class AlsoSavedRecipe(models.Model):
+    """
+    AlsoSavedRecipe model - one entry of a recipe's "people who saved this also saved" list.
+
+    Lists are precomputed from Favorite rows (see recipes/recommendations.py)
+    by `manage.py update_recommendations`; a user's recommendations combine
+    the lists of their favorites. Entries pointing at a recipe deleted since
+    are skipped until the next run repairs the list.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='also_saved_entries',
+        db_index=False,  # Covered by the (recipe, rank) constraint
+        help_text="The recipe this list belongs to"
+    )
+    other = models.ForeignKey(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        help_text="A recipe often saved by the same people"
+    )
+    rank = models.PositiveSmallIntegerField(help_text="Position in the list, from 0 (most related)")
+    score = models.FloatField(help_text="Cosine similarity of the two recipes' sets of savers")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'rank'], name='also_saved_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} + {self.other_id} ({self.score:.3f})"
+
+
+class PendingRecommendation(models.Model):
+    """
+    PendingRecommendation model - a recipe whose favorites changed since its list was computed.
+
+    Rows are added by the signal handlers in recipes/signals.py and consumed
+    by `manage.py update_recommendations`.
+    """
+    recipe_id = models.BigIntegerField(primary_key=True)
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class ImportCheckpoint(models.Model):
+    """
+    ImportCheckpoint model - progress of a bulk recipe import.
+
+    Written by recipes/importer.py in the same transaction as each batch of
+    imported recipes, so `manage.py import_recipes` resumes an interrupted
+    import after the last committed batch.
+    """
+    source = models.CharField(
+        max_length=255,
+        primary_key=True,
+        help_text="The imported file's absolute path, or the name given with --checkpoint"
+    )
+    position = models.BigIntegerField(default=0, help_text="Input records consumed so far, valid or not")
+    imported = models.BigIntegerField(default=0, help_text="Recipes created so far")
+    skipped = models.BigIntegerField(default=0, help_text="Invalid records skipped so far")
+    updated_at = models.DateTimeField(auto_now=True, help_text="When the last batch was committed")
+
+    def __str__(self):
+        return f"{self.source} @ {self.position}"
+
+
 class ABTestImpression(models.Model):
     """
     Log of AB test impressions (one row per page view).
@@ -208,6 +976,10 @@ class ABTestImpression(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Covers per-variant counts, overall or within a time window
+            models.Index(fields=['variant', 'created_at'], name='abimpression_variant_time_idx'),
+        ]
 
     def __str__(self):
         return f"AB impression {self.variant} @ {self.path} on {self.created_at.isoformat()}"
@@ -228,6 +1000,10 @@ class ABTestClick(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Covers per-variant counts, overall or within a time window
+            models.Index(fields=['variant', 'created_at'], name='abclick_variant_time_idx'),
+        ]
 
     def __str__(self):
         return f"AB click {self.variant} @ {self.path} on {self.created_at.isoformat()}"
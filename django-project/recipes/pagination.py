@@ -0,0 +1,324 @@
+"""
+Keyset (cursor) pagination for recipe listings.
+
+OFFSET pagination gets slower the deeper a user scrolls, because the database
+has to walk and discard every row before the requested page. Keyset
+pagination instead remembers the sort key of the last row on the page and asks
+for rows strictly "after" it, which an index on the sort key can answer
+directly. Page cost stays constant no matter how deep the page is.
+
+Cursors are opaque, URL-safe tokens. Each one records the direction of travel
+(next or previous) and the sort-key values of the boundary row.
+"""
+import base64
+import heapq
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+# Number of recipes shown per listing page
+PAGE_SIZE = 24
+
+# Default listing order: newest first, primary key as a tie-breaker so the
+# order is total. Works for both Recipe and RecipeCard (whose pk is recipe_id).
+DEFAULT_KEYS = ('-created_at', '-pk')
+
+# Ranked search listings: best match first, equal scores newest first
+RANKED_KEYS = ('-rank', '-created_at', '-pk')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+@dataclass
+class KeysetPage:
+    """
+    One page of keyset-paginated results.
+
+    Attributes:
+        items: List of objects on this page, in listing order
+        next_cursor: Token for the following page, or None on the last page
+        prev_cursor: Token for the preceding page, or None on the first page
+    """
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+    prev_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def _json_default(value):
+    """Serialize datetimes (e.g. created_at) inside cursor payloads."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(direction, values):
+    """
+    Build an opaque cursor token.
+
+    Args:
+        direction: 'n' to continue forwards, 'p' to go back
+        values: Sort-key values of the boundary row
+
+    Returns:
+        str: URL-safe token
+    """
+    payload = json.dumps({'d': direction, 'v': list(values)}, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Returns:
+        tuple: (direction, values)
+
+    Raises:
+        InvalidCursor: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        direction, values = payload['d'], payload['v']
+    except (ValueError, KeyError, TypeError, UnicodeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise InvalidCursor('Malformed cursor payload')
+    return direction, values
+
+
+def _key_value(obj, key):
+    """Read the sort-key value of `key` (without any '-' prefix) from obj."""
+    return getattr(obj, key.lstrip('-'))
+
+
+def _after(keys, values):
+    """
+    Build a Q matching rows that sort strictly after `values` under `keys`.
+
+    For keys (a, b) this is the expanded form of the row comparison
+    (a, b) > (va, vb): (a > va) OR (a = va AND b > vb), with the comparison
+    flipped for descending keys.
+    """
+    condition = Q()
+    equal_prefix = Q()
+    for key, value in zip(keys, values):
+        name = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+        equal_prefix &= Q(**{name: value})
+    return condition
+
+
+def _reverse(keys):
+    """Flip the direction of every sort key."""
+    return tuple(key[1:] if key.startswith('-') else f'-{key}' for key in keys)
+
+
+def _cursor_value(key, value):
+    """
+    Convert a cursor value back to the type of the sort key it came from.
+
+    Raises:
+        InvalidCursor: If the value cannot belong to the key, e.g. in a
+            tampered cursor
+    """
+    name = key.lstrip('-')
+    try:
+        if name == 'created_at':
+            parsed = parse_datetime(value) if isinstance(value, str) else None
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            parsed = None
+        elif name in ('pk', 'id'):
+            parsed = value if isinstance(value, int) and abs(value) < 2 ** 63 else None
+        else:
+            parsed = value
+    except ValueError:  # Well-formed but impossible dates, e.g. month 13
+        parsed = None
+    if parsed is None:
+        raise InvalidCursor('Cursor does not match listing order')
+    # Stored timestamps are aware; a naive one could not be compared with them
+    if isinstance(parsed, datetime) and settings.USE_TZ and timezone.is_naive(parsed):
+        raise InvalidCursor('Cursor timestamp has no time zone')
+    return parsed
+
+
+def paginate(queryset, cursor=None, keys=DEFAULT_KEYS, page_size=PAGE_SIZE):
+    """
+    Return one page of `queryset` using keyset pagination.
+
+    Args:
+        queryset: QuerySet to paginate (any filters already applied)
+        cursor: Optional cursor token from a previous page
+        keys: Sort keys, Django order_by style; must form a total order
+        page_size: Maximum number of items on the page
+
+    Returns:
+        KeysetPage
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded or its values do not
+            match `keys`
+    """
+    direction, values = decode_cursor(cursor) if cursor else ('n', None)
+    if values is not None:
+        if len(values) != len(keys):
+            raise InvalidCursor('Cursor does not match listing order')
+        values = [_cursor_value(key, value) for key, value in zip(keys, values)]
+
+    # Walking backwards is a forwards walk over the reversed order
+    walk_keys = keys if direction == 'n' else _reverse(keys)
+    qs = queryset.order_by(*walk_keys)
+    if values is not None:
+        qs = qs.filter(_after(walk_keys, values))
+
+    # Fetch one extra row to learn whether there is more in this direction
+    rows = list(qs[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'p':
+        rows.reverse()
+
+    first = [_key_value(rows[0], key) for key in keys] if rows else None
+    last = [_key_value(rows[-1], key) for key in keys] if rows else None
+    return _page(rows, direction, values is not None, has_more, first, last)
+
+
+def _page(rows, direction, from_cursor, has_more, first, last):
+    """
+    Wrap the rows of a page together with the cursors to its neighbours.
+
+    Args:
+        rows: Items on the page, in listing order
+        direction: Direction of travel that produced the page ('n' or 'p')
+        from_cursor: Whether the page was requested with a cursor
+        has_more: Whether more rows exist beyond the page in that direction
+        first / last: Sort-key values of the first and last row
+    """
+    page = KeysetPage(items=rows)
+    if not rows:
+        return page
+    if direction == 'n':
+        page.next_cursor = encode_cursor('n', last) if has_more else None
+        page.prev_cursor = encode_cursor('p', first) if from_cursor else None
+    else:
+        page.next_cursor = encode_cursor('n', last)
+        page.prev_cursor = encode_cursor('p', first) if has_more else None
+    return page
+
+
+def paginate_entries(entries, cursor=None, page_size=PAGE_SIZE, keys=DEFAULT_KEYS):
+    """
+    Keyset-paginate an in-memory result set.
+
+    Produces the same cursors as `paginate` with the same keys, so a listing
+    can switch between the two without invalidating links. Only the page
+    (plus one row) is ordered, with a heap, rather than the whole result.
+
+    Args:
+        entries: Iterable of tuples holding the values of `keys`, in any
+            order; the last value is the primary key
+        cursor: Optional cursor token from a previous page
+        page_size: Maximum number of items on the page
+        keys: Sort keys; all must be descending, e.g. ('-created_at', '-pk')
+
+    Returns:
+        KeysetPage whose items are the primary keys on the page
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded
+    """
+    direction, values = decode_cursor(cursor) if cursor else ('n', None)
+    if values is not None:
+        if len(values) != len(keys):
+            raise InvalidCursor('Cursor does not match listing order')
+        boundary = tuple(_cursor_value(key, value) for key, value in zip(keys, values))
+
+    # Every key is descending, so "after" means a smaller tuple
+    if direction == 'n':
+        if values is not None:
+            entries = [entry for entry in entries if entry < boundary]
+        rows = heapq.nlargest(page_size + 1, entries)
+    else:
+        rows = heapq.nsmallest(page_size + 1, [entry for entry in entries if entry > boundary])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'p':
+        rows.reverse()
+
+    first = list(rows[0]) if rows else None
+    last = list(rows[-1]) if rows else None
+    return _page([row[-1] for row in rows], direction, values is not None, has_more, first, last)
+
+
+def paginate_sorted(entries, cursor=None, page_size=PAGE_SIZE, keys=DEFAULT_KEYS, complete=True):
+    """
+    Keyset-paginate a result set that is already in listing order.
+
+    Like `paginate_entries`, but the page is found by binary search and
+    sliced out, so serving a page costs O(log n) whatever its depth.
+
+    Args:
+        entries: List of tuples holding the values of `keys`, sorted in
+            listing order (descending); the last value is the primary key
+        cursor: Optional cursor token from a previous page
+        page_size: Maximum number of items on the page
+        keys: Sort keys; all must be descending, e.g. ('-created_at', '-pk')
+        complete: False if `entries` is only the start of the result set
+
+    Returns:
+        KeysetPage whose items are the primary keys on the page, or None if
+        `entries` is incomplete and the page reaches past its end
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded
+    """
+    direction, values = decode_cursor(cursor) if cursor else ('n', None)
+    start = 0
+    if values is not None:
+        if len(values) != len(keys):
+            raise InvalidCursor('Cursor does not match listing order')
+        boundary = tuple(_cursor_value(key, value) for key, value in zip(keys, values))
+        # First entry at or after the boundary in listing order
+        low, high = 0, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            if entries[middle] > boundary:
+                low = middle + 1
+            else:
+                high = middle
+        start = low
+        if direction == 'n' and start < len(entries) and entries[start] == boundary:
+            start += 1
+
+    if direction == 'n':
+        rows = entries[start:start + page_size + 1]
+        if len(rows) <= page_size and not complete:
+            return None
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+    else:
+        if start == len(entries) and not complete:
+            return None
+        rows = entries[max(0, start - page_size):start]
+        has_more = start > page_size
+
+    first = list(rows[0]) if rows else None
+    last = list(rows[-1]) if rows else None
+    return _page([row[-1] for row in rows], direction, values is not None, has_more, first, last)
@@ -0,0 +1,298 @@
+"""
+In-process ingredient index for pantry searches.
+
+A pantry search ("what can I cook with flour, eggs, milk and butter?")
+ranks recipes by how many of their ingredients the pantry covers, and can
+allow a few missing ones. Checking every recipe against the pantry costs a
+Python loop over the whole catalog per search. This module instead keeps,
+in each worker process,
+
+- a posting list per canonical ingredient name (see recipes/ingredients.py):
+  a bitset (a Python int) with bit N set when recipe N uses the ingredient;
+- a bitset per ingredient count, of the recipes using that many distinct
+  ingredients.
+
+A search adds the posting lists of the pantry's ingredients as bit-sliced
+counters: plane i holds bit i of every recipe's count of covered
+ingredients, so each addition is a handful of AND/OR/XOR operations on
+whole bitsets. Recipes missing exactly m ingredients while covering h are
+then `count == h` (an AND over the planes) intersected with the recipes
+using h + m ingredients. Only the ids on the requested page are listed.
+
+The index is loaded from Ingredient rows on first use and kept current like
+the tag index (see recipes/tag_index.py): incrementally through
+`recipes_changed` for writes in this process, and by reloading when the
+'ingredient_index' IndexVersion token changed.
+"""
+import threading
+
+from .ingredients import canonical_name
+from .models import Ingredient, IndexVersion
+from .tag_index import _bitset, members
+
+
+INDEX_NAME = 'ingredient_index'
+
+# Recipes per response
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Largest accepted number of missing ingredients
+MAX_MISSING = 5
+
+# Pantry items accepted per search
+MAX_PANTRY_SIZE = 1000
+
+
+def pantry_names(items):
+    """
+    Reduce pantry items as typed to canonical ingredient names.
+
+    Args:
+        items: Iterable of strings (e.g., ['Eggs', 'plain flour'])
+
+    Returns:
+        list of distinct canonical names, in the order given
+    """
+    names = {}
+    for item in items:
+        name = canonical_name(item)
+        if name:
+            names.setdefault(name, None)
+    return list(names)
+
+
+def _bit_slices(postings):
+    """
+    Count, per recipe, the posting lists it appears in.
+
+    Uses carry-save addition: three bitsets of the same weight become one of
+    that weight and one of the next (five operations), so each posting list
+    costs about five whole-bitset operations however large the pantry.
+
+    Args:
+        postings: Bitsets to add up
+
+    Returns:
+        list of bitsets: plane i has bit N set when bit i of recipe N's
+        count is set
+    """
+    levels = []  # levels[i]: pending bitsets of weight 2**i, at most two
+
+    def push(weight, bits):
+        while True:
+            if weight == len(levels):
+                levels.append([])
+            level = levels[weight]
+            level.append(bits)
+            if len(level) < 3:
+                return
+            a, b, c = level
+            partial = a ^ b
+            level[:] = [partial ^ c]
+            bits = (a & b) | (partial & c)
+            weight += 1
+
+    for bits in postings:
+        push(0, bits)
+    planes = []
+    weight = 0
+    while weight < len(levels):
+        level = levels[weight]
+        if len(level) == 2:
+            a, b = level
+            level[:] = [a ^ b]
+            push(weight + 1, a & b)
+        planes.append(level[0] if level else 0)
+        weight += 1
+    return planes
+
+
+def _count_equals(planes, candidates, count):
+    """Return the recipes among candidates whose bit-sliced counter equals count."""
+    if count >> len(planes):
+        return 0
+    result = candidates
+    for i, plane in enumerate(planes):
+        if not result:
+            break
+        result = result & plane if count >> i & 1 else result & ~plane
+    return result
+
+
+class PantryResults:
+    """
+    One page of a pantry search.
+
+    Attributes:
+        count: Number of matching recipes
+        matches: Tuples of (recipe_id, have, total) on the page, best first:
+            fewest missing ingredients, then most covered ones, then newest
+    """
+
+    __slots__ = ('count', 'matches')
+
+    def __init__(self, count, matches):
+        self.count = count
+        self.matches = matches
+
+
+class IngredientIndex:
+    """Per-process posting lists of recipe ids, keyed by canonical ingredient."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None  # None until loaded, and after a missed write
+        self._postings = {}  # canonical name -> bitset of recipe ids
+        self._by_size = {}  # distinct ingredient count -> bitset of recipe ids
+        self._recipes = {}  # recipe id -> frozenset of canonical names
+
+    def ensure_current(self):
+        """Reload the index if it was never loaded or another worker wrote since."""
+        current = IndexVersion.objects.current(INDEX_NAME)
+        with self._lock:
+            if current != self._version:
+                self._load(current)
+
+    def _load(self, version):
+        rows = Ingredient.objects.exclude(canonical='').order_by().values_list('recipe_id', 'canonical')
+        self.build(rows.iterator(chunk_size=5000))
+        self._version = version
+
+    def build(self, rows):
+        """
+        Replace the index contents.
+
+        Args:
+            rows: Iterable of (recipe_id, canonical name) pairs
+        """
+        recipes = {}
+        for recipe_id, name in rows:
+            recipes.setdefault(recipe_id, set()).add(name)
+        ids_by_name = {}
+        ids_by_size = {}
+        for recipe_id, names in recipes.items():
+            ids_by_size.setdefault(len(names), []).append(recipe_id)
+            for name in names:
+                ids_by_name.setdefault(name, []).append(recipe_id)
+        with self._lock:
+            self._recipes = {recipe_id: frozenset(names) for recipe_id, names in recipes.items()}
+            self._postings = {name: _bitset(ids) for name, ids in ids_by_name.items()}
+            self._by_size = {size: _bitset(ids) for size, ids in ids_by_size.items()}
+
+    def recipes_changed(self, recipe_ids):
+        """
+        Apply a write to the index and publish a new version token.
+
+        Must run after the Ingredient rows of the changed recipes were
+        synced, inside the transaction of the write.
+
+        Args:
+            recipe_ids: Ids of recipes that were created, edited or deleted
+        """
+        old, new = IndexVersion.objects.replace(INDEX_NAME)
+        with self._lock:
+            if self._version is None or self._version != old:
+                # Not loaded, or already behind: reload on next use instead
+                self._version = None
+                return
+            rows = Ingredient.objects.filter(recipe_id__in=recipe_ids).exclude(canonical='').values_list(
+                'recipe_id', 'canonical'
+            )
+            self.apply(recipe_ids, rows)
+            self._version = new
+
+    def apply(self, recipe_ids, rows):
+        """
+        Replace the ingredients of some recipes.
+
+        Args:
+            recipe_ids: Ids of the recipes to update; those without rows are removed
+            rows: (recipe_id, canonical name) pairs of the updated recipes
+        """
+        fresh = {}
+        for recipe_id, name in rows:
+            fresh.setdefault(recipe_id, set()).add(name)
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+                if fresh.get(recipe_id):
+                    self._add(recipe_id, frozenset(fresh[recipe_id]))
+
+    def _remove(self, recipe_id):
+        names = self._recipes.pop(recipe_id, None)
+        if names is None:
+            return
+        mask = ~(1 << recipe_id)
+        for name in names:
+            remaining = self._postings[name] & mask
+            if remaining:
+                self._postings[name] = remaining
+            else:
+                del self._postings[name]
+        remaining = self._by_size[len(names)] & mask
+        if remaining:
+            self._by_size[len(names)] = remaining
+        else:
+            del self._by_size[len(names)]
+
+    def _add(self, recipe_id, names):
+        self._recipes[recipe_id] = names
+        bit = 1 << recipe_id
+        for name in names:
+            self._postings[name] = self._postings.get(name, 0) | bit
+        self._by_size[len(names)] = self._by_size.get(len(names), 0) | bit
+
+    def __contains__(self, name):
+        return name in self._postings
+
+    def search(self, names, max_missing=0, limit=DEFAULT_LIMIT, offset=0):
+        """
+        Rank recipes by how much of their ingredient list the pantry covers.
+
+        Args:
+            names: Canonical ingredient names in the pantry (see pantry_names)
+            max_missing: Largest number of ingredients a recipe may need
+                beyond the pantry
+            limit: Recipes per page
+            offset: Matches to skip, for later pages
+
+        Returns:
+            PantryResults; recipes using none of the pantry's ingredients
+            never match
+        """
+        with self._lock:
+            postings = [self._postings[name] for name in set(names) if name in self._postings]
+            by_size = dict(self._by_size)
+
+        planes = _bit_slices(postings)
+        candidates = 0
+        for plane in planes:
+            candidates |= plane
+
+        most = len(postings)
+        count = 0
+        matches = []
+        wanted = offset + limit
+        for missing in range(max_missing + 1):
+            for have in range(most, 0, -1):
+                sized = by_size.get(have + missing, 0) & candidates
+                if not sized:
+                    continue
+                bits = _count_equals(planes, sized, have)
+                if not bits:
+                    continue
+                tier = bits.bit_count()
+                if count < wanted and count + tier > offset:
+                    ids = members(bits)[::-1]  # Newest (highest id) first
+                    start = max(0, offset - count)
+                    matches.extend(
+                        (recipe_id, have, have + missing)
+                        for recipe_id in ids[start:start + wanted - max(count, offset)]
+                    )
+                count += tier
+        return PantryResults(count, matches)
+
+
+# The index of this process
+ingredient_index = IngredientIndex()
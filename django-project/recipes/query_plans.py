@@ -0,0 +1,98 @@
+"""
+Query-plan checks for the hot queries issued by views.py.
+
+Each hot query is EXPLAINed and the plan is searched for full table scans
+(SQLite "SCAN <table>" without an index, PostgreSQL "Seq Scan"). On
+PostgreSQL sequential scans are disabled for the check, so a Seq Scan in the
+plan means no index can serve the query at all, rather than that the
+planner preferred a scan of a small table.
+
+Whole-catalog aggregates (the facet counts) and substring search are not
+listed: they read every row by design.
+
+Run with `manage.py check_query_plans`.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import ABTestClick, ABTestImpression, IndexVersion, Recipe, RecipeCard, Step, Tag
+from .pagination import DEFAULT_KEYS, PAGE_SIZE
+from .tag_index import INDEX_NAME
+
+
+def hot_queries():
+    """
+    Build the hot queries, using ids from the current database where needed.
+
+    Returns:
+        list of (name, QuerySet) pairs
+    """
+    recipe_pk = Recipe.objects.order_by().values_list('pk', flat=True).first() or 0
+    page_ids = list(RecipeCard.objects.order_by(*DEFAULT_KEYS).values_list('pk', flat=True)[:PAGE_SIZE]) or [0]
+    card_fields = ('recipe_id', 'created_at', 'version')
+    since = timezone.now() - timedelta(days=7)
+    return [
+        ('home: listing page', RecipeCard.objects.only(*card_fields).order_by(*DEFAULT_KEYS)[:PAGE_SIZE + 1]),
+        ('home: max-time filter', RecipeCard.objects.only(*card_fields).filter(total_time__lte=30)
+            .order_by(*DEFAULT_KEYS)[:PAGE_SIZE + 1]),
+        ('home: page cards by id', RecipeCard.objects.only(*card_fields).filter(recipe_id__in=page_ids)),
+        ('home: cuisine menu', Tag.objects.filter(category='cuisine').order_by('name')),
+        ('home: dietary menu', Tag.objects.filter(category='dietary').order_by('name')),
+        ('home: tag index version', IndexVersion.objects.filter(name=INDEX_NAME)),
+        ('quickest first', Recipe.objects.filter(total_time__lte=30)
+            .order_by('total_time', '-created_at', '-id')[:PAGE_SIZE]),
+        ('detail: recipe', Recipe.objects.select_related('author').filter(pk=recipe_pk)),
+        ('detail: steps', Step.objects.filter(recipe__in=[recipe_pk])),
+        ('detail: tags', Tag.objects.filter(recipe__in=[recipe_pk])),
+        ('analytics: impressions by variant', ABTestImpression.objects.values('variant')
+            .annotate(count=Count('id')).order_by('-count')),
+        ('analytics: clicks by variant', ABTestClick.objects.values('variant')
+            .annotate(count=Count('id')).order_by('-count')),
+        ('analytics: recent impressions of a variant', ABTestImpression.objects
+            .filter(variant='A', created_at__gte=since).order_by()),
+    ]
+
+
+def full_table_scans(queryset):
+    """
+    EXPLAIN a queryset and return the tables it reads with a full scan.
+
+    Args:
+        queryset: QuerySet to explain
+
+    Returns:
+        list of table names (empty if every table is reached via an index)
+
+    Raises:
+        NotImplementedError: On database backends other than SQLite and PostgreSQL
+    """
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        tables = set(connection.introspection.table_names())
+        scans = []
+        for line in queryset.explain().splitlines():
+            match = re.search(r'\bSCAN (\S+)(.*)$', line)
+            if match and match.group(1) in tables and 'INDEX' not in match.group(2):
+                scans.append(match.group(1))
+        return scans
+    if vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    raise NotImplementedError(f'Query plan checks do not support {vendor}')
+
+
+def check_query_plans():
+    """
+    EXPLAIN every hot query.
+
+    Returns:
+        list of (name, scanned tables) pairs, one per hot query
+    """
+    return [(name, full_table_scans(queryset)) for name, queryset in hot_queries()]
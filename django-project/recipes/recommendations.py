@@ -0,0 +1,359 @@
+"""
+"People who saved this also saved": recommendations from favorites.
+
+Two recipes are related when the same people saved them. For recipes i and
+j saved by n_i and n_j people, c_ij of whom saved both, the relation is
+
+    c_ij / sqrt(n_i * n_j)
+
+the cosine similarity of the two columns of the sparse user x recipe matrix
+of Favorite rows. The TOP_K neighbours of every recipe are stored as
+AlsoSavedRecipe rows by `manage.py update_recommendations`; a user's
+recommendations add up the stored neighbours of their favorites
+(recommend_for), reading a few indexed rows per favorite.
+
+Building the item-item matrix streams Favorite rows ordered by user, a
+chunk at a time, and counts each user's favorites (their "basket") against
+each other with Counter.update, which counts in C. The pair counts are what
+takes memory, so recipes are split into shards whose pairs fit MAX_PAIRS,
+as estimated from above by a first pass, and the stream is read once per
+shard. Baskets of more than MAX_BASKET_SIZE favorites count towards
+popularity but not towards pairs: they would cost their size squared.
+Recipes saved together by fewer than MIN_COMMON_SAVERS people are not
+related, so a recommendation never reveals one person's favorites.
+
+Favorites saved or removed since the last run are queued
+(PendingRecommendation). An update recomputes the rows of those recipes
+from their savers' baskets, and the lists of the recipes they now enter or
+leave.
+"""
+import heapq
+import itertools
+import math
+from collections import Counter
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import AlsoSavedRecipe, Favorite, PendingRecommendation, Recipe
+
+
+# Neighbours stored per recipe
+TOP_K = 20
+
+# People who must have saved two recipes before they are related
+MIN_COMMON_SAVERS = 2
+
+# Larger baskets only count towards popularity
+MAX_BASKET_SIZE = 500
+
+# Pair counts held in memory at once while building, roughly 100 bytes each
+MAX_PAIRS = 2_000_000
+
+# Favorite rows read per query while streaming
+STREAM_CHUNK_SIZE = 10000
+
+# Recipes per query, and lists written per transaction
+BATCH_SIZE = 1000
+
+# Favorites of a user whose neighbours are combined, most recent first
+MAX_SEED_FAVORITES = 200
+
+# Recommendations per response
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def favorite_rows(users=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream Favorite rows ordered by user, then recipe.
+
+    Uses keyset pagination over the unique (user, recipe) index, so each
+    chunk is one indexed range read however far into the table it is.
+
+    Args:
+        users: Optional ids of the users to read
+        chunk_size: Rows per query
+
+    Yields:
+        (user_id, recipe_id) tuples
+    """
+    rows = Favorite.objects.order_by('user_id', 'recipe_id').values_list('user_id', 'recipe_id')
+    if users is not None:
+        rows = rows.filter(user_id__in=users)
+    last = None
+    while True:
+        chunk = rows if last is None else rows.filter(
+            Q(user_id__gt=last[0]) | Q(user_id=last[0], recipe_id__gt=last[1])
+        )
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last = chunk[-1]
+
+
+def baskets(rows):
+    """Group (user_id, recipe_id) rows ordered by user into lists of recipe ids."""
+    for _, group in itertools.groupby(rows, key=itemgetter(0)):
+        yield [recipe_id for _, recipe_id in group]
+
+
+def _shards(pairs, max_pairs):
+    """Split recipe ids into (first, last) ranges whose estimated pair counts fit max_pairs."""
+    shards = []
+    first = None
+    last = None
+    total = 0
+    for recipe_id in sorted(pairs):
+        if first is not None and total + pairs[recipe_id] > max_pairs:
+            shards.append((first, last))
+            first = None
+        if first is None:
+            first, total = recipe_id, 0
+        total += pairs[recipe_id]
+        last = recipe_id
+    if first is not None:
+        shards.append((first, last))
+    return shards
+
+
+def _row(recipe_id, counts, popularity):
+    """Turn the co-save counts of a recipe into {other recipe: cosine}."""
+    saved = popularity[recipe_id]
+    return {
+        other: common / math.sqrt(saved * popularity[other])
+        for other, common in counts.items()
+        if common >= MIN_COMMON_SAVERS and other != recipe_id
+    }
+
+
+def _best(row, k=TOP_K):
+    """Return the k highest scores of a row as [(recipe_id, score)], best (then newest) first."""
+    best = heapq.nlargest(k, row.items(), key=lambda item: (item[1], item[0]))
+    return [(other, round(score, 6)) for other, score in best]
+
+
+def neighbour_lists(stream, k=TOP_K, max_pairs=MAX_PAIRS):
+    """
+    Compute the neighbours of every saved recipe in bounded memory.
+
+    Args:
+        stream: Callable returning a fresh iterable of (user_id, recipe_id)
+            rows ordered by user (e.g., favorite_rows); called once plus
+            once per shard
+        k: Neighbours per recipe
+        max_pairs: Pair counts held in memory at once
+
+    Yields:
+        (recipe_id, [(recipe_id, score), ...]) for every saved recipe
+    """
+    popularity = Counter()
+    pairs = Counter()
+    for basket in baskets(stream()):
+        popularity.update(basket)
+        if 1 < len(basket) <= MAX_BASKET_SIZE:
+            for recipe_id in basket:
+                pairs[recipe_id] += len(basket) - 1
+
+    for first, last in _shards(pairs, max_pairs):
+        counts = {}
+        for basket in baskets(stream()):
+            if 1 < len(basket) <= MAX_BASKET_SIZE:
+                for recipe_id in basket:
+                    if first <= recipe_id <= last:
+                        recipe_counts = counts.get(recipe_id)
+                        if recipe_counts is None:
+                            recipe_counts = counts[recipe_id] = Counter()
+                        recipe_counts.update(basket)
+        for recipe_id in sorted(counts):
+            yield recipe_id, _best(_row(recipe_id, counts.pop(recipe_id), popularity), k)
+    # Recipes whose savers saved nothing else
+    for recipe_id in sorted(set(popularity) - set(pairs)):
+        yield recipe_id, []
+
+
+def _popularity(recipe_ids):
+    """Return {recipe_id: number of favorites} for the given recipes."""
+    recipe_ids = list(recipe_ids)
+    popularity = Counter()
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        popularity.update(dict(
+            Favorite.objects.filter(recipe_id__in=recipe_ids[start:start + BATCH_SIZE]).order_by()
+            .values('recipe_id').annotate(count=Count('pk')).values_list('recipe_id', 'count')
+        ))
+    return popularity
+
+
+def _rows(recipe_ids):
+    """
+    Compute the full rows of some recipes from the baskets of their savers.
+
+    Returns:
+        dict: {recipe_id: {other recipe: cosine}}, for every given recipe
+    """
+    recipe_ids = set(recipe_ids)
+    users = sorted(set(Favorite.objects.filter(recipe_id__in=recipe_ids).values_list('user_id', flat=True)))
+    counts = {recipe_id: Counter() for recipe_id in recipe_ids}
+    for start in range(0, len(users), BATCH_SIZE):
+        for basket in baskets(favorite_rows(users[start:start + BATCH_SIZE])):
+            if 1 < len(basket) <= MAX_BASKET_SIZE:
+                for recipe_id in recipe_ids.intersection(basket):
+                    counts[recipe_id].update(basket)
+    popularity = _popularity(set().union(recipe_ids, *counts.values()))
+    return {recipe_id: _row(recipe_id, recipe_counts, popularity) for recipe_id, recipe_counts in counts.items()}
+
+
+def favorites_changed(recipe_ids):
+    """
+    Queue the lists of recipes whose favorites changed.
+
+    Called from the Favorite signal handlers (see recipes/signals.py); the
+    next `update_recommendations` run picks them up.
+
+    Args:
+        recipe_ids: Ids of recipes saved or removed from favorites
+    """
+    PendingRecommendation.objects.bulk_create(
+        [PendingRecommendation(recipe_id=recipe_id) for recipe_id in recipe_ids], ignore_conflicts=True
+    )
+
+
+def _stored_lists(recipe_ids):
+    """Return {recipe_id: [other ids]} as stored for the given recipes."""
+    recipe_ids = list(recipe_ids)
+    stored = {}
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        rows = AlsoSavedRecipe.objects.filter(recipe_id__in=recipe_ids[start:start + BATCH_SIZE]).order_by(
+            'recipe_id', 'rank'
+        )
+        for recipe_id, other_id in rows.values_list('recipe_id', 'other_id'):
+            stored.setdefault(recipe_id, []).append(other_id)
+    return stored
+
+
+def _write_lists(lists):
+    """
+    Store neighbour lists that differ from the stored ones.
+
+    Lists are compared by recipe ids only, so scores that merely drifted
+    are not rewritten.
+
+    Args:
+        lists: {recipe_id: [(other_id, score), ...]}
+
+    Returns:
+        int: Number of lists written
+    """
+    stored = _stored_lists(lists)
+    changed = [
+        recipe_id for recipe_id, neighbours in lists.items()
+        if [other_id for other_id, _ in neighbours] != stored.get(recipe_id, [])
+    ]
+    for start in range(0, len(changed), BATCH_SIZE):
+        batch = changed[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            # Recipes deleted since they were read keep no list
+            existing = set(Recipe.objects.filter(pk__in=batch).values_list('pk', flat=True))
+            AlsoSavedRecipe.objects.filter(recipe_id__in=batch).delete()
+            AlsoSavedRecipe.objects.bulk_create([
+                AlsoSavedRecipe(recipe_id=recipe_id, other_id=other_id, rank=rank, score=score)
+                for recipe_id in batch if recipe_id in existing
+                for rank, (other_id, score) in enumerate(lists[recipe_id])
+            ])
+    return len(changed)
+
+
+def _claim_pending():
+    """Take the queued recipe ids off the queue."""
+    with transaction.atomic():
+        recipe_ids = set(PendingRecommendation.objects.values_list('recipe_id', flat=True))
+        PendingRecommendation.objects.filter(recipe_id__in=recipe_ids).delete()
+    return recipe_ids
+
+
+def rebuild(max_pairs=MAX_PAIRS):
+    """
+    Recompute the list of every recipe from a stream of all favorites.
+
+    Args:
+        max_pairs: Pair counts held in memory at once
+
+    Returns:
+        int: Number of lists that changed
+    """
+    _claim_pending()
+    listed = set(AlsoSavedRecipe.objects.values_list('recipe_id', flat=True).distinct())
+    changed = 0
+    lists = {}
+    for recipe_id, neighbours in neighbour_lists(favorite_rows, max_pairs=max_pairs):
+        listed.discard(recipe_id)
+        lists[recipe_id] = neighbours
+        if len(lists) >= BATCH_SIZE:
+            changed += _write_lists(lists)
+            lists = {}
+    # Recipes nobody saves any more
+    lists.update((recipe_id, []) for recipe_id in listed)
+    return changed + _write_lists(lists)
+
+
+def update():
+    """
+    Recompute the lists affected by the queued favorites.
+
+    Besides the lists of the queued recipes themselves, recomputes those of
+    recipes that listed one of them (its score changed, or it is gone) and
+    of recipes a queued one now scores above the last stored neighbour of.
+
+    Returns:
+        tuple: (recipes processed from the queue, lists that changed)
+    """
+    pending = _claim_pending()
+    if not pending:
+        return 0, 0
+    try:
+        rows = _rows(pending)
+        affected = set(AlsoSavedRecipe.objects.filter(other_id__in=pending).values_list('recipe_id', flat=True))
+        candidates = list(set().union(*rows.values()) - pending)
+        thresholds = {}
+        for start in range(0, len(candidates), BATCH_SIZE):
+            thresholds.update(AlsoSavedRecipe.objects.filter(
+                recipe_id__in=candidates[start:start + BATCH_SIZE], rank=TOP_K - 1
+            ).values_list('recipe_id', 'score'))
+        for row in rows.values():
+            affected.update(other for other, score in row.items() if score > thresholds.get(other, 0.0))
+        rows.update(_rows(affected - pending))
+        changed = _write_lists({recipe_id: _best(row) for recipe_id, row in rows.items()})
+    except BaseException:
+        favorites_changed(pending)  # Put them back for the next run
+        raise
+    return len(pending), changed
+
+
+def recommend_for(user_id, limit=DEFAULT_LIMIT):
+    """
+    Recommend recipes to a user from the stored lists of their favorites.
+
+    Scores of a recipe listed by several favorites add up. The user's own
+    favorites are never recommended.
+
+    Args:
+        user_id: Primary key of the user
+        limit: Number of recommendations
+
+    Returns:
+        list of (recipe_id, score, [ids of the favorites that led to it]),
+        best (then newest) first
+    """
+    saved = list(Favorite.objects.filter(user_id=user_id).order_by('-created_at').values_list('recipe_id', flat=True))
+    if not saved:
+        return []
+    scores = Counter()
+    because = {}
+    rows = AlsoSavedRecipe.objects.filter(recipe_id__in=saved[:MAX_SEED_FAVORITES]).exclude(other_id__in=saved)
+    for recipe_id, other_id, score in rows.values_list('recipe_id', 'other_id', 'score'):
+        scores[other_id] += score
+        because.setdefault(other_id, []).append(recipe_id)
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+    return [(recipe_id, round(score, 6), because[recipe_id]) for recipe_id, score in best]
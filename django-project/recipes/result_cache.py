@@ -0,0 +1,203 @@
+"""
+Per-process cache of search results (ranked recipe ids).
+
+Popular searches ("pasta", "chicken", "vegan dessert") would otherwise re-run
+the full ranking query for every visitor and every page. The home listing
+keeps, per normalized query and filter set, the ranked entries of the result
+(the sort-key values of each matching recipe, ending with its id) and serves
+every page by slicing that list (see pagination.paginate_sorted). The
+highlighted titles and snippets of the recipes shown are kept with them
+(see recipes/highlight.py).
+
+Entries are dropped:
+
+- on any recipe write: `recipes_changed` bumps a global search generation
+  counter in the Django cache (see recipes/signals.py), which every worker
+  reads before using its cache;
+- after RESULT_TTL seconds, for writes that bypass the signals (e.g.
+  QuerySet.update());
+- least recently used first, once the cached entries hold more than
+  MAX_CACHED_IDS recipe ids in total.
+
+Only the first MAX_RESULTS_PER_QUERY results of a search are kept; deeper
+pages of larger results are read from the database as before.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import search
+from . import search_index as memory_search
+
+
+# Seconds a cached result may be used
+RESULT_TTL = 300
+
+# Recipe ids held across all cached results of a process
+MAX_CACHED_IDS = 200000
+
+# Results kept per search; about 80 pages
+MAX_RESULTS_PER_QUERY = 2000
+
+GENERATION_KEY = 'search-results:generation'
+
+
+def normalize_query(query, backend):
+    """
+    Reduce a search string to the form the backend actually searches for.
+
+    Two queries with the same normalized form return the same recipes, so
+    they share a cache entry: case is folded and whitespace collapsed, and
+    stop words are dropped where the backend ignores them.
+
+    Args:
+        query: Search string from user input
+        backend: 'memory', 'postgresql', 'fts5' or None (substring search)
+
+    Returns:
+        str
+    """
+    if backend == 'memory':
+        # Folded, stop words removed and stemmed by the index's own parser
+        return repr(memory_search.parse_query(query))
+    if backend == 'fts5':
+        # unicode61 folds case and diacritics; every word must match, stop words too
+        return search.fts_query(memory_search.fold(query)) or ''
+    if backend == 'postgresql':
+        # The 'english' configuration lower-cases and drops stop words
+        return ' '.join(word for word in query.lower().split() if word not in memory_search.STOP_WORDS)
+    # Substring search (icontains) ignores case; it collapses whitespace itself
+    return ' '.join(query.casefold().split())
+
+
+def current_generation():
+    """Return the global search generation, starting it if the cache lost it."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from the clock, so a counter evicted from the cache never
+        # comes back with a value it had before
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _bump():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        current_generation()
+
+
+def invalidate():
+    """
+    Retire every cached search result, in every worker.
+
+    Runs immediately and again after the surrounding transaction commits,
+    so a search that caches results between the write and the commit cannot
+    keep them.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+class CachedResults:
+    """
+    Ranked entries of one search, best first.
+
+    Attributes:
+        keys: Listing sort keys the entries are ordered by
+            (pagination.RANKED_KEYS or DEFAULT_KEYS)
+        entries: Tuples of the sort-key values, the last being the recipe id
+        complete: False if the search had more than MAX_RESULTS_PER_QUERY
+            results and only the first ones are kept
+        highlights: {recipe_id: highlight.Highlight}, filled in as pages
+            of the results are shown
+    """
+
+    __slots__ = ('keys', 'entries', 'complete', 'highlights', 'expires')
+
+    def __init__(self, keys, entries, complete):
+        self.keys = keys
+        self.entries = entries
+        self.complete = complete
+        self.highlights = {}
+        self.expires = time.monotonic() + RESULT_TTL
+
+    @property
+    def recipe_ids(self):
+        return [entry[-1] for entry in self.entries]
+
+
+class SearchResultCache:
+    """LRU cache of CachedResults with a TTL, bounded by the number of ids held."""
+
+    def __init__(self, max_ids=MAX_CACHED_IDS):
+        self._lock = threading.Lock()
+        self._max_ids = max_ids
+        self._generation = None
+        self._results = OrderedDict()  # key -> CachedResults, least recent first
+        self._size = 0  # ids held
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached results for key, computing and storing them on a miss.
+
+        Args:
+            key: Hashable key of the normalized search and filters
+            compute: Callable returning (keys, entries, complete)
+
+        Returns:
+            CachedResults
+        """
+        generation = current_generation()
+        now = time.monotonic()
+        with self._lock:
+            if generation != self._generation:
+                self._clear(generation)
+            results = self._results.get(key)
+            if results is not None and results.expires > now:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return results
+        results = CachedResults(*compute())
+        # Results read while a write was committing may already be stale
+        fresh = current_generation() == generation
+        with self._lock:
+            self.misses += 1
+            if fresh and generation == self._generation:
+                self._store(key, results)
+        return results
+
+    def _clear(self, generation):
+        self._results.clear()
+        self._size = 0
+        self._generation = generation
+
+    def _store(self, key, results):
+        previous = self._results.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous.entries)
+        if len(results.entries) > self._max_ids:
+            return
+        self._results[key] = results
+        self._size += len(results.entries)
+        while self._size > self._max_ids:
+            _, evicted = self._results.popitem(last=False)
+            self._size -= len(evicted.entries)
+
+    def clear(self):
+        """Drop every entry of this process."""
+        with self._lock:
+            self._clear(self._generation)
+
+
+# The result cache of this process
+result_cache = SearchResultCache()
@@ -0,0 +1,345 @@
+"""
+Full-text search backends for recipes.
+
+PostgreSQL: each recipe keeps a weighted `tsvector` in Recipe.search_document
+
+    - A: title
+    - B: description
+    - C: tag names and step instructions
+
+with a GIN index (created by migration 0013).
+
+SQLite: recipes are mirrored into the FTS5 virtual table `recipes_recipe_fts`
+(columns title, description, tags, steps; created by migration 0014 when the
+SQLite build has FTS5), ranked with weighted bm25 and queried through the
+unmanaged RecipeSearchEntry model.
+
+Either way a search reads only the matching documents instead of scanning
+every recipe, tag and step at query time. Documents are refreshed from
+`recipes_changed` (see recipes/signals.py) and can be rebuilt with
+`manage.py rebuild_search_documents`. Without either backend, search falls
+back to substring matching. search_recipes() picks the backend, including
+the in-process index of recipes/search_index.py when it is enabled.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import search_index as memory_search
+from .models import Recipe, RecipeSearchEntry, Step, Tag
+
+
+FTS_TABLE = RecipeSearchEntry._meta.db_table
+
+# SQLite limits the number of bound parameters per statement
+FTS_BATCH_SIZE = 500
+
+_FTS_INSERT_SQL = f"""
+INSERT INTO {FTS_TABLE}(rowid, title, description, tags, steps)
+SELECT r.id, r.title, r.description,
+    COALESCE((SELECT group_concat(t.name, ' ') FROM {Tag._meta.db_table} t
+              JOIN {Recipe.tags.through._meta.db_table} rt ON rt.tag_id = t.id
+              WHERE rt.recipe_id = r.id), ''),
+    COALESCE((SELECT group_concat(s.instruction_text, ' ') FROM {Step._meta.db_table} s
+              WHERE s.recipe_id = r.id), '')
+FROM {Recipe._meta.db_table} r
+"""
+
+# Whether the FTS5 table exists, per database name
+_fts_tables = {}
+
+
+def backend():
+    """
+    Return the full-text backend of the default database.
+
+    Returns:
+        'postgresql', 'fts5', or None when only substring search is available
+    """
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        name = connection.settings_dict['NAME']
+        if name not in _fts_tables:
+            _fts_tables[name] = FTS_TABLE in connection.introspection.table_names()
+        if _fts_tables[name]:
+            return 'fts5'
+    return None
+
+
+def is_supported():
+    """Whether the default database can store search documents."""
+    return backend() is not None
+
+
+def document_expression():
+    """
+    Expression computing a recipe's weighted search document.
+
+    Tag names and step instructions are aggregated in correlated subqueries,
+    so it can be used in an UPDATE over many recipes at once.
+    """
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    tag_names = (
+        Tag.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(text=StringAgg('name', ' '))
+        .values('text')
+    )
+    step_text = (
+        Step.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(text=StringAgg('instruction_text', ' '))
+        .values('text')
+    )
+    return (
+        SearchVector('title', weight='A')
+        + SearchVector('description', weight='B')
+        + SearchVector(Subquery(tag_names), weight='C')
+        + SearchVector(Subquery(step_text), weight='C')
+    )
+
+
+def _sync_fts(condition, params):
+    """
+    Replace the FTS rows of the recipes selected by an SQL condition.
+
+    Args:
+        condition: SQL condition with an `{id}` placeholder for the recipe id
+        params: Parameters of the condition
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE {condition.format(id="rowid")}', params)
+        cursor.execute(f'{_FTS_INSERT_SQL} WHERE {condition.format(id="r.id")}', params)
+        return cursor.rowcount
+
+
+def update_documents(recipe_ids):
+    """
+    Recompute the search documents of the given recipes.
+
+    Costs one UPDATE on PostgreSQL, and one DELETE plus one INSERT per
+    FTS_BATCH_SIZE recipes on SQLite.
+
+    Args:
+        recipe_ids: Iterable of Recipe primary keys (deleted ones are removed)
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    engine = backend()
+    if engine == 'postgresql':
+        Recipe.objects.filter(pk__in=recipe_ids).update(search_document=document_expression())
+    elif engine == 'fts5':
+        for start in range(0, len(recipe_ids), FTS_BATCH_SIZE):
+            batch = recipe_ids[start:start + FTS_BATCH_SIZE]
+            _sync_fts('{id} IN (%s)' % ', '.join(['%s'] * len(batch)), batch)
+
+
+def update_document_range(start, stop):
+    """
+    Recompute the search documents of recipes with start <= pk < stop.
+
+    Returns:
+        int: Number of recipes updated
+    """
+    engine = backend()
+    if engine == 'postgresql':
+        return Recipe.objects.filter(pk__gte=start, pk__lt=stop).update(search_document=document_expression())
+    if engine == 'fts5':
+        return _sync_fts('{id} >= %s AND {id} < %s', [start, stop])
+    return 0
+
+
+def fts_query(text):
+    """
+    Turn user input into a safe FTS5 query.
+
+    Every word becomes a quoted term (so FTS5 operators in the input are
+    never interpreted) and all terms must match. A word ending in `*`, and
+    always the last word, matches as a prefix, so partial input finds
+    complete words.
+
+    Args:
+        text: Search string from user input
+
+    Returns:
+        str: FTS5 MATCH expression, or None if the input has no words
+    """
+    words = re.findall(r'(\w+)(\*?)', text)
+    if not words:
+        return None
+    terms = [
+        f'"{word}"*' if star or i == len(words) - 1 else f'"{word}"'
+        for i, (word, star) in enumerate(words)
+    ]
+    return ' '.join(terms)
+
+
+def fts_search(query, recipes):
+    """
+    Rank recipes against a query using the FTS5 table.
+
+    Args:
+        query: Search string from user input
+        recipes: QuerySet to filter (typically Recipe.objects.all())
+
+    Returns:
+        QuerySet of matching recipes annotated with `rank` (higher is
+        better), best first and newest first among equal scores
+    """
+    match = fts_query(query)
+    if match is None:
+        return recipes.none()
+    return (
+        recipes
+        .filter(search_entry__document__match=match)
+        .annotate(rank=-F('search_entry__rank'))  # bm25: lower is better
+        .order_by('-rank', '-created_at', '-id')
+    )
+
+
+def snippets(query, recipe_ids, tokens=12):
+    """
+    Return highlighted excerpts of the best-matching column of each recipe.
+
+    Uses the FTS5 snippet() function; only available with the fts5 backend.
+
+    Args:
+        query: Search string from user input
+        recipe_ids: Recipes to build snippets for
+        tokens: Maximum number of words per snippet
+
+    Returns:
+        dict: {recipe_id: safe HTML with matches wrapped in <mark>}
+    """
+    match = fts_query(query)
+    recipe_ids = list(recipe_ids)
+    if match is None or not recipe_ids or backend() != 'fts5':
+        return {}
+    # Control characters as markers, so the text can be escaped before
+    # the markup is added
+    sql = (
+        f"SELECT rowid, snippet({FTS_TABLE}, -1, char(2), char(3), '…', %s) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({', '.join(['%s'] * len(recipe_ids))})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tokens, match] + recipe_ids)
+        rows = cursor.fetchall()
+    return {
+        recipe_id: mark_safe(escape(text).replace('\x02', '<mark>').replace('\x03', '</mark>'))
+        for recipe_id, text in rows
+    }
+
+
+def postgres_search(query, recipes):
+    """
+    Rank recipes against a query using the stored PostgreSQL documents.
+
+    Args:
+        query: Search string from user input
+        recipes: QuerySet to filter (typically Recipe.objects.all())
+
+    Returns:
+        QuerySet of matching recipes annotated with `rank`, best first and
+        newest first among equal scores
+    """
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    search_query = SearchQuery(query)
+    return (
+        recipes
+        .filter(search_document=search_query)  # @@ served by the GIN index
+        .annotate(rank=SearchRank(F('search_document'), search_query))
+        .order_by('-rank', '-created_at', '-id')
+    )
+
+
+def substring_search(query, recipes):
+    """
+    Perform basic full-text-like search using icontains (SQLite-friendly).
+
+    This is slower than PostgreSQL full-text search but works with any database.
+    Searches across recipe title, description, tag names, and step instructions.
+    Tag and step matches are EXISTS subqueries, so recipes with several
+    matching tags or steps are still returned once. Runs of whitespace in
+    the query match a single space, as result_cache.normalize_query assumes.
+
+    Args:
+        query: Search string from user input
+        recipes: QuerySet to filter (typically Recipe.objects.all())
+
+    Returns:
+        QuerySet of Recipe objects matching the query
+    """
+    query = ' '.join(query.split())
+    tag_matches = Tag.objects.filter(recipe=OuterRef('pk'), name__icontains=query)
+    step_matches = Step.objects.filter(recipe=OuterRef('pk'), instruction_text__icontains=query)
+    return recipes.filter(
+        Q(title__icontains=query)
+        | Q(description__icontains=query)
+        | Exists(tag_matches)
+        | Exists(step_matches)
+    )
+
+
+def memory_scores(query, limit=memory_search.MAX_RESULTS):
+    """
+    Score recipes against a query with the in-process index.
+
+    See recipes/search_index.py; used when RECIPE_SEARCH_BACKEND is 'memory'.
+
+    Args:
+        query: Search string from user input
+        limit: Maximum number of matches, or None for every match
+
+    Returns:
+        dict: {recipe_id: score} for the best-scoring matches
+    """
+    memory_search.search_index.ensure_current()
+    return dict(memory_search.search_index.search(query, limit=limit))
+
+
+def search_recipes(query, recipes, limit=memory_search.MAX_RESULTS):
+    """
+    Search recipes by query, using the configured full-text search.
+
+    With RECIPE_SEARCH_BACKEND = 'memory' the in-process index finds the
+    matches (unranked here; the home page orders them by score itself).
+    Otherwise PostgreSQL uses the stored tsvector documents and SQLite builds
+    with FTS5 use the recipes_recipe_fts table; both rank results. Other
+    databases fall back to substring_search.
+
+    Args:
+        query: Search string from user input
+        recipes: QuerySet to filter (typically Recipe.objects.all())
+        limit: Most matches taken from the in-process index, or None for
+            every match; database backends always return every match
+
+    Returns:
+        QuerySet of matching Recipe objects, annotated with `rank` when ranked
+    """
+    if not query:
+        return recipes
+
+    if memory_search.is_enabled():
+        return recipes.filter(pk__in=list(memory_scores(query, limit)))
+
+    engine = backend()
+    if engine == 'postgresql':
+        try:
+            return postgres_search(query, recipes)
+        except ImportError:
+            pass
+    elif engine == 'fts5':
+        return fts_search(query, recipes)
+
+    # Fall back to basic search
+    return substring_search(query, recipes)
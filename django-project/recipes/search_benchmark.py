@@ -0,0 +1,327 @@
+"""
+Search backend benchmark: latency and work per query on a synthetic catalog.
+
+Compares every search backend available on the current database
+
+    fallback     search.substring_search (icontains; any database)
+    postgresql   search.postgres_search (PostgreSQL only)
+    fts5         search.fts_search (SQLite builds with FTS5)
+    memory       the in-process BM25 index (recipes/search_index.py)
+
+on the same seeded catalog (see benchmarks.seed_search_catalog) and the
+same mix of queries. Each backend returns the first listing page of
+results, as the home page would ask for.
+
+For every query the report gives latency percentiles and, from one extra
+untimed run, the work done:
+
+    queries        SQL statements issued
+    rows_scanned   PostgreSQL: rows read by the scan nodes of the plan
+                   (EXPLAIN ANALYZE, including rows removed by filters);
+                   SQLite: rows of the tables the plan walks with a SCAN,
+                   in table or index order (an upper bound when a LIMIT
+                   stops the walk early; index lookups are not counted)
+    full_scans     tables read in full (see query_plans.full_table_scans)
+    vm_steps       SQLite only: virtual machine instructions executed,
+                   in thousands, a proxy for the work done
+
+Results are plain JSON (see run_benchmark) so runs can be stored and
+compared with compare_reports.
+
+Run with `manage.py benchmark_search`.
+"""
+import json
+import platform
+import re
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from . import search
+from .benchmarks import seed_search_catalog
+from .models import Recipe
+from .pagination import PAGE_SIZE
+from .query_plans import full_table_scans
+from .search_index import InvertedIndex
+
+
+# Bump when the report layout changes
+REPORT_FORMAT = 1
+
+# (class, query) pairs replayed against every backend; words come from
+# benchmarks.synthetic_documents, whose vocabulary gets rarer with the number
+QUERY_MIX = [
+    ('single word', 'chicken'),
+    ('single word', 'garlic'),
+    ('single word', 'pasta'),
+    ('multi-word', 'garlic butter'),
+    ('multi-word', 'lemon herb chicken'),
+    ('multi-word', 'spicy tomato soup'),
+    ('tag name', 'Basil'),
+    ('tag name', 'Coconut'),
+    ('rare term', 'word5000'),
+    ('rare term', 'word19000'),
+    ('no hit', 'quinoa'),
+    ('no hit', 'zzyzx pudding'),
+]
+
+# SQLite progress handler granularity, in virtual machine instructions
+VM_STEP_UNIT = 1000
+
+
+def _percentiles(timings):
+    timings = sorted(timings)
+
+    def at(share):
+        return round(timings[min(len(timings) - 1, int(len(timings) * share))], 3)
+
+    return {'p50_ms': round(statistics.median(timings), 3), 'p95_ms': at(0.95), 'p99_ms': at(0.99)}
+
+
+class _DatabaseBackend:
+    """A backend that searches with a QuerySet."""
+
+    def __init__(self, search_recipes, order_by=()):
+        self._search_recipes = search_recipes
+        self._order_by = order_by
+
+    def queryset(self, query):
+        results = self._search_recipes(query, Recipe.objects.all())
+        return results.order_by(*self._order_by) if self._order_by else results
+
+    def page(self, query):
+        return list(self.queryset(query).values_list('pk', flat=True)[:PAGE_SIZE])
+
+    def count(self, query):
+        return self.queryset(query).order_by().count()
+
+
+class _MemoryBackend:
+    """The in-process index, built once from the seeded catalog."""
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self.index.build()
+
+    def queryset(self, query):
+        return None
+
+    def page(self, query):
+        return [recipe_id for recipe_id, _ in self.index.search(query)[:PAGE_SIZE]]
+
+    def count(self, query):
+        # Searches return at most search_index.MAX_RESULTS recipes
+        return len(self.index.search(query))
+
+
+def available_backends():
+    """
+    Return the backends that can run on the default database.
+
+    Returns:
+        dict: {name: backend factory}; factories are called once the
+        catalog is seeded
+    """
+    backends = {
+        # Unranked: newest first, as the listing orders it
+        'fallback': lambda: _DatabaseBackend(search.substring_search, ('-created_at', '-id')),
+    }
+    engine = search.backend()
+    if engine == 'postgresql':
+        backends['postgresql'] = lambda: _DatabaseBackend(search.postgres_search)
+    elif engine == 'fts5':
+        backends['fts5'] = lambda: _DatabaseBackend(search.fts_search)
+    backends['memory'] = _MemoryBackend
+    return backends
+
+
+def _scanned_rows(queryset, table_rows):
+    """Rows read by a query's scans; see the module docstring."""
+    if connection.vendor == 'postgresql':
+        plans = json.loads(queryset.explain(format='json', analyze=True))
+        rows = 0
+        nodes = [plans[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'].endswith('Scan'):
+                rows += (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * node.get('Actual Loops', 1)
+            nodes.extend(node.get('Plans', ()))
+        return rows
+    tables = set(connection.introspection.table_names())
+    scanned = []
+    for line in queryset.explain().splitlines():
+        match = re.search(r'\bSCAN (\S+)(.*)$', line)
+        if match and match.group(1) in tables and 'VIRTUAL TABLE' not in match.group(2):
+            scanned.append(match.group(1))
+    for table in scanned:
+        if table not in table_rows:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                table_rows[table] = cursor.fetchone()[0]
+    return sum(table_rows[table] for table in scanned)
+
+
+def _vm_steps(func):
+    """Run func on SQLite and return the virtual machine instructions it took, in thousands."""
+    steps = 0
+
+    def count():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    connection.ensure_connection()
+    connection.connection.set_progress_handler(count, VM_STEP_UNIT)
+    try:
+        func()
+    finally:
+        connection.connection.set_progress_handler(None, VM_STEP_UNIT)
+    return steps
+
+
+def _work(backend, query, table_rows):
+    """Measure the work of one search, untimed."""
+    with CaptureQueriesContext(connection) as captured:
+        backend.page(query)
+    work = {'queries': len(captured.captured_queries), 'rows_scanned': 0, 'full_scans': [], 'vm_steps': None}
+    queryset = backend.queryset(query)
+    if queryset is not None:
+        page = queryset.values_list('pk', flat=True)[:PAGE_SIZE]
+        work['full_scans'] = sorted(set(full_table_scans(page)))
+        work['rows_scanned'] = _scanned_rows(page, table_rows)
+    if connection.vendor == 'sqlite':
+        work['vm_steps'] = _vm_steps(lambda: backend.page(query))
+    return work
+
+
+def _summary(results):
+    """Combine the per-query results of a backend or query class."""
+    timings = [timing for result in results for timing in result['_timings']]
+    return {
+        **_percentiles(timings),
+        'queries': round(statistics.mean(result['queries'] for result in results), 2),
+        'rows_scanned': round(statistics.mean(result['rows_scanned'] for result in results)),
+    }
+
+
+def benchmark_backend(backend, repeat, table_rows):
+    """
+    Replay QUERY_MIX against one backend.
+
+    Returns:
+        dict with 'summary', 'classes' ({class: summary}) and 'queries'
+    """
+    results = []
+    for query_class, query in QUERY_MIX:
+        backend.page(query)  # Warm caches, as a busy server would have them
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            backend.page(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append({
+            'class': query_class,
+            'query': query,
+            'matches': backend.count(query),
+            **_percentiles(timings),
+            **_work(backend, query, table_rows),
+            '_timings': timings,
+        })
+    classes = {}
+    for result in results:
+        classes.setdefault(result['class'], []).append(result)
+    report = {
+        'summary': _summary(results),
+        'classes': {name: _summary(members) for name, members in classes.items()},
+        'queries': results,
+    }
+    for result in results:
+        del result['_timings']
+    return report
+
+
+def run_benchmark(sizes, repeat=20, seed=0, backends=None, log=None):
+    """
+    Seed catalogs of the given sizes and benchmark every backend on each.
+
+    Each catalog is seeded in a transaction that is rolled back afterwards.
+
+    Args:
+        sizes: Catalog sizes (numbers of recipes)
+        repeat: Timed runs per query
+        seed: Random seed of the catalog
+        backends: Names of the backends to run (default: all available)
+        log: Optional callable receiving progress messages
+
+    Returns:
+        dict: The report, ready for json.dump
+    """
+    log = log or (lambda message: None)
+    factories = available_backends()
+    names = [name for name in (backends or factories) if name in factories]
+    report = {
+        'format': REPORT_FORMAT,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+        },
+        'settings': {'repeat': repeat, 'seed': seed, 'page_size': PAGE_SIZE},
+        'query_mix': [{'class': query_class, 'query': query} for query_class, query in QUERY_MIX],
+        'runs': [],
+    }
+    for size in sizes:
+        with transaction.atomic():
+            log(f'Seeding {size} recipes...')
+            start = time.perf_counter()
+            seed_search_catalog(size, seed=seed)
+            run = {'recipes': size, 'seed_seconds': round(time.perf_counter() - start, 2), 'backends': {}}
+            table_rows = {}
+            for name in names:
+                log(f'  {name}')
+                start = time.perf_counter()
+                backend = factories[name]()
+                setup = time.perf_counter() - start
+                run['backends'][name] = {'setup_seconds': round(setup, 2), **benchmark_backend(backend, repeat, table_rows)}
+            report['runs'].append(run)
+            transaction.set_rollback(True)
+    return report
+
+
+def compare_reports(previous, current):
+    """
+    Compare two reports, run by run, backend by backend and class by class.
+
+    Args:
+        previous: Report of an earlier run (e.g., loaded from JSON)
+        current: Report of this run
+
+    Returns:
+        list of dicts with 'recipes', 'backend', 'class' ('all' for the
+        summary), 'p95_ms' (before, after) and 'ratio' (after / before)
+    """
+    before = {run['recipes']: run['backends'] for run in previous.get('runs', ())}
+    rows = []
+    for run in current['runs']:
+        for name, result in run['backends'].items():
+            old = before.get(run['recipes'], {}).get(name)
+            if old is None:
+                continue
+            pairs = [('all', old['summary'], result['summary'])] + [
+                (query_class, old['classes'][query_class], summary)
+                for query_class, summary in result['classes'].items() if query_class in old['classes']
+            ]
+            for query_class, old_summary, new_summary in pairs:
+                rows.append({
+                    'recipes': run['recipes'],
+                    'backend': name,
+                    'class': query_class,
+                    'p95_ms': (old_summary['p95_ms'], new_summary['p95_ms']),
+                    'ratio': round(new_summary['p95_ms'] / old_summary['p95_ms'], 2) if old_summary['p95_ms'] else None,
+                })
+    return rows
@@ -0,0 +1,763 @@
+"""
+In-process full-text search index with BM25 ranking.
+
+An alternative to the database backends in recipes/search.py, selected with
+settings.RECIPE_SEARCH_BACKEND = 'memory'. Each worker keeps an inverted
+index of every recipe in memory and answers searches without a query; only
+the cards of the matching recipes are read from the database.
+
+Documents: every recipe is indexed as four fields, weighted like the stored
+PostgreSQL document (ts_rank's default weights for A, B and C):
+
+    - title (A, 1.0)
+    - description (B, 0.4)
+    - tag names and step instructions (C, 0.2)
+
+Text is folded (lower case, diacritics removed), split into words, stripped
+of English stop words and stemmed (the plural, -ed/-ing and final -e steps of
+the Porter stemmer, so "tomatoes" finds "tomato" and "baking" finds "bake").
+
+Postings: per term, four parallel arrays
+
+    docs       document numbers, ascending (array 'I')
+    freqs      field-weighted term frequency per document (array 'f')
+    offsets    start of each document's run in `positions` (array 'I')
+    positions  word positions; each field starts at a multiple of FIELD_SPAN,
+               so a phrase never matches across two fields (array 'I')
+
+Document numbers are handed out in insertion order, so indexing appends to
+the arrays. An edited recipe is re-added under a new number and its old
+number is tombstoned; `compact()` drops tombstones once they make up a
+quarter of the index. As in Lucene, document frequencies count tombstoned
+documents until then.
+
+Queries: all words must match. "Quoted words" must appear as a phrase. A word
+ending in `*`, and always the last word, matches as a prefix (as in
+search.fts_query). Matches are scored with BM25 over the weighted term
+frequencies, and only the best MAX_RESULTS are returned.
+
+Lifecycle, as for the tag index (recipes/tag_index.py):
+
+- Writes in this process update the index incrementally through
+  `recipes_changed` (see recipes/signals.py), and every write replaces the
+  'search_index' IndexVersion token so other workers notice and reload.
+- Loading first tries the snapshot file (settings.RECIPE_SEARCH_SNAPSHOT),
+  which is used only if it was saved at the current token; otherwise the
+  index is built from the database and the snapshot is rewritten. Workers
+  load the index at start (see recipeapp/wsgi.py), and
+  `manage.py build_search_index` writes a fresh snapshot ahead of a deploy.
+"""
+import logging
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from heapq import nlargest
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import IndexVersion, Recipe, Step
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'search_index'
+
+# (field, weight) in document order
+FIELDS = (('title', 1.0), ('description', 0.4), ('tags', 0.2), ('steps', 0.2))
+
+# Positions of field N start at N * FIELD_SPAN
+FIELD_SPAN = 1 << 20
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Searches return at most this many (best-scoring) recipes
+MAX_RESULTS = 1000
+
+# compact() runs once this share of document numbers is tombstoned
+COMPACT_RATIO = 0.25
+
+# Recipes read per batch when building from the database
+LOAD_BATCH_SIZE = 1000
+
+# Bump when the snapshot layout changes; older snapshots are ignored
+SNAPSHOT_FORMAT = 1
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from in into is it of on or so than that
+    the then these this to was were will with
+""".split())
+
+_WORD_RE = re.compile(r'\w+')
+_QUERY_RE = re.compile(r'"([^"]*)"?|(\w+)(\*?)')
+_VOWELS = frozenset('aeiou')
+
+
+def is_enabled():
+    """Whether search is configured to use the in-process index."""
+    return getattr(settings, 'RECIPE_SEARCH_BACKEND', 'database') == 'memory'
+
+
+def fold(text):
+    """Lower-case text and strip diacritics ('Crème' -> 'creme')."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+# --- Stemming ---------------------------------------------------------------
+
+def _is_consonant(word, i):
+    if word[i] in _VOWELS:
+        return False
+    if word[i] == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem):
+    """Porter's m: the number of vowel-consonant sequences in stem."""
+    count = 0
+    after_vowel = False
+    for i in range(len(stem)):
+        consonant = _is_consonant(stem, i)
+        if consonant and after_vowel:
+            count += 1
+        after_vowel = not consonant
+    return count
+
+
+def _has_vowel(stem):
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_cvc(stem):
+    """Consonant-vowel-consonant ending, the last not w, x or y ('hop', not 'snow')."""
+    n = len(stem)
+    return (
+        n >= 3 and stem[-1] not in 'wxy'
+        and _is_consonant(stem, n - 1) and not _is_consonant(stem, n - 2) and _is_consonant(stem, n - 3)
+    )
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """
+    Reduce an English word to its stem (Porter steps 1a to 1c and 5a).
+
+    Handles plurals and -ed/-ing forms, which is what recipe searches need
+    ('tomatoes' -> 'tomato', 'chopped' -> 'chop', 'baking' -> 'bake').
+
+    Args:
+        word: Folded word
+
+    Returns:
+        str: The stem; words that are short or not ASCII letters unchanged
+    """
+    if len(word) <= 2 or not (word.isascii() and word.isalpha()):
+        return word
+
+    # Step 1a: plurals
+    if word.endswith('sses') or word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    # Step 1b: -eed, -ed, -ing
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ed', 'ing'):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif len(word) > 1 and word[-1] == word[-2] and word[-1] not in 'lsz' \
+                        and _is_consonant(word, len(word) - 1):
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_cvc(word):
+                    word += 'e'
+                break
+
+    # Step 1c: terminal y after a vowel-bearing stem
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+
+    # Step 5a: final e, unless that leaves a short stem ('bake', 'slice')
+    if word.endswith('e'):
+        measure = _measure(word[:-1])
+        if measure > 1 or (measure == 1 and not _ends_cvc(word[:-1])):
+            word = word[:-1]
+    return word
+
+
+def analyze(text):
+    """
+    Split text into index terms.
+
+    Args:
+        text: Field text or query text
+
+    Returns:
+        list of (position, term) pairs; stop words are dropped but still
+        count towards positions, so phrases keep their spacing
+    """
+    return [
+        (position, stem(word))
+        for position, word in enumerate(_WORD_RE.findall(fold(text)))
+        if word not in STOP_WORDS
+    ]
+
+
+def parse_query(text):
+    """
+    Parse user input into query clauses.
+
+    Args:
+        text: Search string from user input
+
+    Returns:
+        list of clauses, each one of
+            ('term', term)
+            ('prefix', (folded word, stemmed word))
+            ('phrase', [(offset, term), ...])
+    """
+    matches = list(_QUERY_RE.finditer(fold(text)))
+    last_word = max((i for i, match in enumerate(matches) if match.group(2)), default=None)
+    clauses = []
+    for i, match in enumerate(matches):
+        phrase, word, star = match.groups()
+        if phrase is not None:
+            terms = analyze(phrase)
+            if len(terms) > 1:
+                first = terms[0][0]
+                clauses.append(('phrase', [(position - first, term) for position, term in terms]))
+            elif terms:
+                clauses.append(('term', terms[0][1]))
+        elif star or i == last_word:
+            clauses.append(('prefix', (word, stem(word))))
+        elif word not in STOP_WORDS:
+            clauses.append(('term', stem(word)))
+    return clauses
+
+
+# --- Index ------------------------------------------------------------------
+
+class _Postings:
+    """Array-backed posting list of one term."""
+
+    __slots__ = ('docs', 'freqs', 'offsets', 'positions')
+
+    def __init__(self):
+        self.docs = array('I')
+        self.freqs = array('f')
+        self.offsets = array('I')
+        self.positions = array('I')
+
+    def __len__(self):
+        return len(self.docs)
+
+    def append(self, doc, freq, positions):
+        self.docs.append(doc)
+        self.freqs.append(freq)
+        self.offsets.append(len(self.positions))
+        self.positions.extend(positions)
+
+    def find(self, doc):
+        """Return the index of doc in this list, or -1."""
+        i = bisect_left(self.docs, doc)
+        return i if i < len(self.docs) and self.docs[i] == doc else -1
+
+    def positions_at(self, i):
+        end = self.offsets[i + 1] if i + 1 < len(self.offsets) else len(self.positions)
+        return self.positions[self.offsets[i]:end]
+
+
+def _document_terms(fields):
+    """
+    Analyze the fields of one document.
+
+    Returns:
+        tuple: ({term: (weighted frequency, positions)}, weighted length)
+    """
+    terms = {}
+    length = 0.0
+    for number, ((_, weight), text) in enumerate(zip(FIELDS, fields)):
+        base = number * FIELD_SPAN
+        tokens = analyze(text or '')
+        length += weight * len(tokens)
+        for position, term in tokens:
+            if position >= FIELD_SPAN:
+                break  # Only the start of an absurdly long field is indexed
+            entry = terms.get(term)
+            if entry is None:
+                terms[term] = [weight, [base + position]]
+            else:
+                entry[0] += weight
+                entry[1].append(base + position)
+    return terms, length
+
+
+def recipe_documents(recipes=None):
+    """
+    Read the indexed fields of recipes, in primary key order.
+
+    Args:
+        recipes: Recipe QuerySet to read (default: every recipe)
+
+    Yields:
+        (recipe_id, (title, description, tags, steps)) tuples
+    """
+    rows = (Recipe.objects.all() if recipes is None else recipes).order_by('pk').values_list(
+        'pk', 'title', 'description'
+    )
+    RecipeTag = Recipe.tags.through
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:LOAD_BATCH_SIZE])
+        if not batch:
+            return
+        ids = [row[0] for row in batch]
+        tags, steps = {}, {}
+        for recipe_id, name in RecipeTag.objects.filter(recipe_id__in=ids).values_list('recipe_id', 'tag__name'):
+            tags.setdefault(recipe_id, []).append(name)
+        step_rows = Step.objects.filter(recipe_id__in=ids).order_by('recipe_id', 'step_number')
+        for recipe_id, text in step_rows.values_list('recipe_id', 'instruction_text'):
+            steps.setdefault(recipe_id, []).append(text)
+        for recipe_id, title, description in batch:
+            yield recipe_id, (
+                title, description, ' '.join(tags.get(recipe_id, ())), '\n'.join(steps.get(recipe_id, ())),
+            )
+        last = ids[-1]
+
+
+def _current_version():
+    """Return the current IndexVersion token, creating one on first use."""
+    current = IndexVersion.objects.current(INDEX_NAME)
+    if not current:
+        # Snapshots are matched by token; a random one can't match a
+        # snapshot taken of another database
+        _, current = IndexVersion.objects.replace(INDEX_NAME)
+    return current
+
+
+class InvertedIndex:
+    """
+    Per-process inverted index of recipe text, ranked with BM25.
+
+    Can be filled directly with `add` (as the benchmarks do) or kept in step
+    with the database through `ensure_current` and `recipes_changed`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None  # None until loaded, and after a missed write
+        self._clear()
+
+    def _clear(self):
+        self._postings = {}  # term -> _Postings
+        self._vocabulary = []  # sorted terms, for prefix lookups
+        self._vocabulary_stale = False
+        self._doc_recipes = array('I')  # document number -> recipe id
+        self._doc_lengths = array('f')  # document number -> weighted length
+        self._documents = {}  # recipe id -> live document number
+        self._deleted = set()  # tombstoned document numbers
+        self._total_length = 0.0  # of live documents
+
+    def __len__(self):
+        return len(self._documents)
+
+    def stats(self):
+        """
+        Describe the size of the index.
+
+        Returns:
+            dict with 'documents' (live), 'terms', 'postings' (document
+            entries, including tombstones), 'positions' and 'array_bytes'
+            (memory held by the posting and document arrays)
+        """
+        with self._lock:
+            lists = self._postings.values()
+            arrays = [a for p in lists for a in (p.docs, p.freqs, p.offsets, p.positions)]
+            arrays += [self._doc_recipes, self._doc_lengths]
+            return {
+                'documents': len(self._documents),
+                'terms': len(self._postings),
+                'postings': sum(len(p) for p in lists),
+                'positions': sum(len(p.positions) for p in lists),
+                'array_bytes': sum(a.itemsize * len(a) for a in arrays),
+            }
+
+    # --- Writing ---
+
+    def add(self, recipe_id, fields):
+        """
+        Index a recipe, replacing any earlier version of it.
+
+        Args:
+            recipe_id: Recipe primary key
+            fields: (title, description, tags, steps) texts
+        """
+        terms, length = _document_terms(fields)
+        with self._lock:
+            self._remove(recipe_id)
+            doc = len(self._doc_recipes)
+            self._doc_recipes.append(recipe_id)
+            self._doc_lengths.append(length)
+            self._documents[recipe_id] = doc
+            self._total_length += self._doc_lengths[doc]
+            for term, (freq, positions) in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                    self._vocabulary_stale = True
+                postings.append(doc, freq, positions)
+            self._maybe_compact()
+
+    def remove(self, recipe_id):
+        """Drop a recipe from the index (a no-op if it is not indexed)."""
+        with self._lock:
+            self._remove(recipe_id)
+            self._maybe_compact()
+
+    def _remove(self, recipe_id):
+        doc = self._documents.pop(recipe_id, None)
+        if doc is not None:
+            self._deleted.add(doc)
+            self._total_length -= self._doc_lengths[doc]
+
+    def _maybe_compact(self):
+        if len(self._deleted) > COMPACT_RATIO * len(self._doc_recipes):
+            self.compact()
+
+    def compact(self):
+        """Renumber live documents and drop tombstones from every posting list."""
+        with self._lock:
+            if not self._deleted:
+                return
+            renumber = {}
+            doc_recipes, doc_lengths = array('I'), array('f')
+            for doc, recipe_id in enumerate(self._doc_recipes):
+                if doc not in self._deleted:
+                    renumber[doc] = len(doc_recipes)
+                    doc_recipes.append(recipe_id)
+                    doc_lengths.append(self._doc_lengths[doc])
+            postings = {}
+            for term, old in self._postings.items():
+                new = _Postings()
+                for i, doc in enumerate(old.docs):
+                    if doc in renumber:
+                        new.append(renumber[doc], old.freqs[i], old.positions_at(i))
+                if new.docs:
+                    postings[term] = new
+            self._postings = postings
+            self._vocabulary_stale = True
+            self._doc_recipes, self._doc_lengths = doc_recipes, doc_lengths
+            self._documents = {recipe_id: doc for doc, recipe_id in enumerate(doc_recipes)}
+            self._deleted = set()
+
+    # --- Searching ---
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Find the recipes best matching a query.
+
+        Args:
+            query: Search string from user input
+            limit: Maximum number of results, or None for every match
+
+        Returns:
+            list of (recipe_id, score) tuples, best first
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        with self._lock:
+            resolved = [self._resolve(clause) for clause in clauses]
+            if not self._documents or not all(postings for postings, _ in resolved):
+                return []
+            # Cheapest clause first: it bounds the candidates for the others
+            resolved.sort(key=lambda clause: sum(len(postings) for postings in clause[0]))
+            candidates = None
+            for clause in resolved:
+                candidates = self._matching(clause, candidates)
+                if not candidates:
+                    return []
+            if self._deleted:
+                candidates -= self._deleted
+            totals = None
+            for postings, offsets in resolved:
+                scores = self._scores(postings, offsets is None, candidates)
+                totals = scores if totals is None else {doc: s + scores[doc] for doc, s in totals.items()}
+            ranked = zip(totals.values(), totals.keys())
+            best = sorted(ranked, reverse=True) if limit is None else nlargest(limit, ranked)
+            return [(self._doc_recipes[doc], score) for score, doc in best]
+
+    def _resolve(self, clause):
+        """
+        Look up the posting lists of a clause.
+
+        Returns:
+            tuple: (posting lists, phrase offsets or None); any one of the
+            lists must match unless offsets are given, in which case all
+            must, at those relative positions. An empty list matches nothing.
+        """
+        kind, value = clause
+        if kind == 'term':
+            postings = self._postings.get(value)
+            return ([postings] if postings else []), None
+        if kind == 'prefix':
+            terms = set()
+            for prefix in set(value):
+                terms.update(self._expand(prefix))
+            return [self._postings[term] for term in terms], None
+        postings = [self._postings.get(term) for _, term in value]
+        if not all(postings):
+            return [], None
+        return postings, [offset for offset, _ in value]
+
+    def _expand(self, prefix):
+        """Return the indexed terms starting with prefix."""
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_stale = False
+        terms = []
+        i = bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            terms.append(self._vocabulary[i])
+            i += 1
+        return terms
+
+    def _matching(self, clause, candidates):
+        """Return the documents (among candidates, if given) matching a clause."""
+        postings, offsets = clause
+        if offsets is not None:
+            # Documents with every word first, then check the positions
+            for p in sorted(postings, key=len):
+                candidates = self._matching(([p], None), candidates)
+            return {doc for doc in candidates if self._phrase_in(postings, offsets, doc)}
+        if candidates is None:
+            return set(postings[0].docs).union(*(p.docs for p in postings[1:]))
+        if len(candidates) * 16 < sum(len(p) for p in postings):
+            # Few candidates: binary-search them in the long posting lists
+            return {doc for doc in candidates if any(p.find(doc) >= 0 for p in postings)}
+        return candidates.intersection(set().union(*(p.docs for p in postings)))
+
+    @staticmethod
+    def _phrase_in(postings, offsets, doc):
+        """Whether the terms occur in doc at the given relative positions."""
+        starts = None
+        for p, offset in zip(postings, offsets):
+            i = p.find(doc)
+            if i < 0:
+                return False
+            shifted = {position - offset for position in p.positions_at(i)}
+            starts = shifted if starts is None else starts & shifted
+            if not starts:
+                return False
+        return True
+
+    def _scores(self, postings, alternatives, candidates):
+        """
+        Compute the BM25 score of one clause for every candidate document.
+
+        Args:
+            postings: The clause's posting lists
+            alternatives: True if the lists are alternatives (a prefix's
+                expansions; the best one counts), False if all of them count
+            candidates: Set of documents, each matching the clause
+
+        Returns:
+            dict: {doc: score} for every candidate
+        """
+        count = len(self._documents)
+        lengths = self._doc_lengths
+        # BM25 with the length normalisation K1 * (1 - B + B * length / average)
+        # split into a constant and a per-length part
+        constant = K1 * (1 - B)
+        per_length = K1 * B * count / (self._total_length or 1.0)
+        clause_scores = None
+        for p in postings:
+            df = len(p)
+            weight = math.log(1 + (count - df + 0.5) / (df + 0.5)) * (K1 + 1)
+            if len(candidates) * 16 < df:
+                # Few candidates: binary-search them in the long posting list
+                found = ((doc, p.find(doc)) for doc in candidates)
+                pairs = [(doc, p.freqs[i]) for doc, i in found if i >= 0]
+            elif df == len(candidates) and (len(postings) == 1 or not alternatives):
+                # Candidates are a subset of this list, so they are the list
+                pairs = zip(p.docs, p.freqs)
+            else:
+                pairs = [(doc, freq) for doc, freq in zip(p.docs, p.freqs) if doc in candidates]
+            scores = {
+                doc: weight * freq / (freq + constant + per_length * lengths[doc])
+                for doc, freq in pairs
+            }
+            if clause_scores is None:
+                clause_scores = scores
+            elif alternatives:
+                for doc, score in scores.items():
+                    if score > clause_scores.get(doc, 0.0):
+                        clause_scores[doc] = score
+            else:
+                for doc, score in scores.items():
+                    clause_scores[doc] += score
+        return clause_scores
+
+    # --- Keeping in step with the database ---
+
+    def ensure_current(self, snapshot_path=None):
+        """
+        Load the index if it was never loaded or another worker wrote since.
+
+        Args:
+            snapshot_path: Snapshot file to try first and to rewrite after a
+                build (default: settings.RECIPE_SEARCH_SNAPSHOT; '' disables)
+        """
+        if snapshot_path is None:
+            snapshot_path = getattr(settings, 'RECIPE_SEARCH_SNAPSHOT', '')
+        current = _current_version()
+        with self._lock:
+            if current == self._version:
+                return
+            if snapshot_path and self.load_snapshot(snapshot_path, current):
+                return
+            self.build(current)
+            if snapshot_path:
+                self.save_snapshot(snapshot_path)
+
+    def build(self, version=None):
+        """
+        Index every recipe from the database.
+
+        Args:
+            version: IndexVersion token the data was read at (default: the
+                current one)
+        """
+        if version is None:
+            version = _current_version()
+        with self._lock:
+            self._clear()
+            for recipe_id, fields in recipe_documents():
+                self.add(recipe_id, fields)
+            self._version = version
+
+    def recipes_changed(self, recipe_ids):
+        """
+        Apply a write to the index and publish a new version token.
+
+        Must run inside the transaction of the write.
+
+        Args:
+            recipe_ids: Ids of recipes that were created, edited or deleted
+        """
+        old, new = IndexVersion.objects.replace(INDEX_NAME)
+        with self._lock:
+            if self._version is None or self._version != old:
+                # Not loaded, or already behind: reload on next use instead
+                self._version = None
+                return
+            fresh = dict(recipe_documents(Recipe.objects.filter(pk__in=recipe_ids)))
+            for recipe_id in recipe_ids:
+                if recipe_id in fresh:
+                    self.add(recipe_id, fresh[recipe_id])
+                else:
+                    self.remove(recipe_id)
+            self._version = new
+
+    # --- Snapshots ---
+
+    def save_snapshot(self, path):
+        """
+        Write the index to a file, atomically replacing any previous snapshot.
+
+        Args:
+            path: Snapshot file path
+        """
+        with self._lock:
+            self.compact()
+            state = {
+                'format': SNAPSHOT_FORMAT,
+                'version': self._version,
+                'postings': self._postings,
+                'doc_recipes': self._doc_recipes,
+                'doc_lengths': self._doc_lengths,
+            }
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.search-index-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def load_snapshot(self, path, version=None):
+        """
+        Load the index from a snapshot file written by save_snapshot.
+
+        Snapshots are trusted local files written by this application; never
+        point RECIPE_SEARCH_SNAPSHOT at a file others can write.
+
+        Args:
+            path: Snapshot file path
+            version: Only load a snapshot saved at this IndexVersion token
+                (None: load whatever the file holds)
+
+        Returns:
+            bool: Whether the snapshot was loaded
+        """
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as exc:
+            logger.warning('Ignoring unreadable search index snapshot %s: %s', path, exc)
+            return False
+        if not isinstance(state, dict) or state.get('format') != SNAPSHOT_FORMAT:
+            return False
+        if version is not None and state['version'] != version:
+            return False
+        with self._lock:
+            self._clear()
+            self._postings = state['postings']
+            self._vocabulary_stale = True
+            self._doc_recipes = state['doc_recipes']
+            self._doc_lengths = state['doc_lengths']
+            self._documents = {recipe_id: doc for doc, recipe_id in enumerate(self._doc_recipes)}
+            self._total_length = sum(self._doc_lengths)
+            self._version = state['version']
+        return True
+
+
+def warm_up():
+    """
+    Load the index of this process ahead of the first search.
+
+    Called at worker start; does nothing unless the in-process backend is
+    enabled. If the database is unreachable the index loads on first use.
+    """
+    if not is_enabled():
+        return
+    try:
+        search_index.ensure_current()
+    except DatabaseError as exc:
+        logger.warning('Search index not loaded at startup: %s', exc)
+
+
+# The index of this process
+search_index = InvertedIndex()
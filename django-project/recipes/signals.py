@@ -0,0 +1,239 @@
+"""
+Signal handlers that keep derived recipe data in sync with writes.
+
+Every write that can change what a recipe looks like (the recipe row, its
+steps, ingredient rows, its tags, a tag's name or category, the author's
+username) is
+translated into a single `recipes_changed` signal carrying the affected
+recipe ids. Derived data (the RecipeCard read model, the in-process tag
+and ingredient indexes, the search documents, in-process search index and
+typo lexicon, the typeahead completions, the similar-recipes queue, the
+search result and anonymous page caches) listens to that one signal
+instead of to each model signal. Ingredient rows are
+themselves derived from Recipe.ingredients, and are re-parsed when a recipe
+is saved, before the signal is sent.
+
+Handlers run synchronously, inside the same transaction as the write.
+Code that performs many related writes at once (e.g. a recipe plus its tags
+and steps) can wrap them in `deferred_recipe_sync()` so derived data is
+recomputed once at the end instead of after every row.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from . import fuzzy, recommendations, result_cache, search, similar
+from .cache import invalidate_pages
+from .models import Favorite, Ingredient, Recipe, RecipeCard, SimilarRecipe, Step, Tag
+from .pantry import ingredient_index
+from .search_index import search_index
+from .tag_index import tag_index
+from .typeahead import completion_index
+
+
+# Sent with `recipe_ids` (a set of Recipe pks) whenever those recipes changed.
+# Ids of deleted recipes are included; receivers must handle missing rows.
+recipes_changed = Signal()
+
+_state = threading.local()
+
+
+def _pending():
+    """Return the set of ids collected by the active deferral, or None."""
+    return getattr(_state, 'pending', None)
+
+
+def _deleting():
+    """Return the set of recipe ids currently being deleted in this thread."""
+    if not hasattr(_state, 'deleting'):
+        _state.deleting = set()
+    return _state.deleting
+
+
+def notify_recipes_changed(recipe_ids):
+    """
+    Report that the given recipes changed.
+
+    Sends `recipes_changed` immediately, or collects the ids if a
+    `deferred_recipe_sync()` block is active.
+
+    Args:
+        recipe_ids: Iterable of Recipe primary keys
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    pending = _pending()
+    if pending is not None:
+        pending.update(recipe_ids)
+    else:
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+
+
+@contextmanager
+def deferred_recipe_sync():
+    """
+    Collect recipe change notifications and send them once on exit.
+
+    Nested blocks are merged into the outermost one. Use inside a
+    transaction so derived data is committed together with the write.
+    """
+    if _pending() is not None:
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+        recipe_ids = _state.pending
+    finally:
+        _state.pending = None
+    if recipe_ids:
+        recipes_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+
+
+# --- Translate model writes into recipes_changed ---------------------------
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'ingredients' in update_fields:
+        Ingredient.objects.sync([instance.pk])
+    notify_recipes_changed([instance.pk])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Steps and ingredient rows are deleted in the same cascade; don't rebuild a card for them
+    _deleting().add(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    _deleting().discard(instance.pk)
+    notify_recipes_changed([instance.pk])
+
+
+@receiver(post_save, sender=Step)
+@receiver(post_delete, sender=Step)
+def step_changed(sender, instance, **kwargs):
+    if instance.recipe_id not in _deleting():
+        notify_recipes_changed([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    # Rows written by Ingredient.objects.sync() send no signals
+    if instance.recipe_id not in _deleting():
+        notify_recipes_changed([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.recipe_set.clear(): remember the recipes before the rows go
+        instance._cleared_recipe_ids = set(instance.recipe_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            notify_recipes_changed([instance.pk])
+        elif action == 'post_clear':
+            notify_recipes_changed(getattr(instance, '_cleared_recipe_ids', ()))
+        else:
+            notify_recipes_changed(pk_set or ())
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        notify_recipes_changed(instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    instance._tagged_recipe_ids = set(instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    notify_recipes_changed(getattr(instance, '_tagged_recipe_ids', ()))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Cards show the uploader's username; skip saves that can't change it
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    notify_recipes_changed(Recipe.objects.filter(author=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def favorite_changed(sender, instance, created=None, **kwargs):
+    # Favorites rank typeahead completions and drive recommendations; saves
+    # that merely edit the notes change neither
+    if created is False:
+        return
+    # Cascades of a deleted recipe are queued too, so lists naming it are repaired
+    recommendations.favorites_changed([instance.recipe_id])
+    if instance.recipe_id not in _deleting():
+        completion_index.recipes_changed([instance.recipe_id])
+
+
+# --- Derived data -------------------------------------------------------------
+
+@receiver(recipes_changed)
+def refresh_recipe_cards(sender, recipe_ids, **kwargs):
+    RecipeCard.objects.sync(recipe_ids)
+
+
+@receiver(recipes_changed)
+def update_tag_index(sender, recipe_ids, **kwargs):
+    # Reads the cards, so must stay registered after refresh_recipe_cards
+    tag_index.recipes_changed(recipe_ids)
+
+
+@receiver(recipes_changed)
+def update_ingredient_index(sender, recipe_ids, **kwargs):
+    ingredient_index.recipes_changed(recipe_ids)
+
+
+@receiver(recipes_changed)
+def update_search_documents(sender, recipe_ids, **kwargs):
+    search.update_documents(recipe_ids)
+    search_index.recipes_changed(recipe_ids)
+
+
+@receiver(recipes_changed)
+def update_search_terms(sender, recipe_ids, **kwargs):
+    fuzzy.recipes_changed(recipe_ids)
+
+
+@receiver(recipes_changed)
+def update_completions(sender, recipe_ids, **kwargs):
+    completion_index.recipes_changed(recipe_ids)
+
+
+@receiver(recipes_changed)
+def queue_similar_recipes(sender, recipe_ids, **kwargs):
+    similar.recipes_changed(recipe_ids)
+
+
+@receiver(recipes_changed)
+def drop_cached_recipe_pages(sender, recipe_ids, **kwargs):
+    # Detail pages also show the cards of the recipes they list as similar
+    listing = SimilarRecipe.objects.filter(similar_id__in=recipe_ids).values_list('recipe_id', flat=True)
+    invalidate_pages(set(recipe_ids) | set(listing))
+
+
+@receiver(recipes_changed)
+def drop_cached_search_results(sender, recipe_ids, **kwargs):
+    result_cache.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def drop_cached_listing_pages(sender, **kwargs):
+    # The home filter menus list every cuisine and dietary tag
+    invalidate_pages()
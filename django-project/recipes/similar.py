@@ -0,0 +1,536 @@
+"""
+"More like this": similar recipes from precomputed TF-IDF vectors.
+
+Each recipe is described by a sparse vector of weighted features:
+
+    title and step words    stemmed like search terms (search_index.analyze)
+    tags                    'tag:<name>', one feature per tag
+    ingredients             'ing:<canonical name>' (see recipes/ingredients.py)
+
+Feature counts are weighted per source (FIELD_WEIGHTS), then scaled as
+(1 + log tf) * log(N / df), so words every recipe uses ("add", "salt") weigh
+nothing. Only the MAX_FEATURES heaviest features of a recipe are kept and
+the vector is normalized, so the dot product of two vectors is their cosine
+similarity.
+
+The vectors form a sparse matrix held both row-wise (recipe -> features)
+and column-wise (feature -> recipes), as a CSR/CSC pair of arrays would be.
+A recipe's neighbours are one sparse row times the transposed matrix: walk
+the columns of the recipe's features and add up the products.
+
+The TOP_K neighbours of every recipe are stored as SimilarRecipe rows by
+`manage.py update_similar_recipes`, so the detail page reads them with one
+indexed lookup and no scoring. Writes only queue the changed recipes
+(PendingSimilarity); the next run of the command recomputes their lists,
+and the lists of recipes they now enter or leave, instead of every list.
+
+`--rebuild` reads every recipe, recomputes every list and stores the matrix
+(SimilarityFeature: each feature's idf and column; RecipeVector: each
+recipe's row). Incremental runs read only the written recipes, patch their
+rows and columns, and load the stored rows and columns of the lists they
+recompute. Document frequencies drift as the catalog grows, so the rebuild
+is meant to run nightly.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter
+from operator import itemgetter
+
+from django.db import transaction
+
+from .cache import invalidate_pages
+from .models import (
+    Ingredient, PendingSimilarity, Recipe, RecipeCard, RecipeVector, SimilarityFeature, SimilarRecipe, Step,
+)
+from .search_index import analyze, fold
+
+
+# Neighbours stored, and shown, per recipe
+TOP_K = 6
+
+# Multiplier of a feature's count, per source
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 2.0, 'ingredients': 2.0, 'steps': 1.0}
+
+# Heaviest features kept per recipe vector
+MAX_FEATURES = 32
+
+# Features used by more than this share of recipes (and by more than
+# COMMON_FEATURE_FLOOR recipes) are dropped: they say little about a recipe,
+# and their columns are the longest to walk
+MAX_FEATURE_SHARE = 0.05
+COMMON_FEATURE_FLOOR = 100
+
+# Longest column kept; longer ones keep the recipes where the feature weighs
+# most, so finding a recipe's neighbours costs at most
+# MAX_FEATURES * MAX_COLUMN_LENGTH steps however large the catalog
+MAX_COLUMN_LENGTH = 2000
+
+# Recipes read, and lists written, per batch
+BATCH_SIZE = 1000
+
+# Longest feature name stored; longer ones (e.g. runs of letters in a step)
+# weigh nothing
+MAX_FEATURE_LENGTH = 200
+
+
+def recipe_features(recipes=None):
+    """
+    Read the weighted feature counts of recipes, in primary key order.
+
+    Args:
+        recipes: Recipe QuerySet to read (default: every recipe)
+
+    Yields:
+        (recipe_id, Counter of {feature: weighted count}) tuples
+    """
+    rows = (Recipe.objects.all() if recipes is None else recipes).order_by('pk').values_list('pk', 'title')
+    RecipeTag = Recipe.tags.through
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            return
+        ids = [recipe_id for recipe_id, _ in batch]
+        features = {recipe_id: Counter() for recipe_id in ids}
+        for recipe_id, title in batch:
+            for _, term in analyze(title):
+                features[recipe_id][term] += FIELD_WEIGHTS['title']
+        for recipe_id, name in RecipeTag.objects.filter(recipe_id__in=ids).values_list('recipe_id', 'tag__name'):
+            features[recipe_id]['tag:' + fold(name)] += FIELD_WEIGHTS['tags']
+        ingredients = Ingredient.objects.filter(recipe_id__in=ids).exclude(canonical='').order_by()
+        for recipe_id, name in ingredients.values_list('recipe_id', 'canonical').distinct():
+            features[recipe_id]['ing:' + name] += FIELD_WEIGHTS['ingredients']
+        for recipe_id, text in Step.objects.filter(recipe_id__in=ids).order_by().values_list(
+            'recipe_id', 'instruction_text'
+        ):
+            for _, term in analyze(text):
+                features[recipe_id][term] += FIELD_WEIGHTS['steps']
+        yield from features.items()
+        last = ids[-1]
+
+
+class TfidfMatrix:
+    """Sparse, row-normalized TF-IDF matrix of recipes, held row-wise and column-wise."""
+
+    def __init__(self):
+        self._features = {}  # feature -> (feature id, idf), for features that weigh something
+        self._rows = {}  # recipe id -> (array of feature ids, array of weights)
+        self._columns = {}  # feature id -> (array of recipe ids, array of weights)
+
+    @classmethod
+    def load(cls):
+        """Build the matrix from every recipe in the database."""
+        return cls.build(recipe_features())
+
+    @classmethod
+    def build(cls, documents):
+        """
+        Build the matrix from feature counts.
+
+        Args:
+            documents: Iterable of (recipe_id, {feature: weighted count}) pairs
+
+        Returns:
+            TfidfMatrix
+        """
+        documents = list(documents)
+        frequencies = Counter()
+        for _, counts in documents:
+            frequencies.update(counts.keys())
+        total = len(documents)
+        cutoff = max(MAX_FEATURE_SHARE * total, COMMON_FEATURE_FLOOR)
+
+        matrix = cls()
+        for feature, frequency in frequencies.items():
+            if frequency <= cutoff and frequency < total and len(feature) <= MAX_FEATURE_LENGTH:
+                matrix._features[feature] = (len(matrix._features) + 1, math.log(total / frequency))
+        columns = matrix._columns
+        for recipe_id, counts in documents:
+            row = matrix._rows[recipe_id] = matrix.vector(counts)
+            for feature_id, weight in zip(*row):
+                column_recipes, column_weights = columns.setdefault(feature_id, (array('I'), array('f')))
+                column_recipes.append(recipe_id)
+                column_weights.append(weight)
+        for feature_id, (column_recipes, column_weights) in columns.items():
+            if len(column_recipes) > MAX_COLUMN_LENGTH:
+                kept = heapq.nlargest(MAX_COLUMN_LENGTH, zip(column_weights, column_recipes))
+                columns[feature_id] = (array('I', (r for _, r in kept)), array('f', (w for w, _ in kept)))
+        return matrix
+
+    def vector(self, counts):
+        """
+        Weigh a recipe's feature counts into a normalized row of the matrix.
+
+        Only the MAX_FEATURES heaviest features are kept; features the
+        matrix does not know (too common, or unseen when it was built) are
+        left out.
+
+        Args:
+            counts: {feature: weighted count}, as from recipe_features
+
+        Returns:
+            tuple: (array of feature ids, array of weights)
+        """
+        weights = []
+        for feature, count in counts.items():
+            known = self._features.get(feature)
+            if known is not None:
+                weights.append((known[0], (1 + math.log(count)) * known[1]))
+        weights = heapq.nlargest(MAX_FEATURES, weights, key=itemgetter(1))
+        norm = math.sqrt(sum(weight * weight for _, weight in weights))
+        return (
+            array('I', (feature_id for feature_id, _ in weights)),
+            array('f', (weight / norm for _, weight in weights)),
+        )
+
+    def replace_row(self, recipe_id, row):
+        """
+        Replace a recipe's row, keeping the columns in step.
+
+        The columns of the recipe's old and new features must be loaded.
+        A full column keeps its MAX_COLUMN_LENGTH heaviest entries; entries
+        it dropped are not restored when others leave, until the next
+        rebuild.
+
+        Args:
+            recipe_id: Recipe whose row changes
+            row: (array of feature ids, array of weights), or None to remove the recipe
+        """
+        old = self._rows.pop(recipe_id, None)
+        for feature_id in (old[0] if old else ()):
+            column_recipes, column_weights = self._columns[feature_id]
+            if recipe_id in column_recipes:
+                position = column_recipes.index(recipe_id)
+                del column_recipes[position]
+                del column_weights[position]
+        if row is None:
+            return
+        self._rows[recipe_id] = row
+        for feature_id, weight in zip(*row):
+            column_recipes, column_weights = self._columns.setdefault(feature_id, (array('I'), array('f')))
+            if len(column_recipes) < MAX_COLUMN_LENGTH:
+                column_recipes.append(recipe_id)
+                column_weights.append(weight)
+                continue
+            lightest = min(range(len(column_weights)), key=column_weights.__getitem__)
+            if weight > column_weights[lightest]:
+                column_recipes[lightest] = recipe_id
+                column_weights[lightest] = weight
+
+    def save(self):
+        """Store the whole matrix, replacing the stored one."""
+        with transaction.atomic():
+            SimilarityFeature.objects.all().delete()
+            RecipeVector.objects.all().delete()
+            empty = (array('I'), array('f'))
+            features = list(self._features.items())
+            for start in range(0, len(features), BATCH_SIZE):
+                SimilarityFeature.objects.bulk_create([
+                    SimilarityFeature(
+                        pk=feature_id, name=feature, idf=idf,
+                        recipe_ids=self._columns.get(feature_id, empty)[0].tobytes(),
+                        weights=self._columns.get(feature_id, empty)[1].tobytes(),
+                    )
+                    for feature, (feature_id, idf) in features[start:start + BATCH_SIZE]
+                ])
+            self.save_rows(self._rows)
+
+    def load_features(self, names):
+        """Read the ids and weights of stored features, by name."""
+        names = list(names)
+        for start in range(0, len(names), BATCH_SIZE):
+            rows = SimilarityFeature.objects.filter(name__in=names[start:start + BATCH_SIZE])
+            for feature_id, name, idf in rows.values_list('pk', 'name', 'idf'):
+                self._features[name] = (feature_id, idf)
+
+    def load_rows(self, recipe_ids):
+        """Read the stored rows of recipes not loaded yet; recipes without one are skipped."""
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in self._rows]
+        for start in range(0, len(missing), BATCH_SIZE):
+            rows = RecipeVector.objects.filter(recipe_id__in=missing[start:start + BATCH_SIZE])
+            for recipe_id, features, weights in rows.values_list('recipe_id', 'features', 'weights'):
+                self._rows[recipe_id] = (_unpack('I', features), _unpack('f', weights))
+
+    def load_columns(self, feature_ids, lock=False):
+        """
+        Read the stored columns of features not loaded yet.
+
+        Args:
+            feature_ids: Iterable of SimilarityFeature ids
+            lock: Lock the rows until the end of the transaction, to patch them
+        """
+        missing = [feature_id for feature_id in feature_ids if feature_id not in self._columns]
+        for start in range(0, len(missing), BATCH_SIZE):
+            rows = SimilarityFeature.objects.filter(pk__in=missing[start:start + BATCH_SIZE])
+            if lock:
+                rows = rows.select_for_update()
+            for feature_id, recipe_ids, weights in rows.values_list('pk', 'recipe_ids', 'weights'):
+                self._columns[feature_id] = (_unpack('I', recipe_ids), _unpack('f', weights))
+
+    def save_rows(self, recipe_ids):
+        """Store the rows of recipes, removing those of recipes no longer in the matrix."""
+        recipe_ids = list(recipe_ids)
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            batch = recipe_ids[start:start + BATCH_SIZE]
+            RecipeVector.objects.filter(recipe_id__in=batch).delete()
+            RecipeVector.objects.bulk_create([
+                RecipeVector(
+                    recipe_id=recipe_id,
+                    features=self._rows[recipe_id][0].tobytes(),
+                    weights=self._rows[recipe_id][1].tobytes(),
+                )
+                for recipe_id in batch if recipe_id in self._rows
+            ])
+
+    def save_columns(self, feature_ids):
+        """Store the loaded columns of features."""
+        SimilarityFeature.objects.bulk_update([
+            SimilarityFeature(
+                pk=feature_id,
+                recipe_ids=self._columns[feature_id][0].tobytes(),
+                weights=self._columns[feature_id][1].tobytes(),
+            )
+            for feature_id in feature_ids if feature_id in self._columns
+        ], ['recipe_ids', 'weights'], batch_size=BATCH_SIZE)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, recipe_id):
+        return recipe_id in self._rows
+
+    def recipe_ids(self):
+        return self._rows.keys()
+
+    def row(self, recipe_id):
+        """Return a recipe's (array of feature ids, array of weights)."""
+        return self._rows[recipe_id]
+
+    def scores(self, recipe_id):
+        """
+        Return the cosine similarity of a recipe with every recipe sharing a feature.
+
+        Args:
+            recipe_id: Recipe in the matrix
+
+        Returns:
+            dict: {recipe_id: similarity}, including the recipe itself
+        """
+        scores = {}
+        get = scores.get
+        features, weights = self._rows[recipe_id]
+        for feature, weight in zip(features, weights):
+            column_recipes, column_weights = self._columns[feature]
+            for other, other_weight in zip(column_recipes, column_weights):
+                scores[other] = get(other, 0.0) + weight * other_weight
+        return scores
+
+    def neighbours(self, recipe_id, k=TOP_K):
+        """
+        Return the k recipes most similar to one recipe.
+
+        Args:
+            recipe_id: Recipe in the matrix
+            k: Number of neighbours
+
+        Returns:
+            list of (recipe_id, similarity), most similar (then newest) first
+        """
+        scores = self.scores(recipe_id)
+        scores.pop(recipe_id, None)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+        return [(other, round(score, 6)) for other, score in best]
+
+
+def recipes_changed(recipe_ids):
+    """
+    Queue the lists of written recipes for recomputation.
+
+    Called from `recipes_changed` (see recipes/signals.py), inside the
+    transaction of the write; the next `update_similar_recipes` run picks
+    them up.
+
+    Args:
+        recipe_ids: Ids of recipes that were created, edited or deleted
+    """
+    PendingSimilarity.objects.bulk_create(
+        [PendingSimilarity(recipe_id=recipe_id) for recipe_id in recipe_ids], ignore_conflicts=True
+    )
+
+
+def similar_cards(recipe_id):
+    """
+    Return the cards of a recipe's stored neighbours, for render_recipe_cards.
+
+    One indexed lookup; neighbours deleted since the list was computed are
+    skipped.
+
+    Args:
+        recipe_id: Primary key of the recipe shown
+
+    Returns:
+        list of unsaved RecipeCard objects with recipe_id and version set
+    """
+    rows = SimilarRecipe.objects.filter(recipe_id=recipe_id, similar__card__isnull=False).order_by('rank')
+    return [
+        RecipeCard(recipe_id=similar_id, version=version)
+        for similar_id, version in rows.values_list('similar_id', 'similar__card__version')
+    ]
+
+
+def _unpack(typecode, data):
+    """Read a packed array stored in a BinaryField."""
+    values = array(typecode)
+    values.frombytes(bytes(data))
+    return values
+
+
+def _stored_lists(recipe_ids=None):
+    """Return {recipe_id: [similar ids]} as stored, optionally for some recipes only."""
+    rows = SimilarRecipe.objects.order_by('recipe_id', 'rank')
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    stored = {}
+    for recipe_id, similar_id in rows.values_list('recipe_id', 'similar_id').iterator(chunk_size=5000):
+        stored.setdefault(recipe_id, []).append(similar_id)
+    return stored
+
+
+def _write_lists(lists, stored):
+    """
+    Store neighbour lists that differ from the stored ones.
+
+    Lists are compared by recipe ids only, so scores that merely drifted
+    are not rewritten.
+
+    Args:
+        lists: {recipe_id: [(similar_id, similarity), ...]}
+        stored: {recipe_id: [similar ids]} of (at least) the same recipes
+
+    Returns:
+        int: Number of lists written
+    """
+    changed = [
+        recipe_id for recipe_id, neighbours in lists.items()
+        if [similar_id for similar_id, _ in neighbours] != stored.get(recipe_id, [])
+    ]
+    for start in range(0, len(changed), BATCH_SIZE):
+        batch = changed[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            # Recipes deleted since the matrix was loaded keep no list
+            existing = set(Recipe.objects.filter(pk__in=batch).values_list('pk', flat=True))
+            SimilarRecipe.objects.filter(recipe_id__in=batch).delete()
+            SimilarRecipe.objects.bulk_create([
+                SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id, rank=rank, score=score)
+                for recipe_id in batch if recipe_id in existing
+                for rank, (similar_id, score) in enumerate(lists[recipe_id])
+            ])
+            invalidate_pages(batch, listings=False)
+    return len(changed)
+
+
+def _claim_pending():
+    """Take the queued recipe ids off the queue."""
+    with transaction.atomic():
+        recipe_ids = set(PendingSimilarity.objects.values_list('recipe_id', flat=True))
+        PendingSimilarity.objects.filter(recipe_id__in=recipe_ids).delete()
+    return recipe_ids
+
+
+def rebuild(matrix=None):
+    """
+    Recompute the neighbour list of every recipe.
+
+    Also stores the matrix, with fresh document frequencies, for update()
+    to patch.
+
+    Args:
+        matrix: TfidfMatrix of the current catalog (default: loaded from the database)
+
+    Returns:
+        int: Number of lists that changed
+    """
+    _claim_pending()
+    matrix = matrix or TfidfMatrix.load()
+    matrix.save()
+    stored = _stored_lists()
+    lists = {recipe_id: matrix.neighbours(recipe_id) for recipe_id in matrix.recipe_ids()}
+    # Lists of recipes deleted since they were computed
+    SimilarRecipe.objects.filter(recipe_id__in=set(stored) - set(lists)).delete()
+    return _write_lists(lists, stored)
+
+
+def _update_rows(matrix, recipe_ids):
+    """
+    Recompute the stored rows of written recipes and patch the columns they leave or enter.
+
+    Reads the written recipes and the stored rows and columns involved,
+    nothing else. Runs in one transaction, holding the patched columns
+    locked so concurrent runs cannot lose each other's changes.
+    """
+    with transaction.atomic():
+        counts = dict(recipe_features(Recipe.objects.filter(pk__in=recipe_ids)))
+        matrix.load_features({feature for features in counts.values() for feature in features})
+        rows = {recipe_id: matrix.vector(features) for recipe_id, features in counts.items()}
+        matrix.load_rows(recipe_ids)
+        touched = {feature_id for row in rows.values() for feature_id in row[0]}
+        touched.update(
+            feature_id for recipe_id in recipe_ids if recipe_id in matrix for feature_id in matrix.row(recipe_id)[0]
+        )
+        matrix.load_columns(touched, lock=True)
+        for recipe_id in recipe_ids:
+            matrix.replace_row(recipe_id, rows.get(recipe_id))
+        matrix.save_rows(recipe_ids)
+        matrix.save_columns(touched)
+
+
+def update():
+    """
+    Recompute the lists affected by the queued writes.
+
+    Besides the lists of the written recipes themselves, recomputes those
+    of recipes that listed one of them (it may have changed or gone) and of
+    recipes a written one now scores above the last stored neighbour of.
+
+    Only the written recipes are read; the rows and columns of the matrix
+    needed to score the recomputed lists come from the matrix stored by
+    the last rebuild and patched since. Document frequencies stay those of
+    the last rebuild, and features first used since then are left out
+    until the next one. With no stored matrix yet, every list is rebuilt.
+
+    Returns:
+        tuple: (recipes processed from the queue, lists that changed)
+    """
+    pending = _claim_pending()
+    if not pending:
+        return 0, 0
+    try:
+        if not SimilarityFeature.objects.exists():
+            return len(pending), rebuild()
+        matrix = TfidfMatrix()
+        _update_rows(matrix, pending)
+
+        affected = set(SimilarRecipe.objects.filter(similar_id__in=pending).values_list('recipe_id', flat=True))
+        candidates = {}
+        for recipe_id in pending:
+            if recipe_id in matrix:
+                for other, score in matrix.scores(recipe_id).items():
+                    candidates[other] = max(score, candidates.get(other, 0.0))
+        thresholds = {}
+        ids = list(candidates)
+        for start in range(0, len(ids), BATCH_SIZE):
+            thresholds.update(SimilarRecipe.objects.filter(
+                rank=TOP_K - 1, recipe_id__in=ids[start:start + BATCH_SIZE]
+            ).values_list('recipe_id', 'score'))
+        affected.update(other for other, score in candidates.items() if score > thresholds.get(other, 0.0))
+
+        matrix.load_rows(affected)
+        targets = [recipe_id for recipe_id in pending | affected if recipe_id in matrix]
+        matrix.load_columns({feature_id for recipe_id in targets for feature_id in matrix.row(recipe_id)[0]})
+        lists = {recipe_id: matrix.neighbours(recipe_id) for recipe_id in targets}
+        changed = _write_lists(lists, _stored_lists(targets))
+    except BaseException:
+        recipes_changed(pending)  # Put them back for the next run
+        raise
+    return len(pending), changed
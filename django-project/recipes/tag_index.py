@@ -0,0 +1,190 @@
+"""
+In-process tag index for AND-combined tag filters.
+
+Filtering recipes by several tags in SQL needs one join (or one LIKE scan of
+RecipeCard.tag_ids) per selected tag, and gets slower with every checkbox
+ticked. This module keeps, in each worker process, a posting list per tag:
+a bitset (a Python int) with bit N set when recipe N carries the tag.
+Selecting recipes that carry every chosen tag is then a bitwise AND of a few
+integers, and only the ids on the requested page are fetched from the
+database.
+
+The index is loaded from RecipeCard on first use and kept current:
+
+- Writes in this process update it incrementally through `recipes_changed`
+  (see recipes/signals.py).
+- Every write also replaces the 'tag_index' IndexVersion token. Before each
+  use the index compares its token with the database; a mismatch means
+  another worker (or a rolled-back transaction) changed recipes since it was
+  loaded, and the index is reloaded.
+"""
+import threading
+
+from .models import IndexVersion, RecipeCard
+
+
+INDEX_NAME = 'tag_index'
+
+
+def _parse_tag_ids(text):
+    """Parse RecipeCard.tag_ids (',3,7,') into a list of ints."""
+    return [int(tag_id) for tag_id in text.strip(',').split(',')] if text else []
+
+
+def _bitset(ids):
+    """Build a bitset with the bits of the given non-negative ids set."""
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def members(bits):
+    """
+    Return the ids whose bits are set, in ascending order.
+
+    Args:
+        bits: Bitset (int) as returned by TagIndex.intersect
+
+    Returns:
+        list of ints
+    """
+    binary = bin(bits)[:1:-1]  # Least significant bit first, without '0b'
+    ids = []
+    position = binary.find('1')
+    while position != -1:
+        ids.append(position)
+        position = binary.find('1', position + 1)
+    return ids
+
+
+class TagIndex:
+    """
+    Per-process posting lists of recipe ids, keyed by tag id.
+
+    Also keeps each recipe's listing sort key and total time, so a filtered
+    listing can be ordered, time-filtered and paginated without a query.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None  # None until loaded, and after a missed write
+        self._postings = {}  # tag id -> bitset of recipe ids
+        self._recipes = {}  # recipe id -> (created_at, total_time, tag ids)
+
+    def ensure_current(self):
+        """Reload the index if it was never loaded or another worker wrote since."""
+        current = IndexVersion.objects.current(INDEX_NAME)
+        with self._lock:
+            if current != self._version:
+                self._load(current)
+
+    def _load(self, version):
+        ids_by_tag = {}
+        recipes = {}
+        rows = RecipeCard.objects.order_by().values_list('recipe_id', 'tag_ids', 'created_at', 'total_time')
+        for recipe_id, tag_text, created_at, total_time in rows.iterator(chunk_size=2000):
+            tag_ids = _parse_tag_ids(tag_text)
+            recipes[recipe_id] = (created_at, total_time, tag_ids)
+            for tag_id in tag_ids:
+                ids_by_tag.setdefault(tag_id, []).append(recipe_id)
+        self._postings = {tag_id: _bitset(ids) for tag_id, ids in ids_by_tag.items()}
+        self._recipes = recipes
+        self._version = version
+
+    def recipes_changed(self, recipe_ids):
+        """
+        Apply a write to the index and publish a new version token.
+
+        Must run after the RecipeCards of the changed recipes were synced,
+        inside the transaction of the write.
+
+        Args:
+            recipe_ids: Ids of recipes that were created, edited or deleted
+        """
+        old, new = IndexVersion.objects.replace(INDEX_NAME)
+        with self._lock:
+            if self._version is None or self._version != old:
+                # Not loaded, or already behind: reload on next use instead
+                self._version = None
+                return
+            rows = RecipeCard.objects.filter(recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'tag_ids', 'created_at', 'total_time'
+            )
+            fresh = {recipe_id: rest for recipe_id, *rest in rows}
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+                if recipe_id in fresh:
+                    tag_text, created_at, total_time = fresh[recipe_id]
+                    self._add(recipe_id, created_at, total_time, _parse_tag_ids(tag_text))
+            self._version = new
+
+    def _remove(self, recipe_id):
+        entry = self._recipes.pop(recipe_id, None)
+        if entry is None:
+            return
+        mask = ~(1 << recipe_id)
+        for tag_id in entry[2]:
+            remaining = self._postings.get(tag_id, 0) & mask
+            if remaining:
+                self._postings[tag_id] = remaining
+            else:
+                self._postings.pop(tag_id, None)
+
+    def _add(self, recipe_id, created_at, total_time, tag_ids):
+        self._recipes[recipe_id] = (created_at, total_time, tag_ids)
+        bit = 1 << recipe_id
+        for tag_id in tag_ids:
+            self._postings[tag_id] = self._postings.get(tag_id, 0) | bit
+
+    def intersect(self, tag_ids):
+        """
+        Return the bitset of recipes carrying every one of the given tags.
+
+        Args:
+            tag_ids: One or more tag ids
+
+        Returns:
+            int: Bitset of recipe ids (see `members`)
+        """
+        with self._lock:
+            postings = [self._postings.get(tag_id, 0) for tag_id in set(tag_ids)]
+        if not postings:
+            raise ValueError('intersect() needs at least one tag id')
+        # AND costs the size of the smaller operand; start from the shortest
+        postings.sort(key=int.bit_length)
+        result = postings[0]
+        for bits in postings[1:]:
+            if not result:
+                break
+            result &= bits
+        return result
+
+    def matching(self, tag_ids, max_time=None):
+        """
+        Return listing sort keys of recipes carrying all of the given tags.
+
+        Args:
+            tag_ids: One or more tag ids
+            max_time: Optional maximum total time in minutes; recipes without
+                a total time are excluded, as in the SQL filter
+
+        Returns:
+            list of (created_at, recipe_id) tuples, unordered; suitable for
+            recipes.pagination.paginate_entries
+        """
+        with self._lock:
+            bits = self.intersect(tag_ids)
+            recipes = self._recipes
+            entries = []
+            for recipe_id in members(bits):
+                created_at, total_time, _ = recipes[recipe_id]
+                if max_time is None or (total_time is not None and total_time <= max_time):
+                    entries.append((created_at, recipe_id))
+        return entries
+
+
+# The index of this process
+tag_index = TagIndex()
@@ -0,0 +1,267 @@
+"""
+Unit tests for the recipe card projection, the RecipeCard read model and the
+rendered card fragment cache.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes import fuzzy
+from recipes.models import Recipe, RecipeCard, Tag, Step
+
+
+class RecipeCardQuerySetTests(TestCase):
+    """Test cases for Recipe.objects.cards()."""
+
+    def setUp(self):
+        """Set up a recipe with tags and steps."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.greek = Tag.objects.create(name='Greek', category='cuisine')
+        self.vegan = Tag.objects.create(name='vegan', category='dietary')
+        self.recipe = Recipe.objects.create(title='Salad', description='Fresh', author=self.user)
+        self.recipe.tags.add(self.italian, self.greek, self.vegan)
+        for i in range(1, 4):
+            Step.objects.create(recipe=self.recipe, step_number=i, instruction_text=f'Step {i}')
+
+    def test_card_fields_in_one_query(self):
+        """Cuisine, step count and author are all available from one query."""
+        with self.assertNumQueries(1):
+            card = Recipe.objects.cards().get(pk=self.recipe.pk)
+            self.assertEqual(card.cuisine_name, 'Greek')  # first alphabetically
+            self.assertEqual(card.step_count, 3)
+            self.assertEqual(card.author.username, 'testuser')
+
+    def test_recipe_without_tags_or_steps(self):
+        """Recipes with no cuisine or steps get None and 0."""
+        bare = Recipe.objects.create(title='Toast', description='Bread', author=self.user)
+        card = Recipe.objects.cards().get(pk=bare.pk)
+        self.assertIsNone(card.cuisine_name)
+        self.assertEqual(card.step_count, 0)
+
+    def test_heavy_text_columns_are_deferred(self):
+        """Description, ingredients and the search document are not loaded for cards."""
+        card = Recipe.objects.cards().get(pk=self.recipe.pk)
+        self.assertEqual(card.get_deferred_fields(), {'description', 'ingredients', 'search_document'})
+
+    def test_no_fan_out_with_tag_filters(self):
+        """Filtering through tags does not inflate the step count."""
+        card = Recipe.objects.filter(tags=self.vegan).cards().get(pk=self.recipe.pk)
+        self.assertEqual(card.step_count, 3)
+
+
+class HomeQueryCountTests(TestCase):
+    """The home page issues a bounded number of queries."""
+
+    def setUp(self):
+        """Set up a user and tags shared by all recipes."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.vegan = Tag.objects.create(name='vegan', category='dietary')
+
+    def _add_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(title=f'Recipe {i}', description='Test', author=self.user)
+            recipe.tags.add(self.italian, self.vegan)
+            Step.objects.create(recipe=recipe, step_number=1, instruction_text='Cook')
+
+    def _count_home_queries(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'), params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_recipes(self):
+        """Rendering 2 or 20 recipes costs the same number of queries."""
+        self._add_recipes(2)
+        few = self._count_home_queries()
+        self._add_recipes(18)
+        many = self._count_home_queries()
+        self.assertEqual(few, many)
+
+    def test_filtered_query_count_does_not_grow_with_recipes(self):
+        """The same holds with search and filters applied."""
+        params = {'q': 'Recipe', 'cuisine': self.italian.id, 'dietary': [self.vegan.id]}
+        # Enough matches that neither request retries with a typo-corrected query
+        self._add_recipes(fuzzy.MIN_RESULTS)
+        few = self._count_home_queries(params)
+        self._add_recipes(18)
+        many = self._count_home_queries(params)
+        self.assertEqual(few, many)
+
+
+class RecipeCardMaintenanceTests(TestCase):
+    """The RecipeCard table follows every write path."""
+
+    def setUp(self):
+        """Set up a logged-in author and some tags."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.client.login(username='cook', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.mexican = Tag.objects.create(name='Mexican', category='cuisine')
+
+    def test_create_view_writes_card(self):
+        """Creating a recipe through the view creates its card."""
+        self.client.post(reverse('create_recipe'), {
+            'title': 'Carbonara',
+            'description': 'Pasta',
+            'prep_time': 10,
+            'cook_time': 15,
+            'cuisine_type': self.italian.id,
+            'tags_csv': 'quick',
+            'steps_text': 'Boil\nMix',
+        })
+        recipe = Recipe.objects.get(title='Carbonara')
+        card = RecipeCard.objects.get(recipe=recipe)
+        quick = Tag.objects.get(name='quick')
+        self.assertEqual(card.cuisine_name, 'Italian')
+        self.assertEqual(card.total_time, 25)
+        self.assertEqual(card.step_count, 2)
+        self.assertEqual(card.byline, 'From cook')
+        self.assertEqual(card.tag_ids, ',%s,' % ','.join(str(i) for i in sorted([self.italian.id, quick.id])))
+
+    def test_edit_view_updates_card(self):
+        """Editing a recipe through the view rewrites its card."""
+        recipe = Recipe.objects.create(title='Tacos', description='Good', author=self.user)
+        recipe.tags.add(self.italian)
+        self.client.post(reverse('edit_recipe', args=[recipe.pk]), {
+            'title': 'Fish Tacos',
+            'description': 'Better',
+            'recipe_author': 'Rick Bayless',
+            'cuisine_type': self.mexican.id,
+            'steps_text': 'Grill\nFold\nServe',
+        })
+        card = RecipeCard.objects.get(recipe=recipe)
+        self.assertEqual(card.title, 'Fish Tacos')
+        self.assertEqual(card.cuisine_name, 'Mexican')
+        self.assertEqual(card.step_count, 3)
+        self.assertEqual(card.byline, 'By Rick Bayless')
+
+    def test_delete_view_removes_card(self):
+        """Deleting a recipe deletes its card."""
+        recipe = Recipe.objects.create(title='Soup', description='Warm', author=self.user)
+        Step.objects.create(recipe=recipe, step_number=1, instruction_text='Simmer')
+        self.client.post(reverse('delete_recipe', args=[recipe.pk]))
+        self.assertFalse(RecipeCard.objects.filter(recipe_id=recipe.pk).exists())
+
+    def test_tag_rename_updates_cards(self):
+        """Renaming a tag (e.g. in the admin) refreshes the cards using it."""
+        recipe = Recipe.objects.create(title='Pizza', description='Cheesy', author=self.user)
+        recipe.tags.add(self.italian)
+        self.italian.name = 'Neapolitan'
+        self.italian.save()
+        self.assertEqual(RecipeCard.objects.get(recipe=recipe).cuisine_name, 'Neapolitan')
+
+    def test_tag_delete_updates_cards(self):
+        """Deleting a tag removes it from the cards that carried it."""
+        recipe = Recipe.objects.create(title='Pizza', description='Cheesy', author=self.user)
+        recipe.tags.add(self.italian)
+        self.italian.delete()
+        card = RecipeCard.objects.get(recipe=recipe)
+        self.assertEqual(card.cuisine_name, '')
+        self.assertEqual(card.tag_ids, '')
+
+    def test_rebuild_command_recreates_cards(self):
+        """rebuild_recipe_cards restores missing or stale cards."""
+        recipe = Recipe.objects.create(title='Bread', description='Crusty', author=self.user)
+        RecipeCard.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_recipe_cards', stdout=out)
+        self.assertTrue(RecipeCard.objects.filter(recipe=recipe).exists())
+        self.assertIn('Rebuilt 1 recipe card', out.getvalue())
+
+    def test_home_reads_only_the_card_table(self):
+        """Listing and filtering query RecipeCard without joining other tables."""
+        recipe = Recipe.objects.create(title='Nachos', description='Crunchy', author=self.user, prep_time=5)
+        recipe.tags.add(self.mexican)
+        self.client.logout()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'), {'cuisine': self.mexican.id, 'max_time': '15'})
+        self.assertEqual([r.id for r in response.context['recipes']], [recipe.pk])
+        # Facet counts (recipes/facets.py) are aggregates; only the listing reads are checked
+        card_queries = [
+            q['sql'] for q in ctx.captured_queries
+            if 'recipes_recipecard' in q['sql'] and 'COUNT(' not in q['sql']
+        ]
+        self.assertTrue(card_queries)
+        for sql in card_queries:
+            self.assertNotIn('JOIN', sql.upper())
+
+
+class CardFragmentCacheTests(TestCase):
+    """Rendered cards are cached per recipe and content version."""
+
+    def setUp(self):
+        """Start from an empty cache with a few recipes and a logged-in user."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        # Logged-in visitors bypass the full-page cache, so cards are assembled per request
+        self.client.login(username='cook', password='testpass123')
+        self.recipes = [
+            Recipe.objects.create(title=f'Dish {i}', description='Test', author=self.user)
+            for i in range(3)
+        ]
+
+    def test_warm_cache_costs_one_card_query_and_one_cache_read(self):
+        """With every card cached, the page needs only the id list query and a get_many."""
+        self.client.get(reverse('home'))  # warm the cache
+        with CaptureQueriesContext(connection) as ctx, \
+                mock.patch('recipes.cache.render_to_string') as render, \
+                mock.patch('recipes.cache.cache.get_many', wraps=cache.get_many) as get_many:
+            response = self.client.get(reverse('home'))
+        card_queries = [
+            q for q in ctx.captured_queries
+            if 'recipes_recipecard' in q['sql'] and 'COUNT(' not in q['sql']
+        ]
+        self.assertEqual(len(card_queries), 1)
+        self.assertEqual(get_many.call_count, 1)
+        render.assert_not_called()
+        for recipe in self.recipes:
+            self.assertContains(response, recipe.title)
+
+    def test_only_misses_are_rendered(self):
+        """A cold card is rendered while cached cards are reused."""
+        self.client.get(reverse('home'))
+        Recipe.objects.create(title='Fresh Dish', description='New', author=self.user)
+        with mock.patch('recipes.cache.render_to_string', wraps=render_to_string) as render:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(render.call_count, 1)
+        self.assertContains(response, 'Fresh Dish')
+
+    def test_version_changes_with_content(self):
+        """Editing the recipe, its tags or its steps yields a new card version."""
+        recipe = self.recipes[0]
+        versions = [RecipeCard.objects.get(recipe=recipe).version]
+
+        recipe.title = 'Renamed Dish'
+        recipe.save()
+        versions.append(RecipeCard.objects.get(recipe=recipe).version)
+
+        recipe.tags.add(Tag.objects.create(name='Thai', category='cuisine'))
+        versions.append(RecipeCard.objects.get(recipe=recipe).version)
+
+        Step.objects.create(recipe=recipe, step_number=1, instruction_text='Stir')
+        versions.append(RecipeCard.objects.get(recipe=recipe).version)
+
+        self.assertEqual(len(set(versions)), 4)
+
+    def test_edited_card_is_not_served_stale(self):
+        """After an edit the home page shows the new markup."""
+        self.client.get(reverse('home'))
+        recipe = self.recipes[0]
+        recipe.title = 'Renamed Dish'
+        recipe.save()
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Renamed Dish')
+        self.assertNotContains(response, 'Dish 0')
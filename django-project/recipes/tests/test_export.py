@@ -0,0 +1,134 @@
+"""
+Unit tests for the streaming recipe export.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from recipes import exporter, importer, search_index
+from recipes.models import Recipe, Step, Tag
+
+
+class ExportTests(TestCase):
+    """Test cases for exporting recipes as JSON Lines and CSV."""
+
+    def setUp(self):
+        """Create a tagged recipe with steps and two plain ones."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.recipe = Recipe.objects.create(
+            title='Tomato Pasta', description='Quick dinner', author=self.user,
+            ingredients='200g spaghetti\n2 tomatoes', prep_time=5, cook_time=10,
+        )
+        self.recipe.tags.add(self.italian, Tag.objects.create(name='easy'))
+        Step.objects.create(recipe=self.recipe, step_number=2, instruction_text='Add the sauce')
+        Step.objects.create(recipe=self.recipe, step_number=1, instruction_text='Boil, then drain')
+        for title in ('Bread', 'Stew'):
+            Recipe.objects.create(title=title, description='Slow', author=self.user, cook_time=120)
+
+    def _export(self, recipes=None, fmt='jsonl', **kwargs):
+        recipes = exporter.filtered_recipes() if recipes is None else recipes
+        return b''.join(exporter.export(recipes, fmt, **kwargs))
+
+    def test_jsonl(self):
+        """Each line is a recipe with its tags and steps in order."""
+        lines = self._export().decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        record = json.loads(lines[0])
+        self.assertEqual(record['id'], self.recipe.pk)
+        self.assertEqual(record['tags'], ['Italian', 'easy'])
+        self.assertEqual(record['steps'], ['Boil, then drain', 'Add the sauce'])
+        self.assertEqual((record['total_time'], record['author'], record['source_url']), (15, 'cook', None))
+
+    def test_csv(self):
+        """CSV rows hold tags comma-separated and steps one per line."""
+        rows = list(csv.DictReader(io.StringIO(self._export(fmt='csv').decode())))
+        self.assertEqual([row['title'] for row in rows], ['Tomato Pasta', 'Bread', 'Stew'])
+        self.assertEqual(rows[0]['tags'], 'Italian, easy')
+        self.assertEqual(rows[0]['steps'], 'Boil, then drain\nAdd the sauce')
+        self.assertEqual(rows[1]['prep_time'], '')
+
+    def test_gzip(self):
+        """Compressed output decompresses to the plain export."""
+        self.assertEqual(gzip.decompress(self._export(compress=True)), self._export())
+
+    def test_filters(self):
+        """Search and filters select the same recipes as the home page."""
+        ids = lambda **filters: list(exporter.filtered_recipes(**filters).values_list('pk', flat=True))
+        self.assertEqual(ids(query='tomato'), [self.recipe.pk])
+        self.assertEqual(ids(tag_ids=[self.italian.pk]), [self.recipe.pk])
+        self.assertEqual(ids(max_time=30), [self.recipe.pk])
+        self.assertEqual(len(ids()), 3)
+
+    @override_settings(RECIPE_SEARCH_BACKEND='memory', RECIPE_SEARCH_SNAPSHOT='')
+    def test_in_memory_search_is_not_capped(self):
+        """Every match is exported, not only the top MAX_RESULTS the home page ranks."""
+        count = search_index.MAX_RESULTS + 5
+        Recipe.objects.bulk_create([
+            Recipe(title=f'Baked Pasta {n}', description='Dinner', author=self.user) for n in range(count)
+        ])
+        search_index.search_index.build()
+        self.assertEqual(exporter.filtered_recipes(query='baked').count(), count)
+        self.assertEqual(len(self._export(exporter.filtered_recipes(query='baked')).splitlines()), count)
+
+    def test_queries_per_chunk(self):
+        """Tags and steps are fetched once per chunk, not once per recipe."""
+        chunks = exporter.export(exporter.filtered_recipes(), chunk_size=2)
+        with self.assertNumQueries(1 + 2 * 2):  # Recipes, then tags and steps of each of 2 chunks
+            list(chunks)
+
+    def test_export_imports_back(self):
+        """An export can be imported with import_recipes."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'recipes.csv.gz')
+        call_command('export_recipes', '--output', path, stderr=io.StringIO())
+        plain = os.path.join(directory, 'recipes.csv')
+        with gzip.open(path, 'rb') as f, open(plain, 'wb') as out:
+            out.write(f.read())
+        Recipe.objects.all().delete()
+        importer.import_recipes(plain, self.user)
+        recipe = Recipe.objects.get(title='Tomato Pasta')
+        self.assertEqual(list(recipe.steps.values_list('instruction_text', flat=True)),
+                         ['Boil, then drain', 'Add the sauce'])
+        self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['Italian', 'easy'])
+        self.assertEqual(Recipe.objects.count(), 3)
+
+
+class ExportViewTests(TestCase):
+    """Test cases for the export endpoint."""
+
+    def setUp(self):
+        """Create a user and two recipes."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        Recipe.objects.create(title='Tomato Soup', description='Warm', author=self.user)
+        Recipe.objects.create(title='Bread', description='Crusty', author=self.user)
+        self.url = reverse('export_recipes')
+
+    def test_requires_login(self):
+        """Anonymous visitors cannot export."""
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_streams_an_attachment(self):
+        """The export is streamed as a download, filtered like the home page."""
+        self.client.login(username='cook', password='testpass123')
+        response = self.client.get(self.url, {'q': 'soup', 'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="recipes.jsonl.gz"')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Tomato Soup'])
+
+    def test_unknown_format(self):
+        """Only JSON Lines and CSV are offered."""
+        self.client.login(username='cook', password='testpass123')
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 400)
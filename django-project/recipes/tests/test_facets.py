@@ -0,0 +1,77 @@
+"""
+Unit tests for home page facet counts.
+"""
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+
+from recipes.facets import facet_counts
+from recipes.models import Recipe, Tag
+
+
+class FacetCountTests(TestCase):
+    """Facet counts reflect the current search and filters."""
+
+    def setUp(self):
+        """Create a small catalog with cuisines, dietary tags and times."""
+        cache.clear()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.mexican = Tag.objects.create(name='Mexican', category='cuisine')
+        self.vegan = Tag.objects.create(name='vegan', category='dietary')
+        self.gluten_free = Tag.objects.create(name='gluten-free', category='dietary')
+
+        def make(title, tags, prep):
+            recipe = Recipe.objects.create(title=title, description='Test', author=self.user, prep_time=prep)
+            recipe.tags.add(*tags)
+            return recipe
+
+        make('Vegan Pasta', [self.italian, self.vegan], 10)
+        make('GF Vegan Risotto', [self.italian, self.vegan, self.gluten_free], 45)
+        make('Carnitas', [self.mexican, self.gluten_free], 90)
+        make('Vegan Tacos', [self.mexican, self.vegan], 20)
+
+    def test_unfiltered_counts(self):
+        """Without filters, each option counts every recipe it covers."""
+        facets = facet_counts()
+        self.assertEqual(facets['tags'][self.italian.id], 2)
+        self.assertEqual(facets['tags'][self.mexican.id], 2)
+        self.assertEqual(facets['tags'][self.vegan.id], 3)
+        self.assertEqual(facets['tags'][self.gluten_free.id], 2)
+        self.assertEqual(facets['time'], {15: 1, 30: 2, 60: 3, 120: 4})
+        self.assertEqual(facets['total'], 4)
+
+    def test_counts_respect_other_filters(self):
+        """Cuisine counts ignore the chosen cuisine; dietary counts apply it."""
+        facets = facet_counts(cuisine_id=self.italian.id, dietary_ids=[self.vegan.id])
+        # Switching cuisine keeps the vegan filter
+        self.assertEqual(facets['tags'][self.italian.id], 2)
+        self.assertEqual(facets['tags'][self.mexican.id], 1)
+        # Adding gluten-free to Italian + vegan leaves only the risotto
+        self.assertEqual(facets['tags'][self.gluten_free.id], 1)
+        self.assertEqual(facets['time'], {15: 1, 30: 1, 60: 2, 120: 2})
+        self.assertEqual(facets['total'], 2)
+
+    def test_counts_respect_search(self):
+        """Only recipes matching the search are counted."""
+        matching = Recipe.objects.filter(title__icontains='taco').values('pk')
+        facets = facet_counts(matching_ids=matching)
+        self.assertEqual(facets['tags'].get(self.italian.id, 0), 0)
+        self.assertEqual(facets['tags'][self.mexican.id], 1)
+        self.assertEqual(facets['total'], 1)
+
+    def test_two_queries_regardless_of_tag_count(self):
+        """Facets cost two aggregate queries however many tags exist."""
+        for i in range(10):
+            Tag.objects.create(name=f'cuisine-{i}', category='cuisine')
+        with self.assertNumQueries(2):
+            facet_counts(cuisine_id=self.italian.id, dietary_ids=[self.vegan.id], max_time=60)
+
+    def test_home_renders_counts_and_disables_empty_options(self):
+        """The filter UI shows counts and disables options with none."""
+        thai = Tag.objects.create(name='Thai', category='cuisine')
+        response = Client().get(reverse('home'))
+        self.assertContains(response, 'data-value="%d" data-label="Thai" data-count="0"' % thai.id)
+        self.assertContains(response, 'class="select-option disabled"')
+        self.assertEqual(response.context['result_count'], 4)
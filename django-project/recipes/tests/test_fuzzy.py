@@ -0,0 +1,118 @@
+"""
+Unit tests for typo-tolerant search: the lexicon, the trigram index and the
+home page retry with a corrected query.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+
+from recipes import fuzzy
+from recipes.models import IndexVersion, Recipe, SearchTerm, Tag
+
+
+class TrigramTests(SimpleTestCase):
+    """Test cases for word extraction and trigram similarity."""
+
+    def test_trigrams_are_padded_like_pg_trgm(self):
+        """Two spaces in front, one behind."""
+        self.assertEqual(fuzzy.trigrams('cat'), {'  c', ' ca', 'cat', 'at '})
+
+    def test_similarity(self):
+        """Identical words score 1; a typo keeps most trigrams."""
+        self.assertEqual(fuzzy.similarity('pasta', 'pasta'), 1.0)
+        self.assertGreater(fuzzy.similarity('choclate', 'chocolate'), fuzzy.SIMILARITY_THRESHOLD)
+        self.assertLess(fuzzy.similarity('choclate', 'carrot'), fuzzy.SIMILARITY_THRESHOLD)
+
+    def test_words_skip_numbers_short_and_stop_words(self):
+        """Only folded, alphabetic words of three letters or more are kept."""
+        self.assertEqual(fuzzy.words('2 cups of Crème fraîche, 1 egg'), ['cups', 'creme', 'fraiche', 'egg'])
+
+
+class TrigramIndexTests(TestCase):
+    """Test cases for the lexicon and the in-process trigram index."""
+
+    def setUp(self):
+        """Create a recipe and a freshly loaded index."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.recipe = Recipe.objects.create(
+            title='Spaghetti Carbonara', description='Roman', author=self.user, ingredients='Guanciale\nPecorino',
+        )
+        self.recipe.tags.add(Tag.objects.create(name='Italian', category='cuisine'))
+        self.index = fuzzy.TrigramIndex()
+        self.index.ensure_current()
+
+    def test_lexicon_holds_titles_ingredients_and_tags(self):
+        """Writes add the words of titles, ingredients and tag names."""
+        self.assertEqual(
+            set(SearchTerm.objects.values_list('word', flat=True)),
+            {'spaghetti', 'carbonara', 'guanciale', 'pecorino', 'italian'},
+        )
+
+    def test_closest(self):
+        """Misspellings map to the most similar term; unrelated words to None."""
+        self.assertEqual(self.index.closest('carbonnara'), 'carbonara')
+        self.assertEqual(self.index.closest('pecorno'), 'pecorino')
+        self.assertIsNone(self.index.closest('xylophone'))
+
+    def test_new_terms_are_added_without_reloading(self):
+        """Terms written in this process are applied incrementally."""
+        with mock.patch('recipes.fuzzy.term_index', self.index), \
+                mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            Recipe.objects.create(title='Chocolate Cake', description='Rich', author=self.user)
+            self.index.ensure_current()
+        load.assert_not_called()
+        self.assertEqual(self.index.closest('choclate'), 'chocolate')
+
+    def test_write_by_another_worker_triggers_reload(self):
+        """A version token this process did not produce forces a reload."""
+        SearchTerm.objects.create(word='tiramisu')
+        IndexVersion.objects.replace(fuzzy.INDEX_NAME)
+        self.index.ensure_current()
+        self.assertEqual(self.index.closest('tiramisou'), 'tiramisu')
+
+    def test_correct_only_replaces_unknown_words(self):
+        """Known words stay; unknown ones are corrected when a term is close enough."""
+        with mock.patch('recipes.fuzzy.term_index', self.index):
+            self.assertEqual(fuzzy.correct('Spagetti carbonara'), 'spaghetti carbonara')
+            self.assertIsNone(fuzzy.correct('carbonara'))
+            self.assertIsNone(fuzzy.correct('xylophone'))
+
+    def test_rebuild_drops_unused_words(self):
+        """rebuild_search_terms removes the words of deleted recipes."""
+        self.recipe.delete()
+        Recipe.objects.create(title='Tiramisu', description='Sweet', author=self.user)
+        out = StringIO()
+        call_command('rebuild_search_terms', stdout=out)
+        self.assertEqual(list(SearchTerm.objects.values_list('word', flat=True)), ['tiramisu'])
+        self.assertIn('1 term', out.getvalue())
+
+
+class FuzzySearchViewTests(TestCase):
+    """The home page retries searches with few results."""
+
+    def setUp(self):
+        """Create recipes to misspell."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.cake = Recipe.objects.create(title='Chocolate Cake', description='Rich', author=self.user)
+        self.mousse = Recipe.objects.create(title='Chocolate Mousse', description='Airy', author=self.user)
+
+    def test_misspelled_search_shows_corrected_results(self):
+        """A search without results shows the results of the corrected query."""
+        response = self.client.get(reverse('home'), {'q': 'choclate'})
+        self.assertEqual(response.context['corrected_query'], 'chocolate')
+        self.assertEqual({card.pk for card in response.context['recipes']}, {self.cake.pk, self.mousse.pk})
+        self.assertEqual(response.context['result_count'], 2)
+        self.assertContains(response, '(searched instead of "choclate")')
+
+    def test_correct_search_is_left_alone(self):
+        """Exact results are kept when no word needs correcting."""
+        response = self.client.get(reverse('home'), {'q': 'mousse'})
+        self.assertIsNone(response.context['corrected_query'])
+        self.assertEqual([card.pk for card in response.context['recipes']], [self.mousse.pk])
@@ -0,0 +1,149 @@
+"""
+Unit tests for search hit highlighting and result snippets.
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes import highlight
+from recipes.highlight import mark, matcher, snippet
+from recipes.models import Recipe, Step
+
+
+def _matched(query, backend, text):
+    return [text[start:end] for start, end in matcher(query, backend)(text)]
+
+
+class MatcherTests(SimpleTestCase):
+    """Matches follow the rules of the backend that found the recipe."""
+
+    TEXT = 'Bake the Tomatoes; baking tomato sauce with crème'
+
+    def test_stemming_backends(self):
+        """PostgreSQL and the memory index match other forms of a word."""
+        self.assertEqual(_matched('tomato', 'postgresql', self.TEXT), ['Tomatoes', 'tomato'])
+        self.assertEqual(_matched('baked the', 'postgresql', self.TEXT), ['Bake', 'baking'])
+        # The last word of a memory search is also a prefix
+        self.assertEqual(_matched('sau', 'memory', self.TEXT), ['sauce'])
+
+    def test_fts5(self):
+        """FTS5 matches folded words, and the last one as a prefix."""
+        self.assertEqual(_matched('creme', 'fts5', self.TEXT), ['crème'])
+        self.assertEqual(_matched('bake tom', 'fts5', self.TEXT), ['Bake', 'Tomatoes', 'tomato'])
+
+    def test_substring_search(self):
+        """Substring search marks the query text wherever it appears."""
+        self.assertEqual(_matched('TOMATO', None, self.TEXT), ['Tomato', 'tomato'])
+        self.assertEqual(_matched('', None, self.TEXT), [])
+
+
+class SnippetTests(SimpleTestCase):
+    """Test cases for marking and cutting text."""
+
+    def test_mark_escapes_text(self):
+        """Text is escaped before the markup is added."""
+        self.assertEqual(mark('<b>Fish</b> & chips', [(3, 7)]), '&lt;b&gt;<mark>Fish</mark>&lt;/b&gt; &amp; chips')
+
+    def test_snippet_starts_near_the_match(self):
+        """Long texts are cut around the first match, at word boundaries."""
+        text = ' '.join(['filler'] * 40) + ' the pasta ' + ' '.join(['more'] * 40)
+        start = text.index('pasta')
+        cut = snippet(text, [(start, start + 5)])
+        self.assertTrue(cut.startswith('…filler'))
+        self.assertTrue(cut.endswith('more…'))
+        self.assertIn('<mark>pasta</mark>', cut)
+        self.assertLess(len(cut), highlight.SNIPPET_CHARS + 20)
+
+    def test_short_texts_are_kept_whole(self):
+        """Nothing is cut from a text shorter than a snippet."""
+        self.assertEqual(snippet('Quick pasta', [(6, 11)]), 'Quick <mark>pasta</mark>')
+
+
+class HighlightTests(TestCase):
+    """Test cases for building highlights from the database."""
+
+    def setUp(self):
+        """Create a recipe whose description does not mention the query."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.recipe = Recipe.objects.create(title='Weeknight Pasta', description='Quick dinner', author=self.user)
+        Step.objects.create(recipe=self.recipe, step_number=1, instruction_text='Boil the water')
+        Step.objects.create(recipe=self.recipe, step_number=2, instruction_text='Add the pasta and salt')
+
+    def test_snippet_from_steps(self):
+        """Without a match in the description, the first matching step is used."""
+        result = highlight.highlights('pasta', [self.recipe.pk], 'fts5')[self.recipe.pk]
+        self.assertEqual(result.title, 'Weeknight <mark>Pasta</mark>')
+        self.assertEqual(result.snippet, 'Add the <mark>pasta</mark> and salt')
+
+    def test_no_match_shows_the_description(self):
+        """Recipes found through a tag still get the start of their description."""
+        result = highlight.highlights('vegan', [self.recipe.pk], 'fts5')[self.recipe.pk]
+        self.assertEqual((result.title, result.snippet), ('Weeknight Pasta', 'Quick dinner'))
+
+    @mock.patch('recipes.highlight.MAX_TEXT_CHARS', 10)
+    def test_text_read_is_bounded(self):
+        """Only the start of each text is read and searched."""
+        result = highlight.highlights('salt', [self.recipe.pk], 'fts5')[self.recipe.pk]
+        self.assertNotIn('<mark>', result.snippet)
+
+    @mock.patch('recipes.highlight.MAX_STEPS', 1)
+    def test_steps_read_are_bounded(self):
+        """Steps past MAX_STEPS are neither read nor searched."""
+        with CaptureQueriesContext(connection) as captured:
+            texts = highlight._texts([self.recipe.pk])
+        self.assertEqual(texts[self.recipe.pk][2], ['Boil the water'])
+        self.assertIn('"step_number" <= 1', captured.captured_queries[-1]['sql'])
+        result = highlight.highlights('salt', [self.recipe.pk], 'fts5')[self.recipe.pk]
+        self.assertNotIn('<mark>', result.snippet)
+
+    def test_cached_highlights_are_reused(self):
+        """Highlights already built for a search are not built again."""
+        cached = {}
+        highlight.highlights('pasta', [self.recipe.pk], 'fts5', cached)
+        with self.assertNumQueries(0):
+            result = highlight.highlights('pasta', [self.recipe.pk], 'fts5', cached)
+        self.assertEqual(result, cached)
+
+
+class HighlightedSearchViewTests(TestCase):
+    """The home page marks why each search result matched."""
+
+    def setUp(self):
+        """Create recipes with matches in the title and the description."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        Recipe.objects.create(title='Tomato Soup', description='A <rich> soup of roasted tomatoes', author=self.user)
+        Recipe.objects.create(title='Bread', description='Crusty bread', author=self.user)
+
+    def test_full_text_search(self):
+        """Titles and snippets carry <mark> around the matching words."""
+        response = self.client.get(reverse('home'), {'q': 'tomato'})
+        self.assertContains(response, 'class="recipe-card-title"><mark>Tomato</mark> Soup</h3>', html=False)
+        self.assertContains(response, 'A &lt;rich&gt; soup of roasted <mark>tomatoes</mark>', html=False)
+        self.assertNotContains(response, 'Crusty bread')
+
+    def test_substring_search(self):
+        """The fallback search highlights too."""
+        with mock.patch('recipes.search.backend', return_value=None):
+            response = self.client.get(reverse('home'), {'q': 'soup'})
+        self.assertContains(response, 'Tomato <mark>Soup</mark>', html=False)
+        self.assertContains(response, 'A &lt;rich&gt; <mark>soup</mark> of', html=False)
+
+    def test_listing_without_search_is_not_highlighted(self):
+        """Browsing shows the cached cards as they are."""
+        response = self.client.get(reverse('home'))
+        self.assertNotContains(response, '<mark>', html=False)
+        self.assertNotContains(response, 'class="recipe-card-snippet"', html=False)
+
+    def test_highlights_are_cached_with_the_results(self):
+        """Showing the same search again builds no snippets."""
+        self.client.get(reverse('home'), {'q': 'tomato'})
+        with mock.patch('recipes.highlight._texts', wraps=highlight._texts) as texts:
+            self.client.get(reverse('home'), {'q': 'Tomato'})
+        texts.assert_not_called()
@@ -0,0 +1,136 @@
+"""
+Unit tests for the bulk recipe import.
+"""
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+
+from recipes import importer
+from recipes.import_records import parse_record, read_records
+from recipes.models import ImportCheckpoint, Ingredient, Recipe, RecipeCard, Tag
+
+
+def _write(directory, name, text):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+class ImportRecordTests(SimpleTestCase):
+    """Test cases for reading and validating records, without a database."""
+
+    def test_jsonl_record(self):
+        """Lists and texts are both accepted; tags are de-duplicated."""
+        record = parse_record(json.dumps({
+            'title': ' Pancakes ', 'tags': ['breakfast', 'quick', 'breakfast'],
+            'steps': 'Mix\n\nFry', 'ingredients': ['2 eggs', '1 cup flour'], 'prep_time': '5',
+        }), 'jsonl')
+        self.assertEqual(record['title'], 'Pancakes')
+        self.assertEqual(record['tags'], ['breakfast', 'quick'])
+        self.assertEqual(record['steps'], ['Mix', 'Fry'])
+        self.assertEqual(record['ingredients'], '2 eggs\n1 cup flour')
+        self.assertEqual((record['prep_time'], record['cook_time'], record['source_url']), (5, None, None))
+
+    def test_invalid_records(self):
+        """Records the form would reject raise ValueError."""
+        for raw in ('{"title": ""}', '[1]', '{"title": "Soup", "cook_time": -5}', '{"title": "Soup",',
+                    '{"title": "Soup", "source_url": "not a url"}', json.dumps({'title': 'Soup', 'tags': ['x' * 51]})):
+            with self.subTest(raw=raw), self.assertRaises(ValueError):
+                parse_record(raw, 'jsonl')
+
+    def test_csv_line_numbers(self):
+        """CSV cells may span lines; records report the line they start on."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = _write(directory, 'recipes.csv', 'title,steps\nSoup,"Chop\nSimmer"\nBread,Bake\n')
+        records = list(read_records(path, 'csv'))
+        self.assertEqual([line for line, _ in records], [2, 4])
+        self.assertEqual(parse_record(records[0][1], 'csv')['steps'], ['Chop', 'Simmer'])
+
+
+class ImportRecipesTests(TestCase):
+    """Test cases for writing imported recipes and resuming imports."""
+
+    def setUp(self):
+        """Create an uploader, an existing tag and a file of recipes."""
+        self.user = User.objects.create_user(username='importer')
+        self.quick = Tag.objects.create(name='quick')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        lines = [
+            json.dumps({'title': f'Recipe {n}', 'tags': ['quick', f'tag {n % 3}'], 'steps': ['Mix', 'Bake'],
+                        'ingredients': '2 eggs\n1 cup flour', 'prep_time': 10, 'cook_time': n})
+            for n in range(10)
+        ]
+        lines.insert(4, '{"description": "no title"}')
+        self.path = _write(self.directory, 'recipes.jsonl', '\n'.join(lines) + '\n')
+
+    def test_import_writes_recipes_and_derived_data(self):
+        """Recipes get their tags, steps, ingredient rows and cards; invalid records are skipped."""
+        messages = []
+        stats = importer.import_recipes(self.path, self.user, batch_size=4, log=messages.append)
+        self.assertEqual((stats['imported'], stats['skipped']), (10, 1))
+        self.assertIn('Skipped line 5: title is required', messages)
+        recipe = Recipe.objects.get(title='Recipe 7')
+        self.assertEqual(recipe.author, self.user)
+        self.assertEqual(recipe.total_time, 17)
+        self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['quick', 'tag 1'])
+        self.assertEqual(list(recipe.steps.values_list('step_number', 'instruction_text')), [(1, 'Mix'), (2, 'Bake')])
+        self.assertEqual(Ingredient.objects.filter(recipe=recipe).count(), 2)
+        self.assertTrue(RecipeCard.objects.filter(recipe_id=recipe.pk).exists())
+        # Existing tags are reused, new ones created once
+        self.assertEqual(Tag.objects.filter(name='quick').get(), self.quick)
+        self.assertEqual(Tag.objects.count(), 4)
+
+    def test_queries_per_batch_are_fixed(self):
+        """Writing a batch takes the same number of queries however many recipes it holds."""
+        tag_ids = importer.TagIds()
+        records = [
+            parse_record(json.dumps({'title': f'R{n}', 'tags': ['quick'], 'steps': ['Mix'] * 3}), 'jsonl')
+            for n in range(20)
+        ]
+        with CaptureQueriesContext(connection) as small:
+            importer._insert_batch(records[:2], self.user.pk, tag_ids)
+        with self.assertNumQueries(len(small.captured_queries)):
+            importer._insert_batch(records[2:], self.user.pk, tag_ids)
+
+    def test_interrupted_import_resumes(self):
+        """After a failure, running again imports each record exactly once."""
+        original = importer._insert_batch
+        calls = []
+
+        def failing(*args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return original(*args)
+
+        with mock.patch('recipes.importer._insert_batch', side_effect=failing):
+            with self.assertRaises(RuntimeError):
+                importer.import_recipes(self.path, self.user, batch_size=4)
+        self.assertEqual(Recipe.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.get().position, 4)
+
+        stats = importer.import_recipes(self.path, self.user, batch_size=4)
+        self.assertEqual((stats['resumed_from'], stats['imported']), (4, 6))
+        self.assertEqual(sorted(Recipe.objects.values_list('title', flat=True)), sorted(f'Recipe {n}' for n in range(10)))
+        # A finished import has nothing left to do
+        self.assertEqual(importer.import_recipes(self.path, self.user)['imported'], 0)
+
+    def test_command(self):
+        """The command validates records in worker processes and reports throughput."""
+        out = StringIO()
+        call_command('import_recipes', self.path, '--workers', '2', '--author', 'importer', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 10 recipe(s), skipped 1 invalid record(s)', out.getvalue())
+        self.assertIn('records/s', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 10)
@@ -0,0 +1,228 @@
+"""
+Unit tests for ingredient parsing, Ingredient rows, the pantry index and endpoint.
+"""
+import random
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from recipes.ingredients import canonical_name, parse_ingredient, parse_ingredients
+from recipes.models import Ingredient, IndexVersion, Recipe
+from recipes.pantry import INDEX_NAME, IngredientIndex, ingredient_index
+
+
+class ParseIngredientTests(SimpleTestCase):
+    """Test cases for splitting ingredient lines into their parts."""
+
+    def test_quantity_and_unit(self):
+        """Amounts are parsed into a number and a normalized unit."""
+        line = parse_ingredient('2 cups flour, sifted')
+        self.assertEqual(line.amount, '2 cups')
+        self.assertEqual((line.quantity, line.unit), (2.0, 'cup'))
+        self.assertEqual((line.name, line.canonical), ('flour, sifted', 'flour'))
+
+    def test_fractions_ranges_and_attached_units(self):
+        """Fractions, mixed numbers, ranges and '200g' are understood."""
+        self.assertEqual(parse_ingredient('½ tsp salt')[1:3], (0.5, 'tsp'))
+        self.assertEqual(parse_ingredient('1 1/2 cups of milk')[1:], (1.5, 'cup', 'milk', 'milk'))
+        self.assertEqual(parse_ingredient('2-3 cloves garlic')[1:3], (2.0, 'clove'))
+        self.assertEqual(parse_ingredient('200g spaghetti')[1:3], (200.0, 'g'))
+        self.assertEqual(parse_ingredient('1 (14 oz) can tomatoes').amount, '1 (14 oz) can')
+
+    def test_thousands_separators_and_bad_numbers(self):
+        """'1,000 g' is a thousand grams; amounts that are not numbers have no quantity."""
+        self.assertEqual(parse_ingredient('1,000 g flour')[:3], ('1,000 g', 1000.0, 'g'))
+        self.assertEqual(parse_ingredient('2,5 kg potatoes')[1], 2.5)
+        self.assertEqual(parse_ingredient('1/0 cup flour')[:], ('1/0 cup', None, 'cup', 'flour', 'flour'))
+        self.assertEqual(parse_ingredient('1 1/0 cups milk')[1], None)
+
+    def test_lines_without_amount(self):
+        """Counted and unmeasured ingredients have no unit."""
+        self.assertEqual(parse_ingredient('3 Large Eggs')[1:3], (3.0, ''))
+        self.assertEqual(parse_ingredient('Pecorino')[:3], ('', None, ''))
+
+    def test_canonical_names(self):
+        """Case, plurals and descriptive words do not change the canonical name."""
+        self.assertEqual(canonical_name('3 Large Eggs'), 'egg')
+        self.assertEqual(canonical_name('Cherry Tomatoes (halved)'), 'cherry tomato')
+        self.assertEqual(canonical_name('fresh blueberries'), 'blueberry')
+        self.assertEqual(canonical_name('extra virgin olive oil'), 'olive oil')
+        self.assertEqual(canonical_name('Crème fraîche'), 'creme fraiche')
+        self.assertEqual(canonical_name('molasses'), 'molasses')
+
+    def test_headers_and_blank_lines_are_skipped(self):
+        """Only lines naming an ingredient are kept."""
+        lines = parse_ingredients('For the dough:\n\n- 2 cups flour\n* 1 egg\n')
+        self.assertEqual([line.canonical for line in lines], ['flour', 'egg'])
+
+
+class IngredientIndexTests(SimpleTestCase):
+    """Test cases for pantry ranking on the bitset index, without a database."""
+
+    def setUp(self):
+        """Index a few recipes directly."""
+        self.index = IngredientIndex()
+        self.index.build([
+            (1, 'flour'), (1, 'egg'), (1, 'milk'),  # Pancakes
+            (2, 'flour'), (2, 'egg'), (2, 'sugar'), (2, 'butter'),  # Cake
+            (3, 'egg'),  # Boiled egg
+            (4, 'pasta'), (4, 'egg'), (4, 'pecorino'),  # Carbonara
+        ])
+
+    def _ids(self, pantry, missing=0, **kwargs):
+        return [recipe_id for recipe_id, _, _ in self.index.search(pantry, missing, **kwargs).matches]
+
+    def test_complete_matches(self):
+        """Without missing items, only recipes fully covered by the pantry match."""
+        self.assertEqual(self._ids(['egg', 'flour', 'milk']), [1, 3])
+        self.assertEqual(self._ids(['salt']), [])
+
+    def test_missing_at_most_k(self):
+        """Fewest missing first, then most covered, then newest."""
+        results = self.index.search(['egg', 'flour'], max_missing=2)
+        self.assertEqual(results.matches, [(3, 1, 1), (1, 2, 3), (2, 2, 4), (4, 1, 3)])
+        self.assertEqual(results.count, 4)
+
+    def test_paging(self):
+        """Offset and limit cut pages across missing-count tiers."""
+        pages = [self._ids(['egg', 'flour'], 2, limit=1, offset=offset) for offset in range(5)]
+        self.assertEqual(pages, [[3], [1], [2], [4], []])
+        self.assertEqual(self._ids(['egg', 'flour'], 2, limit=2, offset=1), [1, 2])
+
+    def test_updates(self):
+        """Applied writes move recipes between posting lists and sizes."""
+        self.index.apply([3, 5], [(3, 'egg'), (3, 'salt'), (5, 'milk')])
+        self.assertEqual(self._ids(['egg', 'salt', 'milk']), [3, 5])
+        self.index.apply([1, 2, 3, 4], [])
+        self.assertEqual(self._ids(['egg', 'milk', 'flour'], 3), [5])
+        self.assertNotIn('egg', self.index)
+
+    def test_matches_a_scan_of_every_recipe(self):
+        """Bit-sliced counting agrees with checking each recipe in turn."""
+        rng = random.Random(7)
+        vocabulary = [f'item{i}' for i in range(40)]
+        recipes = {recipe_id: set(rng.sample(vocabulary, rng.randint(1, 12))) for recipe_id in range(1, 400)}
+        index = IngredientIndex()
+        index.build((recipe_id, name) for recipe_id, names in recipes.items() for name in names)
+        for _ in range(20):
+            pantry = set(rng.sample(vocabulary, rng.randint(1, 30)))
+            max_missing = rng.randint(0, 3)
+            expected = sorted(
+                (
+                    (len(names - pantry), -len(names & pantry), -recipe_id)
+                    for recipe_id, names in recipes.items()
+                    if names & pantry and len(names - pantry) <= max_missing
+                ),
+            )
+            results = index.search(pantry, max_missing, limit=1000)
+            self.assertEqual(results.count, len(expected))
+            self.assertEqual(
+                results.matches,
+                [(-recipe_id, -have, missing - have) for missing, have, recipe_id in expected],
+            )
+
+
+class IngredientSyncTests(TestCase):
+    """Ingredient rows and the index follow recipe writes."""
+
+    def setUp(self):
+        """Create a recipe and load the index."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.recipe = Recipe.objects.create(
+            title='Pancakes', description='Fluffy', author=self.user,
+            ingredients='2 cups flour\n2 eggs\n1 cup milk',
+        )
+        ingredient_index.ensure_current()
+
+    def test_rows_are_parsed_on_save(self):
+        """Saving a recipe rewrites its rows from the ingredient text."""
+        rows = list(self.recipe.ingredient_items.values_list('amount', 'unit', 'canonical'))
+        self.assertEqual(rows, [('2 cups', 'cup', 'flour'), ('2', '', 'egg'), ('1 cup', 'cup', 'milk')])
+        self.recipe.ingredients = '2 cups flour\n2 eggs\n1 cup oat milk'
+        self.recipe.save()
+        self.assertEqual(self.recipe.ingredient_items.last().canonical, 'oat milk')
+
+    def test_unparseable_amounts_are_saved(self):
+        """A line such as '1/0 cup flour' is stored without a quantity rather than failing the save."""
+        self.recipe.ingredients = '1/0 cup flour\n2 eggs'
+        self.recipe.save()
+        rows = list(self.recipe.ingredient_items.values_list('amount', 'quantity', 'canonical'))
+        self.assertEqual(rows, [('1/0 cup', None, 'flour'), ('2', 2.0, 'egg')])
+
+    def test_unchanged_lists_are_not_rewritten(self):
+        """Saves that leave the ingredient list alone keep the same rows."""
+        before = list(self.recipe.ingredient_items.values_list('pk', flat=True))
+        self.recipe.title = 'Crêpes'
+        self.recipe.save()
+        self.assertEqual(list(self.recipe.ingredient_items.values_list('pk', flat=True)), before)
+
+    def test_index_follows_writes(self):
+        """Edits, rows added directly and deletes reach the index without a reload."""
+        self.assertEqual(ingredient_index.search(['flour', 'egg', 'milk']).count, 1)
+        self.recipe.ingredients = '2 cups flour\n2 eggs'
+        self.recipe.save()
+        Ingredient.objects.create(recipe=self.recipe, name='Sugar', amount='1 cup')
+        self.assertEqual(ingredient_index._version, IndexVersion.objects.current(INDEX_NAME))
+        self.assertEqual(ingredient_index.search(['flour', 'egg', 'sugar']).matches, [(self.recipe.pk, 3, 3)])
+        self.recipe.delete()
+        self.assertEqual(ingredient_index.search(['flour', 'egg', 'sugar']).count, 0)
+
+    def test_rows_created_directly_are_parsed(self):
+        """Quantity, unit and canonical name are filled in from name and amount."""
+        ingredient = Ingredient.objects.create(recipe=self.recipe, name='Brown Sugar', amount='1/2 cup')
+        self.assertEqual((ingredient.quantity, ingredient.unit, ingredient.canonical), (0.5, 'cup', 'brown sugar'))
+        self.assertEqual(str(ingredient), '1/2 cup Brown Sugar')
+
+
+class PantrySearchViewTests(TestCase):
+    """Test cases for the pantry JSON endpoint."""
+
+    def setUp(self):
+        """Create recipes needing more or fewer ingredients."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.pancakes = Recipe.objects.create(
+            title='Pancakes', description='Fluffy', author=self.user,
+            ingredients='2 cups flour\n2 eggs\n1 cup milk',
+        )
+        self.cake = Recipe.objects.create(
+            title='Cake', description='Sweet', author=self.user,
+            ingredients='2 cups flour\n3 eggs\n1 cup sugar\n100g butter',
+        )
+
+    def _get(self, **params):
+        response = self.client.get(reverse('pantry_search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_complete_matches(self):
+        """Pantry items are normalized like ingredient lines."""
+        data = self._get(have='Eggs, Flour,whole milk')
+        self.assertEqual(data['pantry'], ['egg', 'flour', 'milk'])
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'], [{
+            'id': self.pancakes.pk,
+            'title': 'Pancakes',
+            'url': reverse('recipe_detail', args=[self.pancakes.pk]),
+            'have': 3,
+            'total': 3,
+            'coverage': 1.0,
+            'missing': [],
+        }])
+
+    def test_missing_items(self):
+        """Recipes needing a few more items list what to buy."""
+        data = self._get(have=['egg', 'flour', 'sugar', 'saffron'], missing='1')
+        self.assertEqual([result['title'] for result in data['results']], ['Cake', 'Pancakes'])
+        self.assertEqual([result['missing'] for result in data['results']], [['butter'], ['milk']])
+        self.assertEqual(data['results'][0]['coverage'], 0.75)
+        self.assertEqual(data['unknown'], ['saffron'])
+
+    def test_limits(self):
+        """Invalid or excessive parameters are clamped, oversized pantries refused."""
+        data = self._get(have='egg,flour', missing='99', limit='1')
+        self.assertEqual((data['count'], len(data['results'])), (2, 1))
+        self.assertEqual(self._get(missing='x')['results'], [])
+        response = self.client.get(reverse('pantry_search'), {'have': ','.join(['egg'] * 1001)})
+        self.assertEqual(response.status_code, 400)
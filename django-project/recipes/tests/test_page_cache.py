@@ -0,0 +1,134 @@
+"""
+Unit tests for the anonymous full-page cache on home and recipe detail.
+"""
+import warnings
+
+from django.test import TestCase, Client, RequestFactory
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.urls import reverse
+
+from recipes.cache import canonical_query_string, page_cache_stats
+from recipes.models import Recipe, Tag, Step
+
+
+class CanonicalQueryStringTests(TestCase):
+    """Equivalent filter URLs share a cache key."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _canonical(self, query):
+        return canonical_query_string(self.factory.get('/?' + query).GET)
+
+    def test_dietary_order_and_empty_params_are_ignored(self):
+        """Sorted dietary values, dropped empty params."""
+        self.assertEqual(
+            self._canonical('dietary=12&q=&dietary=3&cuisine='),
+            self._canonical('dietary=3&dietary=12'),
+        )
+
+    def test_parameter_order_is_ignored(self):
+        """Keys are sorted."""
+        self.assertEqual(self._canonical('q=pasta&max_time=30'), self._canonical('max_time=30&q=pasta'))
+
+    def test_different_filters_differ(self):
+        """Distinct filters keep distinct keys."""
+        self.assertNotEqual(self._canonical('q=pasta'), self._canonical('q=pizza'))
+
+
+class AnonymousPageCacheTests(TestCase):
+    """Anonymous home and detail pages are cached and invalidated by writes."""
+
+    def setUp(self):
+        """Start with an empty cache and one recipe."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.recipe = Recipe.objects.create(title='Lasagna', description='Layers', author=self.user)
+
+    def test_second_anonymous_request_is_a_hit(self):
+        """A repeated anonymous request skips the database entirely."""
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Lasagna')
+        self.assertEqual(page_cache_stats()['home'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_equivalent_urls_share_an_entry(self):
+        """Reordered dietary filters and empty params hit the same entry."""
+        vegan = Tag.objects.create(name='vegan', category='dietary')
+        nut_free = Tag.objects.create(name='nut-free', category='dietary')
+        self.client.get(reverse('home') + f'?dietary={vegan.id}&dietary={nut_free.id}&q=')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('home') + f'?dietary={nut_free.id}&dietary={vegan.id}')
+
+    def test_repeated_dietary_filters_render_like_the_shared_entry(self):
+        """URLs sharing an entry count repeated and empty dietary values alike."""
+        vegan = Tag.objects.create(name='vegan', category='dietary')
+        counts = []
+        for query in (f'?dietary={vegan.id}', f'?dietary={vegan.id}&dietary={vegan.id}&dietary='):
+            cache.clear()
+            counts.append(self.client.get(reverse('home') + query).context['active_filter_count'])
+        self.assertEqual(counts, [1, 1])
+
+    def test_long_query_strings_fit_cache_key_limits(self):
+        """Keys stay short however long the query string is, and still hit."""
+        url = reverse('home') + '?q=' + 'lasagna ' * 300
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_recipe_change_invalidates_home_and_detail(self):
+        """Editing a recipe drops both the listing and its detail page."""
+        detail_url = reverse('recipe_detail', args=[self.recipe.pk])
+        self.client.get(reverse('home'))
+        self.client.get(detail_url)
+
+        self.recipe.title = 'Vegetable Lasagna'
+        self.recipe.save()
+
+        self.assertContains(self.client.get(reverse('home')), 'Vegetable Lasagna')
+        self.assertContains(self.client.get(detail_url), 'Vegetable Lasagna')
+
+    def test_step_change_invalidates_detail(self):
+        """Adding a step shows up on the cached detail page."""
+        detail_url = reverse('recipe_detail', args=[self.recipe.pk])
+        self.client.get(detail_url)
+        Step.objects.create(recipe=self.recipe, step_number=1, instruction_text='Layer the pasta')
+        self.assertContains(self.client.get(detail_url), 'Layer the pasta')
+
+    def test_other_detail_pages_stay_cached(self):
+        """Changing one recipe leaves other recipes' detail pages cached."""
+        other = Recipe.objects.create(title='Risotto', description='Creamy', author=self.user)
+        other_url = reverse('recipe_detail', args=[other.pk])
+        self.client.get(other_url)
+        self.recipe.title = 'Vegetable Lasagna'
+        self.recipe.save()
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+
+    def test_new_tag_invalidates_home(self):
+        """A new tag appears in the home filter menu straight away."""
+        self.client.get(reverse('home'))
+        Tag.objects.create(name='Ethiopian', category='cuisine')
+        self.assertContains(self.client.get(reverse('home')), 'Ethiopian')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        """Authenticated pages are always rendered fresh."""
+        self.client.login(username='cook', password='testpass123')
+        self.client.get(reverse('home'))
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'cook')
+        self.assertEqual(page_cache_stats()['home']['hits'], 0)
+
+    def test_stats_endpoint(self):
+        """Counters are exposed as JSON."""
+        self.client.get(reverse('recipe_detail', args=[self.recipe.pk]))
+        self.client.get(reverse('recipe_detail', args=[self.recipe.pk]))
+        data = self.client.get(reverse('page_cache_stats')).json()
+        self.assertEqual(data['recipe'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
@@ -0,0 +1,181 @@
+"""
+Unit tests for keyset (cursor) pagination of the home listing.
+"""
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from recipes.models import Recipe, Tag
+from recipes.pagination import (
+    RANKED_KEYS, InvalidCursor, decode_cursor, encode_cursor, paginate, paginate_entries, paginate_sorted,
+)
+
+
+class KeysetPaginateTests(TestCase):
+    """Test cases for the paginate() helper."""
+
+    def setUp(self):
+        """Create recipes, several sharing the same created_at timestamp."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.recipes = [
+            Recipe.objects.create(title=f'Recipe {i}', description='Test', author=self.user)
+            for i in range(7)
+        ]
+        # Force a tie on created_at so the id tie-breaker matters
+        Recipe.objects.filter(pk__in=[r.pk for r in self.recipes[2:5]]).update(created_at=timezone.now())
+
+    def _expected_order(self):
+        return list(Recipe.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_walks_every_row_exactly_once(self):
+        """Following next cursors visits each recipe once, in listing order."""
+        seen = []
+        cursor = None
+        while True:
+            page = paginate(Recipe.objects.all(), cursor=cursor, page_size=3)
+            seen.extend(r.pk for r in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self._expected_order())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """A prev cursor from page two leads back to exactly page one."""
+        first = paginate(Recipe.objects.all(), page_size=3)
+        second = paginate(Recipe.objects.all(), cursor=first.next_cursor, page_size=3)
+        back = paginate(Recipe.objects.all(), cursor=second.prev_cursor, page_size=3)
+
+        self.assertFalse(first.has_previous)
+        self.assertTrue(second.has_previous)
+        self.assertEqual([r.pk for r in back.items], [r.pk for r in first.items])
+        self.assertFalse(back.has_previous)
+
+    def test_deep_pages_do_not_use_offset(self):
+        """Later pages seek by key instead of skipping rows with OFFSET."""
+        first = paginate(Recipe.objects.all(), page_size=2)
+        with CaptureQueriesContext(connection) as ctx:
+            paginate(Recipe.objects.all(), cursor=first.next_cursor, page_size=2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('OFFSET', ctx.captured_queries[0]['sql'].upper())
+
+    def test_cursor_round_trip(self):
+        """Cursors decode back to their direction and values."""
+        token = encode_cursor('n', ['2025-01-01T00:00:00+00:00', 5])
+        self.assertEqual(decode_cursor(token), ('n', ['2025-01-01T00:00:00+00:00', 5]))
+
+    def test_malformed_cursor_raises(self):
+        """Garbage cursors raise InvalidCursor."""
+        with self.assertRaises(InvalidCursor):
+            paginate(Recipe.objects.all(), cursor='not-a-cursor')
+
+    def test_tampered_values_raise(self):
+        """Cursors that decode but hold values of the wrong type raise InvalidCursor."""
+        for values in (['garbage', 'x'], [None, None], [{'a': 1}, 5], ['2025-13-45T00:00:00+00:00', 5],
+                       ['2025-01-01T00:00:00+00:00', 'x'], ['2025-01-01T00:00:00+00:00', 10 ** 30]):
+            with self.subTest(values=values), self.assertRaises(InvalidCursor):
+                list(paginate(Recipe.objects.all(), cursor=encode_cursor('n', values)).items)
+        with self.assertRaises(InvalidCursor):
+            paginate(Recipe.objects.all(), cursor=encode_cursor('n', [True, '2025-01-01T00:00:00+00:00', 5]),
+                     keys=RANKED_KEYS)
+
+
+class SortedPaginateTests(SimpleTestCase):
+    """Test cases for paginate_sorted() over a ranked, in-memory result."""
+
+    def setUp(self):
+        """Ranked entries with tied scores and timestamps, best first."""
+        now = timezone.now()
+        self.entries = sorted(
+            ((float(i % 3), now - timedelta(minutes=i % 4), i) for i in range(1, 12)),
+            reverse=True,
+        )
+
+    def test_pages_match_paginate_entries(self):
+        """Walking forwards and back gives the same pages and cursors as paginate_entries."""
+        cursor = None
+        while True:
+            page = paginate_sorted(self.entries, cursor=cursor, page_size=4, keys=RANKED_KEYS)
+            expected = paginate_entries(self.entries, cursor=cursor, page_size=4, keys=RANKED_KEYS)
+            self.assertEqual(page, expected)
+            back = paginate_sorted(self.entries, cursor=page.prev_cursor, page_size=4, keys=RANKED_KEYS)
+            if page.prev_cursor:
+                self.assertEqual(back, paginate_entries(self.entries, cursor=page.prev_cursor, page_size=4,
+                                                        keys=RANKED_KEYS))
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+    def test_incomplete_results(self):
+        """Pages reaching past the end of a partial result return None."""
+        first = paginate_sorted(self.entries, page_size=4, keys=RANKED_KEYS, complete=False)
+        self.assertEqual(len(first.items), 4)
+        self.assertIsNone(paginate_sorted(self.entries, page_size=20, keys=RANKED_KEYS, complete=False))
+
+
+class HomePaginationTests(TestCase):
+    """Test cases for pagination on the home view."""
+
+    def setUp(self):
+        """Create enough recipes to span several pages."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.vegan = Tag.objects.create(name='vegan', category='dietary')
+        for i in range(30):
+            recipe = Recipe.objects.create(
+                title=f'Pasta {i}', description='Test', author=self.user, prep_time=10,
+            )
+            if i % 2 == 0:
+                recipe.tags.add(self.vegan)
+
+    def test_first_page_exposes_next_cursor(self):
+        """The first page is capped at the page size and links onwards."""
+        response = self.client.get(reverse('home'))
+        self.assertEqual(len(response.context['recipes']), 24)
+        self.assertIsNotNone(response.context['next_cursor'])
+        self.assertIsNone(response.context['prev_cursor'])
+        self.assertContains(response, 'cursor=')
+
+    def test_next_page_preserves_filters(self):
+        """Filtered listings paginate over the filtered set only."""
+        params = {'q': 'Pasta', 'dietary': [self.vegan.id], 'max_time': '15'}
+        seen = []
+        response = self.client.get(reverse('home'), params)
+        seen.extend(r.pk for r in response.context['recipes'])
+        next_url = response.context['next_page_url']
+        while next_url:
+            self.assertIn('dietary=%d' % self.vegan.id, next_url)
+            response = self.client.get(reverse('home') + next_url)
+            seen.extend(r.pk for r in response.context['recipes'])
+            next_url = response.context['next_page_url']
+
+        expected = Recipe.objects.filter(tags=self.vegan).order_by('-created_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('pk', flat=True)))
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """A tampered cursor renders the first page instead of erroring."""
+        response = self.client.get(reverse('home'), {'cursor': '%%%'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['recipes']), 24)
+
+    def test_cursor_with_naive_timestamp_falls_back_to_first_page(self):
+        """A timestamp without a time zone is rejected rather than compared with stored ones."""
+        cursor = encode_cursor('n', ['2025-01-01T00:00:00', 5])
+        with self.assertRaises(InvalidCursor):
+            paginate_entries([(timezone.now(), 1)], cursor=cursor)
+        response = self.client.get(reverse('home'), {'dietary': self.vegan.id, 'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['recipes']), 15)
+
+    def test_cursor_with_tampered_values_falls_back_to_first_page(self):
+        """Cursors holding values of the wrong type render the first page, with or without filters."""
+        for values in (['garbage', 'x'], [None, None]):
+            for params in ({}, {'max_time': '20'}):
+                with self.subTest(values=values, params=params):
+                    response = self.client.get(reverse('home'), {**params, 'cursor': encode_cursor('n', values)})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.context['recipes']), 24)
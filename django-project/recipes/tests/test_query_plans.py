@@ -0,0 +1,33 @@
+"""
+Unit tests for the hot-query plan checks.
+"""
+from io import StringIO
+from unittest import skipUnless
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+
+from recipes.models import ABTestImpression, Recipe
+from recipes.query_plans import full_table_scans
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN parsing supports SQLite and PostgreSQL')
+class QueryPlanTests(TestCase):
+    """The hot queries from views.py are served by indexes."""
+
+    def test_hot_queries_use_indexes(self):
+        """check_query_plans passes against a seeded database."""
+        out = StringIO()
+        call_command('check_query_plans', seed=200, stdout=out)
+        self.assertIn('hot queries use indexes', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())  # seed data is rolled back
+
+    def test_detects_full_table_scan(self):
+        """A filter on an unindexed column is reported as a full scan."""
+        self.assertEqual(full_table_scans(Recipe.objects.filter(description='x').order_by()), ['recipes_recipe'])
+
+    def test_variant_counts_use_covering_index(self):
+        """Per-variant counts read the (variant, created_at) index, not the table."""
+        queryset = ABTestImpression.objects.values('variant').order_by()
+        self.assertEqual(full_table_scans(queryset), [])
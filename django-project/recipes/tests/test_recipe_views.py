@@ -2,7 +2,9 @@
 Unit tests for recipe-related views (create, detail, edit).
 """
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.db import connection
 from django.urls import reverse
 from recipes.models import Recipe, Tag, Step
 
@@ -303,6 +305,132 @@ class RecipeEditTests(TestCase):
         self.assertEqual(self.recipe.cook_time, 45)
 
 
+class RecipeWriteQueryTests(TestCase):
+    """Saving a recipe takes the same number of queries however many tags and steps it has."""
+
+    def setUp(self):
+        """Log in an author with an existing recipe."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='pass123')
+        self.client.login(username='cook', password='pass123')
+        self.italian_tag = Tag.objects.create(name='Italian', category='cuisine')
+        self.recipe = Recipe.objects.create(title='Soup', author=self.user)
+        self.recipe.tags.add(Tag.objects.create(name='old'))
+        Step.objects.create(recipe=self.recipe, step_number=1, instruction_text='Simmer')
+
+    def _post(self, url, prefix, tags, steps):
+        """POST a recipe with new tags and return the queries it took."""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(url, {
+                'title': f'{prefix} recipe',
+                'description': 'Test',
+                'cuisine_type': self.italian_tag.id,
+                'tags_csv': ', '.join(f'{prefix}-tag-{n}' for n in range(tags)),
+                'steps_text': '\n'.join(f'{prefix} step {n}' for n in range(steps)),
+            })
+        self.assertEqual(response.status_code, 302)
+        return len(captured.captured_queries)
+
+    def test_create_query_count_is_fixed(self):
+        """One tag and step cost as many queries as fifteen tags and thirty steps."""
+        url = reverse('create_recipe')
+        small = self._post(url, 'small', tags=1, steps=1)
+        large = self._post(url, 'large', tags=15, steps=30)
+        self.assertEqual(small, large)
+        recipe = Recipe.objects.get(title='large recipe')
+        self.assertEqual(recipe.tags.count(), 16)
+        self.assertEqual(list(recipe.steps.values_list('step_number', flat=True)), list(range(1, 31)))
+
+    def test_edit_query_count_is_fixed(self):
+        """Replacing the tags and steps of a recipe does not grow with their number."""
+        url = reverse('edit_recipe', args=[self.recipe.pk])
+        # Both edits drop a tag, add tags, change the existing steps and add more
+        small = self._post(url, 'small', tags=1, steps=2)
+        large = self._post(url, 'large', tags=15, steps=30)
+        self.assertEqual(small, large)
+        self.assertEqual(self.recipe.steps.count(), 30)
+        self.assertEqual(self.recipe.tags.count(), 16)
+
+    def test_existing_and_repeated_tags(self):
+        """Existing tags are reused and a tag named twice is attached once."""
+        Tag.objects.create(name='quick')
+        self.client.post(reverse('edit_recipe', args=[self.recipe.pk]), {
+            'title': 'Soup',
+            'description': 'Test',
+            'tags_csv': 'quick, new, quick',
+        })
+        self.assertEqual(sorted(self.recipe.tags.values_list('name', flat=True)), ['new', 'quick'])
+        self.assertEqual(Tag.objects.filter(name='quick').count(), 1)
+
+
+class RecipeEditDiffTests(TestCase):
+    """Editing a recipe writes only the tags and steps that changed."""
+
+    def setUp(self):
+        """Log in the author of a recipe with two tags and three steps."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='pass123')
+        self.client.login(username='cook', password='pass123')
+        self.italian_tag = Tag.objects.create(name='Italian', category='cuisine')
+        self.quick_tag = Tag.objects.create(name='quick')
+        self.recipe = Recipe.objects.create(title='Soup', description='Test', author=self.user)
+        self.recipe.tags.add(self.italian_tag, self.quick_tag)
+        self.steps = [
+            Step.objects.create(recipe=self.recipe, step_number=number, instruction_text=text)
+            for number, text in enumerate(['Chop', 'Simmer', 'Serve'], start=1)
+        ]
+        self.edit_url = reverse('edit_recipe', args=[self.recipe.pk])
+
+    def _edit(self, **data):
+        """POST an edit and return the SQL it ran."""
+        form = {
+            'title': 'Soup', 'description': 'Test', 'cuisine_type': self.italian_tag.id,
+            'tags_csv': 'quick', 'steps_text': 'Chop\nSimmer\nServe', **data,
+        }
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(self.edit_url, form)
+        self.assertEqual(response.status_code, 302)
+        return [query['sql'] for query in captured.captured_queries]
+
+    def _step_rows(self):
+        return list(self.recipe.steps.values_list('pk', 'step_number', 'instruction_text'))
+
+    def test_title_fix_leaves_tags_and_steps_alone(self):
+        """Fixing a typo in the title inserts, updates and deletes no tag or step rows."""
+        before = self._step_rows()
+        statements = self._edit(title='Tomato Soup')
+        writes = [
+            sql for sql in statements
+            if sql.startswith(('INSERT', 'UPDATE', 'DELETE')) and ('recipes_step' in sql or 'recipes_recipe_tags' in sql)
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(self._step_rows(), before)
+        self.assertEqual(set(self.recipe.tags.all()), {self.italian_tag, self.quick_tag})
+
+    def test_changed_steps_keep_their_rows(self):
+        """Edited steps are updated in place; surplus steps are deleted, new ones added."""
+        self._edit(steps_text='Chop finely\nSimmer')
+        self.assertEqual(self._step_rows(), [
+            (self.steps[0].pk, 1, 'Chop finely'), (self.steps[1].pk, 2, 'Simmer'),
+        ])
+        self._edit(steps_text='Chop finely\nSimmer\nSeason\nServe')
+        rows = self._step_rows()
+        self.assertEqual(rows[:2], [(self.steps[0].pk, 1, 'Chop finely'), (self.steps[1].pk, 2, 'Simmer')])
+        self.assertEqual([row[1:] for row in rows[2:]], [(3, 'Season'), (4, 'Serve')])
+
+    def test_changed_tags(self):
+        """Only tags that were dropped or added are written."""
+        self._edit(cuisine_type='', tags_csv='quick, vegan')
+        self.assertEqual(sorted(self.recipe.tags.values_list('name', flat=True)), ['quick', 'vegan'])
+
+    def test_prepopulation_reuses_prefetched_rows(self):
+        """The edit form is filled from the prefetched tags and steps."""
+        with self.assertNumQueries(6):  # Session, user, recipe, tags, steps, cuisine choices
+            response = self.client.get(self.edit_url)
+        self.assertEqual(response.context['form'].initial['tags_csv'], 'quick')
+        self.assertEqual(response.context['form'].initial['steps_text'], 'Chop\nSimmer\nServe')
+
+
 class RecipeDetailTests(TestCase):
     """Test cases for recipe detail view."""
 
@@ -0,0 +1,140 @@
+"""
+Unit tests for favorites-based recommendations.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from recipes import recommendations
+from recipes.models import AlsoSavedRecipe, Favorite, PendingRecommendation, Recipe
+from recipes.recommendations import neighbour_lists
+
+
+# (user, recipe) favorites, ordered by user
+FAVORITES = [
+    (1, 10), (1, 11), (1, 12),
+    (2, 10), (2, 11),
+    (3, 10), (3, 11), (3, 13),
+    (4, 12), (4, 13),
+    (5, 13), (5, 12),
+    (6, 14),
+]
+
+
+class NeighbourListTests(SimpleTestCase):
+    """Test cases for building neighbour lists from a stream of favorites."""
+
+    def _lists(self, **kwargs):
+        return dict(neighbour_lists(lambda: iter(FAVORITES), **kwargs))
+
+    def test_cosine_of_savers(self):
+        """Recipes saved together by at least two people are related by the cosine of their savers."""
+        lists = self._lists()
+        self.assertEqual(lists[10], [(11, 1.0)])
+        self.assertEqual(lists[12], [(13, round(2 / 3, 6))])
+        # 10 and 13 share one saver only
+        self.assertEqual([other for other, _ in lists[13]], [12])
+        self.assertEqual(lists[14], [])
+
+    def test_sharding_gives_the_same_lists(self):
+        """Holding fewer pairs in memory takes more passes, not different results."""
+        passes = 0
+
+        def stream():
+            nonlocal passes
+            passes += 1
+            return iter(FAVORITES)
+
+        sharded = dict(neighbour_lists(stream, max_pairs=2))
+        self.assertEqual(sharded, self._lists())
+        self.assertGreater(passes, 2)
+
+    @mock.patch('recipes.recommendations.MAX_BASKET_SIZE', 2)
+    def test_large_baskets_are_left_out_of_pairs(self):
+        """Users with too many favorites count towards popularity only."""
+        lists = self._lists()
+        self.assertEqual(lists[10], [])
+        self.assertEqual(lists[12], [(13, round(2 / 3, 6))])
+
+
+class RecommendationTests(TestCase):
+    """Stored lists, incremental updates and the recommendations endpoint."""
+
+    def setUp(self):
+        """Create users who save recipes in overlapping groups."""
+        self.client = Client()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.recipes = {
+            name: Recipe.objects.create(title=name, description='Dinner', author=self.author)
+            for name in ('Carbonara', 'Cacio e Pepe', 'Tiramisu', 'Pad Thai', 'Green Curry')
+        }
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(4)]
+        for user in self.users[:3]:
+            self._save(user, 'Carbonara', 'Cacio e Pepe')
+        self._save(self.users[0], 'Tiramisu')
+        self._save(self.users[1], 'Tiramisu')
+        for user in self.users[2:]:
+            self._save(user, 'Pad Thai', 'Green Curry')
+        recommendations.rebuild()
+
+    def _save(self, user, *names):
+        for name in names:
+            Favorite.objects.create(user=user, recipe=self.recipes[name])
+
+    def _list(self, name):
+        entries = self.recipes[name].also_saved_entries.order_by('rank')
+        return [Recipe.objects.get(pk=pk).title for pk in entries.values_list('other_id', flat=True)]
+
+    def test_rebuild_stores_lists(self):
+        """Recipes saved by the same people list each other, best first."""
+        self.assertEqual(self._list('Carbonara'), ['Cacio e Pepe', 'Tiramisu'])
+        self.assertEqual(self._list('Pad Thai'), ['Green Curry'])
+        self.assertFalse(PendingRecommendation.objects.exists())
+
+    def test_favorites_are_queued_and_applied(self):
+        """A new favorite updates the lists of the recipe and of those it now relates to."""
+        self._save(self.users[3], 'Tiramisu')
+        self._save(self.users[2], 'Tiramisu')
+        self.assertEqual(PendingRecommendation.objects.count(), 1)
+        processed, changed = recommendations.update()
+        self.assertEqual(processed, 1)
+        self.assertEqual(self._list('Pad Thai'), ['Green Curry', 'Tiramisu'])
+        self.assertIn('Pad Thai', self._list('Tiramisu'))
+        self.assertEqual(recommendations.update(), (0, 0))
+
+    def test_deleted_recipes_are_repaired(self):
+        """Lists naming a deleted recipe lose it on the next update."""
+        self.recipes['Cacio e Pepe'].delete()
+        recommendations.update()
+        self.assertEqual(self._list('Carbonara'), ['Tiramisu'])
+
+    def test_recommendations_combine_favorites(self):
+        """A user is recommended what their favorites' lists name, minus what they saved."""
+        user = User.objects.create_user(username='newcomer', password='testpass123')
+        self._save(user, 'Cacio e Pepe')
+        self.client.login(username='newcomer', password='testpass123')
+        with self.assertNumQueries(5):  # Session, user, favorites, lists, titles
+            response = self.client.get(reverse('recommended_recipes'))
+        results = response.json()['results']
+        self.assertEqual([result['title'] for result in results], ['Carbonara', 'Tiramisu'])
+        self.assertEqual(results[0]['because'], [self.recipes['Cacio e Pepe'].pk])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(len(self.client.get(reverse('recommended_recipes'), {'limit': '1'}).json()['results']), 1)
+
+    def test_anonymous_visitors_are_refused(self):
+        """Recommendations need a logged-in user."""
+        self.assertEqual(self.client.get(reverse('recommended_recipes')).status_code, 401)
+
+    def test_command(self):
+        """update_recommendations processes the queue, or rebuilds every list."""
+        AlsoSavedRecipe.objects.all().delete()
+        out = StringIO()
+        call_command('update_recommendations', rebuild=True, max_pairs=1, stdout=out)
+        self.assertIn('Rebuilt recommendations', out.getvalue())
+        self.assertEqual(self._list('Carbonara'), ['Cacio e Pepe', 'Tiramisu'])
+        call_command('update_recommendations', stdout=out)
+        self.assertIn('Processed 0', out.getvalue())
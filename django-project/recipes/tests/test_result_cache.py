@@ -0,0 +1,144 @@
+"""
+Unit tests for the search result cache and its use by the home listing.
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+
+from recipes import result_cache, views
+from recipes.models import Recipe, Tag
+from recipes.pagination import DEFAULT_KEYS
+from recipes.result_cache import SearchResultCache, normalize_query
+
+
+def _results(*ids):
+    return lambda: (DEFAULT_KEYS, [(None, pk) for pk in ids], True)
+
+
+class NormalizeQueryTests(SimpleTestCase):
+    """Queries share a key exactly when the backend treats them alike."""
+
+    def test_case_and_whitespace(self):
+        """Every backend, substring search included, folds case and ignores extra whitespace."""
+        for backend in ('memory', 'fts5', 'postgresql', None):
+            self.assertEqual(normalize_query('  Pasta   BAKE ', backend), normalize_query('pasta bake', backend))
+
+    def test_stop_words(self):
+        """Stop words are dropped only where the backend ignores them."""
+        self.assertEqual(normalize_query('the pasta', 'postgresql'), normalize_query('pasta', 'postgresql'))
+        self.assertEqual(normalize_query('pasta of the day', 'memory'), normalize_query('pasta day', 'memory'))
+        # FTS5 requires every word, and substring search matches stop words too
+        self.assertNotEqual(normalize_query('the pasta', 'fts5'), normalize_query('pasta', 'fts5'))
+        self.assertNotEqual(normalize_query('the pasta', None), normalize_query('pasta', None))
+
+    def test_phrases_keep_their_gaps(self):
+        """A stop word inside a phrase still separates its neighbours."""
+        self.assertNotEqual(normalize_query('"salt and pepper"', 'memory'), normalize_query('"salt pepper"', 'memory'))
+
+
+class SearchResultCacheTests(SimpleTestCase):
+    """Test cases for LRU eviction, expiry and generations."""
+
+    def setUp(self):
+        """Start from an empty cache with room for five ids."""
+        cache.clear()
+        self.results = SearchResultCache(max_ids=5)
+
+    def test_hits_and_misses(self):
+        """A second lookup of the same key does not recompute."""
+        compute = mock.Mock(side_effect=_results(1, 2))
+        self.results.get_or_compute('a', compute)
+        cached = self.results.get_or_compute('a', compute)
+        self.assertEqual(cached.recipe_ids, [1, 2])
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual((self.results.hits, self.results.misses), (1, 1))
+
+    def test_least_recently_used_are_evicted_first(self):
+        """Entries are dropped, oldest use first, once too many ids are held."""
+        self.results.get_or_compute('a', _results(1, 2))
+        self.results.get_or_compute('b', _results(3, 4))
+        self.results.get_or_compute('a', _results())  # Hit: 'a' is now the most recent
+        self.results.get_or_compute('c', _results(5, 6))
+        self.assertEqual(list(self.results._results), ['a', 'c'])
+        self.results.get_or_compute('d', _results(*range(6)))  # Larger than the whole cache
+        self.assertEqual(list(self.results._results), ['a', 'c'])
+
+    def test_entries_expire(self):
+        """Entries older than RESULT_TTL are recomputed."""
+        compute = mock.Mock(side_effect=_results(1))
+        with mock.patch('recipes.result_cache.time.monotonic', return_value=1000.0):
+            self.results.get_or_compute('a', compute)
+        with mock.patch('recipes.result_cache.time.monotonic', return_value=1000.0 + result_cache.RESULT_TTL):
+            self.results.get_or_compute('a', compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_new_generation_drops_everything(self):
+        """Bumping the global generation empties the cache of every process."""
+        self.results.get_or_compute('a', _results(1))
+        result_cache.invalidate()
+        compute = mock.Mock(side_effect=_results(1))
+        self.results.get_or_compute('a', compute)
+        self.assertEqual(compute.call_count, 1)
+
+    def test_results_computed_during_a_write_are_not_kept(self):
+        """A write while results were being read keeps them out of the cache."""
+        def compute():
+            result_cache.invalidate()
+            return _results(1)()
+
+        self.results.get_or_compute('a', compute)
+        self.assertEqual(len(self.results), 0)
+
+
+class CachedSearchViewTests(TestCase):
+    """The home page pages through cached search results."""
+
+    def setUp(self):
+        """Create more matching recipes than fit on one page."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.vegan = Tag.objects.create(name='Vegan', category='dietary')
+        for i in range(30):
+            recipe = Recipe.objects.create(title=f'Pasta {i}', description='Quick', author=self.user)
+            if i % 2:
+                recipe.tags.add(self.vegan)
+
+    def _ids(self, params):
+        response = self.client.get(reverse('home'), params)
+        return [card.pk for card in response.context['recipes']], response
+
+    def test_pages_are_sliced_from_one_search(self):
+        """Every page of a search, and equivalent spellings, run the search once."""
+        with mock.patch('recipes.views._rank_results', wraps=views._rank_results) as rank:
+            first, response = self._ids({'q': 'pasta'})
+            second, _ = self._ids({'q': '  PASTA ', 'cursor': response.context['next_cursor']})
+            filtered, _ = self._ids({'q': 'pasta', 'dietary': self.vegan.id})
+        self.assertEqual(rank.call_count, 2)  # Unfiltered, then with the dietary filter
+        self.assertEqual(len(set(first + second)), 30)
+        self.assertEqual(len(filtered), 15)
+
+    def test_recipe_writes_invalidate_results(self):
+        """A new recipe shows up in a search that was cached before."""
+        before, _ = self._ids({'q': 'pasta'})
+        recipe = Recipe.objects.create(title='Pasta 30', description='Quick', author=self.user)
+        after, response = self._ids({'q': 'pasta'})
+        self.assertEqual(after[0], recipe.pk)
+        self.assertEqual(response.context['result_count'], 31)
+
+    @mock.patch('recipes.result_cache.MAX_RESULTS_PER_QUERY', 10)
+    def test_pages_past_the_cached_results_use_the_database(self):
+        """Only the first results are cached; later pages still list everything once."""
+        seen = []
+        params = {'q': 'pasta'}
+        while True:
+            ids, response = self._ids(params)
+            seen.extend(ids)
+            if not response.context['next_cursor']:
+                break
+            params['cursor'] = response.context['next_cursor']
+        self.assertEqual(len(set(seen)), 30)
+        self.assertEqual(response.context['result_count'], 30)
@@ -0,0 +1,118 @@
+"""
+Unit tests for stored recipe search documents.
+"""
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
+
+from recipes import search
+from recipes.models import Recipe, Step, Tag
+
+
+class SearchDocumentTests(TestCase):
+    """PostgreSQL search documents follow recipe, tag and step writes."""
+
+    def setUp(self):
+        """Create a recipe with a tag and a step."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.recipe = Recipe.objects.create(title='Pasta Night', description='Quick dinner', author=self.user)
+
+    def test_no_op_without_backend(self):
+        """Databases without full-text support skip document maintenance entirely."""
+        with mock.patch('recipes.search.backend', return_value=None):
+            with self.assertNumQueries(0):
+                search.update_documents([self.recipe.pk])
+            with self.assertRaises(CommandError):
+                call_command('rebuild_search_documents', stdout=StringIO())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Stored documents require PostgreSQL')
+    def test_tags_and_steps_are_searchable(self):
+        """Adding a tag or a step makes its words match."""
+        self.recipe.tags.add(Tag.objects.create(name='vegetarian', category='dietary'))
+        Step.objects.create(recipe=self.recipe, step_number=1, instruction_text='Toast the walnuts')
+        for word in ('pasta', 'vegetarian', 'walnuts'):
+            self.assertEqual(list(search.postgres_search(word, Recipe.objects.all())), [self.recipe])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Stored documents require PostgreSQL')
+    def test_title_matches_rank_first(self):
+        """Weights rank a title match above a step match."""
+        other = Recipe.objects.create(title='Salad', description='Fresh', author=self.user)
+        Step.objects.create(recipe=other, step_number=1, instruction_text='Serve with pasta')
+        self.assertEqual(list(search.postgres_search('pasta', Recipe.objects.all())), [self.recipe, other])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Stored documents require PostgreSQL')
+    def test_rebuild_command(self):
+        """The rebuild command restores cleared documents."""
+        Recipe.objects.update(search_document=None)
+        call_command('rebuild_search_documents', workers=1, stdout=StringIO())
+        self.assertEqual(list(search.postgres_search('pasta', Recipe.objects.all())), [self.recipe])
+
+
+class FullTextSearchTests(TestCase):
+    """SQLite FTS5 search: sync, bm25 ranking, prefixes and snippets."""
+
+    def setUp(self):
+        """Create recipes whose matches sit in different columns."""
+        if search.backend() != 'fts5':
+            self.skipTest('Requires SQLite built with FTS5')
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.titled = Recipe.objects.create(title='Pasta Night', description='Quick dinner', author=self.user)
+        self.stepped = Recipe.objects.create(title='Salad', description='Fresh greens', author=self.user)
+        Step.objects.create(recipe=self.stepped, step_number=1, instruction_text='Serve with leftover pasta')
+
+    def _search(self, query):
+        return list(search.fts_search(query, Recipe.objects.all()))
+
+    def test_title_matches_rank_first(self):
+        """Weighted bm25 ranks a title match above a step match."""
+        self.assertEqual(self._search('pasta'), [self.titled, self.stepped])
+
+    def test_prefix_and_multiple_words(self):
+        """The last word matches as a prefix and every word must match."""
+        self.assertEqual(self._search('past'), [self.titled, self.stepped])
+        self.assertEqual(self._search('pasta nig'), [self.titled])
+        self.assertEqual(self._search('pas* greens'), [self.stepped])
+
+    def test_operators_in_input_are_literal(self):
+        """FTS5 syntax typed by users cannot break the query."""
+        self.assertEqual(search.fts_query('pasta OR "NEAR(x'), '"pasta" "OR" "NEAR" "x"*')
+        self.assertEqual(self._search('salad -'), [self.stepped])
+        self.assertEqual(self._search('"()'), [])
+
+    def test_tracks_tag_step_and_delete_writes(self):
+        """Tags, steps, edits and deletes are reflected immediately."""
+        self.titled.tags.add(Tag.objects.create(name='weeknight', category='other'))
+        self.assertEqual(self._search('weeknight'), [self.titled])
+        Tag.objects.filter(name='weeknight').update(name='weekend')  # bypasses signals
+        self.titled.title = 'Pasta Evening'
+        self.titled.save()
+        self.assertEqual(self._search('evening'), [self.titled])
+        self.assertEqual(self._search('weekend'), [self.titled])
+        self.stepped.delete()
+        self.assertEqual(self._search('greens'), [])
+
+    def test_snippets_escape_text_and_mark_matches(self):
+        """Snippets wrap matches in <mark> and escape everything else."""
+        Step.objects.create(recipe=self.stepped, step_number=2, instruction_text='Add <b>pasta</b> & toss')
+        snippet = search.snippets('pasta', [self.stepped.pk])[self.stepped.pk]
+        self.assertIn('<mark>pasta</mark>', snippet)
+        self.assertNotIn('<b>', snippet)
+
+    def test_rebuild_command(self):
+        """The rebuild command restores a cleared FTS table."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        out = StringIO()
+        call_command('rebuild_search_documents', stdout=out)
+        self.assertEqual(self._search('pasta'), [self.titled, self.stepped])
+        self.assertIn('Rebuilt 2 search document', out.getvalue())
+
+    def test_home_uses_ranked_search(self):
+        """The home page lists FTS matches best first."""
+        response = self.client.get(reverse('home'), {'q': 'pasta'})
+        self.assertEqual([r.id for r in response.context['recipes']], [self.titled.pk, self.stepped.pk])
@@ -0,0 +1,67 @@
+"""
+Unit tests for the search backend benchmark harness.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from recipes.models import Recipe, Tag
+from recipes.search_benchmark import QUERY_MIX, available_backends, compare_reports
+
+
+class SearchBenchmarkTests(TestCase):
+    """benchmark_search writes a comparable JSON report and leaves no data behind."""
+
+    def setUp(self):
+        """Pick a temporary report path."""
+        handle, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.output)
+
+    def _run(self, **options):
+        out = StringIO()
+        call_command('benchmark_search', sizes='150', repeat=2, output=self.output, stdout=out, **options)
+        with open(self.output) as file:
+            return json.load(file), out.getvalue()
+
+    def test_report(self):
+        """Every available backend is timed on every query of the mix, then the catalog is rolled back."""
+        report, out = self._run()
+        self.assertEqual(report['format'], 1)
+        self.assertEqual([run['recipes'] for run in report['runs']], [150])
+        backends = report['runs'][0]['backends']
+        self.assertEqual(list(backends), list(available_backends()))
+        for result in backends.values():
+            self.assertEqual(len(result['queries']), len(QUERY_MIX))
+            self.assertEqual(set(result['classes']), {query_class for query_class, _ in QUERY_MIX})
+            summary = result['summary']
+            self.assertLessEqual(summary['p50_ms'], summary['p95_ms'])
+            self.assertLessEqual(summary['p95_ms'], summary['p99_ms'])
+        fallback = {result['query']: result for result in backends['fallback']['queries']}
+        self.assertEqual(fallback['chicken']['queries'], 1)
+        self.assertEqual(fallback['quinoa']['matches'], 0)
+        self.assertEqual(backends['memory']['summary']['queries'], 0)
+        self.assertIn('rolled back', out)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_compare(self):
+        """An earlier report is compared by p95 latency, run by run."""
+        report, _ = self._run(backends='fallback')
+        previous = json.loads(json.dumps(report))
+        previous['runs'][0]['backends']['fallback']['summary']['p95_ms'] = 0
+        rows = compare_reports(previous, report)
+        self.assertEqual(rows[0]['class'], 'all')
+        self.assertIsNone(rows[0]['ratio'])
+        self.assertEqual(len(rows), 1 + len(report['runs'][0]['backends']['fallback']['classes']))
+        self.assertEqual(compare_reports({'runs': []}, report), [])
+
+    def test_unknown_backend(self):
+        """Backends that cannot run on this database are refused."""
+        with self.assertRaises(CommandError):
+            self._run(backends='elasticsearch')
@@ -0,0 +1,203 @@
+"""
+Unit tests for the in-process BM25 search index and its use by the home listing.
+"""
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+
+from recipes.models import IndexVersion, Recipe, Step, Tag
+from recipes.search_index import INDEX_NAME, InvertedIndex, analyze, parse_query, stem
+
+
+class AnalyzerTests(SimpleTestCase):
+    """Test cases for stemming, analysis and query parsing."""
+
+    def test_stem_folds_inflections(self):
+        """Plurals and -ed/-ing forms share a stem."""
+        self.assertEqual(stem('tomatoes'), stem('tomato'))
+        self.assertEqual(stem('baking'), stem('bake'))
+        self.assertEqual(stem('chopped'), stem('chop'))
+        self.assertEqual(stem('berries'), stem('berry'))
+
+    def test_analyze_drops_stop_words_but_keeps_positions(self):
+        """Stop words leave a gap, and text is folded."""
+        self.assertEqual(analyze('Salt and Pepper'), [(0, 'salt'), (2, 'pepper')])
+        self.assertEqual(analyze('Crème jalapeño'), [(0, 'creme'), (1, 'jalapeno')])
+
+    def test_parse_query(self):
+        """Quoted words form phrases; starred and last words are prefixes."""
+        self.assertEqual(parse_query('"salt and pepper" gril* chick'), [
+            ('phrase', [(0, 'salt'), (2, 'pepper')]),
+            ('prefix', ('gril', 'gril')),
+            ('prefix', ('chick', 'chick')),
+        ])
+        self.assertEqual(parse_query('   '), [])
+
+
+class InvertedIndexTests(SimpleTestCase):
+    """Test cases for indexing, ranking and snapshots, without a database."""
+
+    def setUp(self):
+        """Index a few recipes directly."""
+        self.index = InvertedIndex()
+        self.index.add(1, ('Roast Chicken', 'Crispy skin', 'dinner', 'Season with salt and pepper. Roast.'))
+        self.index.add(2, ('Tomato Soup', 'Warm soup with chicken stock', 'soup', 'Simmer the tomatoes'))
+        self.index.add(3, ('Green Salad', 'Fresh', 'vegan', 'Toss with pepper and salt'))
+
+    def _ids(self, query):
+        return [recipe_id for recipe_id, _ in self.index.search(query)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        """Title (weight A) outranks description (weight B)."""
+        self.assertEqual(self._ids('chicken'), [1, 2])
+
+    def test_all_words_must_match(self):
+        """Every word of the query has to be found."""
+        self.assertEqual(self._ids('salt roast'), [1])
+        self.assertEqual(self._ids('salt soup'), [])
+
+    def test_stemmed_matches(self):
+        """Inflected query words find other forms."""
+        self.assertEqual(self._ids('tomatoes simmering'), [2])
+
+    def test_phrase(self):
+        """A quoted phrase matches only words in that order."""
+        self.assertEqual(self._ids('"salt and pepper"'), [1])
+        self.assertEqual(self._ids('"pepper and salt"'), [3])
+
+    def test_prefix(self):
+        """The last word matches as a prefix."""
+        self.assertEqual(self._ids('chick'), [1, 2])
+        self.assertEqual(self._ids('sal'), [3, 1])
+
+    def test_edits_and_removals(self):
+        """Re-adding replaces a recipe; removed recipes disappear, also after compaction."""
+        self.index.add(2, ('Tomato Soup', 'Warm soup', 'soup', 'Simmer'))
+        self.assertEqual(self._ids('chicken'), [1])
+        self.index.remove(1)
+        self.assertEqual(self._ids('chicken'), [])
+        self.index.compact()
+        self.assertEqual(self._ids('soup'), [2])
+        self.assertEqual(len(self.index), 2)
+
+    def test_snapshot_round_trip(self):
+        """A saved snapshot loads back with the same results, only at its version."""
+        self.index._version = 'v1'
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.pickle')
+            self.index.save_snapshot(path)
+            self.assertFalse(InvertedIndex().load_snapshot(path, 'v2'))
+            loaded = InvertedIndex()
+            self.assertTrue(loaded.load_snapshot(path, 'v1'))
+        self.assertEqual(loaded.search('salt pepper'), self.index.search('salt pepper'))
+        self.assertFalse(InvertedIndex().load_snapshot(path))
+
+
+class DatabaseIndexTests(TestCase):
+    """Test cases for loading from and following the database."""
+
+    def setUp(self):
+        """Create recipes with tags and steps and a freshly loaded index."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.curry = Recipe.objects.create(title='Curry', description='Spicy', author=self.user)
+        self.curry.tags.add(Tag.objects.create(name='Indian', category='cuisine'))
+        Step.objects.create(recipe=self.curry, step_number=1, instruction_text='Toast the cumin')
+        self.index = InvertedIndex()
+        self.index.ensure_current(snapshot_path='')
+
+    def _ids(self, query):
+        return [recipe_id for recipe_id, _ in self.index.search(query)]
+
+    def test_build_indexes_tags_and_steps(self):
+        """Tag names and step instructions are searchable."""
+        self.assertEqual(self._ids('indian'), [self.curry.pk])
+        self.assertEqual(self._ids('cumin'), [self.curry.pk])
+
+    def test_writes_update_a_current_index_without_rebuilding(self):
+        """Creates, edits and deletes in this process are applied incrementally."""
+        with mock.patch('recipes.signals.search_index', self.index), \
+                mock.patch.object(self.index, 'build', wraps=self.index.build) as build:
+            dal = Recipe.objects.create(title='Dal', description='Lentils', author=self.user)
+            Step.objects.create(recipe=dal, step_number=1, instruction_text='Add cumin')
+            self.curry.delete()
+            self.index.ensure_current(snapshot_path='')
+        build.assert_not_called()
+        self.assertEqual(self._ids('cumin'), [dal.pk])
+
+    def test_write_by_another_worker_triggers_rebuild(self):
+        """A version token this process did not produce forces a rebuild."""
+        Recipe.objects.filter(pk=self.curry.pk).update(title='Korma')
+        IndexVersion.objects.replace(INDEX_NAME)
+        self.index.ensure_current(snapshot_path='')
+        self.assertEqual(self._ids('korma'), [self.curry.pk])
+
+    def test_current_snapshot_is_loaded_instead_of_building(self):
+        """Workers load a snapshot saved at the current version."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.pickle')
+            self.index.save_snapshot(path)
+            fresh = InvertedIndex()
+            with mock.patch.object(fresh, 'build') as build:
+                fresh.ensure_current(snapshot_path=path)
+            build.assert_not_called()
+            self.assertEqual(fresh.search('cumin'), self.index.search('cumin'))
+
+            # After a write the snapshot is stale: rebuild and rewrite it
+            IndexVersion.objects.replace(INDEX_NAME)
+            stale = InvertedIndex()
+            with mock.patch.object(stale, 'build', wraps=stale.build) as build:
+                stale.ensure_current(snapshot_path=path)
+            build.assert_called_once()
+            self.assertTrue(InvertedIndex().load_snapshot(path, IndexVersion.objects.current(INDEX_NAME)))
+
+
+@override_settings(RECIPE_SEARCH_BACKEND='memory', RECIPE_SEARCH_SNAPSHOT='')
+class InMemorySearchViewTests(TestCase):
+    """The home page searches with the in-process index when selected."""
+
+    def setUp(self):
+        """Create recipes that rank differently for 'pasta'."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.title_match = Recipe.objects.create(title='Pasta Bake', description='Cheesy', author=self.user)
+        self.step_match = Recipe.objects.create(title='Soup', description='Warm', author=self.user)
+        Step.objects.create(recipe=self.step_match, step_number=1, instruction_text='Add pasta')
+        self.title_match.tags.add(self.italian)
+
+    def _ids(self, params):
+        response = self.client.get(reverse('home'), params)
+        return [card.pk for card in response.context['recipes']], response
+
+    def test_results_are_ranked_by_score(self):
+        """The title match comes first although the step match is newer."""
+        ids, response = self._ids({'q': 'pasta'})
+        self.assertEqual(ids, [self.title_match.pk, self.step_match.pk])
+        self.assertEqual(response.context['result_count'], 2)
+
+    def test_filters_apply_to_search_results(self):
+        """Tag filters narrow the in-memory matches."""
+        ids, _ = self._ids({'q': 'pasta', 'cuisine': self.italian.id})
+        self.assertEqual(ids, [self.title_match.pk])
+
+    def test_pages_follow_score_order(self):
+        """Cursors walk the ranked results without gaps or repeats."""
+        for i in range(30):
+            Recipe.objects.create(title=f'Dish {i}', description='Pasta salad', author=self.user)
+        seen = []
+        params = {'q': 'pasta'}
+        while True:
+            ids, response = self._ids(params)
+            seen.extend(ids)
+            if not response.context['next_cursor']:
+                break
+            params['cursor'] = response.context['next_cursor']
+        self.assertEqual(len(seen), 32)
+        self.assertEqual(len(set(seen)), 32)
+        self.assertEqual(seen[0], self.title_match.pk)
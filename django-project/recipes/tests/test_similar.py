@@ -0,0 +1,153 @@
+"""
+Unit tests for the precomputed "More like this" similar recipes.
+"""
+from collections import Counter
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from recipes import similar
+from recipes.models import PendingSimilarity, Recipe, RecipeVector, SimilarityFeature, SimilarRecipe, Step, Tag
+from recipes.similar import TfidfMatrix
+
+
+class TfidfMatrixTests(SimpleTestCase):
+    """Test cases for scoring on the sparse matrix, without a database."""
+
+    def setUp(self):
+        """Build a matrix of a few small documents."""
+        self.matrix = TfidfMatrix.build([
+            (1, Counter({'pasta': 3, 'tomato': 1, 'salt': 1})),
+            (2, Counter({'pasta': 3, 'basil': 1, 'salt': 1})),
+            (3, Counter({'tomato': 1, 'soup': 3, 'salt': 1})),
+            (4, Counter({'cake': 3, 'sugar': 2, 'salt': 1})),
+        ])
+
+    def test_similarity_is_cosine(self):
+        """Scores are symmetric and a recipe is most similar to itself."""
+        scores = self.matrix.scores(1)
+        self.assertAlmostEqual(scores[1], 1.0, places=5)
+        self.assertAlmostEqual(scores[2], self.matrix.scores(2)[1], places=6)
+        self.assertGreater(scores[2], scores[3])
+
+    def test_features_of_every_recipe_weigh_nothing(self):
+        """A word all recipes use does not make them similar."""
+        self.assertNotIn(4, self.matrix.scores(1))
+        self.assertEqual([recipe_id for recipe_id, _ in self.matrix.neighbours(1)], [2, 3])
+        self.assertEqual(self.matrix.neighbours(4), [])
+
+    def test_neighbours_are_limited(self):
+        """Only the k best neighbours are returned."""
+        self.assertEqual(len(self.matrix.neighbours(1, k=1)), 1)
+
+
+class SimilarRecipesTests(TestCase):
+    """Stored lists, the detail page panel and incremental updates."""
+
+    def setUp(self):
+        """Create two families of related recipes and compute every list."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.pastas = []
+        for title in ('Tomato Basil Pasta', 'Creamy Basil Pasta', 'Pasta with Tomato Sauce'):
+            recipe = Recipe.objects.create(
+                title=title, description='Dinner', author=self.user,
+                ingredients='200g spaghetti\n2 tomatoes\nbasil',
+            )
+            recipe.tags.add(italian)
+            Step.objects.create(recipe=recipe, step_number=1, instruction_text='Boil the spaghetti')
+            self.pastas.append(recipe)
+        self.cake = Recipe.objects.create(
+            title='Chocolate Cake', description='Dessert', author=self.user,
+            ingredients='2 cups flour\n1 cup sugar\n100g chocolate',
+        )
+        similar.rebuild()
+
+    def _similar_ids(self, recipe):
+        return list(recipe.similar_entries.order_by('rank').values_list('similar_id', flat=True))
+
+    def test_rebuild_stores_lists(self):
+        """Each recipe lists the recipes sharing its features, best first."""
+        self.assertEqual(set(self._similar_ids(self.pastas[0])), {self.pastas[1].pk, self.pastas[2].pk})
+        self.assertEqual(self._similar_ids(self.cake), [])
+        self.assertFalse(PendingSimilarity.objects.exists())
+
+    def test_detail_page_shows_similar_recipes(self):
+        """The panel is rendered from the stored list with one query."""
+        with self.assertNumQueries(1):
+            cards = similar.similar_cards(self.pastas[0].pk)
+        self.assertEqual(len(cards), 2)
+        response = self.client.get(reverse('recipe_detail', args=[self.pastas[0].pk]))
+        self.assertContains(response, 'More like this')
+        self.assertContains(response, 'Creamy Basil Pasta')
+        response = self.client.get(reverse('recipe_detail', args=[self.cake.pk]))
+        self.assertNotContains(response, 'More like this')
+
+    def test_writes_are_queued_and_applied(self):
+        """A new recipe enters the lists of the recipes it resembles."""
+        cake = Recipe.objects.create(
+            title='Chocolate Fudge Cake', description='Dessert', author=self.user,
+            ingredients='2 cups flour\n1 cup sugar\n200g chocolate',
+        )
+        self.assertTrue(PendingSimilarity.objects.filter(recipe_id=cake.pk).exists())
+        self.client.get(reverse('recipe_detail', args=[self.cake.pk]))  # Cached for anonymous visitors
+        processed, changed = similar.update()
+        self.assertEqual((processed, changed), (1, 2))
+        self.assertEqual(self._similar_ids(self.cake), [cake.pk])
+        self.assertEqual(self._similar_ids(cake), [self.cake.pk])
+        # The cached page of the recipe whose list changed was dropped
+        self.assertContains(self.client.get(reverse('recipe_detail', args=[self.cake.pk])), 'Chocolate Fudge Cake')
+        self.assertEqual(similar.update(), (0, 0))
+
+    def test_edits_drop_pages_listing_the_recipe(self):
+        """A cached page showing a recipe's card is dropped when that recipe changes."""
+        url = reverse('recipe_detail', args=[self.pastas[0].pk])
+        self.assertContains(self.client.get(url), 'Creamy Basil Pasta')  # Cached for anonymous visitors
+        self.pastas[1].title = 'Creamy Pesto Pasta'
+        self.pastas[1].save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Creamy Pesto Pasta')
+        self.assertNotContains(response, 'Creamy Basil Pasta')
+
+    def test_update_reads_only_written_recipes(self):
+        """Incremental runs patch the stored matrix instead of reading the catalog."""
+        cake = Recipe.objects.create(
+            title='Chocolate Fudge Cake', description='Dessert', author=self.user,
+            ingredients='2 cups flour\n1 cup sugar\n200g chocolate',
+        )
+        with mock.patch('recipes.similar.recipe_features', side_effect=similar.recipe_features) as features, \
+                mock.patch('recipes.similar.TfidfMatrix.load') as load:
+            similar.update()
+        load.assert_not_called()
+        self.assertEqual(list(features.call_args.args[0].values_list('pk', flat=True)), [cake.pk])
+        self.assertTrue(RecipeVector.objects.filter(recipe_id=cake.pk).exists())
+        column = similar._unpack('I', SimilarityFeature.objects.get(name='ing:chocolate').recipe_ids)
+        self.assertEqual(sorted(column), sorted([self.cake.pk, cake.pk]))
+        # A rebuild finds the same lists
+        self.assertEqual(similar.rebuild(), 0)
+
+    def test_deleted_recipes_are_skipped_then_repaired(self):
+        """Lists pointing at a deleted recipe hide it until the next update."""
+        deleted = self.pastas[1]
+        deleted_id = deleted.pk
+        deleted.delete()
+        self.assertEqual(len(similar.similar_cards(self.pastas[0].pk)), 1)
+        similar.update()
+        self.assertEqual(self._similar_ids(self.pastas[0]), [self.pastas[2].pk])
+        self.assertFalse(RecipeVector.objects.filter(recipe_id=deleted_id).exists())
+
+    def test_command(self):
+        """update_similar_recipes processes the queue, or rebuilds every list."""
+        self.cake.title = 'Chocolate Pasta'
+        self.cake.save()
+        out = StringIO()
+        call_command('update_similar_recipes', stdout=out)
+        self.assertIn('Processed 1 written recipe(s)', out.getvalue())
+        SimilarRecipe.objects.all().delete()
+        call_command('update_similar_recipes', rebuild=True, stdout=out)
+        self.assertEqual(set(self._similar_ids(self.pastas[0])), {self.pastas[1].pk, self.pastas[2].pk})
@@ -0,0 +1,85 @@
+"""
+Unit tests for EXISTS-based tag filtering and search without row fan-out.
+"""
+from unittest import skipUnless
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+
+from recipes.models import Recipe, Step, Tag
+from recipes.search import search_recipes, substring_search
+
+
+class ManyTagsTestCase(TestCase):
+    """Shared fixture: one recipe carrying many tags and matching steps."""
+
+    def setUp(self):
+        """Create a heavily tagged recipe and a lightly tagged one."""
+        cache.clear()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.tags = [Tag.objects.create(name=f'garlic-{i}', category='dietary') for i in range(30)]
+        self.heavy = Recipe.objects.create(title='Garlic Feast', description='Lots of garlic', author=self.user)
+        self.heavy.tags.add(*self.tags)
+        for i in range(1, 6):
+            Step.objects.create(recipe=self.heavy, step_number=i, instruction_text=f'Add garlic ({i})')
+        self.light = Recipe.objects.create(title='Plain Rice', description='Simple', author=self.user)
+        self.light.tags.add(*self.tags[:2])
+
+
+class WithAllTagsTests(ManyTagsTestCase):
+    """Test cases for RecipeQuerySet.with_all_tags()."""
+
+    def test_requires_every_tag(self):
+        """Only recipes carrying all selected tags match, each exactly once."""
+        ids = [tag.id for tag in self.tags[:5]]
+        self.assertEqual(list(Recipe.objects.with_all_tags(ids)), [self.heavy])
+        self.assertEqual(
+            sorted(r.pk for r in Recipe.objects.with_all_tags(ids[:2])),
+            sorted([self.heavy.pk, self.light.pk]),
+        )
+
+    def test_no_join_or_distinct(self):
+        """Tag constraints are semi-joins, not joins that need DISTINCT."""
+        sql = str(Recipe.objects.with_all_tags([tag.id for tag in self.tags[:5]]).query).upper()
+        self.assertEqual(sql.count('EXISTS'), 5)
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+
+class SearchFanOutTests(ManyTagsTestCase):
+    """Search matches through tags and steps without duplicating recipes."""
+
+    def test_recipe_matching_many_tags_and_steps_returned_once(self):
+        """A recipe matching in 30 tags and 5 steps appears once."""
+        results = list(search_recipes('garlic', Recipe.objects.all()))
+        self.assertEqual([r.pk for r in results].count(self.heavy.pk), 1)
+
+    def test_search_respects_given_queryset(self):
+        """The search narrows the queryset it is given."""
+        results = search_recipes('garlic', Recipe.objects.exclude(pk=self.heavy.pk))
+        self.assertNotIn(self.heavy, results)
+
+    def test_substring_search_ignores_case_and_extra_whitespace(self):
+        """Queries sharing a result cache key find the same recipes."""
+        for query in ('garlic feast', 'GARLIC   Feast'):
+            self.assertEqual(list(substring_search(query, Recipe.objects.all())), [self.heavy])
+
+    def test_home_search_with_tag_filters(self):
+        """Search plus several tag filters lists the recipe once and counts it once."""
+        params = {'q': 'garlic', 'dietary': [tag.id for tag in self.tags[:3]]}
+        response = Client().get(reverse('home'), params)
+        self.assertEqual([r.id for r in response.context['recipes']], [self.heavy.pk])
+        self.assertEqual(response.context['result_count'], 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Ranked search requires PostgreSQL')
+    def test_postgres_ranking_order(self):
+        """Title matches outrank matches found only in tags or steps."""
+        titled = Recipe.objects.create(title='Garlic Bread', description='Toast', author=self.user)
+        results = list(search_recipes('garlic', Recipe.objects.all()))
+        ranks = [r.rank for r in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertEqual(len(results), len({r.pk for r in results}))
+        self.assertLess(results.index(titled), results.index(self.light))
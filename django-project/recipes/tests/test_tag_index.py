@@ -0,0 +1,134 @@
+"""
+Unit tests for the in-process tag index and its use by the home listing.
+"""
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from recipes.models import IndexVersion, Recipe, RecipeCard, Tag
+from recipes.pagination import paginate, paginate_entries
+from recipes.tag_index import INDEX_NAME, TagIndex, members, tag_index
+
+
+class TagIndexTests(TestCase):
+    """Test cases for TagIndex loading, intersection and maintenance."""
+
+    def setUp(self):
+        """Create tagged recipes and a freshly loaded index."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.vegan = Tag.objects.create(name='vegan', category='dietary')
+        self.gluten_free = Tag.objects.create(name='gluten-free', category='dietary')
+        self.salad = Recipe.objects.create(title='Salad', description='Fresh', author=self.user, prep_time=10)
+        self.salad.tags.add(self.vegan, self.gluten_free)
+        self.stew = Recipe.objects.create(title='Stew', description='Hearty', author=self.user, prep_time=90)
+        self.stew.tags.add(self.vegan)
+        self.index = TagIndex()
+        self.index.ensure_current()
+
+    def _ids(self, *tags, max_time=None):
+        return sorted(pk for _, pk in self.index.matching([t.id for t in tags], max_time))
+
+    def test_intersection(self):
+        """Only recipes carrying every tag match."""
+        self.assertEqual(self._ids(self.vegan), sorted([self.salad.pk, self.stew.pk]))
+        self.assertEqual(self._ids(self.vegan, self.gluten_free), [self.salad.pk])
+        self.assertEqual(members(self.index.intersect([self.gluten_free.id, 999])), [])
+
+    def test_time_filter(self):
+        """max_time filters on the card's total time."""
+        self.assertEqual(self._ids(self.vegan, max_time=30), [self.salad.pk])
+
+    def test_writes_update_a_current_index_without_reloading(self):
+        """Creates, tag changes and deletes in this process are applied incrementally."""
+        # Writes go to the global index's receiver; point it at this instance
+        with mock.patch('recipes.signals.tag_index', self.index), \
+                mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            soup = Recipe.objects.create(title='Soup', description='Warm', author=self.user)
+            soup.tags.add(self.gluten_free)
+            self.stew.tags.add(self.gluten_free)
+            self.salad.delete()
+            self.index.ensure_current()
+        load.assert_not_called()
+        self.assertEqual(self._ids(self.gluten_free), sorted([soup.pk, self.stew.pk]))
+        self.assertEqual(self._ids(self.vegan), [self.stew.pk])
+
+    def test_write_by_another_worker_triggers_reload(self):
+        """A version token this process did not produce forces a reload."""
+        # Simulate another worker: the write lands but this index is not told
+        RecipeCard.objects.filter(recipe=self.stew).update(tag_ids=f',{self.gluten_free.id},')
+        IndexVersion.objects.replace(INDEX_NAME)
+        self.index.ensure_current()
+        self.assertEqual(self._ids(self.gluten_free), sorted([self.salad.pk, self.stew.pk]))
+
+    def test_missed_write_marks_index_stale(self):
+        """If the token moved before our own write, the index reloads instead of patching."""
+        IndexVersion.objects.replace(INDEX_NAME)
+        self.index.recipes_changed([self.salad.pk])
+        with mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            self.index.ensure_current()
+        load.assert_called_once()
+
+
+class PaginateEntriesTests(TestCase):
+    """paginate_entries() pages like paginate() with the default keys."""
+
+    def test_matches_database_pagination(self):
+        """Both walk the same pages with interchangeable cursors."""
+        user = User.objects.create_user(username='cook', password='testpass123')
+        recipes = [Recipe.objects.create(title=f'R{i}', description='Test', author=user) for i in range(7)]
+        Recipe.objects.filter(pk__in=[r.pk for r in recipes[2:5]]).update(created_at=timezone.now())
+        entries = list(Recipe.objects.values_list('created_at', 'pk'))
+
+        cursor = None
+        while True:
+            from_db = paginate(Recipe.objects.all(), cursor=cursor, page_size=3)
+            in_memory = paginate_entries(entries, cursor=cursor, page_size=3)
+            self.assertEqual(in_memory.items, [r.pk for r in from_db.items])
+            self.assertEqual(in_memory.next_cursor, from_db.next_cursor)
+            self.assertEqual(in_memory.prev_cursor, from_db.prev_cursor)
+            if not from_db.has_next:
+                break
+            cursor = from_db.next_cursor
+
+        back = paginate(Recipe.objects.all(), cursor=from_db.prev_cursor, page_size=3)
+        self.assertEqual(paginate_entries(entries, cursor=from_db.prev_cursor, page_size=3).items,
+                         [r.pk for r in back.items])
+
+
+class HomeTagIndexTests(TestCase):
+    """The home page serves tag-only filters from the tag index."""
+
+    def setUp(self):
+        """Create a catalog of tagged recipes."""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.italian = Tag.objects.create(name='Italian', category='cuisine')
+        self.vegan = Tag.objects.create(name='vegan', category='dietary')
+        self.nut_free = Tag.objects.create(name='nut-free', category='dietary')
+        self.match = Recipe.objects.create(title='Vegan Pasta', description='Test', author=self.user)
+        self.match.tags.add(self.italian, self.vegan, self.nut_free)
+        other = Recipe.objects.create(title='Pesto Pasta', description='Test', author=self.user)
+        other.tags.add(self.italian, self.vegan)
+
+    def test_filters_use_the_index(self):
+        """Multi-tag filtering goes through TagIndex.matching and returns only full matches."""
+        params = {'cuisine': self.italian.id, 'dietary': [self.vegan.id, self.nut_free.id]}
+        with mock.patch.object(tag_index, 'matching', wraps=tag_index.matching) as matching:
+            response = self.client.get(reverse('home'), params)
+        matching.assert_called_once()
+        self.assertEqual([r.id for r in response.context['recipes']], [self.match.pk])
+        self.assertContains(response, 'Vegan Pasta')
+        self.assertNotContains(response, 'Pesto Pasta')
+
+    def test_new_recipe_appears_in_filtered_listing(self):
+        """Recipes created after the index loaded are found."""
+        self.client.get(reverse('home'), {'dietary': self.vegan.id})
+        fresh = Recipe.objects.create(title='Vegan Curry', description='Test', author=self.user)
+        fresh.tags.add(self.vegan)
+        response = self.client.get(reverse('home'), {'dietary': self.vegan.id})
+        self.assertIn(fresh.pk, [r.id for r in response.context['recipes']])
@@ -0,0 +1,47 @@
+"""
+Unit tests for the stored Recipe.total_time column.
+"""
+from unittest import skipUnless
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+
+from recipes.models import Recipe, RecipeCard
+
+
+class StoredTotalTimeTests(TestCase):
+    """total_time is persisted by save() and indexed for filtering."""
+
+    def setUp(self):
+        """Set up a user."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+
+    def _create(self, **times):
+        return Recipe.objects.create(title='Dish', description='Test', author=self.user, **times)
+
+    def test_save_stores_sum(self):
+        """Prep plus cook time is written to the column."""
+        recipe = self._create(prep_time=10, cook_time=25)
+        self.assertEqual(Recipe.objects.filter(pk=recipe.pk).values_list('total_time', flat=True).get(), 35)
+
+    def test_missing_times(self):
+        """One missing time counts as zero; no times at all stores NULL."""
+        self.assertEqual(self._create(cook_time=20).total_time, 20)
+        self.assertIsNone(self._create().total_time)
+        self.assertIsNone(self._create(prep_time=0, cook_time=0).total_time)
+
+    def test_save_with_update_fields(self):
+        """Saving only prep_time or cook_time still refreshes the total."""
+        recipe = self._create(prep_time=10, cook_time=5)
+        recipe.cook_time = 50
+        recipe.save(update_fields=['cook_time'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.total_time, 60)
+        self.assertEqual(RecipeCard.objects.get(recipe=recipe).total_time, 60)
+
+    @skipUnless(connection.vendor == 'sqlite', 'PostgreSQL may prefer a sequential scan on tiny tables')
+    def test_filter_is_an_index_range_scan(self):
+        """Time filters and quickest-first ordering are served by the index."""
+        plan = Recipe.objects.filter(total_time__lte=30).order_by('total_time', '-created_at', '-id').explain()
+        self.assertIn('recipe_total_time_idx', plan)
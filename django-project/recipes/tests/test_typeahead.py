@@ -0,0 +1,178 @@
+"""
+Unit tests for the in-process completion index and the typeahead endpoint.
+"""
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from recipes.models import Favorite, IndexVersion, Recipe, Tag
+from recipes.typeahead import INDEX_NAME, CompletionIndex
+
+
+TAGS = {1: ('Italian', 'cuisine'), 2: ('Vegan', 'dietary')}
+
+
+def _texts(completions):
+    return [completion['text'] for completion in completions]
+
+
+class CompletionIndexTests(SimpleTestCase):
+    """Test cases for prefix matching, ranking and updates, without a database."""
+
+    def setUp(self):
+        """Index a few recipes directly."""
+        self.index = CompletionIndex()
+        self.index.build([
+            (1, 'Spaghetti Carbonara', '200g spaghetti\n2 eggs\nPecorino', [1], 3),
+            (2, 'Spinach Pie', '1 cup spinach\n2 eggs', [2], 0),
+            (3, 'Pasta e Ceci', 'Pasta\nChickpeas\nPecorino', [1, 2], 0),
+        ], TAGS)
+
+    def test_completes_titles_from_any_word(self):
+        """Titles are found by their first and later words."""
+        self.assertEqual(_texts(self.index.complete('carb')), ['Spaghetti Carbonara'])
+        self.assertEqual(_texts(self.index.complete('Spaghetti c')), ['Spaghetti Carbonara'])
+
+    def test_ranked_by_popularity(self):
+        """Favorited titles and widely used tags and ingredients come first."""
+        self.assertEqual(self.index.complete('sp'), [
+            {'text': 'Spaghetti Carbonara', 'kind': 'recipe'},
+            {'text': 'Spinach Pie', 'kind': 'recipe'},
+        ])
+        self.assertEqual(self.index.complete('it'), [
+            {'text': 'Italian', 'kind': 'tag', 'id': 1, 'category': 'cuisine'},
+        ])
+        self.assertEqual(_texts(self.index.complete('pe', limit=1)), ['pecorino'])
+
+    def test_only_common_ingredients(self):
+        """Ingredient words listed once, and measures, are not offered."""
+        self.assertEqual(_texts(self.index.complete('chick')), [])
+        self.assertEqual(_texts(self.index.complete('cup')), [])
+        self.assertEqual(_texts(self.index.complete('egg')), ['eggs'])
+
+    def test_trailing_space_ends_the_word(self):
+        """'pasta ' completes titles continuing after the word only."""
+        self.assertEqual(_texts(self.index.complete('pasta ')), ['Pasta e Ceci'])
+        self.assertEqual(_texts(self.index.complete('   ')), [])
+
+    def test_updates(self):
+        """Edits, deletions and tag renames are applied."""
+        renamed = {1: ('Roman', 'cuisine')}
+        self.index.apply([1], [(1, 'Cacio e Pepe', 'Pecorino', [1], 0)], renamed)
+        self.index.apply([3], [(3, 'Pasta e Ceci', 'Pasta\nChickpeas\nPecorino', [1, 2], 0)], {**TAGS, **renamed})
+        self.index.apply([2], [], {})
+        self.assertEqual(_texts(self.index.complete('sp')), [])
+        self.assertEqual(_texts(self.index.complete('ca')), ['Cacio e Pepe'])
+        self.assertEqual(_texts(self.index.complete('ro')), ['Roman'])
+        self.assertEqual(_texts(self.index.complete('it')), [])
+        self.assertEqual(_texts(self.index.complete('egg')), [])
+
+    @mock.patch('recipes.typeahead.SCAN_LIMIT', 0)
+    @mock.patch('recipes.typeahead.TOP_SIZE', 4)
+    @mock.patch('recipes.typeahead.MAX_LIMIT', 3)
+    def test_kept_tops_match_a_fresh_index(self):
+        """Ranked tops adjusted by updates give the same completions as a rebuild."""
+        rng = random.Random(0)
+        vocabulary = ['salt', 'salmon', 'salsa', 'sage', 'soup', 'stew', 'sauce', 'spice']
+        tags = {i: (f'tag{i}', 'other') for i in range(5)}
+
+        def record(recipe_id):
+            return (recipe_id, ' '.join(rng.sample(vocabulary, 2)), ' '.join(rng.sample(vocabulary, 3)),
+                    rng.sample(range(5), 2), rng.randrange(3))
+
+        records = {recipe_id: record(recipe_id) for recipe_id in range(1, 60)}
+        self.index.build(records.values(), tags)
+        prefixes = ['s', 'sa', 'sal', 'salt ', 'st', 't', 'tag']
+        for prefix in prefixes:
+            self.index.complete(prefix)
+        for _ in range(40):
+            changed = rng.sample(sorted(records), 3)
+            for recipe_id in changed:
+                if rng.random() < 0.3:
+                    del records[recipe_id]
+                else:
+                    records[recipe_id] = record(recipe_id)
+            self.index.apply(changed, [records[i] for i in changed if i in records], tags)
+            fresh = CompletionIndex()
+            fresh.build(records.values(), tags)
+            for prefix in prefixes:
+                self.assertEqual(self.index.complete(prefix, 3), fresh.complete(prefix, 3), prefix)
+        self.assertEqual(self.index._keys, fresh._keys)
+
+
+class DatabaseCompletionTests(TestCase):
+    """Test cases for loading from and following the database."""
+
+    def setUp(self):
+        """Create recipes and a freshly loaded index."""
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        self.tag = Tag.objects.create(name='Thai', category='cuisine')
+        self.curry = Recipe.objects.create(title='Green Curry', description='Hot', author=self.user)
+        self.soup = Recipe.objects.create(title='Tom Yum', description='Sour', author=self.user)
+        self.curry.tags.add(self.tag)
+        self.index = CompletionIndex()
+        self.index.ensure_current()
+
+    def test_writes_update_a_current_index_without_reloading(self):
+        """Recipe, tag and favorite writes in this process are applied incrementally."""
+        with mock.patch('recipes.signals.completion_index', self.index), \
+                mock.patch.object(self.index, '_load', wraps=self.index._load) as load:
+            Recipe.objects.create(title='Tom Kha', description='Creamy', author=self.user)
+            Favorite.objects.create(user=self.user, recipe=self.soup)
+            self.tag.name = 'Thai food'
+            self.tag.save()
+            self.curry.delete()
+            self.index.ensure_current(max_age=0)
+        load.assert_not_called()
+        self.assertEqual(_texts(self.index.complete('tom')), ['Tom Yum', 'Tom Kha'])
+        self.assertEqual(_texts(self.index.complete('thai')), [])
+        self.assertEqual(_texts(self.index.complete('gr')), [])
+
+    def test_write_by_another_worker_triggers_reload(self):
+        """A foreign version token forces a reload, once the check interval passed."""
+        Recipe.objects.filter(pk=self.soup.pk).update(title='Tom Kha')
+        IndexVersion.objects.replace(INDEX_NAME)
+        with self.assertNumQueries(0):
+            self.index.ensure_current()
+        self.assertEqual(_texts(self.index.complete('tom')), ['Tom Yum'])
+        self.index.ensure_current(max_age=0)
+        self.assertEqual(_texts(self.index.complete('tom')), ['Tom Kha'])
+
+
+class SearchCompletionsViewTests(TestCase):
+    """Test cases for the JSON typeahead endpoint."""
+
+    def setUp(self):
+        """Create recipes to complete."""
+        self.client = Client()
+        self.user = User.objects.create_user(username='cook', password='testpass123')
+        for title in ['Banana Bread', 'Banana Pancakes', 'Beef Stew']:
+            Recipe.objects.create(title=title, description='Tasty', author=self.user)
+
+    def test_returns_cacheable_completions(self):
+        """Completions come back as JSON with public cache headers."""
+        response = self.client.get(reverse('search_completions'), {'q': 'ban', 'limit': '1'})
+        self.assertEqual(response.json(), {'query': 'ban', 'completions': [{'text': 'Banana Bread', 'kind': 'recipe'}]})
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_limit_is_bounded(self):
+        """Limits below 1 return one completion, limits above the maximum return at most the maximum."""
+        for n in range(25):
+            Recipe.objects.create(title=f'Banana Muffin {n}', description='Tasty', author=self.user)
+        counts = {
+            limit: len(self.client.get(reverse('search_completions'), {'q': 'ban', 'limit': limit}).json()['completions'])
+            for limit in ('-3', '1', '0', 'x', '500')
+        }
+        self.assertEqual(counts, {'-3': 1, '1': 1, '0': 8, 'x': 8, '500': 20})
+
+    def test_keystrokes_do_not_query_the_database(self):
+        """Once the index is loaded, completing runs no queries."""
+        self.client.get(reverse('search_completions'), {'q': 'b'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('search_completions'), {'q': 'be'})
+        self.assertEqual(_texts(response.json()['completions']), ['Beef Stew'])
@@ -0,0 +1,468 @@
+"""
+In-process prefix index for search box completions (typeahead).
+
+Every keystroke in the search box asks for completions of what was typed so
+far, so the answer has to come from memory: each worker keeps a sorted array
+of completion keys and answers a prefix with two binary searches, without a
+database query.
+
+Completions come in three kinds, ranked by popularity:
+
+    recipe      a recipe title; 1 per recipe with that title, plus 1 per
+                favorite of those recipes
+    tag         a tag name (with its category); recipes carrying the tag
+    ingredient  a word of the ingredient lists; recipes listing it. Only
+                words listed by at least MIN_INGREDIENT_RECIPES recipes are
+                offered, so one-off typos and quantities stay out
+
+Each completion is indexed under its folded text and under every later
+word start, so "carb" completes "Spaghetti Carbonara".
+
+Short prefixes match a large share of the keys. For prefixes matching more
+than SCAN_LIMIT keys the ranked completions are kept (`_Top`) and adjusted
+on writes instead of re-ranking the whole range on every request. They are
+all ranked when the index is built, so no keystroke pays for it.
+
+The index is loaded on first use and kept current like the tag index (see
+recipes/tag_index.py): writes in this process are applied incrementally
+through `recipes_changed`, and the 'typeahead' IndexVersion token reveals
+writes by other workers. To keep keystrokes free of queries, the token is
+read at most once every VERSION_CHECK_INTERVAL seconds.
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from operator import itemgetter
+
+from django.db import DatabaseError
+from django.db.models import Count
+
+from .fuzzy import words
+from .models import Favorite, IndexVersion, Recipe, Tag
+from .search_index import fold
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'typeahead'
+
+# Completions returned by default, and at most
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Seconds a worker trusts its index before reading the version token again;
+# writes by other workers show up in completions after at most this long
+VERSION_CHECK_INTERVAL = 2.0
+
+# Seconds browsers and proxies may reuse a completions response
+CACHE_MAX_AGE = 60
+
+# Ingredient words listed by fewer recipes are not offered
+MIN_INGREDIENT_RECIPES = 2
+
+# Units and quantity words of ingredient lists; never offered as ingredients
+MEASURE_WORDS = frozenset("""
+    cup cups tablespoon tablespoons tbsp teaspoon teaspoons tsp ounce ounces oz
+    pound pounds lb lbs gram grams kilogram kilograms liter liters litre litres
+    milliliter milliliters pinch dash clove cloves can cans package packages
+    large medium small whole half chopped diced minced sliced fresh optional
+    taste
+""".split())
+
+# Prefixes matching more keys than this keep their ranked completions
+SCAN_LIMIT = 2000
+
+# Ranked completions kept per such prefix; refilled when fewer than
+# MAX_LIMIT remain and trimmed back when more than twice as many were added
+TOP_SIZE = 2 * MAX_LIMIT
+
+_WORD_RE = re.compile(r'\w+')
+
+# Sorts after every character, for the upper end of a prefix range
+_LAST_CHAR = '\U0010ffff'
+
+
+def normalize(text):
+    """Fold text and reduce it to single-space separated words."""
+    return ' '.join(_WORD_RE.findall(fold(text or '')))
+
+
+def ingredient_words(text):
+    """Return the set of completion words of an ingredient list."""
+    return {word for word in words(text) if word not in MEASURE_WORDS}
+
+
+def _keys(normalized):
+    """Keys a completion is found under: its text from each word start on."""
+    return [normalized] + [normalized[i + 1:] for i, ch in enumerate(normalized) if ch == ' ']
+
+
+def _prefixes(normalized):
+    """Every prefix of every key of a completion."""
+    return {key[:length] for key in _keys(normalized) for length in range(1, len(key) + 1)}
+
+
+class _Entry:
+    """One completion and its popularity."""
+
+    __slots__ = ('kind', 'label', 'normalized', 'category', 'tag_id', 'popularity', 'listed')
+
+    def __init__(self, kind, label, category=None, tag_id=None):
+        self.kind = kind
+        self.label = label
+        self.normalized = normalize(label)
+        self.category = category
+        self.tag_id = tag_id
+        self.popularity = 0
+        self.listed = False  # True while its keys are in the sorted arrays
+
+    def visible(self):
+        minimum = MIN_INGREDIENT_RECIPES if self.kind == 'ingredient' else 1
+        return self.popularity >= minimum
+
+    def as_dict(self):
+        completion = {'text': self.label, 'kind': self.kind}
+        if self.kind == 'tag':
+            completion.update(id=self.tag_id, category=self.category)
+        return completion
+
+
+def _rank(entry):
+    """Sort key of completions: most popular first, then alphabetical."""
+    return (-entry.popularity, entry.normalized, entry.kind)
+
+
+class _Top:
+    """
+    Ranked completions of a prefix matching many keys.
+
+    `entries` is sorted by rank. Every matching completion that is not in
+    `entries` ranks at or after `bound` (None: all matches are listed).
+    """
+
+    __slots__ = ('entries', 'bound')
+
+    def __init__(self, entries, bound):
+        self.entries = entries
+        self.bound = bound
+
+    def offer(self, entry):
+        rank = _rank(entry)
+        if self.bound is not None and rank >= self.bound:
+            return
+        insort(self.entries, entry, key=_rank)
+        if len(self.entries) > 2 * TOP_SIZE:
+            self.bound = _rank(self.entries[TOP_SIZE])
+            del self.entries[TOP_SIZE:]
+
+    def complete(self):
+        """Whether the kept entries still cover every possible request."""
+        return self.bound is None or len(self.entries) >= MAX_LIMIT
+
+
+class CompletionIndex:
+    """
+    Per-process sorted array of completion keys, ranked by popularity.
+
+    Recipes are fed in as records:
+    (recipe id, title, ingredients, tag ids, number of favorites).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None  # None until loaded, and after a missed write
+        self._checked_at = 0.0  # time.monotonic() of the last token read
+        self._entries = {}  # (kind, normalized text or tag id) -> _Entry
+        self._recipes = {}  # recipe id -> contribution (see _contribution)
+        self._keys = []  # sorted completion keys
+        self._owners = []  # entry of each key
+        self._tops = {}  # prefix -> _Top, for prefixes matching many keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def ensure_current(self, max_age=VERSION_CHECK_INTERVAL):
+        """
+        Reload the index if it was never loaded or another worker wrote since.
+
+        Args:
+            max_age: Seconds since the last check during which the version
+                token is not read again
+        """
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < max_age:
+            return
+        current = IndexVersion.objects.current(INDEX_NAME)
+        with self._lock:
+            if current != self._version:
+                self._load(current)
+            self._checked_at = now
+
+    def _load(self, version):
+        RecipeTag = Recipe.tags.through
+        tag_ids = defaultdict(list)
+        for recipe_id, tag_id in RecipeTag.objects.values_list('recipe_id', 'tag_id').iterator(chunk_size=5000):
+            tag_ids[recipe_id].append(tag_id)
+        favorites = dict(
+            Favorite.objects.order_by().values('recipe_id').annotate(count=Count('pk')).values_list('recipe_id', 'count')
+        )
+        tags = {pk: (name, category) for pk, name, category in Tag.objects.values_list('pk', 'name', 'category')}
+        rows = Recipe.objects.order_by().values_list('pk', 'title', 'ingredients').iterator(chunk_size=2000)
+        self.build(
+            ((pk, title, ingredients, tag_ids.get(pk, ()), favorites.get(pk, 0)) for pk, title, ingredients in rows),
+            tags,
+        )
+        self._version = version
+
+    def build(self, records, tags):
+        """
+        Replace the contents of the index.
+
+        Args:
+            records: Iterable of recipe records (see the class docstring)
+            tags: Dict of tag id -> (name, category) for the tags used
+        """
+        with self._lock:
+            self._entries, self._recipes, self._tops = {}, {}, {}
+            for record in records:
+                contribution = self._contribution(record, tags)
+                self._recipes[record[0]] = contribution
+                self._count(contribution, tags, 1)
+            listed = []
+            for entry in self._entries.values():
+                entry.listed = entry.visible()
+                if entry.listed:
+                    listed.extend((key, entry) for key in _keys(entry.normalized))
+            listed.sort(key=itemgetter(0))
+            self._keys = [key for key, _ in listed]
+            self._owners = [entry for _, entry in listed]
+
+            # Rank every prefix matching many keys now rather than on the
+            # first keystrokes: one character first, then longer prefixes
+            # within the ranges that were large
+            ranges, length = [(0, len(self._keys))], 1
+            while ranges:
+                large = []
+                for low, end in ranges:
+                    while low < end:
+                        if len(self._keys[low]) < length:
+                            low += 1
+                            continue
+                        prefix = self._keys[low][:length]
+                        high = bisect_left(self._keys, prefix + _LAST_CHAR, low, end)
+                        if high - low > SCAN_LIMIT:
+                            self._rank_top(prefix, low, high)
+                            large.append((low, high))
+                        low = high
+                ranges, length = large, length + 1
+
+    @staticmethod
+    def _contribution(record, tags):
+        """What one recipe adds to popularities: (title, weight, tag ids, ingredient words)."""
+        _, title, ingredients, tag_ids, favorites = record
+        return (
+            title if normalize(title) else None,
+            1 + favorites,
+            tuple(sorted(tag_id for tag_id in set(tag_ids) if tag_id in tags)),
+            tuple(sorted(ingredient_words(ingredients))),
+        )
+
+    @staticmethod
+    def _identities(contribution):
+        title, _, tag_ids, ingredients = contribution
+        identities = [('tag', tag_id) for tag_id in tag_ids] + [('ingredient', word) for word in ingredients]
+        if title is not None:
+            identities.append(('recipe', normalize(title)))
+        return identities
+
+    def _count(self, contribution, tags, sign):
+        """Add (sign 1) or subtract (sign -1) a recipe's share of popularities."""
+        title, weight, tag_ids, ingredients = contribution
+        for identity in self._identities(contribution):
+            entry = self._entries.get(identity)
+            if entry is None:
+                kind, value = identity
+                if kind == 'recipe':
+                    entry = _Entry(kind, title)
+                elif kind == 'tag':
+                    entry = _Entry(kind, tags[value][0], category=tags[value][1], tag_id=value)
+                else:
+                    entry = _Entry(kind, value)
+                self._entries[identity] = entry
+            entry.popularity += sign * (weight if identity[0] == 'recipe' else 1)
+
+    def apply(self, recipe_ids, records, tags):
+        """
+        Update the index for written recipes.
+
+        Args:
+            recipe_ids: Ids of recipes that were created, edited or deleted
+            records: Current records of those that still exist
+            tags: Dict of tag id -> (name, category) covering their tags
+        """
+        with self._lock:
+            old = [self._recipes.pop(recipe_id) for recipe_id in recipe_ids if recipe_id in self._recipes]
+            fresh = {record[0]: self._contribution(record, tags) for record in records}
+            identities = {identity for c in old + list(fresh.values()) for identity in self._identities(c)}
+
+            # Take the affected completions out of the ranked tops first, as
+            # their ranks are about to change
+            touched = {}  # identity -> (entry, normalized text before the write)
+            dirty = set()
+            for identity in identities:
+                entry = self._entries.get(identity)
+                if entry is not None:
+                    touched[identity] = (entry, entry.normalized)
+                    if entry.listed:
+                        dirty |= self._withdraw(entry)
+
+            for contribution in old:
+                self._count(contribution, tags, -1)
+            for recipe_id, contribution in fresh.items():
+                self._recipes[recipe_id] = contribution
+                self._count(contribution, tags, 1)
+
+            for identity in identities:
+                entry = self._entries[identity]
+                before = touched.get(identity, (entry, None))[1]
+                if identity[0] == 'tag' and identity[1] in tags:
+                    # Renamed or recategorized tags
+                    entry.label, entry.category = tags[identity[1]]
+                    entry.normalized = normalize(entry.label)
+                if entry.listed and (not entry.visible() or entry.normalized != before):
+                    self._unlist(entry, before)
+                if entry.visible():
+                    if not entry.listed:
+                        self._list(entry)
+                    for prefix in _prefixes(entry.normalized):
+                        top = self._tops.get(prefix)
+                        if top is not None:
+                            top.offer(entry)
+                            dirty.add(prefix)
+                elif entry.popularity <= 0:
+                    del self._entries[identity]
+
+            for prefix in dirty:
+                top = self._tops.get(prefix)
+                if top is not None and not top.complete():
+                    del self._tops[prefix]
+
+    def _rank_top(self, prefix, low, high):
+        """Rank the completions of a prefix matching the keys in [low, high)."""
+        ranked = heapq.nsmallest(TOP_SIZE + 1, set(self._owners[low:high]), key=_rank)
+        bound = _rank(ranked.pop()) if len(ranked) > TOP_SIZE else None
+        top = self._tops[prefix] = _Top(ranked, bound)
+        return top
+
+    def _withdraw(self, entry):
+        """Remove an entry from the tops of its prefixes; return those prefixes."""
+        prefixes = set()
+        for prefix in _prefixes(entry.normalized):
+            top = self._tops.get(prefix)
+            if top is not None:
+                prefixes.add(prefix)
+                try:
+                    top.entries.remove(entry)
+                except ValueError:
+                    pass
+        return prefixes
+
+    def _list(self, entry):
+        for key in _keys(entry.normalized):
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._owners.insert(position, entry)
+        entry.listed = True
+
+    def _unlist(self, entry, normalized):
+        for key in _keys(normalized):
+            position = bisect_left(self._keys, key)
+            while self._owners[position] is not entry:
+                position += 1
+            del self._keys[position]
+            del self._owners[position]
+        entry.listed = False
+
+    def recipes_changed(self, recipe_ids):
+        """
+        Apply a write to the index and publish a new version token.
+
+        Must run inside the transaction of the write.
+
+        Args:
+            recipe_ids: Ids of recipes that were created, edited or deleted,
+                or whose favorites changed
+        """
+        old, new = IndexVersion.objects.replace(INDEX_NAME)
+        with self._lock:
+            if self._version is None or self._version != old:
+                # Not loaded, or already behind: reload on next use instead
+                self._version = None
+                return
+            RecipeTag = Recipe.tags.through
+            tag_ids = defaultdict(list)
+            for recipe_id, tag_id in RecipeTag.objects.filter(recipe_id__in=recipe_ids).values_list('recipe_id', 'tag_id'):
+                tag_ids[recipe_id].append(tag_id)
+            favorites = dict(
+                Favorite.objects.filter(recipe_id__in=recipe_ids).order_by().values('recipe_id')
+                .annotate(count=Count('pk')).values_list('recipe_id', 'count')
+            )
+            used = {tag_id for ids in tag_ids.values() for tag_id in ids}
+            tags = {pk: (name, category) for pk, name, category in Tag.objects.filter(pk__in=used).values_list(
+                'pk', 'name', 'category')}
+            records = [
+                (pk, title, ingredients, tag_ids.get(pk, ()), favorites.get(pk, 0))
+                for pk, title, ingredients in Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                    'pk', 'title', 'ingredients')
+            ]
+            self.apply(recipe_ids, records, tags)
+            self._version = new
+
+    def complete(self, text, limit=DEFAULT_LIMIT):
+        """
+        Return the most popular completions of a prefix.
+
+        Args:
+            text: What was typed so far; a trailing space ends the last word
+            limit: Maximum number of completions (capped at MAX_LIMIT)
+
+        Returns:
+            list of dicts with 'text' and 'kind' ('recipe', 'tag' or
+            'ingredient'); tags also carry 'id' and 'category'
+        """
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        if text[-1:].isspace():
+            prefix += ' '
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            low = bisect_left(self._keys, prefix)
+            high = bisect_left(self._keys, prefix + _LAST_CHAR, low)
+            if high - low <= SCAN_LIMIT:
+                ranked = heapq.nsmallest(limit, set(self._owners[low:high]), key=_rank)
+            else:
+                top = self._tops.get(prefix) or self._rank_top(prefix, low, high)
+                ranked = top.entries[:limit]
+            return [entry.as_dict() for entry in ranked]
+
+
+def warm_up():
+    """
+    Load the completion index of this process ahead of the first keystroke.
+
+    Called at worker start. If the database is unreachable the index loads
+    on first use.
+    """
+    try:
+        completion_index.ensure_current()
+    except DatabaseError as exc:
+        logger.warning('Completion index not loaded at startup: %s', exc)
+
+
+# The index of this process
+completion_index = CompletionIndex()
@@ -8,12 +8,20 @@ Routes:
     '' (root):             Home page with recipe listing and search (home)
     'create/':             Recipe creation form (create_recipe)
     'recipe/<int:pk>/':    Individual recipe detail view (recipe_detail)
+    'search/complete/':    JSON search box completions (search_completions)
+    'pantry/':             JSON recipes cookable from a pantry (pantry_search)
+    'recommendations/':    JSON recommendations from the user's favorites (recommended_recipes)
+    'export/':             Streamed JSON Lines / CSV export of recipes (export_recipes)
 """
 from django.urls import path
 from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('search/complete/', views.search_completions, name='search_completions'),
+    path('pantry/', views.pantry_search, name='pantry_search'),
+    path('recommendations/', views.recommended_recipes, name='recommended_recipes'),
+    path('export/', views.export_recipes, name='export_recipes'),
     path('create/', views.create_recipe, name='create_recipe'),
     path('recipe/<int:pk>/', views.recipe_detail, name='recipe_detail'),
     path('recipe/<int:pk>/edit/', views.edit_recipe, name='edit_recipe'),
@@ -28,5 +36,6 @@ urlpatterns = [
     # Public analytics endpoint (no login required)
     path('analytics/', views.analytics_view, name='analytics'),
     path('analytics/json/', views.analytics_data_json, name='analytics_json'),
+    path('analytics/cache/json/', views.page_cache_stats_json, name='page_cache_stats'),
 ]
 
@@ -2,167 +2,328 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
-from django.db.models import Q, Count
-from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
+from django.db import transaction
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.http import HttpResponseForbidden
 
-from .models import Recipe, Tag, Step, ABTestImpression, ABTestClick
-from django.http import JsonResponse, HttpResponseBadRequest
+from .models import Recipe, RecipeCard, Tag, Step, Ingredient, ABTestImpression, ABTestClick, has_tag
+from django.http import JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_cache_control
+from django.urls import reverse
 from .forms import RecipeForm
+from . import exporter, fuzzy, highlight, pantry, recommendations, result_cache, search, similar, typeahead
+from . import search_index as memory_search
+from .cache import cache_anonymous_page, page_cache_stats, render_recipe_cards
+from .facets import TIME_BUCKETS, facet_counts
+from .pantry import ingredient_index
+from .pagination import DEFAULT_KEYS, RANKED_KEYS, InvalidCursor, paginate, paginate_entries, paginate_sorted
+from .signals import deferred_recipe_sync
+from .tag_index import tag_index
+from .typeahead import completion_index
+
+
+def _parse_id(value):
+    """Parse a numeric GET parameter, returning None for blank or invalid input."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 
-def _search_recipes_postgres(query, recipes):
+def _paginate_by_tags(tag_ids, max_time, cursor):
     """
-    Perform full-text search using PostgreSQL-specific features.
-    
+    Page through recipes carrying all of the given tags using the tag index.
+
+    The matching set is a bitset intersection in memory; only the cards on
+    the requested page are fetched, with a single `recipe_id__in` query.
+
     Args:
-        query: Search string from user input
-        recipes: QuerySet to filter (typically Recipe.objects.all())
-    
+        tag_ids: Selected tag ids (at least one)
+        max_time: Maximum total time in minutes, or None
+        cursor: Cursor token, or None for the first page
+
     Returns:
-        QuerySet of Recipe objects ranked by relevance
+        KeysetPage of RecipeCard objects (ids and versions only)
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded
     """
-    try:
-        from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
-    except ImportError:
-        return None
-    
-    vector = (
-        SearchVector('title', weight='A')
-        + SearchVector('description', weight='B')
-        + SearchVector('tags__name', weight='C')
-        + SearchVector('steps__instruction_text', weight='C')
-    )
-    search_query = SearchQuery(query)
-    return (
-        recipes
-        .annotate(rank=SearchRank(vector, search_query))
-        .filter(rank__gte=0.001)
-        .order_by('-rank', 'id')
-        .distinct('id')
+    tag_index.ensure_current()
+    return _with_cards(paginate_entries(tag_index.matching(tag_ids, max_time), cursor=cursor))
+
+
+def _paginate_cards(cards, keys, scores, cursor):
+    """
+    Page through filtered cards.
+
+    Args:
+        cards: RecipeCard QuerySet with search and filters applied
+        keys: Sort keys for the database listing
+        scores: {recipe_id: score} from the in-process search index, or None;
+            when given, the page is ordered by score in memory
+        cursor: Cursor token, or None for the first page
+
+    Returns:
+        KeysetPage of RecipeCard objects (ids and versions only)
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded
+    """
+    if scores is None:
+        return paginate(cards, cursor=cursor, keys=keys)
+    entries = [
+        (scores[pk], created_at, pk)
+        for pk, created_at in cards.values_list('recipe_id', 'created_at')
+    ]
+    return _with_cards(paginate_entries(entries, cursor=cursor, keys=RANKED_KEYS))
+
+
+def _with_cards(page):
+    """Replace the recipe ids on an in-memory page with their RecipeCards."""
+    if page.items:
+        cards = RecipeCard.objects.only('recipe_id', 'created_at', 'version').in_bulk(page.items)
+        page.items = [cards[pk] for pk in page.items if pk in cards]
+    return page
+
+
+def _page_url(request, cursor):
+    """
+    Build the query string for another page of the current listing.
+
+    Keeps every search and filter parameter and swaps in the given cursor.
+    """
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    params['cursor'] = cursor
+    return '?' + params.urlencode()
+
+
+def _search_cards(query, cards):
+    """
+    Restrict cards to the recipes matching a search.
+
+    Args:
+        query: Search string (not empty)
+        cards: RecipeCard QuerySet
+
+    Returns:
+        tuple: (filtered cards, listing sort keys, {recipe_id: score} from
+        the in-process index or None, matching recipe ids as a subquery or
+        list)
+    """
+    if memory_search.is_enabled():
+        # In-process index: matches and scores come from memory
+        scores = search.memory_scores(query)
+        matching_ids = list(scores)
+        return cards.filter(recipe_id__in=matching_ids), RANKED_KEYS, scores, matching_ids
+
+    matches = search.search_recipes(query, Recipe.objects.all()).order_by()
+    matching_ids = matches.values('pk')
+    cards = cards.filter(recipe_id__in=matching_ids)
+    if 'rank' not in matches.query.annotations:
+        return cards, DEFAULT_KEYS, None, matching_ids
+    # Ranked full-text search pages by relevance instead of recency
+    cards = cards.annotate(
+        rank=Subquery(matches.filter(pk=OuterRef('recipe_id')).values('rank')[:1])
     )
+    return cards, RANKED_KEYS, None, matching_ids
 
 
-def _search_recipes_fallback(query, recipes):
+def _filter_cards(cards, tag_ids, max_time):
+    """Apply tag and time filters to a RecipeCard QuerySet."""
+    # Cuisine and dietary filters (must have ALL selected tags), one EXISTS
+    # per tag so cards never fan out
+    for tag_id in tag_ids:
+        cards = cards.filter(has_tag(tag_id, 'recipe_id'))
+    # Time filter on the precomputed prep + cook total
+    if max_time is not None:
+        cards = cards.filter(total_time__lte=max_time)
+    return cards
+
+
+def _rank_results(query, tag_ids, max_time):
     """
-    Perform basic full-text-like search using icontains (SQLite-friendly).
+    Run a search with filters and return its ranked entries.
 
-    This is slower than PostgreSQL full-text search but works with any database.
-    Searches across recipe title, description, tag names, and step instructions.
+    Returns:
+        tuple: (sort keys, entries best first, whether all results are
+        included); see result_cache.CachedResults
+    """
+    cards, keys, scores, _ = _search_cards(query, RecipeCard.objects.all())
+    cards = _filter_cards(cards, tag_ids, max_time)
+    limit = result_cache.MAX_RESULTS_PER_QUERY
+    if scores is not None:
+        entries = sorted(
+            ((scores[pk], created_at, pk) for pk, created_at in cards.values_list('recipe_id', 'created_at')),
+            reverse=True,
+        )
+    else:
+        entries = list(cards.order_by(*keys).values_list(*(key.lstrip('-') for key in keys))[:limit + 1])
+    return keys, entries[:limit], len(entries) <= limit
+
+
+def _search_results(query, tag_ids, max_time):
+    """
+    Return the ranked results of a search with filters, through the result cache.
 
     Args:
-        query: Search string from user input
-        recipes: QuerySet to filter (typically Recipe.objects.all())
+        query: Search string (not empty)
+        tag_ids: Selected cuisine and dietary tag ids
+        max_time: Maximum total time in minutes, or None
 
     Returns:
-        QuerySet of Recipe objects matching the query
+        result_cache.CachedResults
     """
-    # Get unique recipe IDs first, then filter recipes by those IDs
-    # This prevents duplicates when joining across tags and steps
-    matching_ids = recipes.filter(
-        Q(title__icontains=query)
-        | Q(description__icontains=query)
-        | Q(tags__name__icontains=query)
-        | Q(steps__instruction_text__icontains=query)
-    ).values_list('id', flat=True).distinct()
+    backend = highlight.current_backend()
+    key = (backend, result_cache.normalize_query(query, backend), tuple(sorted(set(tag_ids))), max_time)
+    return result_cache.result_cache.get_or_compute(key, lambda: _rank_results(query, tag_ids, max_time))
 
-    return Recipe.objects.filter(id__in=matching_ids)
 
+def _slice_results(results, cursor):
+    """
+    Serve a page from cached search results.
+
+    Returns:
+        KeysetPage of RecipeCard objects, or None if the page lies beyond
+        the cached part of the results
+    """
+    def page_at(position):
+        return paginate_sorted(results.entries, cursor=position, keys=results.keys, complete=results.complete)
 
-def _search_recipes(query, recipes):
+    try:
+        page = page_at(cursor)
+    except InvalidCursor:
+        # Stale or tampered cursor: start again from the first page
+        page = page_at(None)
+    return _with_cards(page) if page is not None else None
+
+
+def _list_recipes(query, tag_ids, max_time, cursor):
     """
-    Search recipes by query, using PostgreSQL full-text search if available.
-    
-    Falls back to basic icontains search for SQLite and other databases.
-    
+    Search and filter recipes and return one page of the listing.
+
+    Searches are answered from the result cache (recipes/result_cache.py)
+    and pages are sliced from the cached ranking; only pages beyond the
+    cached results run the search in the database.
+
     Args:
-        query: Search string from user input
-        recipes: QuerySet to filter (typically Recipe.objects.all())
-    
+        query: Search string, or '' to list every recipe
+        tag_ids: Selected cuisine and dietary tag ids (recipes must carry all)
+        max_time: Maximum total time in minutes, or None
+        cursor: Cursor token, or '' for the first page
+
     Returns:
-        QuerySet of matching Recipe objects
-    """
-    if not query:
-        return recipes
-    
-    # Try PostgreSQL full-text search if available
-    is_postgres = 'postgresql' in connection.settings_dict.get('ENGINE', '')
-    if is_postgres:
-        results = _search_recipes_postgres(query, recipes)
-        if results is not None:
-            return results
-    
-    # Fall back to basic search
-    return _search_recipes_fallback(query, recipes)
+        tuple: (KeysetPage of RecipeCard objects, matching recipe ids for
+        facet_counts: a subquery or list, or None without a search, and
+        the dict caching the search's highlights, or None)
+    """
+    if query:
+        results = _search_results(query, tag_ids, max_time)
+        # Facets count the search matches before filters
+        unfiltered = results if not tag_ids and max_time is None else _search_results(query, [], None)
+        matching_ids = unfiltered.recipe_ids if unfiltered.complete else None
+        page = _slice_results(results, cursor or None)
+        if page is not None and matching_ids is not None:
+            return page, matching_ids, results.highlights
+
+        cards, keys, scores, search_ids = _search_cards(query, RecipeCard.objects.all())
+        if matching_ids is None:
+            matching_ids = search_ids
+        if page is not None:
+            return page, matching_ids, results.highlights
+    elif tag_ids:
+        # Browsing by tags: intersect in-memory posting lists, fetch only the page
+        try:
+            return _paginate_by_tags(tag_ids, max_time, cursor or None), None, None
+        except InvalidCursor:
+            # Stale or tampered cursor: start again from the first page
+            return _paginate_by_tags(tag_ids, max_time, None), None, None
+    else:
+        cards, keys, scores, matching_ids = RecipeCard.objects.all(), DEFAULT_KEYS, None, None
+
+    # The listing query only needs ids and versions; markup comes from the cache
+    cards = _filter_cards(cards, tag_ids, max_time).only('recipe_id', 'created_at', 'version')
+    try:
+        page = _paginate_cards(cards, keys, scores, cursor or None)
+    except InvalidCursor:
+        # Stale or tampered cursor: start again from the first page
+        page = _paginate_cards(cards, keys, scores, None)
+    return page, matching_ids, None
+
 
+def _highlights(query, page, cached=None):
+    """Highlight the matches of a search on the recipes of a page (see recipes/highlight.py)."""
+    recipe_ids = [card.recipe_id for card in page.items]
+    return highlight.highlights(query, recipe_ids, highlight.current_backend(), cached)
 
+
+@cache_anonymous_page('home')
 def home(request):
     """
     Home page displaying recipes with optional search and filter functionality.
 
+    Responses for logged-out visitors are served from the page cache.
+
     Supports:
     - Search via 'q' GET parameter
     - Cuisine filter via 'cuisine' GET parameter (tag ID)
     - Dietary restriction filter via 'dietary' GET parameter (multiple tag IDs)
     - Time filter via 'max_time' GET parameter (minutes)
+    - Keyset pagination via the opaque 'cursor' GET parameter
 
     Context:
-        recipes: QuerySet of Recipe objects matching filters
+        recipes: RecipeCard objects on the current page (ids and versions only)
+        recipe_cards: Rendered HTML for each card on the page; with a
+            search, titles and snippets show the matching words
         query: The search query string
+        corrected_query: The query with typos corrected, when its results
+            are shown instead of the few (or no) exact matches; else None
+        result_count: Total number of recipes matching the search and filters
         cuisine_tags: All available cuisine tags for filter dropdown
         dietary_tags: All available dietary tags for filter dropdown
+            (each tag carries a facet_count)
+        time_options: Time filter options with their facet_count
         selected_cuisine: Currently selected cuisine tag ID
         selected_dietary: List of selected dietary tag IDs
         selected_max_time: Currently selected max time value
         show_filter_warning: Boolean indicating if filters produced no results
         active_filter_count: Number of active filters
+        next_cursor / prev_cursor: Opaque cursors for adjacent pages (or None)
+        next_page_url / prev_page_url: Query strings for adjacent pages (or None)
     """
     query = request.GET.get('q', '').strip()
     cuisine_filter = request.GET.get('cuisine', '').strip()
-    dietary_filters = request.GET.getlist('dietary')  # Multiple selections allowed
+    # Multiple selections allowed; cleaned like the page cache key (see cache.canonical_query_string)
+    dietary_filters = list(dict.fromkeys(value.strip() for value in request.GET.getlist('dietary') if value.strip()))
     max_time_filter = request.GET.get('max_time', '').strip()
-
-    recipes = Recipe.objects.all()
-
-    # Apply search
-    if query:
-        recipes = _search_recipes(query, recipes)
-
-    # Apply cuisine filter
-    if cuisine_filter:
-        recipes = recipes.filter(tags__id=cuisine_filter)
-
-    # Apply dietary filters (must have ALL selected dietary tags)
-    if dietary_filters:
-        for dietary_id in dietary_filters:
-            recipes = recipes.filter(tags__id=dietary_id)
-
-    # Apply time filter
-    if max_time_filter:
-        try:
-            max_time = int(max_time_filter)
-            # Filter recipes where total_time (prep + cook) <= max_time
-            # Use Q objects to handle NULL values
-            recipes = recipes.filter(
-                Q(prep_time__isnull=False) | Q(cook_time__isnull=False)
-            ).extra(
-                where=["COALESCE(prep_time, 0) + COALESCE(cook_time, 0) <= %s"],
-                params=[max_time]
-            )
-        except ValueError:
-            pass  # Ignore invalid time values
-
-    # Remove duplicates (can occur when filtering by multiple tags)
-    recipes = recipes.distinct()
-
-    # Add cuisine tag to each recipe for display
-    for recipe in recipes:
-        cuisine_tag = recipe.tags.filter(category='cuisine').first()
-        recipe.cuisine_tag = cuisine_tag.name if cuisine_tag else None
+    cursor = request.GET.get('cursor', '').strip()
+
+    cuisine_id = _parse_id(cuisine_filter)
+    dietary_ids = [tag_id for tag_id in map(_parse_id, dietary_filters) if tag_id is not None]
+    max_time = _parse_id(max_time_filter)  # Invalid time values are ignored
+
+    tag_ids = ([cuisine_id] if cuisine_id is not None else []) + dietary_ids
+    page, matching_ids, cached_highlights = _list_recipes(query, tag_ids, max_time, cursor)
+    # Live counts for every filter option; the total replaces an exists() check
+    facets = facet_counts(matching_ids, cuisine_id, dietary_ids, max_time)
+
+    # Few results: retry with misspelled words corrected ("choclate" -> "chocolate")
+    corrected_query = None
+    if query and facets['total'] < fuzzy.MIN_RESULTS:
+        suggestion = fuzzy.correct(query)
+        if suggestion:
+            fuzzy_page, fuzzy_ids, fuzzy_highlights = _list_recipes(suggestion, tag_ids, max_time, cursor)
+            fuzzy_facets = facet_counts(fuzzy_ids, cuisine_id, dietary_ids, max_time)
+            if fuzzy_facets['total'] > facets['total']:
+                page, facets, corrected_query = fuzzy_page, fuzzy_facets, suggestion
+                cached_highlights = fuzzy_highlights
+    # Only the recipes shown are highlighted
+    highlights = _highlights(corrected_query or query, page, cached_highlights) if query else {}
+    recipe_cards = render_recipe_cards(page.items, highlights)
 
     # Check if filters are active and produced no results
     active_filter_count = (
@@ -170,26 +331,284 @@ def home(request):
         len(dietary_filters) +
         (1 if max_time_filter else 0)
     )
-    show_filter_warning = (active_filter_count > 0 or query) and not recipes.exists()
-
-    # Get all tags for filter UI
-    cuisine_tags = Tag.objects.filter(category='cuisine').order_by('name')
-    dietary_tags = Tag.objects.filter(category='dietary').order_by('name')
+    show_filter_warning = bool(active_filter_count > 0 or query) and facets['total'] == 0
+
+    # Get all tags for filter UI, each with the number of recipes it would return
+    cuisine_tags = list(Tag.objects.filter(category='cuisine').order_by('name'))
+    dietary_tags = list(Tag.objects.filter(category='dietary').order_by('name'))
+    for tag in cuisine_tags + dietary_tags:
+        tag.facet_count = facets['tags'].get(tag.id, 0)
+    time_options = [
+        {'value': str(minutes), 'label': label, 'facet_count': facets['time'][minutes]}
+        for minutes, label in TIME_BUCKETS
+    ]
 
     context = {
-        'recipes': recipes,
+        'recipes': page.items,
+        'recipe_cards': recipe_cards,
+        'result_count': facets['total'],
         'query': query,
+        'corrected_query': corrected_query,
         'cuisine_tags': cuisine_tags,
         'dietary_tags': dietary_tags,
+        'time_options': time_options,
         'selected_cuisine': cuisine_filter,
         'selected_dietary': dietary_filters,
         'selected_max_time': max_time_filter,
         'show_filter_warning': show_filter_warning,
         'active_filter_count': active_filter_count,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'next_page_url': _page_url(request, page.next_cursor) if page.has_next else None,
+        'prev_page_url': _page_url(request, page.prev_cursor) if page.has_previous else None,
     }
     return render(request, 'home.html', context)
 
 
+def search_completions(request):
+    """
+    Public JSON endpoint completing what was typed into the search box.
+
+    Answered from the in-process completion index (recipes/typeahead.py),
+    normally without a database query. Responses do not depend on the
+    visitor and may be cached by browsers and proxies for
+    typeahead.CACHE_MAX_AGE seconds.
+
+    Supports:
+    - Prefix via 'q' GET parameter
+    - Number of completions via 'limit' GET parameter (default 8, at most 20)
+
+    Returns:
+        JSON object with 'query' and 'completions': a list of objects with
+        'text' and 'kind' ('recipe', 'tag' or 'ingredient'); tags also
+        carry 'id' and 'category'
+    """
+    query = request.GET.get('q', '')
+    limit = min(max(_parse_id(request.GET.get('limit')) or typeahead.DEFAULT_LIMIT, 1), typeahead.MAX_LIMIT)
+    completion_index.ensure_current()
+    response = JsonResponse({'query': query, 'completions': completion_index.complete(query, limit)})
+    patch_cache_control(response, public=True, max_age=typeahead.CACHE_MAX_AGE)
+    return response
+
+
+def pantry_search(request):
+    """
+    JSON endpoint listing recipes that can be cooked from a pantry.
+
+    Recipes are ranked by how much of their ingredient list the pantry
+    covers: fewest missing ingredients first, then most covered ones, then
+    newest. Matching runs on the in-process ingredient index
+    (recipes/pantry.py); only the returned recipes are read from the
+    database.
+
+    Supports:
+    - Pantry items via 'have' GET parameters, repeated or comma-separated
+      (e.g., ?have=flour,eggs&have=milk)
+    - Missing ingredients allowed per recipe via 'missing' (default 0, at most 5)
+    - Pagination via 'limit' (default 20, at most 100) and 'offset'
+
+    Returns:
+        JSON object with 'pantry' (the canonical ingredient names searched
+        for), 'unknown' (pantry items no recipe uses), 'count' and
+        'results': a list of objects with 'id', 'title', 'url', 'have',
+        'total', 'coverage' and 'missing' (canonical names of the
+        ingredients to buy)
+    """
+    items = [item for value in request.GET.getlist('have') for item in value.split(',')]
+    if len(items) > pantry.MAX_PANTRY_SIZE:
+        return HttpResponseBadRequest(f'At most {pantry.MAX_PANTRY_SIZE} pantry items are accepted')
+    names = pantry.pantry_names(items)
+    max_missing = min(max(_parse_id(request.GET.get('missing')) or 0, 0), pantry.MAX_MISSING)
+    limit = min(max(_parse_id(request.GET.get('limit')) or pantry.DEFAULT_LIMIT, 1), pantry.MAX_LIMIT)
+    offset = max(_parse_id(request.GET.get('offset')) or 0, 0)
+
+    ingredient_index.ensure_current()
+    results = ingredient_index.search(names, max_missing=max_missing, limit=limit, offset=offset)
+
+    recipe_ids = [recipe_id for recipe_id, _, _ in results.matches]
+    titles = dict(RecipeCard.objects.filter(recipe_id__in=recipe_ids).values_list('recipe_id', 'title'))
+    missing = {}
+    if max_missing:
+        for recipe_id, canonical in Ingredient.objects.filter(recipe_id__in=recipe_ids).exclude(
+            canonical__in=names
+        ).exclude(canonical='').values_list('recipe_id', 'canonical'):
+            missing.setdefault(recipe_id, {})[canonical] = None
+
+    return JsonResponse({
+        'pantry': names,
+        'unknown': [name for name in names if name not in ingredient_index],
+        'count': results.count,
+        'results': [
+            {
+                'id': recipe_id,
+                'title': titles.get(recipe_id, ''),
+                'url': reverse('recipe_detail', args=[recipe_id]),
+                'have': have,
+                'total': total,
+                'coverage': round(have / total, 3),
+                'missing': list(missing.get(recipe_id, {})),
+            }
+            for recipe_id, have, total in results.matches
+        ],
+    })
+
+
+def recommended_recipes(request):
+    """
+    JSON endpoint recommending recipes to the logged-in user from their favorites.
+
+    Combines the precomputed "people who saved this also saved" lists of the
+    user's favorites (recipes/recommendations.py): recipes listed by several
+    favorites rank higher. Responses are private to the user.
+
+    Supports:
+    - Number of recommendations via 'limit' GET parameter (default 20, at most 100)
+
+    Returns:
+        JSON object with 'results': a list of objects with 'id', 'title',
+        'url', 'score' and 'because' (ids of the user's favorites that led
+        to the recipe); 401 for anonymous visitors
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Log in to get recommendations'}, status=401)
+    limit = min(max(_parse_id(request.GET.get('limit')) or recommendations.DEFAULT_LIMIT, 1), recommendations.MAX_LIMIT)
+    # Ask for a few extra in case some were deleted since the lists were computed
+    recommended = recommendations.recommend_for(request.user.pk, limit + 10)
+    titles = dict(
+        RecipeCard.objects.filter(recipe_id__in=[recipe_id for recipe_id, _, _ in recommended])
+        .values_list('recipe_id', 'title')
+    )
+    response = JsonResponse({
+        'results': [
+            {
+                'id': recipe_id,
+                'title': titles[recipe_id],
+                'url': reverse('recipe_detail', args=[recipe_id]),
+                'score': score,
+                'because': because,
+            }
+            for recipe_id, score, because in recommended if recipe_id in titles
+        ][:limit],
+    })
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def export_recipes(request):
+    """
+    Stream the recipes matching a search and filters as a file download.
+
+    Recipes are read and written a chunk at a time (see recipes/exporter.py),
+    so memory use stays flat however many are exported. Logged-in users only.
+
+    Supports the search and filter parameters of the home page ('q',
+    'cuisine', 'dietary', 'max_time') and:
+    - Output format via 'format' GET parameter ('jsonl', the default, or 'csv')
+    - Compression via 'gzip' GET parameter ('1' to gzip the file)
+
+    Returns:
+        StreamingHttpResponse with a recipes.jsonl / recipes.csv attachment
+        (with a .gz suffix when compressed); 400 for an unknown format;
+        401 for anonymous visitors
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Log in to export recipes'}, status=401)
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in exporter.CONTENT_TYPES:
+        return HttpResponseBadRequest('Unknown export format')
+    compress = request.GET.get('gzip') == '1'
+    cuisine_id = _parse_id(request.GET.get('cuisine', '').strip())
+    dietary_ids = [tag_id for tag_id in map(_parse_id, request.GET.getlist('dietary')) if tag_id is not None]
+    recipes = exporter.filtered_recipes(
+        request.GET.get('q', '').strip(),
+        ([cuisine_id] if cuisine_id is not None else []) + dietary_ids,
+        _parse_id(request.GET.get('max_time', '').strip()),
+    )
+    filename = f'recipes.{fmt}' + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        exporter.export(recipes, fmt, compress),
+        content_type='application/gzip' if compress else f'{exporter.CONTENT_TYPES[fmt]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _form_tags(cleaned_data):
+    """
+    Return the tags chosen in a RecipeForm, creating missing ones in bulk.
+
+    Takes one query to look the named tags up and, if some are new, one
+    to insert them and one to read their ids back, however many are named.
+
+    Args:
+        cleaned_data: RecipeForm.cleaned_data
+
+    Returns:
+        list: Tag objects, the cuisine tag first
+    """
+    tags = [cleaned_data['cuisine_type']] if cleaned_data.get('cuisine_type') else []
+    names = list(dict.fromkeys(cleaned_data.get('tags_csv', [])))
+    if not names:
+        return tags
+    found = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in found]
+    if missing:
+        # Another request may create the same tag meanwhile; keep whichever row wins
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        found.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+    return tags + [found[name] for name in names]
+
+
+def _save_tags_and_steps(recipe, cleaned_data, tags=(), steps=()):
+    """
+    Bring the tags and steps of a saved recipe in line with a RecipeForm.
+
+    Only the differences are written: tags no longer chosen are detached
+    and new ones attached, each with one query, and steps are compared by
+    number, so changed texts are updated with one bulk_update, surplus
+    steps deleted and new ones added with one bulk_create. Steps keep
+    their numbers, so (recipe, step_number) stays unique throughout; a
+    step inserted in the middle rewrites the texts after it, as many
+    writes as renumbering those rows would take. None of this grows in
+    queries with the number of tags or steps.
+
+    bulk_create and bulk_update send no post_save signals; saving the
+    recipe has already reported it changed.
+
+    Args:
+        recipe: The saved Recipe
+        cleaned_data: RecipeForm.cleaned_data
+        tags: The recipe's current Tag objects (none for a new recipe)
+        steps: The recipe's current Step objects, in step_number order
+    """
+    wanted = {tag.pk: tag for tag in _form_tags(cleaned_data)}
+    current = {tag.pk for tag in tags}
+    stale = current - wanted.keys()
+    if stale:
+        recipe.tags.remove(*stale)
+    added = [tag for pk, tag in wanted.items() if pk not in current]
+    if added:
+        recipe.tags.add(*added)
+
+    lines = [line.strip() for line in cleaned_data.get('steps_text', '').splitlines() if line.strip()]
+    steps = {step.step_number: step for step in steps}
+    changed = []
+    for number, line in enumerate(lines, start=1):
+        step = steps.get(number)
+        if step is not None and step.instruction_text != line:
+            step.instruction_text = line
+            changed.append(step)
+    if changed:
+        Step.objects.bulk_update(changed, ['instruction_text'])
+    if any(number > len(lines) for number in steps):
+        recipe.steps.filter(step_number__gt=len(lines)).delete()
+    Step.objects.bulk_create([
+        Step(recipe=recipe, step_number=number, instruction_text=line)
+        for number, line in enumerate(lines, start=1) if number not in steps
+    ])
+
+
 def create_recipe(request):
     """
     Create a new recipe via form submission.
@@ -219,25 +638,13 @@ def create_recipe(request):
         if form.is_valid():
             # Assign author: prefer logged-in user, otherwise first user in DB
             author = request.user if request.user.is_authenticated else User.objects.first()
-            recipe = form.save(commit=False)
-            recipe.author = author
-            recipe.save()
-
-            # Cuisine type: add if selected
-            cuisine_tag = form.cleaned_data.get('cuisine_type')
-            if cuisine_tag:
-                recipe.tags.add(cuisine_tag)
-
-            # Additional tags: create or attach
-            tag_names = form.cleaned_data.get('tags_csv', [])
-            for name in tag_names:
-                tag_obj, _ = Tag.objects.get_or_create(name=name)
-                recipe.tags.add(tag_obj)
-
-            # Steps: newline separated
-            steps_text = form.cleaned_data.get('steps_text', '')
-            for idx, line in enumerate([s.strip() for s in steps_text.splitlines() if s.strip()], start=1):
-                Step.objects.create(recipe=recipe, step_number=idx, instruction_text=line)
+            # Save recipe, tags and steps together; refresh derived data once at the end
+            with transaction.atomic(), deferred_recipe_sync():
+                recipe = form.save(commit=False)
+                recipe.author = author
+                recipe.save()
+
+                _save_tags_and_steps(recipe, form.cleaned_data)
 
             messages.success(request, 'Recipe created successfully.')
             return redirect('home')
@@ -247,11 +654,13 @@ def create_recipe(request):
     return render(request, 'create_recipe.html', {'form': form})
 
 
+@cache_anonymous_page('recipe')
 def recipe_detail(request, pk):
     """
     Display a single recipe with all details: title, description, author, tags, and steps.
 
     Uses select_related and prefetch_related for efficient database queries.
+    Responses for logged-out visitors are served from the page cache.
     Raises Http404 if the recipe with the given pk is not found.
 
     URL Parameters:
@@ -264,6 +673,8 @@ def recipe_detail(request, pk):
         cuisine_tags: Tags categorized as cuisine
         dietary_tags: Tags categorized as dietary restrictions
         other_tags: Other uncategorized tags
+        similar_cards: Rendered cards of the precomputed similar recipes
+            (see recipes/similar.py), read with one indexed lookup
 
     Returns:
         Rendered recipe_detail.html template, or Http404 if recipe not found
@@ -271,6 +682,7 @@ def recipe_detail(request, pk):
     recipe = (
         Recipe.objects.select_related('author')
         .prefetch_related('tags', 'steps')
+        .defer('search_document')
         .filter(pk=pk)
         .first()
     )
@@ -293,6 +705,7 @@ def recipe_detail(request, pk):
         'cuisine_tags': cuisine_tags,
         'dietary_tags': dietary_tags,
         'other_tags': other_tags,
+        'similar_cards': render_recipe_cards(similar.similar_cards(recipe.pk)),
     }
     return render(request, 'recipe_detail.html', context)
 
@@ -337,28 +750,12 @@ def edit_recipe(request, pk):
     if request.method == 'POST':
         form = RecipeForm(request.POST, instance=recipe)
         if form.is_valid():
-            # Save the recipe (keeps the same author)
-            recipe = form.save()
+            with transaction.atomic(), deferred_recipe_sync():
+                # Save the recipe (keeps the same author)
+                recipe = form.save()
 
-            # Clear existing tags and steps
-            recipe.tags.clear()
-            recipe.steps.all().delete()
-
-            # Add cuisine tag
-            cuisine_tag = form.cleaned_data.get('cuisine_type')
-            if cuisine_tag:
-                recipe.tags.add(cuisine_tag)
-
-            # Add additional tags
-            tag_names = form.cleaned_data.get('tags_csv', [])
-            for name in tag_names:
-                tag_obj, _ = Tag.objects.get_or_create(name=name)
-                recipe.tags.add(tag_obj)
-
-            # Recreate steps
-            steps_text = form.cleaned_data.get('steps_text', '')
-            for idx, line in enumerate([s.strip() for s in steps_text.splitlines() if s.strip()], start=1):
-                Step.objects.create(recipe=recipe, step_number=idx, instruction_text=line)
+                # Write only what differs from the prefetched tags and steps
+                _save_tags_and_steps(recipe, form.cleaned_data, recipe.tags.all(), recipe.steps.all())
 
             messages.success(request, 'Recipe updated successfully.')
             return redirect('recipe_detail', pk=recipe.pk)
@@ -366,13 +763,13 @@ def edit_recipe(request, pk):
             # Form validation failed
             messages.error(request, 'Please correct the errors in the form below.')
     else:
-        # Prepopulate the form with existing data
+        # Prepopulate the form from the prefetched tags and steps
         # Extract cuisine tag
-        cuisine_tag = recipe.tags.filter(category='cuisine').first()
+        tags = recipe.tags.all()
+        cuisine_tag = next((tag for tag in tags if tag.category == 'cuisine'), None)
 
         # Extract other tags (non-cuisine)
-        other_tags = recipe.tags.exclude(category='cuisine')
-        tags_csv = ', '.join([tag.name for tag in other_tags])
+        tags_csv = ', '.join([tag.name for tag in tags if tag.category != 'cuisine'])
 
         # Extract steps
         steps_text = '\n'.join([step.instruction_text for step in recipe.steps.all()])
@@ -425,8 +822,9 @@ def delete_recipe(request, pk):
     # Store recipe title for success message
     recipe_title = recipe.title
 
-    # Delete the recipe (cascading deletes will handle steps and tags)
-    recipe.delete()
+    # Delete the recipe (cascading deletes will handle steps, tags and its card)
+    with transaction.atomic():
+        recipe.delete()
 
     messages.success(request, f'Recipe "{recipe_title}" has been deleted successfully.')
     return redirect('home')
@@ -675,6 +1073,16 @@ def analytics_data_json(request):
     return JsonResponse(data)
 
 
+def page_cache_stats_json(request):
+    """
+    Public JSON endpoint reporting anonymous page cache hits and misses.
+
+    Returns, per cached page type ('home', 'recipe'), the hit and miss
+    counters and the resulting hit ratio.
+    """
+    return JsonResponse(page_cache_stats())
+
+
 def analytics_view(request):
     """
     Render the analytics dashboard HTML page.